@@ -0,0 +1,85 @@
+// 列式数据解码器（编码见 adata_ui/utils/wire.py）
+// {dtype, bdata}: 小端typed array的base64；start: 差分存储的首个值；scale: 定点小数的倍数；
+// unit: 日期单位（day/s/ms）；values: 字典编码的取值（下标-1为缺失）
+
+const TYPED_ARRAYS = {
+  f8: Float64Array, f4: Float32Array,
+  i4: Int32Array, i2: Int16Array, i1: Int8Array,
+  u4: Uint32Array, u2: Uint16Array, u1: Uint8Array,
+};
+const UNIT_MS = { day: 86400000, s: 1000, ms: 1 };
+
+export function decodeTyped(column) {
+  const binary = atob(column.bdata);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+  return new TYPED_ARRAYS[column.dtype](bytes.buffer);
+}
+
+// 解码为数值（Float64Array），还原差分和定点小数，日期为毫秒时间戳；图表直接使用
+export function decodeNumeric(column) {
+  const typed = decodeTyped(column);
+  const values = new Float64Array(typed.length);
+  const scale = column.scale || 1;
+  const unit = column.unit ? UNIT_MS[column.unit] : 1;
+  let acc = column.start || 0;
+  for (let i = 0; i < typed.length; i++) {
+    acc = column.start !== undefined ? acc + typed[i] : typed[i];
+    values[i] = (acc * unit) / scale;
+  }
+  return values;
+}
+
+function pad(value) {
+  return value < 10 ? "0" + value : "" + value;
+}
+
+export function formatDate(ms, format) {
+  if (Number.isNaN(ms)) return null;
+  const d = new Date(ms);
+  const date = `${d.getUTCFullYear()}-${pad(d.getUTCMonth() + 1)}-${pad(d.getUTCDate())}`;
+  if (format !== "datetime") return date;
+  return `${date} ${pad(d.getUTCHours())}:${pad(d.getUTCMinutes())}:${pad(d.getUTCSeconds())}`;
+}
+
+// 解码为表格单元格的值：日期为字符串，float32还原为最短的十进制表示（10.12 而不是 10.119999885559082），缺失为null
+export function decodeColumn(column) {
+  if (Array.isArray(column)) return column;
+  if (column.values) {
+    const codes = decodeTyped(column);
+    return Array.from(codes, (code) => (code < 0 ? null : column.values[code]));
+  }
+  if (column.unit) {
+    return Array.from(decodeNumeric(column), (ms) => formatDate(ms, column.format));
+  }
+  if (column.dtype === "f4") {
+    return Array.from(decodeTyped(column), (value) => (Number.isNaN(value) ? null : Number(value.toPrecision(7))));
+  }
+  return Array.from(decodeNumeric(column), (value) => (Number.isNaN(value) ? null : value));
+}
+
+// 列式数据转换为表格行（q-table需要行对象）
+export function decodeRows(data) {
+  if (!data || !data.length) return [];
+  const names = Object.keys(data.columns);
+  const columns = names.map((name) => decodeColumn(data.columns[name]));
+  const rows = new Array(data.length);
+  for (let i = 0; i < data.length; i++) {
+    const row = {};
+    for (let j = 0; j < names.length; j++) row[names[j]] = columns[j][i];
+    rows[i] = row;
+  }
+  return rows;
+}
+
+// 具名的单元格格式（列定义中的 format: 'volume' 等）
+export const FORMATTERS = {
+  volume: (value) => {
+    if (value === null || value === undefined) return "-";
+    if (value >= 1e8) return (value / 1e8).toFixed(2) + "亿";
+    if (value >= 1e4) return (value / 1e4).toFixed(2) + "万";
+    return String(value);
+  },
+  percent: (value) => (value === null || value === undefined ? "-" : (value > 0 ? "+" : "") + value.toFixed(2) + "%"),
+  fixed2: (value) => (value === null || value === undefined ? "-" : value.toFixed(2)),
+};
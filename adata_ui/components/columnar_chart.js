@@ -0,0 +1,43 @@
+import { decodeNumeric } from "columnar";
+
+// 与 ui.plotly 相同的plotly.js图表；trace的 columns 字段把trace属性映射到列式数据中的列，
+// 各列只发送、解码一次（K线和均线共用收盘价等）
+export default {
+  template: "<div></div>",
+  props: {
+    options: Object,
+    data: Object,
+  },
+  async mounted() {
+    const { Plotly } = await import("nicegui-plotly");
+    this.Plotly = Plotly;
+    this.update();
+    this.$nextTick(() => {
+      this.resizeObserver = new ResizeObserver(() => this.Plotly.Plots.resize(this.$el));
+      this.resizeObserver.observe(this.$el);
+    });
+  },
+  unmounted() {
+    this.resizeObserver?.disconnect();
+  },
+  watch: {
+    options() {
+      this.update();
+    },
+    data() {
+      this.update();
+    },
+  },
+  methods: {
+    update() {
+      if (typeof this.Plotly === "undefined") return;
+      const columns = {};
+      const column = (name) => (columns[name] ??= decodeNumeric(this.data.columns[name]));
+      const traces = this.options.data.map(({ columns: mapping = {}, ...trace }) => {
+        for (const [attribute, name] of Object.entries(mapping)) trace[attribute] = column(name);
+        return trace;
+      });
+      this.Plotly.react(this.$el, traces, this.options.layout, this.options.config);
+    },
+  },
+};
@@ -0,0 +1,37 @@
+# 列式图表组件
+# plotly.js图表，trace的数据以列式编码发送（见 adata_ui/utils/wire.py），在浏览器端解码后交给plotly.js；
+# 日期按天数差分、价格按定点整数编码，长历史K线的消息体积远小于 ui.plotly 的figure JSON。
+# 不导入plotly.graph_objects，首页的迷你走势图不需要加载plotly
+from typing import Dict, List, Optional
+import pandas as pd
+import nicegui.elements.plotly  # noqa: F401  注册plotly.js的ESM模块（nicegui-plotly）
+from nicegui.element import Element
+from adata_ui.utils.wire import encode_frame
+
+
+class ColumnarChart(Element, component='columnar_chart.js', dependencies=['columnar.js']):
+    """以列式数据渲染的plotly图表
+
+    Args:
+        df: 图表数据
+        traces: trace定义（plotly.js的dict），其中 'columns' 把trace属性映射到df的列，
+                如 {'type': 'scatter', 'name': '收盘价', 'columns': {'x': 'date', 'y': 'close'}}
+        layout: 布局，dict 或 go.Layout
+        config: plotly.js配置
+    """
+
+    def __init__(self, df: pd.DataFrame, traces: List[Dict], layout: Optional[Dict] = None,
+                 config: Optional[Dict] = None):
+        super().__init__()
+        self._classes.append('js-plotly-plot')
+        self.set_data(df, traces, layout, config)
+
+    def set_data(self, df: pd.DataFrame, traces: List[Dict], layout: Optional[Dict] = None,
+                 config: Optional[Dict] = None) -> None:
+        """替换图表数据（只发送trace引用的列）"""
+        if hasattr(layout, 'to_plotly_json'):
+            layout = layout.to_plotly_json()
+        fields = list(dict.fromkeys(name for trace in traces for name in trace.get('columns', {}).values()))
+        self._props['options'] = {'data': traces, 'layout': layout or {}, 'config': config or {}}
+        self._props['data'] = encode_frame(df, fields)
+        self.update()
@@ -0,0 +1,25 @@
+import { decodeRows, FORMATTERS } from "columnar";
+
+export default {
+  template: `
+    <q-table :columns="formattedColumns" :rows="rows">
+      <template v-for="(_, slot) in $slots" v-slot:[slot]="slotProps">
+        <slot :name="slot" v-bind="slotProps || {}" />
+      </template>
+    </q-table>
+  `,
+  props: {
+    columns: Array,
+    data: Object,
+  },
+  computed: {
+    rows() {
+      return decodeRows(this.data);
+    },
+    formattedColumns() {
+      return this.columns.map((column) =>
+        typeof column.format === "string" ? { ...column, format: FORMATTERS[column.format] } : column
+      );
+    },
+  },
+};
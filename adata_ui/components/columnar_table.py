@@ -0,0 +1,37 @@
+# 列式表格组件
+# 与 ui.table 相同的 q-table，但行数据以列式编码发送（见 adata_ui/utils/wire.py），在浏览器端解码成行，
+# 大表（长历史K线、成分股列表）的消息体积和序列化耗时都小得多
+from typing import Dict, List, Optional
+import pandas as pd
+from nicegui.element import Element
+from adata_ui.utils.wire import encode_frame
+
+
+class ColumnarTable(Element, component='columnar_table.js', dependencies=['columnar.js']):
+    """以列式数据渲染的表格
+
+    Args:
+        columns: q-table列定义；format 可以是 columnar.js 中的具名格式（'volume'、'percent'、'fixed2'）
+        df: 表格数据，直接使用缓存中的紧凑类型（日期、float32、category）
+        row_key: 行主键列
+        pagination: 分页设置，如 {'rowsPerPage': 20}
+        date_formats: 日期列的显示格式（'date' 或 'datetime'）
+    """
+
+    def __init__(self, columns: List[Dict], df: pd.DataFrame, row_key: str = 'id',
+                 pagination: Optional[Dict] = None, date_formats: Optional[Dict[str, str]] = None):
+        super().__init__()
+        self._date_formats = date_formats
+        self._props['columns'] = columns
+        self._props['row-key'] = row_key
+        if pagination is not None:
+            self._props['pagination'] = pagination
+        self.set_data(df)
+
+    def set_data(self, df: pd.DataFrame) -> None:
+        """替换表格数据（只发送需要的列）"""
+        fields = [column['field'] for column in self._props['columns'] if column.get('field') in df.columns]
+        if self._props['row-key'] in df.columns and self._props['row-key'] not in fields:
+            fields.append(self._props['row-key'])
+        self._props['data'] = encode_frame(df, fields, self._date_formats)
+        self.update()
@@ -0,0 +1,68 @@
+# 首页主要指数看板组件
+from nicegui import ui
+
+# 看板展示的指数：(指数代码, 名称)
+MAJOR_INDICES = [
+    ('000001', '上证指数'),
+    ('399001', '深证成指'),
+    ('399006', '创业板指'),
+    ('000688', '科创50'),
+    ('000300', '沪深300'),
+]
+
+# 迷你走势图：无坐标轴、不响应交互
+SPARKLINE_LAYOUT = {
+    'height': 60,
+    'margin': {'l': 0, 'r': 0, 't': 0, 'b': 0},
+    'xaxis': {'visible': False, 'type': 'date'},
+    'yaxis': {'visible': False},
+    'showlegend': False,
+    'paper_bgcolor': 'rgba(0,0,0,0)',
+    'plot_bgcolor': 'rgba(0,0,0,0)',
+}
+SPARKLINE_CONFIG = {'staticPlot': True, 'displayModeBar': False}
+
+
+def create_index_dashboard(days: int = 365, points: int = 30):
+    """创建主要指数看板
+
+    页面先返回占位内容，随后一次并发获取全部指数的K线（DataLoader.get_index_overview），
+    迷你走势图使用降采样后的收盘价
+
+    Args:
+        days: 走势的自然日数
+        points: 走势降采样的分桶数
+    """
+    with ui.card().classes('p-6 shadow-md border-0 rounded-xl mb-6 w-full'):
+        ui.label('主要指数').style('font-size: 1.1rem; font-weight: 500; margin-bottom: 0.5rem;')
+        container = ui.row().classes('items-center gap-2')
+        with container:
+            ui.spinner()
+            ui.label('指数加载中...').style('color: #666;')
+
+    async def load():
+        # 页面返回后再导入pandas等依赖，不拖慢首页首字节
+        from adata_ui.utils.data_loader import data_loader
+        from adata_ui.components.columnar_chart import ColumnarChart
+
+        overview = await data_loader.get_index_overview([code for code, _ in MAJOR_INDICES], days, points)
+        container.clear()
+        container.classes(replace='w-full')
+        with container, ui.grid(columns=len(MAJOR_INDICES)).classes('gap-4 w-full'):
+            for (code, name), item in zip(MAJOR_INDICES, overview):
+                change = item['change_pct']
+                color = '#666' if not change else '#ff4d4f' if change > 0 else '#52c41a'
+                with ui.column().classes('gap-0'):
+                    ui.label(name).style('font-weight: 600;')
+                    if item['close'] is None:
+                        ui.label('暂无数据').style('color: #999;')
+                        continue
+                    with ui.row().classes('items-baseline gap-2'):
+                        ui.label(f"{item['close']:.2f}").style(f'font-size: 1.2rem; font-weight: 600; color: {color};')
+                        if change is not None:
+                            ui.label(f'{change:+.2f}%').style(f'color: {color};')
+                    traces = [{'type': 'scatter', 'mode': 'lines', 'line': {'color': color, 'width': 1.5},
+                               'columns': {'x': 'date', 'y': 'close'}}]
+                    ColumnarChart(item['bars'], traces, SPARKLINE_LAYOUT, SPARKLINE_CONFIG).classes('w-full')
+
+    ui.timer(0.1, load, once=True)
@@ -0,0 +1,65 @@
+# 首页行情排行榜组件
+import datetime
+from nicegui import ui
+from adata_ui.utils.leaderboard import leaderboards
+
+# 各排行榜的取值列名
+VALUE_LABELS = {
+    'gainers': '涨跌幅(%)',
+    'losers': '涨跌幅(%)',
+    'turnover': '换手率(%)',
+    'volume_ratio': '量比',
+    'concepts': '平均涨跌幅(%)',
+}
+
+
+def create_leaderboard_panel(refresh_interval: float = 3.0):
+    """创建行情排行榜面板
+
+    排行由后台的 LeaderboardService 统一维护，这里只定时检查版本号，
+    版本变化时才重新渲染，不在客户端请求时排序
+
+    Args:
+        refresh_interval: 检查排行版本的间隔（秒）
+    """
+    rendered_version = -1
+
+    @ui.refreshable
+    def panel():
+        if leaderboards.updated is None:
+            with ui.row().classes('items-center gap-2'):
+                ui.spinner()
+                ui.label('排行榜加载中...').style('color: #666;')
+            return
+        updated = datetime.datetime.fromtimestamp(leaderboards.updated).strftime('%H:%M:%S')
+        ui.label(f'更新时间 {updated}').style('color: #999; font-size: 0.8rem;')
+        with ui.grid(columns=5).classes('gap-4 w-full'):
+            for name, board in leaderboards.boards.items():
+                with ui.column().classes('gap-1'):
+                    ui.label(board.label).style('font-weight: 600;')
+                    columns = [
+                        {'name': 'name', 'label': '名称', 'field': 'name', 'align': 'left'},
+                        {'name': 'value', 'label': VALUE_LABELS[name], 'field': 'value', 'align': 'right'},
+                    ]
+                    table = ui.table(columns=columns, rows=leaderboards.rows(name), row_key='code').props('dense flat').classes('w-full')
+                    if name in ('gainers', 'losers', 'concepts'):
+                        table.add_slot('body-cell-value', r'''
+                            <td :props="props">
+                                <span :style="{fontWeight: '600', color: props.value > 0 ? '#ff4d4f' : props.value < 0 ? '#52c41a' : '#666'}">
+                                    {{ props.value > 0 ? '+' : '' }}{{ props.value }}
+                                </span>
+                            </td>
+                        ''')
+
+    def check_version():
+        nonlocal rendered_version
+        if leaderboards.version != rendered_version:
+            rendered_version = leaderboards.version
+            panel.refresh()
+
+    with ui.card().classes('p-6 shadow-md border-0 rounded-xl mt-6 w-full'):
+        ui.label('市场排行').style('font-size: 1.1rem; font-weight: 500; margin-bottom: 0.5rem;')
+        panel()
+    # 页面返回后再启动后台任务（首次启动会导入pandas等依赖），不拖慢首页首字节
+    ui.timer(0.1, leaderboards.ensure_started, once=True)
+    ui.timer(refresh_interval, check_version)
@@ -0,0 +1,106 @@
+# 性能剖析管理页面
+from nicegui import ui, app
+from fastapi.responses import FileResponse, JSONResponse
+from adata_ui.utils.profiling import PROFILE_MODES, profiler
+
+
+PAGE_TARGETS = ['/', '/stock', '/market', '/concept', '/screener', '/backtest', '/export']
+
+
+def loader_targets():
+    """可剖析的DataLoader方法（被timed_loader包装的方法）"""
+    from adata_ui.utils.data_loader import DataLoader
+    return sorted(name for name, attr in vars(DataLoader).items() if hasattr(attr, '__wrapped__'))
+
+
+def arm_profile(kind: str, name: str, count: int = 1, mode: str = 'cprofile'):
+    """启用剖析的API，例如 POST /admin/profile?kind=loader&name=get_concept_stocks&count=5"""
+    try:
+        target = profiler.arm(kind, name, count, mode)
+        return {'target': target.key, 'remaining': target.remaining, 'mode': target.mode}
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+
+def download_profile(name: str):
+    """下载剖析文件"""
+    path = profiler.profile_path(name)
+    if path is None:
+        return JSONResponse({'error': f'剖析文件不存在: {name}'}, status_code=404)
+    return FileResponse(path, filename=path.name)
+
+
+def register_admin_routes():
+    """注册剖析相关的API"""
+    app.add_api_route('/admin/profile', arm_profile, methods=['POST'])
+    app.add_api_route('/admin/profiles/{name}', download_profile, methods=['GET'])
+
+
+def load_profiles_page():
+    """加载性能剖析管理页面"""
+    ui.label('性能剖析').style('font-size: 1.5rem; font-weight: 600; margin-bottom: 1rem; color: #165DFF')
+
+    with ui.card().classes('p-6 shadow-md border-0 rounded-xl w-full mb-6'):
+        ui.label('启用剖析').style('font-size: 1.1rem; font-weight: 500; margin-bottom: 1rem;')
+        with ui.row().classes('items-center gap-4 w-full'):
+            kind_select = ui.select({'page': '页面交互', 'loader': 'DataLoader方法'}, value='page').props('outlined').classes('w-40')
+            name_select = ui.select(PAGE_TARGETS, value='/concept').props('outlined').classes('w-64')
+            count_input = ui.number('次数', value=3, min=1, max=100, format='%d').props('outlined').classes('w-28')
+            mode_select = ui.select({mode: mode for mode in PROFILE_MODES}, value='cprofile').props('outlined').classes('w-36')
+            ui.button('启用', on_click=lambda: arm(), icon='play-arrow').props('color=primary')
+
+        def on_kind_change(e):
+            options = PAGE_TARGETS if e.value == 'page' else loader_targets()
+            name_select.set_options(options, value=options[0])
+        kind_select.on_value_change(on_kind_change)
+
+        ui.label('cprofile 输出 .pstats（python -m pstats 或 snakeviz 查看），'
+                 'sample 输出 speedscope JSON（https://www.speedscope.app 打开）').style('color: #666; margin-top: 0.5rem;')
+
+    def arm():
+        try:
+            target = profiler.arm(kind_select.value, name_select.value, int(count_input.value or 1), mode_select.value)
+            ui.notify(f'已启用 {target.key}，剩余 {target.remaining} 次', color='success')
+        except ValueError as e:
+            ui.notify(str(e), color='negative')
+        armed_list.refresh()
+
+    @ui.refreshable
+    def armed_list():
+        targets = profiler.armed()
+        if not targets:
+            ui.label('当前没有启用的剖析目标').style('color: #666;')
+            return
+        for target in targets:
+            with ui.row().classes('items-center gap-4'):
+                ui.label(f'{target.key}  剩余 {target.remaining} 次  ({target.mode})')
+                ui.button('取消', on_click=lambda key=target.key: (profiler.disarm(key), armed_list.refresh())).props('flat color=negative')
+
+    @ui.refreshable
+    def profile_list():
+        profiles = profiler.list_profiles()
+        if not profiles:
+            ui.label(f'{profiler.directory} 中还没有剖析文件').style('color: #666;')
+            return
+        columns = [
+            {'name': 'name', 'label': '文件', 'field': 'name', 'align': 'left'},
+            {'name': 'format', 'label': '格式', 'field': 'format'},
+            {'name': 'size_kb', 'label': '大小(KB)', 'field': 'size_kb', 'sortable': True},
+            {'name': 'created', 'label': '时间', 'field': 'created', 'sortable': True},
+        ]
+        table = ui.table(columns=columns, rows=profiles, pagination={'rowsPerPage': 20}).classes('w-full')
+        table.add_slot('body-cell-name', r'''
+            <td :props="props">
+                <a :href="'/admin/profiles/' + encodeURIComponent(props.value)" class="text-blue-600">{{ props.value }}</a>
+            </td>
+        ''')
+
+    with ui.card().classes('p-6 shadow-md border-0 rounded-xl w-full mb-6'):
+        ui.label('已启用的目标').style('font-size: 1.1rem; font-weight: 500; margin-bottom: 1rem;')
+        armed_list()
+
+    with ui.card().classes('p-6 shadow-md border-0 rounded-xl w-full'):
+        with ui.row().classes('items-center justify-between w-full mb-2'):
+            ui.label('剖析文件').style('font-size: 1.1rem; font-weight: 500;')
+            ui.button('刷新', on_click=lambda: (armed_list.refresh(), profile_list.refresh()), icon='refresh').props('flat color=primary')
+        profile_list()
@@ -0,0 +1,240 @@
+# 策略回测页面
+import time
+import datetime
+import pandas as pd
+import plotly.graph_objects as go
+from nicegui import run, ui
+from adata_ui.utils.data_loader import DataLoader
+from adata_ui.utils.app_config import show_error, set_loading
+from adata_ui.utils.profiling import profile_interaction
+from adata_ui.utils.compute import compute_pool
+from adata_ui.components.columnar_chart import ColumnarChart
+from adata_ui.utils.backtest import (DEFAULT_COST, STRATEGIES, concept_index_prices, parameter_grid,
+                                     parse_values, run_backtest, sweep)
+
+
+# 创建数据加载器实例
+data_loader = DataLoader()
+
+PARAM_LABELS = {
+    'fast': '快线',
+    'slow': '慢线',
+    'entry': '突破周期',
+    'exit': '离场周期',
+    'lookback': '动量周期',
+    'top': '持有数量',
+    'rebalance': '调仓间隔',
+}
+
+# 参数扫描的默认取值
+SWEEP_DEFAULTS = {
+    'fast': '3:30:3',
+    'slow': '10:120:10',
+    'entry': '10:60:5',
+    'exit': '5:30:5',
+    'lookback': '5:60:5',
+    'top': '1:5',
+    'rebalance': '1,5,10,20',
+}
+
+STAT_LABELS = {
+    'total_return': ('总收益', True),
+    'annual_return': ('年化收益', True),
+    'volatility': ('年化波动', True),
+    'sharpe': ('夏普比率', False),
+    'max_drawdown': ('最大回撤', True),
+    'win_rate': ('日胜率', True),
+    'turnover': ('累计换手', False),
+}
+
+UNIVERSES = {
+    'codes': '指定股票',
+    'concept': '概念成分股',
+    'concepts': '全部概念指数',
+}
+
+
+def format_stat(name: str, value: float) -> str:
+    """统计指标的显示格式"""
+    return f'{value * 100:.2f}%' if STAT_LABELS[name][1] else f'{value:.2f}'
+
+
+def load_backtest_page():
+    """加载策略回测页面"""
+    ui.label('策略回测').style('font-size: 1.5rem; font-weight: 600; margin-bottom: 1rem; color: #165DFF')
+
+    today = datetime.date.today()
+    params = {}
+    sweep_inputs = {}
+
+    with ui.card().classes('p-6 shadow-md border-0 rounded-xl mb-6 w-full'):
+        with ui.row().classes('items-center gap-4'):
+            ui.label('策略:')
+            strategy_select = ui.select({name: label for name, (label, _, _) in STRATEGIES.items()},
+                                        value='ma_cross', on_change=lambda: param_row.refresh()).props('outlined dense')
+            ui.label('标的:')
+            universe_select = ui.select(UNIVERSES, value='codes').props('outlined dense')
+            universe_input = ui.input(value='600000,000001,600519,000858,300750',
+                                      placeholder='股票代码（逗号分隔）或概念代码').props('outlined dense').classes('w-72')
+            source_select = ui.select({'ths': '同花顺', 'east': '东方财富'}, value='ths').props('outlined dense')
+            universe_input.bind_visibility_from(universe_select, 'value', lambda value: value != 'concepts')
+            source_select.bind_visibility_from(universe_select, 'value', lambda value: value != 'codes')
+
+        with ui.row().classes('items-center gap-4 mt-4'):
+            ui.label('区间:')
+            start_input = ui.input(value=(today - datetime.timedelta(days=3 * 365)).strftime('%Y-%m-%d')).props('outlined dense type=date')
+            ui.label('~')
+            end_input = ui.input(value=today.strftime('%Y-%m-%d')).props('outlined dense type=date')
+            ui.label('交易成本(‰):')
+            cost_input = ui.number(value=DEFAULT_COST * 1000, min=0, max=10, step=0.5).props('outlined dense').classes('w-24')
+
+        @ui.refreshable
+        def param_row():
+            params.clear()
+            sweep_inputs.clear()
+            defaults = STRATEGIES[strategy_select.value][2]
+            with ui.grid(columns=len(defaults)).classes('gap-x-8 gap-y-2 mt-4'):
+                for name, value in defaults.items():
+                    with ui.column().classes('gap-1'):
+                        ui.label(PARAM_LABELS[name])
+                        params[name] = ui.number(value=value, min=1, format='%d').props('outlined dense').classes('w-28')
+                        sweep_inputs[name] = ui.input(value=SWEEP_DEFAULTS[name]).props('outlined dense').classes('w-28') \
+                            .tooltip('参数扫描取值：列表 5,10,20 或区间 5:60:5')
+
+        param_row()
+
+        with ui.row().classes('items-center gap-4 mt-4'):
+            ui.button('回测', on_click=lambda: run_single(), icon='show-chart').props('color=primary')
+            ui.button('参数扫描', on_click=lambda: run_sweep(), icon='grid-on').props('color=primary outline')
+            ui.label(f'参数扫描使用 {max(compute_pool.processes, 1)} 个进程').style('color: #999; font-size: 0.8rem;')
+
+    # 结果显示区域
+    result_container = ui.card().classes('p-6 shadow-md border-0 rounded-xl min-h-[400px] w-full')
+    with result_container:
+        with ui.column().classes('items-center justify-center h-full py-12'):
+            ui.icon('show-chart', size='48px').props('color=primary/50')
+            ui.label('选择策略和标的后点击回测或参数扫描').style('color: #666; margin-top: 1rem;')
+
+    async def load_prices():
+        """按所选标的加载对齐的价格矩阵
+
+        Returns:
+            tuple: (交易日, 标的名称, 价格矩阵)
+        """
+        start, end = start_input.value, end_input.value
+        if not start or not end or start >= end:
+            raise ValueError('请选择有效的回测区间')
+        universe = universe_select.value
+        if universe == 'codes':
+            codes = [code.strip() for code in universe_input.value.replace('，', ',').split(',') if code.strip()]
+            if not codes:
+                raise ValueError('请输入股票代码')
+            dates, codes, close = await data_loader.get_close_matrix(codes, start, end)
+            return dates, codes, close
+        if universe == 'concept':
+            concept_code = universe_input.value.strip()
+            if not concept_code:
+                raise ValueError('请输入概念代码')
+            members = await run.io_bound(data_loader.get_concept_constituents, concept_code, source_select.value)
+            if members is None or members.empty:
+                raise ValueError(f'概念 {concept_code} 没有成分股')
+            return await data_loader.get_close_matrix(members['stock_code'].astype(str).tolist(), start, end)
+        # 全部概念指数：成分股价格矩阵合成各概念的等权指数
+        memberships = await data_loader.get_concept_memberships(source_select.value)
+        if memberships.empty:
+            raise ValueError('没有概念成分股数据')
+        dates, codes, close = await data_loader.get_close_matrix(sorted(set(memberships['stock_code'].astype(str))), start, end)
+        _, names, index = await compute_pool.run(concept_index_prices, close, codes, memberships)
+        return dates, names, index
+
+    def render_empty(message: str):
+        result_container.clear()
+        with result_container:
+            with ui.column().classes('items-center justify-center h-full py-12'):
+                ui.icon('error-outline', size='48px').props('color=error/50')
+                ui.label(message).style('color: #666; margin-top: 1rem;')
+
+    @profile_interaction('/backtest')
+    async def run_single():
+        """按当前参数运行一次回测，显示净值曲线和统计指标"""
+        set_loading(True)
+        try:
+            strategy = strategy_select.value
+            values = {name: int(field.value or 1) for name, field in params.items()}
+            dates, names, close = await load_prices()
+            if len(dates) < 2:
+                raise ValueError('区间内没有足够的行情数据')
+            started = time.perf_counter()
+            result = await compute_pool.run(run_backtest, strategy, close, values, (cost_input.value or 0) / 1000)
+            elapsed = (time.perf_counter() - started) * 1000
+
+            result_container.clear()
+            with result_container:
+                ui.label(f'{STRATEGIES[strategy][0]}：{len(names)} 个标的，{len(dates)} 个交易日'
+                         f'（回测耗时 {elapsed:.1f} ms）').style('margin-bottom: 1rem; font-weight: 500;')
+                curves = pd.DataFrame({'date': dates, 'equity': result['equity'], 'benchmark': result['benchmark']})
+                traces = [
+                    {'type': 'scatter', 'name': '策略', 'line': {'color': '#165DFF'}, 'columns': {'x': 'date', 'y': 'equity'}},
+                    {'type': 'scatter', 'name': '等权组合', 'line': {'color': '#999'}, 'columns': {'x': 'date', 'y': 'benchmark'}},
+                ]
+                layout = go.Layout(height=420, margin=dict(l=40, r=20, t=20, b=40), hovermode='x unified', xaxis_type='date',
+                                   legend=dict(orientation='h', y=1.05))
+                ColumnarChart(curves, traces, layout).classes('w-full')
+
+                columns = [{'name': 'name', 'label': '指标', 'field': 'name', 'align': 'left'},
+                           {'name': 'strategy', 'label': '策略', 'field': 'strategy'},
+                           {'name': 'benchmark', 'label': '等权组合', 'field': 'benchmark'}]
+                rows = [{'name': label, 'strategy': format_stat(name, result['stats'][name]),
+                         'benchmark': format_stat(name, result['benchmark_stats'][name])}
+                        for name, (label, _) in STAT_LABELS.items()]
+                ui.table(columns=columns, rows=rows, row_key='name').props('dense flat').classes('w-full mt-4')
+        except ValueError as e:
+            ui.notify(str(e), color='warning')
+        except Exception as e:
+            show_error(f'回测失败: {str(e)}')
+            render_empty('回测失败，请重试')
+        finally:
+            set_loading(False)
+
+    @profile_interaction('/backtest')
+    async def run_sweep():
+        """按参数网格扫描，在进程池中并行回测，显示夏普比率最高的组合"""
+        set_loading(True)
+        try:
+            strategy = strategy_select.value
+            grid = {name: parse_values(field.value) for name, field in sweep_inputs.items()}
+            combos = len(parameter_grid(grid))
+            dates, names, close = await load_prices()
+            if len(dates) < 2:
+                raise ValueError('区间内没有足够的行情数据')
+            started = time.perf_counter()
+            results = await run.io_bound(sweep, strategy, close, grid, (cost_input.value or 0) / 1000)
+            elapsed = time.perf_counter() - started
+
+            result_container.clear()
+            with result_container:
+                ui.label(f'{STRATEGIES[strategy][0]}：{combos} 个参数组合（有效 {len(results)} 个），'
+                         f'{len(names)} 个标的，{len(dates)} 个交易日（耗时 {elapsed:.2f} s）').style('margin-bottom: 1rem; font-weight: 500;')
+                if not results:
+                    ui.label('没有有效的参数组合').style('color: #666;')
+                    return
+                columns = [{'name': name, 'label': PARAM_LABELS[name], 'field': name} for name in grid]
+                columns += [{'name': name, 'label': label, 'field': name, 'sortable': True}
+                            for name, (label, _) in STAT_LABELS.items()]
+                rows = [{'rank': i, **{name: row[name] for name in grid},
+                         **{name: format_stat(name, row[name]) for name in STAT_LABELS}} for i, row in enumerate(results[:20])]
+                ui.table(columns=columns, rows=rows, row_key='rank').props('dense flat').classes('w-full')
+
+                def apply_best():
+                    for name in grid:
+                        params[name].value = results[0][name]
+                    ui.notify('已填入最优参数')
+
+                ui.button('使用最优参数', on_click=apply_best, icon='check').props('flat color=primary').classes('mt-2')
+        except ValueError as e:
+            ui.notify(str(e), color='warning')
+        except Exception as e:
+            show_error(f'参数扫描失败: {str(e)}')
+            render_empty('参数扫描失败，请重试')
+        finally:
+            set_loading(False)
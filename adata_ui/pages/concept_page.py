@@ -1,8 +1,13 @@
 # 概念板块查询页面
 from nicegui import ui, app
 import pandas as pd
+import plotly.graph_objects as go
 from adata_ui.utils.data_loader import DataLoader, DataTransformer
 from adata_ui.utils.app_config import show_error, set_loading
+from adata_ui.utils.concept_index import concept_index
+from adata_ui.utils.materialize import current_materialized
+from adata_ui.utils.profiling import profile_interaction
+from adata_ui.components.columnar_table import ColumnarTable
 
 
 # 创建数据加载器和转换器实例
@@ -23,6 +28,11 @@ def load_concept_page():
             ui.label('板块名称:')
             concept_name_input = ui.input(placeholder='请输入概念板块名称或代码，例如：5G').props('outlined')
             
+            # 数据源选择：合并视图按对照索引把两个数据源的同一概念合为一行
+            ui.label('数据源:')
+            ui.select({'ths': '同花顺', 'east': '东方财富', 'merged': '合并'}).props('outlined') \
+                .bind_value(app.storage.general, 'concept_source')
+            
             # 排序方式选择
             ui.label('排序方式:')
             sort_by_select = ui.select(['涨幅排序', '成交量排序', '总市值排序'], value='涨幅排序').props('outlined')
@@ -42,6 +52,7 @@ def load_concept_page():
     # 选中的概念板块
     selected_concept = None
     
+    @profile_interaction('/concept')
     async def query_concept_list(concept_name, sort_by):
         """查询概念板块列表"""
         nonlocal selected_concept
@@ -60,7 +71,24 @@ def load_concept_page():
                     ui.label('加载中，请稍候...').style('margin-top: 1rem;')
             
             # 获取概念板块列表
-            concept_list = await data_loader.get_concept_list(concept_name)
+            source = app.storage.general.get('concept_source', 'ths')
+            # 格式化结果的缓存键：查询条件加上概念列表、聚合行情和K线数据的版本，任一变化时重新格式化
+            tables = current_materialized()
+            version = (source, concept_name, sort_by, concept_index.version,
+                       tables.version if tables is not None else None, data_loader.data_version)
+            concept_list = await data_loader.get_concept_list(source, concept_name)
+            # 非交易时段使用收盘后物化的成分股聚合行情（涨跌幅、成交量、成分股数量）
+            aggregates = await data_loader.get_concept_aggregates(source)
+            if aggregates is not None and not concept_list.empty:
+                aggregates = pd.DataFrame({
+                    'concept_code': aggregates['concept_code'].astype(str),
+                    'change': aggregates['change'].round(2),
+                    'volume': (aggregates['volume'] / 1e6).round(2),
+                    'stock_count': aggregates['stock_count'],
+                })
+                concept_list = concept_list.drop(columns=['change', 'volume', 'stock_count'], errors='ignore') \
+                    .astype({'concept_code': str}).merge(aggregates, on='concept_code', how='left') \
+                    .fillna({'change': 0, 'volume': 0, 'stock_count': 0})
             
             # 清空结果容器
             result_container.clear()
@@ -73,13 +101,10 @@ def load_concept_page():
                         ui.label('未找到相关概念板块').style('color: #666; margin-top: 1rem;')
                 return
             
-            # 根据选择的排序方式排序
-            if sort_by == '涨幅排序':
-                concept_list = concept_list.sort_values('change', ascending=False)
-            elif sort_by == '成交量排序':
-                concept_list = concept_list.sort_values('volume', ascending=False)
-            elif sort_by == '总市值排序':
-                concept_list = concept_list.sort_values('market_value', ascending=False)
+            # 根据选择的排序方式排序（真实数据源可能不提供行情字段）
+            sort_column = {'涨幅排序': 'change', '成交量排序': 'volume', '总市值排序': 'market_value'}.get(sort_by)
+            if sort_column in concept_list.columns:
+                concept_list = concept_list.sort_values(sort_column, ascending=False)
             
             # 显示概念板块列表
             with result_container:
@@ -90,25 +115,31 @@ def load_concept_page():
                 columns = [
                     {'name': 'code', 'label': '板块代码', 'field': 'code', 'sortable': True},
                     {'name': 'name', 'label': '板块名称', 'field': 'name', 'sortable': True},
-                    {'name': 'change', 'label': '涨跌幅(%)', 'field': 'change', 'sortable': True, 'format': lambda v: f'{v:+.2f}'},
-                    {'name': 'volume', 'label': '成交量(万手)', 'field': 'volume', 'sortable': True, 'format': lambda v: f'{v:.2f}'},
-                    {'name': 'market_value', 'label': '总市值(亿)', 'field': 'market_value', 'sortable': True, 'format': lambda v: f'{v:.2f}'},
+                    {'name': 'change', 'label': '涨跌幅(%)', 'field': 'change', 'sortable': True, ':format': '(v, row) => row.change_text'},
+                    {'name': 'volume', 'label': '成交量(万手)', 'field': 'volume', 'sortable': True, ':format': '(v, row) => row.volume_text'},
+                    {'name': 'market_value', 'label': '总市值(亿)', 'field': 'market_value', 'sortable': True, ':format': '(v, row) => row.market_value_text'},
                     {'name': 'stock_count', 'label': '成分股数量', 'field': 'stock_count', 'sortable': True},
                     {'name': 'op', 'label': '操作', 'field': 'op', 'sortable': False}
                 ]
                 
-                # 准备表格数据
-                rows = []
-                for _, row in concept_list.iterrows():
-                    rows.append({
-                        'code': row.get('code', '-'),
-                        'name': row.get('name', '-'),
-                        'change': row.get('change', 0),
-                        'volume': row.get('volume', 0),
-                        'market_value': row.get('market_value', 0),
-                        'stock_count': row.get('stock_count', 0),
-                        'op': '查看成分股'
-                    })
+                # 准备表格数据：数值列整列格式化为显示文本，排序仍按原值
+                def column(name, default):
+                    return concept_list[name] if name in concept_list.columns else pd.Series(default, index=concept_list.index)
+
+                table_data = pd.DataFrame({
+                    'code': column('concept_code', '-'),
+                    'name': column('concept_name', '-'),
+                    'change': column('change', 0),
+                    'volume': column('volume', 0),
+                    'market_value': column('market_value', 0),
+                    'stock_count': column('stock_count', 0),
+                })
+                texts = data_transformer.format_columns(
+                    table_data, {'change': 'percent', 'volume': 'fixed2', 'market_value': 'fixed2'}, version)
+                for name, text in texts.items():
+                    table_data[f'{name}_text'] = text
+                table_data['op'] = '查看成分股'
+                rows = data_transformer.df_to_dict_list(table_data)
                 
                 # 创建表格
                 concept_table = ui.table(columns=columns, rows=rows, pagination={'rowsPerPage': 20}).classes('w-full')
@@ -116,8 +147,8 @@ def load_concept_page():
                 # 自定义涨跌幅单元格样式
                 concept_table.add_slot('body-cell-change', r'''  
                     <td :props="props">
-                        <span :style="{fontWeight: '600', color: props.value > 0 ? '#ff4d4f' : props.value < 0 ? '#52c41a' : '#666'}">
-                            {{ props.value > 0 ? '+' : '' }}{{ props.value }}%
+                        <span :style="{fontWeight: '600', color: props.row.change > 0 ? '#ff4d4f' : props.row.change < 0 ? '#52c41a' : '#666'}">
+                            {{ props.value }}
                         </span>
                     </td>
                 ''')
@@ -126,18 +157,14 @@ def load_concept_page():
                 concept_table.add_slot('body-cell-op', r'''  
                     <td :props="props">
                         <button class="text-blue-600 hover:text-blue-800 transition-colors" 
-                                @click="show_stocks(props.row.code, props.row.name)">
+                                @click="() => $parent.$emit('show_stocks', props.row)">
                             查看成分股
                         </button>
                     </td>
                 ''')
                 
-                # 注册JavaScript函数
-                ui.run_javascript(f'''  
-                    window.show_stocks = function(code, name) {{
-                        pywebview.api.show_concept_stocks(code, name);
-                    }};
-                ''')
+                # 通过表格事件打开成分股对话框
+                concept_table.on('show_stocks', lambda e: _show_concept_stocks_dialog(e.args['code'], e.args['name']))
                 
                 # 导出按钮
                 ui.button('导出全部', on_click=lambda: export_concept_list(concept_list)).props('color=success mt-4')
@@ -204,20 +231,20 @@ def load_concept_page():
             with ui.card().classes('p-4 shadow-none border-0 mb-4'):
                 with ui.row().classes('items-center gap-4'):
                     ui.label('排序方式:')
-                    stock_sort_by = ui.select([
-                        {'value': 'change', 'label': '涨幅排序'},
-                        {'value': 'volume', 'label': '成交量排序'},
-                        {'value': 'market_value', 'label': '市值排序'}
-                    ], value='change').props('outlined')
+                    stock_sort_by = ui.select({
+                        'change': '涨幅排序',
+                        'volume': '成交量排序',
+                        'market_value': '市值排序'
+                    }, value='change').props('outlined')
                     
                     ui.label('涨跌幅筛选:')
-                    change_filter = ui.select([
-                        {'value': 'all', 'label': '全部'},
-                        {'value': 'up', 'label': '上涨'},
-                        {'value': 'down', 'label': '下跌'},
-                        {'value': 'limit_up', 'label': '涨停'},
-                        {'value': 'limit_down', 'label': '跌停'}
-                    ], value='all').props('outlined')
+                    change_filter = ui.select({
+                        'all': '全部',
+                        'up': '上涨',
+                        'down': '下跌',
+                        'limit_up': '涨停',
+                        'limit_down': '跌停'
+                    }, value='all').props('outlined')
                     
                     # 创建异步的刷新处理函数
                     async def refresh_stocks():
@@ -228,14 +255,25 @@ def load_concept_page():
                         await export_concept_stocks(concept_code, concept_name)
                     ui.button('导出成分股', on_click=export_stocks, icon='download').props('flat color=success')
             
-            # 成分股列表容器
-            stocks_container = ui.element('div').classes('overflow-auto max-h-[calc(80vh-150px)]')
+            with ui.element('div').classes('overflow-auto max-h-[calc(80vh-150px)] w-full'):
+                # 成分股列表容器
+                stocks_container = ui.element('div')
+                
+                # 联动分析：相关性热力图、聚类和beta
+                with ui.row().classes('items-center gap-4 px-4 mt-6'):
+                    ui.label('联动分析').style('font-size: 1.1rem; font-weight: 600;')
+                    window_select = ui.select({20: '20日', 60: '60日', 120: '120日'}, value=60).props('outlined dense')
+                    async def analyze():
+                        await load_co_movement(concept_code, concept_name, window_select.value, analytics_container)
+                    ui.button('分析', on_click=analyze, icon='hub').props('color=primary')
+                analytics_container = ui.element('div').classes('w-full px-4')
             
             # 加载成分股
             await load_concept_stocks(concept_code, concept_name, stock_sort_by.value, change_filter.value, stocks_container)
         
         dialog.open()
     
+    @profile_interaction('/concept')
     async def load_concept_stocks(concept_code, concept_name, sort_by, change_filter, container=None):
         """加载概念板块的成分股"""
         # 如果没有指定容器，则获取当前对话框中的容器
@@ -255,7 +293,7 @@ def load_concept_page():
                     ui.label('加载成分股中...')
             
             # 获取成分股列表
-            stocks = await data_loader.get_concept_stocks(concept_code)
+            stocks = await data_loader.get_concept_stocks(concept_code, app.storage.general.get('concept_source', 'ths'))
             
             # 清空容器
             container.clear()
@@ -280,12 +318,8 @@ def load_concept_page():
                 stocks = stocks[stocks['change'] <= -9.9]
             
             # 排序处理
-            if sort_by == 'change':
-                stocks = stocks.sort_values('change', ascending=False)
-            elif sort_by == 'volume':
-                stocks = stocks.sort_values('volume', ascending=False)
-            elif sort_by == 'market_value':
-                stocks = stocks.sort_values('market_value', ascending=False)
+            if sort_by in stocks.columns:
+                stocks = stocks.sort_values(sort_by, ascending=False)
             
             # 显示成分股列表
             with container:
@@ -296,36 +330,27 @@ def load_concept_page():
                 columns = [
                     {'name': 'code', 'label': '股票代码', 'field': 'code', 'sortable': True},
                     {'name': 'name', 'label': '股票名称', 'field': 'name', 'sortable': True},
-                    {'name': 'current_price', 'label': '现价', 'field': 'current_price', 'sortable': True},
-                    {'name': 'change', 'label': '涨跌幅(%)', 'field': 'change', 'sortable': True},
-                    {'name': 'volume', 'label': '成交量(万手)', 'field': 'volume', 'sortable': True},
-                    {'name': 'market_value', 'label': '市值(亿)', 'field': 'market_value', 'sortable': True},
+                    {'name': 'current_price', 'label': '现价', 'field': 'current_price', 'sortable': True, 'format': 'fixed2'},
+                    {'name': 'change', 'label': '涨跌幅(%)', 'field': 'change', 'sortable': True, 'format': 'percent'},
+                    {'name': 'volume', 'label': '成交量(万手)', 'field': 'volume', 'sortable': True, 'format': 'fixed2'},
+                    {'name': 'market_value', 'label': '市值(亿)', 'field': 'market_value', 'sortable': True, 'format': 'fixed2'},
                     {'name': 'industry', 'label': '所属行业', 'field': 'industry'},
                     {'name': 'op', 'label': '操作', 'field': 'op', 'sortable': False}
                 ]
                 
-                # 准备表格数据
-                rows = []
-                for _, row in stocks.iterrows():
-                    rows.append({
-                        'code': row.get('code', '-'),
-                        'name': row.get('name', '-'),
-                        'current_price': row.get('current_price', 0),
-                        'change': row.get('change', 0),
-                        'volume': row.get('volume', 0),
-                        'market_value': row.get('market_value', 0),
-                        'industry': row.get('industry', '-'),
-                        'op': '查看详情'
-                    })
+                # 准备表格数据（缺失的列按默认值补齐，按列发送）
+                defaults = {'code': '-', 'name': '-', 'current_price': 0, 'change': 0, 'volume': 0,
+                            'market_value': 0, 'industry': '-'}
+                stocks = stocks.assign(**{column: value for column, value in defaults.items() if column not in stocks.columns})
                 
                 # 创建表格
-                stocks_table = ui.table(columns=columns, rows=rows, pagination={'rowsPerPage': 20}).classes('w-full')
+                stocks_table = ColumnarTable(columns=columns, df=stocks, row_key='code', pagination={'rowsPerPage': 20}).classes('w-full')
                 
                 # 自定义涨跌幅单元格样式
                 stocks_table.add_slot('body-cell-change', r'''  
                     <td :props="props">
-                        <span :style="{fontWeight: '600', color: props.value > 0 ? '#ff4d4f' : props.value < 0 ? '#52c41a' : '#666'}">
-                            {{ props.value > 0 ? '+' : '' }}{{ props.value }}%
+                        <span :style="{fontWeight: '600', color: props.row.change > 0 ? '#ff4d4f' : props.row.change < 0 ? '#52c41a' : '#666'}">
+                            {{ props.value }}
                         </span>
                     </td>
                 ''')
@@ -356,6 +381,65 @@ def load_concept_page():
             # 取消加载状态
             set_loading(False)
     
+    @profile_interaction('/concept')
+    async def load_co_movement(concept_code, concept_name, window, container):
+        """显示成分股收益率的相关性热力图、聚类和相对概念的beta"""
+        set_loading(True)
+        try:
+            container.clear()
+            with container:
+                with ui.row().classes('items-center gap-2 py-4'):
+                    ui.spinner()
+                    ui.label('计算中...')
+            
+            result = await data_loader.get_concept_co_movement(concept_code, app.storage.general.get('concept_source', 'ths'), window)
+            
+            container.clear()
+            if len(result['codes']) < 2:
+                with container:
+                    ui.label('成分股行情数据不足，无法分析').style('color: #666;')
+                return
+            
+            labels = result['labels']
+            names = [f"{name}({code})" for code, name in zip(result['codes'], result['names'])]
+            with container:
+                ui.label(f"{result['days']} 个交易日，{len(names)} 只成分股，{labels.max() + 1} 个聚类（平均相关系数 ≥ 0.5）").style('color: #666; margin-bottom: 0.5rem;')
+                
+                # 相关性热力图（按聚类排序，同簇相邻）
+                fig = go.Figure(go.Heatmap(
+                    z=result['corr'].round(3), x=names, y=names,
+                    zmin=-1, zmax=1, colorscale='RdBu', reversescale=True
+                ))
+                fig.update_layout(
+                    title=f'{concept_name} 成分股日收益率相关性',
+                    height=max(400, 18 * len(names) + 150),
+                    yaxis_autorange='reversed',
+                    template='plotly_white'
+                )
+                ui.plotly(fig).classes('w-full')
+                
+                # 聚类和beta
+                rows = [{
+                    'code': code,
+                    'name': name,
+                    'cluster': int(label) + 1,
+                    'beta': None if pd.isna(beta) else round(float(beta), 2)
+                } for code, name, label, beta in zip(result['codes'], result['names'], labels, result['beta'])]
+                columns = [
+                    {'name': 'code', 'label': '股票代码', 'field': 'code', 'sortable': True},
+                    {'name': 'name', 'label': '股票名称', 'field': 'name', 'sortable': True},
+                    {'name': 'cluster', 'label': '聚类', 'field': 'cluster', 'sortable': True},
+                    {'name': 'beta', 'label': 'Beta(相对概念)', 'field': 'beta', 'sortable': True},
+                ]
+                ui.table(columns=columns, rows=rows, row_key='code', pagination={'rowsPerPage': 20}).classes('w-full')
+        except Exception as e:
+            show_error(f'联动分析失败: {str(e)}')
+            container.clear()
+            with container:
+                ui.label(f'分析失败: {str(e)}').style('color: #ff4d4f;')
+        finally:
+            set_loading(False)
+    
     def export_concept_stocks(concept_code, concept_name):
         """导出概念板块的成分股"""
         async def do_export():
@@ -364,7 +448,7 @@ def load_concept_page():
                 set_loading(True)
                 
                 # 获取成分股列表
-                stocks = await data_loader.get_concept_stocks(concept_code)
+                stocks = await data_loader.get_concept_stocks(concept_code, app.storage.general.get('concept_source', 'ths'))
                 
                 if stocks.empty:
                     ui.notify('暂无成分股数据可导出', color='warning')
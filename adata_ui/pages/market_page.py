@@ -1,15 +1,71 @@
 # 股票行情查询页面
+import functools
 from nicegui import ui, app
 import pandas as pd
 import plotly.graph_objects as go
+from adata_ui.utils.adjust import ADJUST_MODES
 from adata_ui.utils.data_loader import DataLoader, DataTransformer
+from adata_ui.utils.intraday import TICK_INTERVAL, intraday_feed
 from adata_ui.utils.app_config import show_error, set_loading
+from adata_ui.utils.profiling import profile_interaction
+from adata_ui.components.columnar_chart import ColumnarChart
+from adata_ui.components.columnar_table import ColumnarTable
 
 
 # 创建数据加载器和转换器实例
 data_loader = DataLoader()
 data_transformer = DataTransformer()
 
+# K线周期
+PERIOD_OPTIONS = {'D': '日K', 'W': '周K', 'M': '月K',
+                  '1': '1分钟', '5': '5分钟', '15': '15分钟', '30': '30分钟', '60': '60分钟'}
+# 分钟K线周期（最近一个交易日，盘中随行情更新）
+MINUTE_PERIODS = ('1', '5', '15', '30', '60')
+
+
+@functools.lru_cache(maxsize=1)
+def kline_layout():
+    """K线图的公共布局（plotly模板展开较慢，只生成一次）"""
+    return go.Layout(
+        xaxis_title='日期',
+        xaxis_type='date',
+        yaxis_title='价格',
+        xaxis_rangeslider_visible=False,
+        height=500,
+        template='plotly_white'
+    ).to_plotly_json()
+
+
+def create_kline_chart(code, period='D'):
+    """创建K线图表的trace和布局
+
+    trace通过 columns 引用K线数据的列，由 ColumnarChart 以列式数据发送
+
+    Args:
+        code: 股票代码
+        period: K线周期，见 PERIOD_OPTIONS
+
+    Returns:
+        tuple: (traces, layout)
+    """
+    # K线
+    traces = [{
+        'type': 'candlestick',
+        'name': 'K线',
+        'columns': {'x': 'date', 'open': 'open', 'high': 'high', 'low': 'low', 'close': 'close'},
+    }]
+    
+    # 布局
+    layout = {**kline_layout(), 'title': {'text': f'{code} 股票{PERIOD_OPTIONS.get(period, "日K")}线图'}}
+    if period in MINUTE_PERIODS:
+        # 分钟K线隐藏午休和隔夜的空白时段
+        layout['xaxis'] = {**layout.get('xaxis', {}), 'title': {'text': '时间'}, 'rangebreaks': [
+            {'bounds': [11.5, 13], 'pattern': 'hour'},
+            {'bounds': [15, 9.5], 'pattern': 'hour'},
+        ]}
+    
+    return traces, layout
+
 
 def load_stock_market_page():
     """加载股票行情查询页面"""
@@ -25,10 +81,18 @@ def load_stock_market_page():
             
             # 时间范围选择
             ui.label('时间范围:')
-            time_range = ui.select([7, 30, 90, 180, 365], value=30).props('outlined')
+            time_range = ui.select([7, 30, 90, 180, 365, 730], value=30).props('outlined')
+            
+            # K线周期选择（周K/月K由日K按交易日历重采样，分钟K线为最近一个交易日）
+            ui.label('周期:')
+            period_select = ui.select(PERIOD_OPTIONS, value='D').props('outlined')
+            
+            # 复权方式选择（由不复权K线在本地计算，切换时不重新请求行情）
+            ui.label('复权:')
+            adjust_select = ui.select(ADJUST_MODES, value='qfq').props('outlined')
             
             # 查询按钮
-            query_button = ui.button('查询', on_click=lambda: query_stock_data(stock_code_input.value, time_range.value), icon='search').props('color=primary')
+            query_button = ui.button('查询', on_click=lambda: query_stock_data(stock_code_input.value, time_range.value, period_select.value, adjust_select.value), icon='search').props('color=primary')
     
     # 数据显示区域
     result_container = ui.card().classes('p-6 shadow-md border-0 rounded-xl min-h-[500px]')
@@ -40,7 +104,8 @@ def load_stock_market_page():
             ui.label('请输入股票代码并点击查询按钮').style('color: #666; margin-top: 1rem;')
     
     
-    async def query_stock_data(code, days):
+    @profile_interaction('/market')
+    async def query_stock_data(code, days, period='D', adjust='qfq'):
         """查询股票数据并显示"""
         if not code:
             ui.notify('请输入股票代码', color='warning')
@@ -59,7 +124,11 @@ def load_stock_market_page():
                     ui.label('加载中，请稍候...').style('margin-top: 1rem;')
             
             # 获取股票数据
-            stock_data = await data_loader.get_stock_market_data(code, days)
+            intraday = period in MINUTE_PERIODS
+            if intraday:
+                version, stock_data = await data_loader.get_intraday_bars(code, int(period))
+            else:
+                stock_data = await data_loader.get_stock_market_data(code, days, period, adjust)
             
             # 清空结果容器
             result_container.clear()
@@ -76,35 +145,49 @@ def load_stock_market_page():
             with result_container:
                 # 股票信息头部
                 with ui.row().classes('items-center justify-between mb-4'):
-                    ui.label(f'股票代码: {code}').style('font-weight: 600;')
+                    ui.label(f'股票代码: {code}（{PERIOD_OPTIONS[period] if intraday else ADJUST_MODES[adjust]}）').style('font-weight: 600;')
                     
                     # 操作按钮
                     with ui.row().classes('gap-2'):
-                        ui.button('刷新', on_click=lambda: query_stock_data(code, days), icon='refresh').props('flat color=primary')
-                        ui.button('导出', on_click=lambda: export_data(stock_data), icon='download').props('flat color=success')
+                        ui.button('刷新', on_click=lambda: query_stock_data(code, days, period, adjust), icon='refresh').props('flat color=primary')
+                        ui.button('导出', on_click=lambda: export_data(shown['data']), icon='download').props('flat color=success')
                 
                 # K线图表
-                fig = create_kline_chart(stock_data, code)
-                plot_div = fig.to_html(full_html=False, include_plotlyjs='cdn')
-                ui.html(plot_div).classes('w-full')
+                traces, layout = create_kline_chart(code, period)
+                chart = ColumnarChart(stock_data, traces, layout).classes('w-full')
                 
                 # 数据表格
-                ui.label('历史数据').style('font-weight: 600; margin-top: 1rem; margin-bottom: 0.5rem;')
-                
-                # 转换数据为字典列表
-                data_list = data_transformer.df_to_dict_list(stock_data)
+                ui.label('分钟数据' if intraday else '历史数据').style('font-weight: 600; margin-top: 1rem; margin-bottom: 0.5rem;')
                 
-                # 创建表格
+                # 创建表格（列式发送，日期和价格在浏览器端格式化）
                 columns = [
-                    {'name': 'date', 'label': '日期', 'field': 'date', 'sortable': True},
+                    {'name': 'date', 'label': '时间' if intraday else '日期', 'field': 'date', 'sortable': True},
                     {'name': 'open', 'label': '开盘价', 'field': 'open', 'sortable': True},
                     {'name': 'high', 'label': '最高价', 'field': 'high', 'sortable': True},
                     {'name': 'low', 'label': '最低价', 'field': 'low', 'sortable': True},
                     {'name': 'close', 'label': '收盘价', 'field': 'close', 'sortable': True},
-                    {'name': 'volume', 'label': '成交量', 'field': 'volume', 'sortable': True, 'format': lambda v: data_transformer.format_volume(v)}
+                    {'name': 'volume', 'label': '成交量', 'field': 'volume', 'sortable': True, 'format': 'volume'}
                 ]
                 
-                ui.table(columns=columns, rows=data_list, pagination={'rowsPerPage': 20}).classes('w-full')
+                table = ColumnarTable(columns=columns, df=stock_data, row_key='date', pagination={'rowsPerPage': 20}).classes('w-full')
+                shown = {'data': stock_data}
+                
+                if intraday:
+                    rendered_version = version
+                    
+                    async def refresh_intraday():
+                        """盘中分钟K线：缓冲区版本变化时才替换图表和表格数据"""
+                        nonlocal rendered_version
+                        latest_version, bars = await data_loader.get_intraday_bars(code, int(period))
+                        if latest_version != rendered_version and not bars.empty:
+                            rendered_version = latest_version
+                            shown['data'] = bars
+                            chart.set_data(bars, traces, layout)
+                            table.set_data(bars)
+                    
+                    # 定时器随结果区域一起清除（重新查询或离开页面时停止）
+                    ui.timer(0.1, intraday_feed.ensure_started, once=True)
+                    ui.timer(TICK_INTERVAL, refresh_intraday)
         
         except Exception as e:
             show_error(f'查询失败: {str(e)}')
@@ -118,33 +201,6 @@ def load_stock_market_page():
             # 取消加载状态
             set_loading(False)
 
-    def create_kline_chart(stock_data, code):
-        """创建K线图表"""
-        # 创建K线图
-        fig = go.Figure()
-        
-        # 添加K线
-        fig.add_trace(go.Candlestick(
-            x=stock_data['date'],
-            open=stock_data['open'],
-            high=stock_data['high'],
-            low=stock_data['low'],
-            close=stock_data['close'],
-            name='K线'
-        ))
-        
-        # 更新布局
-        fig.update_layout(
-            title=f'{code} 股票K线图',
-            xaxis_title='日期',
-            yaxis_title='价格',
-            xaxis_rangeslider_visible=False,
-            height=500,
-            template='plotly_white'
-        )
-        
-        return fig
-
     def export_data(stock_data):
         """导出数据"""
         try:
@@ -153,7 +209,7 @@ def load_stock_market_page():
             import os
             
             with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as tmp:
-                stock_data.to_csv(tmp.name, index=False)
+                data_transformer.to_display_frame(stock_data).to_csv(tmp.name, index=False)
                 tmp_path = tmp.name
             
             # 下载文件
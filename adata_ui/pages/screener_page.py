@@ -0,0 +1,170 @@
+# 全市场选股页面
+import time
+from nicegui import ui
+from fastapi.responses import JSONResponse
+from adata_ui.utils.data_loader import DataLoader, DataTransformer
+from adata_ui.utils.app_config import show_error, set_loading
+from adata_ui.utils.fundamentals import fundamentals_refresher
+from adata_ui.utils.profiling import profile_interaction
+from adata_ui.utils.screener import FIELD_LABELS, CrossCondition, RangeCondition, parse_conditions, screen, to_records
+
+
+# 创建数据加载器和转换器实例
+data_loader = DataLoader()
+data_transformer = DataTransformer()
+
+# 页面上可设置区间的字段
+RANGE_FIELDS = ['price', 'change_pct', 'pe', 'pb', 'volume_ratio', 'turnover_ratio', 'roe', 'gross_margin', 'debt_ratio']
+
+SORT_OPTIONS = {
+    'change_pct': '涨跌幅',
+    'return': 'N日涨幅',
+    'volume_ratio': '量比',
+    'turnover_ratio': '换手率',
+    'amount': '成交额',
+    'pe': '市盈率',
+    'pb': '市净率',
+    'roe': 'ROE',
+}
+
+
+def column_label(field: str) -> str:
+    """结果表格的列名"""
+    if field.startswith('return_'):
+        return f"{field.split('_')[1]}日涨幅(%)"
+    if field.startswith('ma_'):
+        return f"MA{field.split('_')[1]}"
+    return {'stock_code': '股票代码', 'short_name': '股票名称', **FIELD_LABELS}.get(field, field)
+
+
+async def screener_api(params: dict):
+    """全市场选股API
+
+    例如 GET /api/screener?change_pct=2,&pe=0,30&return_20=10,&cross=5,20,up&sort=return_20&limit=50
+    sort/order/limit 以外的参数都是选股条件，格式见 adata_ui.utils.screener.parse_conditions
+    """
+    params = dict(params)
+    sort_by = params.pop('sort', 'change_pct')
+    ascending = params.pop('order', 'desc') == 'asc'
+    try:
+        limit = int(params.pop('limit', 50))
+        conditions = parse_conditions(params)
+        snapshot = await data_loader.get_market_snapshot()
+        start = time.perf_counter()
+        result, total = screen(snapshot, conditions, sort_by, ascending, limit)
+        elapsed = time.perf_counter() - start
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    return {
+        'version': snapshot.version,
+        'total': total,
+        'elapsed_ms': round(elapsed * 1000, 3),
+        'rows': to_records(result),
+    }
+
+
+def load_screener_page():
+    """加载全市场选股页面"""
+    ui.label('全市场选股').style('font-size: 1.5rem; font-weight: 600; margin-bottom: 1rem; color: #165DFF')
+
+    # 选股条件表单
+    inputs = {}
+    with ui.card().classes('p-6 shadow-md border-0 rounded-xl mb-6 w-full'):
+        with ui.grid(columns=3).classes('gap-x-8 gap-y-2 w-full'):
+            for field in RANGE_FIELDS:
+                with ui.row().classes('items-center gap-2 no-wrap'):
+                    ui.label(f'{FIELD_LABELS[field]}:').classes('w-24')
+                    low = ui.number(placeholder='最小').props('outlined dense').classes('w-24')
+                    ui.label('~')
+                    high = ui.number(placeholder='最大').props('outlined dense').classes('w-24')
+                    inputs[field] = (low, high)
+
+        with ui.row().classes('items-center gap-4 mt-4'):
+            ui.label('N日涨幅(%):')
+            return_days = ui.number(value=20, min=1, max=120, format='%d').props('outlined dense').classes('w-20')
+            return_low = ui.number(placeholder='最小').props('outlined dense').classes('w-24')
+            ui.label('~')
+            return_high = ui.number(placeholder='最大').props('outlined dense').classes('w-24')
+
+            ui.label('均线交叉:')
+            cross_direction = ui.select({'none': '不限', 'up': '金叉', 'down': '死叉'}, value='none').props('outlined dense')
+            cross_fast = ui.number(value=5, min=1, max=60, format='%d').props('outlined dense').classes('w-20')
+            ui.label('/')
+            cross_slow = ui.number(value=20, min=2, max=120, format='%d').props('outlined dense').classes('w-20')
+
+        with ui.row().classes('items-center gap-4 mt-4'):
+            ui.label('排序:')
+            sort_select = ui.select(SORT_OPTIONS, value='change_pct').props('outlined dense')
+            order_select = ui.select({'desc': '降序', 'asc': '升序'}, value='desc').props('outlined dense')
+            ui.label('数量:')
+            limit_select = ui.select([20, 50, 100, 200], value=50).props('outlined dense')
+            ui.button('选股', on_click=lambda: run_screener(), icon='filter-alt').props('color=primary')
+
+    # 结果显示区域
+    result_container = ui.card().classes('p-6 shadow-md border-0 rounded-xl min-h-[400px] w-full')
+    with result_container:
+        with ui.column().classes('items-center justify-center h-full py-12'):
+            ui.icon('filter-alt', size='48px').props('color=primary/50')
+            ui.label('设置选股条件并点击选股按钮').style('color: #666; margin-top: 1rem;')
+
+    # ROE等基本面条件来自基本面快照，由后台任务批量更新
+    ui.timer(0.1, fundamentals_refresher.ensure_started, once=True)
+
+    def build_conditions():
+        """根据表单生成选股条件"""
+        conditions = []
+        for field, (low, high) in inputs.items():
+            if low.value is not None or high.value is not None:
+                conditions.append(RangeCondition(field, low.value, high.value))
+        days = int(return_days.value or 20)
+        if return_low.value is not None or return_high.value is not None:
+            conditions.append(RangeCondition(f'return_{days}', return_low.value, return_high.value))
+        if cross_direction.value != 'none':
+            conditions.append(CrossCondition(int(cross_fast.value or 5), int(cross_slow.value or 20), cross_direction.value))
+        sort_by = f'return_{days}' if sort_select.value == 'return' else sort_select.value
+        return conditions, sort_by
+
+    @profile_interaction('/screener')
+    async def run_screener():
+        """执行选股并显示结果"""
+        set_loading(True)
+        try:
+            conditions, sort_by = build_conditions()
+            snapshot = await data_loader.get_market_snapshot()
+            start = time.perf_counter()
+            result, total = screen(snapshot, conditions, sort_by, order_select.value == 'asc', limit_select.value)
+            elapsed = (time.perf_counter() - start) * 1000
+
+            result_container.clear()
+            with result_container:
+                ui.label(f'全市场 {len(snapshot)} 只股票，符合条件 {total} 只，显示前 {len(result)} 只'
+                         f'（筛选耗时 {elapsed:.1f} ms，快照 v{snapshot.version}）').style('margin-bottom: 1rem; font-weight: 500;')
+                if result.empty:
+                    ui.label('没有符合条件的股票').style('color: #666;')
+                    return
+
+                columns = [{'name': field, 'label': column_label(field), 'field': field, 'sortable': True}
+                           for field in result.columns]
+                rows = data_transformer.df_to_dict_list(data_transformer.to_display_frame(result.round(2)))
+                table = ui.table(columns=columns, rows=rows, row_key='stock_code',
+                                 pagination={'rowsPerPage': 20}).classes('w-full')
+
+                # 自定义涨跌幅单元格样式
+                table.add_slot('body-cell-change_pct', r'''
+                    <td :props="props">
+                        <span :style="{fontWeight: '600', color: props.value > 0 ? '#ff4d4f' : props.value < 0 ? '#52c41a' : '#666'}">
+                            {{ props.value > 0 ? '+' : '' }}{{ props.value }}%
+                        </span>
+                    </td>
+                ''')
+        except ValueError as e:
+            ui.notify(str(e), color='warning')
+        except Exception as e:
+            show_error(f'选股失败: {str(e)}')
+            result_container.clear()
+            with result_container:
+                with ui.column().classes('items-center justify-center h-full py-12'):
+                    ui.icon('error-outline', size='48px').props('color=error/50')
+                    ui.label('选股失败，请重试').style('color: #666; margin-top: 1rem;')
+        finally:
+            set_loading(False)
@@ -2,7 +2,9 @@
 from nicegui import ui, app
 import pandas as pd
 from adata_ui.utils.data_loader import DataLoader, DataTransformer
+from adata_ui.utils.fundamentals import fundamentals_refresher
 from adata_ui.utils.app_config import show_error, set_loading
+from adata_ui.utils.profiling import profile_interaction
 
 
 # 创建数据加载器和转换器实例
@@ -37,6 +39,7 @@ def export_batch_results(results):
     except Exception as e:
         show_error(f'批量导出失败: {str(e)}')
 
+@profile_interaction('/stock')
 async def batch_query(codes_text, result_area):
     """批量查询股票信息"""
     if not codes_text:
@@ -60,16 +63,8 @@ async def batch_query(codes_text, result_area):
             ui.spinner()
             ui.label('正在查询，请稍候...')
         
-        # 批量查询
-        results = []
-        for code in codes:
-            try:
-                info = await data_loader.get_stock_info(code)
-                if info:
-                    results.append(info)
-            except Exception as e:
-                # 单个股票查询失败不影响整体
-                pass
+        # 批量查询：基本面快照中按代码查找，最新价一次请求
+        results = await data_loader.get_stock_infos(codes)
         
         # 清空结果区域
         result_area.clear()
@@ -168,8 +163,12 @@ def load_stock_info_page():
             with ui.column().classes('items-center justify-center h-full py-12'):
                 ui.icon('info', size='48px').props('color=primary/50')
                 ui.label('请输入股票代码并点击查询按钮').style('color: #666; margin-top: 1rem;')
+
+        # 启动基本面快照的后台批量更新（查询只读快照）
+        ui.timer(0.1, fundamentals_refresher.ensure_started, once=True)
         
     
+    @profile_interaction('/stock')
     async def query_stock_info(code):
         """查询单个股票信息"""
         if not code:
@@ -246,7 +245,7 @@ def load_stock_info_page():
                     
                     # 涨跌幅
                     change_color = 'text-red-500' if change_percent > 0 else 'text-green-500' if change_percent < 0 else 'text-gray-500'
-                    ui.label(f'{change_percent:+.2f}%').style(f'font-size: 1.1rem; font-weight: 600; {change_color}')
+                    ui.label(f'{change_percent:+.2f}%').classes(change_color).style('font-size: 1.1rem; font-weight: 600;')
             
             # 详细信息网格
             with ui.grid(columns=2).classes('gap-4'):
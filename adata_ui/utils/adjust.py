@@ -0,0 +1,146 @@
+# 复权计算模块
+# 每只股票的除权除息事件（派现、送转、配股）只取一次，按除权日前一交易日的不复权收盘价
+# 换算成复权因子保存；前复权、后复权K线都由不复权K线乘以累计因子在本地向量化得到，
+# 切换复权方式不再向上游重复请求同一段行情
+import os
+import time
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Tuple
+
+# 复权方式
+ADJUST_MODES: Dict[str, str] = {
+    'qfq': '前复权',
+    'hfq': '后复权',
+    'none': '不复权',
+}
+# 除权除息事件的刷新间隔（秒），超过后再次使用时检查是否有新的事件
+ACTIONS_TTL = float(os.environ.get('ADATA_UI_ADJUST_TTL', 6 * 3600))
+# 需要复权的价格列
+PRICE_COLUMNS = ('open', 'close', 'high', 'low')
+
+
+class AdjustmentFactors:
+    """一只股票的复权因子
+
+    除权日的因子 = 前收盘价 / 除权参考价，
+    除权参考价 = (前收盘价 - 每股派现 + 配股价 × 每股配股数) / (1 + 每股送转股数 + 每股配股数)
+
+    Args:
+        ex_dates: 除权日（升序，datetime64[D]）
+        factors: 各除权日的因子（无法计算时为1）
+    """
+
+    def __init__(self, ex_dates: Optional[np.ndarray] = None, factors: Optional[np.ndarray] = None):
+        self.ex_dates = np.empty(0, dtype='datetime64[D]') if ex_dates is None else ex_dates
+        self.factors = np.empty(0, dtype='float64') if factors is None else factors
+        # 累计因子：cumulative[i] 为前i个事件的因子乘积
+        self.cumulative = np.concatenate([[1.0], np.cumprod(self.factors)])
+
+    def __len__(self) -> int:
+        return len(self.ex_dates)
+
+    @property
+    def version(self) -> str:
+        """因子版本：事件数和最后一个除权日，有新事件时变化"""
+        return f"{len(self)}:{self.ex_dates[-1] if len(self) else '-'}"
+
+    def missing(self, actions: pd.DataFrame) -> pd.DataFrame:
+        """事件中尚未计算因子的部分（按除权日）"""
+        if actions.empty:
+            return actions
+        ex_dates = pd.to_datetime(actions['ex_date']).to_numpy().astype('datetime64[D]')
+        return actions[~np.isin(ex_dates, self.ex_dates)]
+
+    def extend(self, actions: pd.DataFrame, bars: pd.DataFrame) -> 'AdjustmentFactors':
+        """加入新的除权除息事件，返回新的因子（已有事件的因子不重新计算）
+
+        Args:
+            actions: 新事件: ex_date, cash, bonus, rights, rights_price
+            bars: 覆盖各除权日前一交易日到最新交易日的不复权K线（date升序）
+        """
+        if actions.empty or bars.empty:
+            return self
+        dates = bars['date'].to_numpy().astype('datetime64[D]')
+        # 除权日晚于最新K线的事件（已公告、尚未除权）留到除权后再计算
+        actions = actions[pd.to_datetime(actions['ex_date']).to_numpy().astype('datetime64[D]') <= dates[-1]]
+        if actions.empty:
+            return self
+        ex_dates = pd.to_datetime(actions['ex_date']).to_numpy().astype('datetime64[D]')
+        close = bars['close'].to_numpy(dtype='float64')
+        # 除权日前一根K线（停牌时为最近一根）的收盘价，K线未覆盖时因子记为1
+        pos = np.searchsorted(dates, ex_dates, side='left') - 1
+        prev = np.full(len(ex_dates), np.nan)
+        prev[pos >= 0] = close[pos[pos >= 0]]
+
+        def column(name):
+            return pd.to_numeric(actions[name], errors='coerce').fillna(0).to_numpy(dtype='float64')
+
+        rights = column('rights')
+        rights_price = pd.to_numeric(actions['rights_price'], errors='coerce').to_numpy(dtype='float64')
+        # 配股价未知时不能当作无偿送股计算，该事件因子记为1
+        unpriced = (rights > 0) & ~(rights_price > 0)
+        for ex_date in actions['ex_date'][unpriced]:
+            print(f"配股事件 {ex_date} 缺少配股价，复权因子按1处理")
+        with np.errstate(divide='ignore', invalid='ignore'):
+            reference = (prev - column('cash') + np.nan_to_num(rights_price) * rights) / (1 + column('bonus') + rights)
+            factors = prev / reference
+        factors = np.where(np.isfinite(factors) & (factors > 0) & ~unpriced, factors, 1.0)
+
+        all_dates = np.concatenate([self.ex_dates, ex_dates])
+        all_factors = np.concatenate([self.factors, factors])
+        order = np.argsort(all_dates, kind='stable')
+        return AdjustmentFactors(all_dates[order], all_factors[order])
+
+    def multipliers(self, dates, mode: str) -> np.ndarray:
+        """各日期的价格乘数
+
+        后复权：该日及之前全部事件的因子乘积；前复权：后复权乘数 / 全部事件的因子乘积
+        """
+        if mode not in ADJUST_MODES:
+            raise ValueError(f'未知的复权方式: {mode}')
+        dates = np.asarray(dates).astype('datetime64[D]')
+        if mode == 'none' or not len(self):
+            return np.ones(len(dates))
+        backward = self.cumulative[np.searchsorted(self.ex_dates, dates, side='right')]
+        return backward if mode == 'hfq' else backward / self.cumulative[-1]
+
+    def apply(self, bars: pd.DataFrame, mode: str) -> pd.DataFrame:
+        """复权K线：价格列乘以乘数，成交量和成交额不变；不复权或没有事件时原样返回"""
+        if mode == 'none' or not len(self) or bars.empty:
+            return bars
+        multipliers = self.multipliers(bars['date'].to_numpy(), mode)
+        adjusted = bars.copy()
+        for column in PRICE_COLUMNS:
+            values = bars[column].to_numpy()
+            adjusted[column] = (values * multipliers).astype(values.dtype)
+        return adjusted
+
+
+class FactorStore:
+    """进程内共享的复权因子：每只股票一份，记录上次检查除权除息事件的时间"""
+
+    def __init__(self):
+        self._factors: Dict[str, Tuple[AdjustmentFactors, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, stock_code: str, max_age: Optional[float] = None) -> Tuple[Optional[AdjustmentFactors], bool]:
+        """返回 (已保存的因子, 是否仍在有效期内)，没有保存过时因子为None"""
+        entry = self._factors.get(stock_code)
+        if entry is None:
+            return None, False
+        max_age = ACTIONS_TTL if max_age is None else max_age
+        return entry[0], time.monotonic() - entry[1] <= max_age
+
+    def put(self, stock_code: str, factors: AdjustmentFactors) -> None:
+        with self._lock:
+            self._factors[stock_code] = (factors, time.monotonic())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._factors.clear()
+
+
+# 进程内共享的复权因子
+factor_store = FactorStore()
@@ -0,0 +1,207 @@
+# 联动分析模块
+# 把多只股票的K线按交易日对齐成收益率矩阵（交易日 x 股票），
+# 相关系数、beta 都是矩阵运算；缺失值按“两两同时有数据的交易日”计算，
+# 全市场规模时按列分块计算，不一次性生成 N x N 的中间矩阵
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+def aligned_prices(frames: Dict[str, pd.DataFrame]) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    """将多只股票的K线按交易日对齐成收盘价矩阵
+
+    Args:
+        frames: 股票代码到K线（date/close列）的映射
+
+    Returns:
+        tuple: (交易日, 股票代码, 收盘价矩阵[交易日 x 股票])，当日无数据为NaN
+    """
+    codes = [code for code, df in frames.items() if df is not None and len(df) > 0]
+    if not codes:
+        return np.empty(0, dtype='datetime64[s]'), [], np.empty((0, 0))
+    dates = [frames[code]['date'].to_numpy().astype('datetime64[s]') for code in codes]
+    all_dates = np.unique(np.concatenate(dates))
+    close = np.full((len(all_dates), len(codes)), np.nan)
+    for j, code in enumerate(codes):
+        close[np.searchsorted(all_dates, dates[j]), j] = frames[code]['close'].to_numpy(dtype='float64')
+    return all_dates, codes, close
+
+
+def aligned_returns(frames: Dict[str, pd.DataFrame], window: Optional[int] = None) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    """将多只股票的K线按交易日对齐，计算日收益率矩阵
+
+    Args:
+        frames: 股票代码到K线（date/close列）的映射
+        window: 只保留最近window个交易日的收益率，None表示全部
+
+    Returns:
+        tuple: (交易日, 股票代码, 收益率矩阵[交易日 x 股票])，缺失为NaN
+    """
+    frames = {code: df for code, df in frames.items() if df is not None and len(df) > 1}
+    all_dates, codes, close = aligned_prices(frames)
+    if not codes:
+        return all_dates, codes, close
+    returns = close[1:] / close[:-1] - 1
+    dates = all_dates[1:]
+    if window is not None:
+        returns, dates = returns[-window:], dates[-window:]
+    return dates, codes, returns
+
+
+def _moments(x: np.ndarray, y: np.ndarray, min_periods: int):
+    """两组列之间按成对有效样本计算的协方差、方差（矩阵形式）"""
+    mx, my = ~np.isnan(x), ~np.isnan(y)
+    x0, y0 = np.where(mx, x, 0.0), np.where(my, y, 0.0)
+    fx, fy = mx.astype('float64'), my.astype('float64')
+    n = fx.T @ fy
+    sx = x0.T @ fy
+    sy = fx.T @ y0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = (x0.T @ y0 - sx * sy / n) / (n - 1)
+        var_x = ((x0 ** 2).T @ fy - sx ** 2 / n) / (n - 1)
+        var_y = (fx.T @ (y0 ** 2) - sy ** 2 / n) / (n - 1)
+    insufficient = n < min_periods
+    cov[insufficient] = np.nan
+    return cov, var_x, var_y
+
+
+def correlation_blocks(returns: np.ndarray, chunk: int = 512, min_periods: int = 10) -> Iterator[Tuple[int, np.ndarray]]:
+    """按列分块计算相关系数矩阵，每次返回 (起始列, 该块与全部列的相关系数[chunk x N])
+
+    全市场（约5000只）时完整矩阵约200MB，分块后峰值内存只与 chunk x N 成正比
+    """
+    for start in range(0, returns.shape[1], chunk):
+        block = returns[:, start:start + chunk]
+        cov, var_x, var_y = _moments(block, returns, min_periods)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cov / np.sqrt(var_x * var_y)
+        yield start, np.clip(corr, -1, 1)
+
+
+def correlation_matrix(returns: np.ndarray, chunk: int = 512, min_periods: int = 10) -> np.ndarray:
+    """成对有效样本的皮尔逊相关系数矩阵"""
+    n = returns.shape[1]
+    corr = np.empty((n, n))
+    for start, block in correlation_blocks(returns, chunk, min_periods):
+        corr[start:start + len(block)] = block
+    return corr
+
+
+def most_correlated(returns: np.ndarray, k: int = 10, chunk: int = 512, min_periods: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+    """每只股票相关性最高的k只股票（不含自身），分块计算，适用于全市场
+
+    Returns:
+        tuple: (下标[N x k], 相关系数[N x k])
+    """
+    n = returns.shape[1]
+    k = min(k, n - 1)
+    index = np.empty((n, k), dtype='int64')
+    values = np.empty((n, k))
+    for start, block in correlation_blocks(returns, chunk, min_periods):
+        rows = np.arange(len(block))
+        block = np.where(np.isnan(block), -np.inf, block)
+        block[rows, start + rows] = -np.inf
+        part = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(block, part, axis=1), axis=1)
+        index[start:start + len(block)] = np.take_along_axis(part, order, axis=1)
+        values[start:start + len(block)] = np.take_along_axis(block, index[start:start + len(block)], axis=1)
+    values[np.isinf(values)] = np.nan
+    return index, values
+
+
+def beta_to_aggregate(returns: np.ndarray, min_periods: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+    """各股票相对于等权组合（如概念指数）的beta
+
+    Returns:
+        tuple: (beta[N], 等权组合收益率[T])
+    """
+    count = (~np.isnan(returns)).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        aggregate = np.where(count > 0, np.nansum(returns, axis=1) / count, np.nan)
+    cov, _, var_aggregate = _moments(returns, aggregate[:, None], min_periods)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        beta = cov[:, 0] / var_aggregate[:, 0]
+    return beta, aggregate
+
+
+def cluster(corr: np.ndarray, threshold: float = 0.5, max_clusters: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """按平均连接的层次聚类，距离为 1 - 相关系数
+
+    簇间平均相关系数低于threshold（且簇数不超过max_clusters）时停止合并。
+    用于概念成分股规模（几十到几百只），每次合并是一次向量化的距离矩阵更新。
+
+    Returns:
+        tuple: (簇编号[N]，按簇大小从0编号, 展示顺序[N]：同簇相邻)
+    """
+    n = len(corr)
+    if n == 0:
+        return np.empty(0, dtype='int64'), np.empty(0, dtype='int64')
+    similarity = np.where(np.isnan(corr), 0.0, corr).astype('float64')
+    np.fill_diagonal(similarity, -np.inf)
+    sizes = np.ones(n)
+    active = np.ones(n, dtype=bool)
+    members: List[List[int]] = [[i] for i in range(n)]
+    clusters = n
+    while clusters > 1:
+        masked = np.where(active[:, None] & active[None, :], similarity, -np.inf)
+        i, j = np.unravel_index(np.argmax(masked), masked.shape)
+        if masked[i, j] < threshold and (max_clusters is None or clusters <= max_clusters):
+            break
+        # 合并j到i，新簇与其他簇的平均相关系数按簇大小加权
+        merged = (similarity[i] * sizes[i] + similarity[j] * sizes[j]) / (sizes[i] + sizes[j])
+        similarity[i], similarity[:, i] = merged, merged
+        similarity[i, i] = -np.inf
+        sizes[i] += sizes[j]
+        active[j] = False
+        members[i].extend(members[j])
+        clusters -= 1
+
+    groups = sorted((members[i] for i in np.flatnonzero(active)), key=len, reverse=True)
+    labels = np.empty(n, dtype='int64')
+    for label, group in enumerate(groups):
+        labels[group] = label
+    order = np.concatenate([np.array(group, dtype='int64') for group in groups])
+    return labels, order
+
+
+def co_movement(frames: Dict[str, pd.DataFrame], window: int = 60, threshold: float = 0.5, min_periods: int = 10) -> Dict:
+    """一组股票（如概念成分股）的联动分析：相关系数矩阵、聚类和相对等权组合的beta
+
+    Args:
+        frames: 股票代码到K线的映射
+        window: 收益率窗口（交易日）
+        threshold: 聚类的平均相关系数阈值
+        min_periods: 计算相关系数所需的最少成对样本数
+
+    Returns:
+        dict: codes（按聚类排序）, corr, labels, beta, days
+    """
+    dates, codes, close = aligned_prices(frames)
+    return co_movement_matrix(codes, close, window, threshold, min_periods)
+
+
+def co_movement_matrix(codes: List[str], close: np.ndarray, window: int = 60, threshold: float = 0.5,
+                       min_periods: int = 10) -> Dict:
+    """在对齐的收盘价矩阵上做联动分析，参数和返回值见co_movement（可在计算进程池中执行）"""
+    if close.shape[0] > 1:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = (close[1:] / close[:-1] - 1)[-window:]
+        # 少于两条K线的股票没有收益率
+        keep = (~np.isnan(close)).sum(axis=0) > 1
+        codes, returns = [code for code, kept in zip(codes, keep) if kept], returns[:, keep]
+    else:
+        codes, returns = [], np.empty((0, 0))
+    if not codes:
+        return {'codes': [], 'corr': np.empty((0, 0)), 'labels': np.empty(0, dtype='int64'),
+                'beta': np.empty(0), 'days': 0}
+    days = len(returns)
+    corr = correlation_matrix(returns, min_periods=min(min_periods, max(days - 1, 2)))
+    labels, order = cluster(corr, threshold)
+    beta, _ = beta_to_aggregate(returns, min_periods=min(min_periods, max(days - 1, 2)))
+    return {
+        'codes': [codes[i] for i in order],
+        'corr': corr[np.ix_(order, order)],
+        'labels': labels[order],
+        'beta': beta[order],
+        'days': days,
+    }
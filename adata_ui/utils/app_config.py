@@ -3,7 +3,6 @@ import os
 import asyncio
 import time
 import random
-import pandas as pd
 from nicegui import events
 from nicegui import ui, app
 from nicegui.events import ValueChangeEventArguments
@@ -52,10 +51,12 @@ class MockDataLoader:
     
     def get_stock_data(self, code, start_date, end_date):
         # 返回模拟数据
+        import pandas as pd
         return pd.DataFrame()
     
     def get_concept_data(self, source='ths'):
         # 返回模拟数据
+        import pandas as pd
         return pd.DataFrame()
     
     def get_stock_info(self, code):
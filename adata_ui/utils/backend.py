@@ -0,0 +1,906 @@
+# 数据后端模块
+# 统一真实adata接口、模拟数据、录制与回放，DataLoader只通过这里取数
+import os
+import re
+import hashlib
+import time
+import random
+import datetime
+import argparse
+import zlib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from adata_ui.utils.metrics import observe_upstream
+
+# list_fundamentals 返回的列
+FUNDAMENTAL_COLUMNS = [
+    'stock_code', 'industry', 'report_date', 'total_shares', 'float_shares', 'revenue', 'net_profit',
+    'gross_margin', 'net_margin', 'roe', 'debt_ratio', 'eps', 'bps'
+]
+
+# 逐只拉取基本面时的并发请求数
+FUNDAMENTALS_WORKERS = int(os.environ.get('ADATA_UI_FUNDAMENTALS_WORKERS', 16))
+
+# 除权除息事件的列（每股数值）
+CORPORATE_ACTION_COLUMNS = ['ex_date', 'cash', 'bonus', 'rights', 'rights_price']
+
+
+def parse_dividend_plan(plan: str) -> Tuple[float, float, float]:
+    """解析分红送转方案文本，如"10送3转5派2元(含税)"、"10派3.5元"、"10配3股"
+
+    Returns:
+        tuple: (每股派现, 每股送转股数, 每股配股数)
+    """
+    base = re.match(r'\s*(\d+(?:\.\d+)?)', plan)
+    per = float(base.group(1)) if base else 10.0
+
+    def amount(pattern):
+        return sum(float(value) for value in re.findall(pattern, plan)) / per if per else 0.0
+
+    cash = amount(r'派(?:发现金)?(\d+(?:\.\d+)?)元')
+    bonus = amount(r'送(?:红股)?(\d+(?:\.\d+)?)股?') + amount(r'转(?:增)?(\d+(?:\.\d+)?)股?')
+    rights = amount(r'配(\d+(?:\.\d+)?)股?')
+    return round(cash, 6), round(bonus, 6), round(rights, 6)
+
+
+def parse_rights_price(plan: str) -> float:
+    """解析方案文本中的配股价，如"10配3股，配股价5.5元"、"配股价格:8.10元/股"；没有给出时为NaN"""
+    match = re.search(r'配股(?:价格?|价)\s*[:：]?\s*(\d+(?:\.\d+)?)\s*元', plan)
+    return float(match.group(1)) if match else float('nan')
+
+
+class ReplayMissError(LookupError):
+    """回放目录中没有对应请求的录制文件"""
+
+
+class DataBackend:
+    """数据后端接口
+
+    方法名与返回列和adata保持一致，所有实现都是同步调用，
+    异步包装由DataLoader负责。
+    """
+
+    name = 'base'
+
+    def all_code(self) -> pd.DataFrame:
+        """全部A股代码: stock_code, short_name, exchange, list_date"""
+        raise NotImplementedError
+
+    def get_market(self, stock_code: str, start_date: str = '1990-01-01',
+                   end_date: Optional[str] = None, k_type: int = 1) -> pd.DataFrame:
+        """个股K线（不复权）: trade_date, open, close, high, low, volume, amount, change_pct ...
+
+        复权K线由 adata_ui.utils.adjust 根据除权除息事件在本地计算
+        """
+        raise NotImplementedError
+
+    def get_market_index(self, index_code: str, start_date: str = '2020-01-01',
+                         k_type: int = 1) -> pd.DataFrame:
+        """指数K线: index_code, trade_date, open, high, low, close, volume, amount ..."""
+        raise NotImplementedError
+
+    def list_market_current(self, code_list: List[str]) -> pd.DataFrame:
+        """最新行情: stock_code, short_name, price, change, change_pct, volume, amount"""
+        raise NotImplementedError
+
+    def get_market_min(self, stock_code: str) -> pd.DataFrame:
+        """最近一个交易日的分时行情（每分钟一行，以分钟结束时刻标记）:
+        stock_code, trade_time, price, change, change_pct, volume, avg_price, amount（成交量/额为该分钟的）"""
+        raise NotImplementedError
+
+    def all_concept_code(self, source: str = 'ths') -> pd.DataFrame:
+        """概念列表: concept_code, index_code, name, source"""
+        raise NotImplementedError
+
+    def concept_constituent(self, concept_code: str, source: str = 'ths') -> pd.DataFrame:
+        """概念成分股: stock_code, short_name"""
+        raise NotImplementedError
+
+    def get_concept(self, stock_code: str, source: str = 'ths') -> pd.DataFrame:
+        """个股所属概念: stock_code, concept_code, name, source, reason"""
+        raise NotImplementedError
+
+    def list_fundamentals(self, code_list: List[str]) -> pd.DataFrame:
+        """最新一期基本面: stock_code, industry, report_date, total_shares, float_shares, revenue, net_profit,
+        gross_margin, net_margin, roe, debt_ratio, eps, bps（股本为股、金额为元、比率为%）"""
+        raise NotImplementedError
+
+    def trade_calendar(self, start_year: int = 1990) -> pd.DataFrame:
+        """沪深交易日历（start_year至今年的每一天）: trade_date, trade_status（1为交易日）"""
+        raise NotImplementedError
+
+    def get_corporate_actions(self, stock_code: str) -> pd.DataFrame:
+        """除权除息事件: ex_date, cash（每股派现，元）, bonus（每股送转股数）, rights（每股配股数）, rights_price（配股价，未知时为NaN）"""
+        raise NotImplementedError
+
+    def submit(self, method: str, *args) -> Optional[Future]:
+        """以非阻塞方式发起请求，返回concurrent Future；不支持时返回None（由调用方在线程中调用同步方法）"""
+        return None
+
+
+class AdataBackend(DataBackend):
+    """真实数据后端，直接调用adata"""
+
+    name = 'adata'
+
+    def __init__(self):
+        # 延迟导入，离线环境下不使用该后端时无需安装adata
+        import adata
+        self._adata = adata
+
+    def all_code(self) -> pd.DataFrame:
+        return self._adata.stock.info.all_code()
+
+    def get_market(self, stock_code, start_date='1990-01-01', end_date=None, k_type=1):
+        return self._adata.stock.market.get_market(
+            stock_code=stock_code, start_date=start_date, end_date=end_date, k_type=k_type, adjust_type=0
+        )
+
+    def get_market_index(self, index_code, start_date='2020-01-01', k_type=1):
+        return self._adata.stock.market.get_market_index(
+            index_code=index_code, start_date=start_date, k_type=k_type
+        )
+
+    def list_market_current(self, code_list):
+        return self._adata.stock.market.list_market_current(code_list=list(code_list))
+
+    def get_market_min(self, stock_code):
+        return self._adata.stock.market.get_market_min(stock_code=stock_code)
+
+    def all_concept_code(self, source='ths'):
+        if source == 'ths':
+            return self._adata.stock.info.all_concept_code_ths()
+        return self._adata.stock.info.all_concept_code_east()
+
+    def concept_constituent(self, concept_code, source='ths'):
+        if source == 'ths':
+            return self._adata.stock.info.concept_constituent_ths(concept_code=concept_code)
+        return self._adata.stock.info.concept_constituent_east(concept_code=concept_code)
+
+    def get_concept(self, stock_code, source='ths'):
+        if source == 'ths':
+            return self._adata.stock.info.get_concept_ths(stock_code)
+        return self._adata.stock.info.get_concept_east(stock_code)
+
+    def list_fundamentals(self, code_list):
+        # adata没有全市场的基本面接口，逐只取最新一期主要财务指标、最新股本和申万行业；
+        # 每只3个请求，在线程池中并发执行（ADATA_UI_FUNDAMENTALS_WORKERS只同时进行）
+        info, finance = self._adata.stock.info, self._adata.stock.finance
+
+        def fetch(code):
+            try:
+                core = finance.get_core_index(stock_code=code)
+                shares = info.get_stock_shares(stock_code=code, is_history=False)
+                industry = info.get_industry_sw(stock_code=code)
+            except Exception as e:
+                print(f"获取{code}基本面失败: {str(e)}")
+                return None
+            latest = core.iloc[0] if len(core) else {}
+            share = shares.iloc[0] if len(shares) else {}
+            return {
+                'stock_code': code,
+                'industry': industry['industry_name'].iloc[0] if len(industry) else None,
+                'report_date': latest.get('report_date'),
+                'total_shares': share.get('total_shares'),
+                'float_shares': share.get('list_a_shares'),
+                'revenue': latest.get('total_rev'),
+                'net_profit': latest.get('net_profit_attr_sh'),
+                'gross_margin': latest.get('gross_margin'),
+                'net_margin': latest.get('net_margin'),
+                'roe': latest.get('roe_wtd'),
+                'debt_ratio': latest.get('asset_liab_ratio'),
+                'eps': latest.get('basic_eps'),
+                'bps': latest.get('net_asset_ps'),
+            }
+
+        code_list = list(code_list)
+        with ThreadPoolExecutor(max_workers=max(1, min(FUNDAMENTALS_WORKERS, len(code_list))),
+                                thread_name_prefix='fundamentals') as pool:
+            data = [row for row in pool.map(fetch, code_list) if row is not None]
+        return pd.DataFrame(data, columns=FUNDAMENTAL_COLUMNS)
+
+    def trade_calendar(self, start_year=1990):
+        frames = [self._adata.stock.info.trade_calendar(year=year)
+                  for year in range(start_year, datetime.date.today().year + 1)]
+        return pd.concat(frames, ignore_index=True)[['trade_date', 'trade_status']]
+
+    def get_corporate_actions(self, stock_code):
+        # adata的分红送转方案为文本（如"10送3转5派2元(含税)"），按每10股解析为每股数值；
+        # 配股价只在方案文本中给出时可用，否则为NaN，由复权因子计算跳过该配股事件
+        df = self._adata.stock.market.get_dividend(stock_code=stock_code)
+        data = []
+        for plan, ex_date in zip(df.get('dividend_plan', []), df.get('ex_dividend_date', [])):
+            if not plan or not ex_date or pd.isna(ex_date):
+                continue
+            cash, bonus, rights = parse_dividend_plan(str(plan))
+            if cash or bonus or rights:
+                data.append({'ex_date': str(ex_date)[:10], 'cash': cash, 'bonus': bonus,
+                             'rights': rights, 'rights_price': parse_rights_price(str(plan)) if rights else 0.0})
+        return pd.DataFrame(data, columns=CORPORATE_ACTION_COLUMNS)
+
+
+class HttpBackend(AdataBackend):
+    """异步HTTP后端
+
+    概念列表（同花顺）、概念成分股和日K线直接通过 adata_ui.utils.http_client 的长连接池请求，
+    可由 submit() 非阻塞发起、批量并发；其余接口仍调用adata
+    """
+
+    name = 'http'
+    ASYNC_METHODS = ('all_concept_code', 'concept_constituent', 'get_market')
+
+    def __init__(self, client=None):
+        from adata_ui.utils.http_client import get_client
+        self.client = client or get_client()
+        self._adata = None
+
+    def _call_adata(self, method, *args):
+        if self._adata is None:
+            import adata
+            self._adata = adata
+        return getattr(AdataBackend, method)(self, *args)
+
+    def all_code(self):
+        return self._call_adata('all_code')
+
+    def get_market_index(self, index_code, start_date='2020-01-01', k_type=1):
+        return self._call_adata('get_market_index', index_code, start_date, k_type)
+
+    def list_market_current(self, code_list):
+        return self._call_adata('list_market_current', code_list)
+
+    def get_market_min(self, stock_code):
+        return self._call_adata('get_market_min', stock_code)
+
+    def get_concept(self, stock_code, source='ths'):
+        return self._call_adata('get_concept', stock_code, source)
+
+    def list_fundamentals(self, code_list):
+        return self._call_adata('list_fundamentals', code_list)
+
+    def trade_calendar(self, start_year=1990):
+        return self._call_adata('trade_calendar', start_year)
+
+    def get_corporate_actions(self, stock_code):
+        return self._call_adata('get_corporate_actions', stock_code)
+
+    def submit(self, method, *args):
+        from adata_ui.utils import http_client
+
+        if method == 'get_market':
+            return self.client.submit(http_client.get_market, *args)
+        if method == 'concept_constituent':
+            concept_code, source = (*args, 'ths')[:2]
+            fetch = http_client.concept_constituent_ths if source == 'ths' else http_client.concept_constituent_east
+            return self.client.submit(fetch, concept_code)
+        if method == 'all_concept_code' and (*args, 'ths')[0] == 'ths':
+            return self.client.submit(http_client.all_concept_code_ths)
+        return None
+
+    def get_market(self, stock_code, start_date='1990-01-01', end_date=None, k_type=1):
+        return self.submit('get_market', stock_code, start_date, end_date, k_type).result()
+
+    def all_concept_code(self, source='ths'):
+        future = self.submit('all_concept_code', source)
+        return future.result() if future is not None else self._call_adata('all_concept_code', source)
+
+    def concept_constituent(self, concept_code, source='ths'):
+        return self.submit('concept_constituent', concept_code, source).result()
+
+
+class MockBackend(DataBackend):
+    """模拟数据后端
+
+    按请求参数派生随机种子，同样的请求总是得到同样的数据，
+    便于离线演示和基准测试复现。
+    """
+
+    name = 'mock'
+
+    CONCEPT_NAMES = [
+        '人工智能', '新能源汽车', '半导体', '光伏', '锂电池',
+        '5G通信', '生物医药', '芯片概念', '航天军工', '云计算',
+        '区块链', '大数据', '元宇宙', '氢能源', '绿色电力',
+        '机器人', '储能', '物联网', '国产软件', '智能驾驶'
+    ]
+    INDUSTRIES = ['科技', '金融', '医药', '制造', '消费', '能源']
+    # 收盘时的分钟序号（一天240分钟）
+    LAST_SLOT = 239
+
+    def __init__(self, seed: int = 0, latency: float = 0.5, stock_count: int = 5000):
+        self.seed = seed
+        # 模拟API调用延迟（秒）
+        self.latency = latency
+        self.stock_count = stock_count
+
+    def _rng(self, *key) -> random.Random:
+        return random.Random(f"{self.seed}:" + ':'.join(str(k) for k in key))
+
+    def _sleep(self):
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def _codes(self) -> List[str]:
+        prefixes = ['600', '601', '603', '000', '002', '300']
+        per_prefix = -(-self.stock_count // len(prefixes))
+        codes = [f"{prefix}{i:03d}" for i in range(per_prefix) for prefix in prefixes]
+        return codes[:self.stock_count]
+
+    def _industries(self) -> Dict[str, str]:
+        """每只股票的模拟行业（与all_code中名称的前缀一致）"""
+        return {row['stock_code']: row['short_name'][:-3] for row in self._code_rows()}
+
+    def _code_rows(self) -> List[Dict]:
+        rng = self._rng('all_code')
+        data = []
+        for code in self._codes():
+            data.append({
+                'stock_code': code,
+                'short_name': f"{rng.choice(self.INDUSTRIES)}{code[-3:]}",
+                'exchange': 'SH' if code.startswith('6') else 'SZ',
+                'list_date': f"20{rng.randint(0, 22):02d}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+            })
+        return data
+
+    def all_code(self):
+        self._sleep()
+        return pd.DataFrame(self._code_rows())
+
+    # 模拟K线的起始锚点，任意日期区间都从这条序列中截取，保证同一天的数据一致
+    BAR_ANCHOR = '2000-01-03'
+
+    def _bars(self, key, start_date, end_date, base_range, step, low_limit, volume_range):
+        """生成一段随机游走的日K线（跳过周末）"""
+        end = pd.to_datetime(end_date) if end_date else pd.Timestamp.now().normalize()
+        dates = pd.bdate_range(start=self.BAR_ANCHOR, end=end)
+        rng = np.random.default_rng(zlib.crc32(f"{self.seed}:{key}".encode()))
+        n = len(dates)
+
+        base = np.maximum(low_limit, rng.uniform(*base_range) + np.cumsum(rng.uniform(-step, step, n)))
+        open_price = np.round(base * rng.uniform(0.98, 1.02, n), 2)
+        close_price = np.round(open_price * rng.uniform(0.95, 1.05, n), 2)
+        high_price = np.round(np.maximum(open_price, close_price) * rng.uniform(1.01, 1.03, n), 2)
+        low_price = np.round(np.minimum(open_price, close_price) * rng.uniform(0.97, 0.99, n), 2)
+        volume = np.round(rng.uniform(*volume_range, n), 0)
+        prev_close = np.concatenate([[open_price[0]], close_price[:-1]]) if n else close_price
+
+        df = pd.DataFrame({
+            'trade_date': dates.strftime('%Y-%m-%d'),
+            'open': open_price,
+            'close': close_price,
+            'high': high_price,
+            'low': low_price,
+            'volume': volume,
+            'amount': np.round(volume * close_price, 2),
+            'change': np.round(close_price - prev_close, 2),
+            'change_pct': np.round((close_price - prev_close) / prev_close * 100, 2)
+        })
+        mask = dates >= pd.to_datetime(start_date)
+        return df[mask].reset_index(drop=True)
+
+    def get_market(self, stock_code, start_date='1990-01-01', end_date=None, k_type=1):
+        self._sleep()
+        df = self._bars(f'get_market:{stock_code}:{k_type}', start_date, end_date,
+                        (10, 100), 0.5, 1, (10000, 10000000))
+        df['stock_code'] = stock_code
+        return df
+
+    def get_market_index(self, index_code, start_date='2020-01-01', k_type=1):
+        self._sleep()
+        df = self._bars(f'get_market_index:{index_code}:{k_type}', start_date, None,
+                        (2000, 5000), 30, 1000, (5000000, 50000000))
+        df.insert(0, 'index_code', index_code)
+        return df
+
+    def _session(self) -> Tuple[pd.Timestamp, int]:
+        """模拟行情的交易日和当前分钟序号（北京时间，周一至周五为交易日）
+
+        开盘前为上一交易日、分钟序号-1；周末为上一交易日收盘
+        """
+        from adata_ui.utils.intraday import MINUTES_PER_DAY, minute_slot
+        from adata_ui.utils.materialize import market_now
+
+        now = market_now()
+        day = pd.Timestamp(now.date())
+        if day.weekday() >= 5:
+            return day - pd.offsets.BDay(1), MINUTES_PER_DAY - 1
+        return day, minute_slot(now.time())
+
+    def _minute_path(self, code, day: str, prev_close: float, price: float, volume: int):
+        """当日分时走势：从昨收到收盘价的布朗桥，以及U形分布的累计成交量（按 (代码, 日期) 固定）"""
+        from adata_ui.utils.intraday import MINUTES_PER_DAY
+
+        rng = np.random.default_rng(zlib.crc32(f"{self.seed}:get_market_min:{code}:{day}".encode()))
+        steps = np.cumsum(rng.normal(0, prev_close * 0.002, MINUTES_PER_DAY))
+        ramp = np.arange(1, MINUTES_PER_DAY + 1) / MINUTES_PER_DAY
+        path = np.round(prev_close + (price - prev_close) * ramp + steps - steps[-1] * ramp, 2)
+        weights = rng.uniform(0.5, 1.5, MINUTES_PER_DAY) * (1 + 2 * (np.abs(ramp - 0.5) * 2) ** 4)
+        cum_volume = np.round(np.cumsum(weights) / weights.sum() * volume, 0)
+        return np.maximum(path, 0.01), cum_volume
+
+    def list_market_current(self, code_list):
+        self._sleep()
+        day, slot = self._session()
+        today = day.strftime('%Y-%m-%d')
+        data = []
+        for code in code_list:
+            rng = self._rng('list_market_current', today, code)
+            price = round(rng.uniform(5, 100), 2)
+            change_pct = round(rng.uniform(-10, 10), 2)
+            volume = rng.randint(100000, 10000000)
+            if slot < MockBackend.LAST_SLOT:
+                # 盘中：取分时走势上当前分钟的价格和累计成交量，收盘后即为全天的收盘价和成交量
+                prev_close = price / (1 + change_pct / 100)
+                path, cum_volume = self._minute_path(code, today, prev_close, price, volume)
+                price = float(path[slot]) if slot >= 0 else round(prev_close, 2)
+                volume = int(cum_volume[slot]) if slot >= 0 else 0
+                change_pct = round((price - prev_close) / prev_close * 100, 2)
+            data.append({
+                'stock_code': code,
+                'short_name': f"个股{code[-3:]}",
+                'price': price,
+                'change': round(price * change_pct / (100 + change_pct), 2),
+                'change_pct': change_pct,
+                'volume': volume,
+                'amount': round(volume * price, 2),
+                # 以下为模拟的估值和换手率字段，adata的行情接口不返回
+                'pe': round(rng.uniform(-20, 120), 2),
+                'pb': round(rng.uniform(0.5, 12), 2),
+                'turnover_ratio': round(rng.uniform(0.1, 15), 2)
+            })
+        return pd.DataFrame(data)
+
+    def get_market_min(self, stock_code):
+        # 与 list_market_current 的同一分时走势一致，截取到当前分钟
+        self._sleep()
+        day, slot = self._session()
+        if slot < 0:
+            day, slot = day - pd.offsets.BDay(1), MockBackend.LAST_SLOT
+        today = day.strftime('%Y-%m-%d')
+        rng = self._rng('list_market_current', today, stock_code)
+        price = round(rng.uniform(5, 100), 2)
+        change_pct = round(rng.uniform(-10, 10), 2)
+        volume = rng.randint(100000, 10000000)
+        prev_close = price / (1 + change_pct / 100)
+        path, cum_volume = self._minute_path(stock_code, today, prev_close, price, volume)
+
+        from adata_ui.utils.intraday import slot_times
+        n = slot + 1
+        minute_volume = np.diff(cum_volume[:n], prepend=0)
+        minute_amount = np.round(minute_volume * path[:n], 2)
+        return pd.DataFrame({
+            'stock_code': stock_code,
+            'trade_time': pd.DatetimeIndex(slot_times(day.date(), np.arange(n))).strftime('%Y-%m-%d %H:%M:%S'),
+            'price': path[:n],
+            'change': np.round(path[:n] - prev_close, 2),
+            'change_pct': np.round((path[:n] - prev_close) / prev_close * 100, 2),
+            'volume': minute_volume,
+            'avg_price': np.round(np.cumsum(minute_amount) / np.maximum(cum_volume[:n], 1), 2),
+            'amount': minute_amount,
+        })
+
+    def all_concept_code(self, source='ths'):
+        self._sleep()
+        rng = self._rng('all_concept_code', source)
+        data = []
+        for i, name in enumerate(self.CONCEPT_NAMES):
+            data.append({
+                'concept_code': f"{source.upper()}_CONCEPT_{i:03d}",
+                'index_code': f"88{i:04d}",
+                'name': name,
+                'source': source,
+                # 以下为模拟的板块行情字段，真实接口不返回
+                'change': round(rng.uniform(-8, 8), 2),
+                'volume': rng.randint(10000000, 100000000),
+                'market_value': round(rng.uniform(500, 2000), 2),
+                'stock_count': rng.randint(10, 100),
+                'avg_price': round(rng.uniform(15, 80), 2)
+            })
+        return pd.DataFrame(data)
+
+    def concept_constituent(self, concept_code, source='ths'):
+        self._sleep()
+        rng = self._rng('concept_constituent', concept_code, source)
+        codes = rng.sample(self._codes(), min(rng.randint(10, 30), self.stock_count))
+        return pd.DataFrame({
+            'stock_code': codes,
+            'short_name': [f"{rng.choice(self.INDUSTRIES)}{code[-3:]}" for code in codes]
+        })
+
+    def get_concept(self, stock_code, source='ths'):
+        self._sleep()
+        rng = self._rng('get_concept', stock_code, source)
+        indexes = rng.sample(range(len(self.CONCEPT_NAMES)), 3)
+        return pd.DataFrame([{
+            'stock_code': stock_code,
+            'concept_code': f"{source.upper()}_CONCEPT_{i:03d}",
+            'name': self.CONCEPT_NAMES[i],
+            'source': source,
+            'reason': ''
+        } for i in indexes])
+
+    def list_fundamentals(self, code_list):
+        self._sleep()
+        industries = self._industries()
+        data = []
+        for code in code_list:
+            rng = self._rng('list_fundamentals', code)
+            total_shares = rng.uniform(1e8, 1e10)
+            bps = rng.uniform(1, 20)
+            roe = rng.uniform(-10, 30)
+            net_profit = total_shares * bps * roe / 100
+            net_margin = rng.uniform(2, 35) * (1 if roe >= 0 else -1)
+            revenue = net_profit / net_margin * 100
+            data.append({
+                'stock_code': code,
+                'industry': industries.get(code, rng.choice(self.INDUSTRIES)),
+                'report_date': f"{pd.Timestamp.now().year - 1}-12-31",
+                'total_shares': round(total_shares, -4),
+                'float_shares': round(total_shares * rng.uniform(0.3, 1), -4),
+                'revenue': round(revenue, 2),
+                'net_profit': round(net_profit, 2),
+                'gross_margin': round(max(net_margin, 0) + rng.uniform(5, 40), 2),
+                'net_margin': round(net_margin, 2),
+                'roe': round(roe, 2),
+                'debt_ratio': round(rng.uniform(10, 90), 2),
+                'eps': round(net_profit / total_shares, 4),
+                'bps': round(bps, 4),
+            })
+        return pd.DataFrame(data, columns=FUNDAMENTAL_COLUMNS)
+
+    def get_corporate_actions(self, stock_code):
+        # 每年6、7月除权除息一次，只派现（模拟K线没有除权缺口，送转会让复权后的K线出现跳变）
+        self._sleep()
+        data = []
+        for year in range(pd.Timestamp(self.BAR_ANCHOR).year + 1, pd.Timestamp.now().year + 1):
+            rng = self._rng('get_corporate_actions', stock_code, year)
+            ex_date = pd.Timestamp(year, rng.choice([6, 7]), rng.randint(1, 28))
+            if ex_date >= pd.Timestamp.now() or rng.random() < 0.2:
+                continue
+            # 跳到周一至周五，与模拟K线对齐
+            ex_date += pd.offsets.BDay(0)
+            data.append({
+                'ex_date': ex_date.strftime('%Y-%m-%d'),
+                'cash': round(rng.uniform(0.05, 1.0), 2),
+                'bonus': 0.0,
+                'rights': 0.0,
+                'rights_price': 0.0,
+            })
+        return pd.DataFrame(data, columns=CORPORATE_ACTION_COLUMNS)
+
+    def trade_calendar(self, start_year=1990):
+        # 与模拟K线一致：周一至周五为交易日
+        self._sleep()
+        days = pd.date_range(f'{start_year}-01-01', f'{pd.Timestamp.now().year}-12-31')
+        return pd.DataFrame({
+            'trade_date': days.strftime('%Y-%m-%d'),
+            'trade_status': (days.weekday < 5).astype(int),
+        })
+
+
+# 需要录制/回放的接口方法
+RECORDED_METHODS = (
+    'all_code', 'get_market', 'get_market_index', 'list_market_current',
+    'all_concept_code', 'concept_constituent', 'get_concept', 'list_fundamentals', 'trade_calendar',
+    'get_corporate_actions', 'get_market_min'
+)
+
+
+def record_key(method: str, *args) -> str:
+    """根据方法名和参数生成录制文件名"""
+    parts = [method]
+    for arg in args:
+        if isinstance(arg, (list, tuple)):
+            arg = ','.join(str(a) for a in arg)
+        parts.append('' if arg is None else str(arg))
+    key = re.sub(r'[^\w.,-]', '_', '__'.join(parts))
+    # 参数过长（如大批量代码列表）时用摘要代替，避免超出文件名长度限制
+    if len(key) > 150:
+        key = f"{method}__{hashlib.sha1(key.encode()).hexdigest()}"
+    return key + '.pkl.gz'
+
+
+class RecordingBackend(DataBackend):
+    """录制后端
+
+    转发到内部后端，并把每次响应以gzip压缩的pickle保存到目录中，
+    供ReplayBackend离线回放。
+    """
+
+    name = 'record'
+
+    def __init__(self, inner: DataBackend, directory):
+        self.inner = inner
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _record(self, method, *args):
+        df = getattr(self.inner, method)(*args)
+        df.to_pickle(self.directory / record_key(method, *args), compression='gzip')
+        return df
+
+    def all_code(self):
+        return self._record('all_code')
+
+    def get_market(self, stock_code, start_date='1990-01-01', end_date=None, k_type=1):
+        return self._record('get_market', stock_code, start_date, end_date, k_type)
+
+    def get_market_index(self, index_code, start_date='2020-01-01', k_type=1):
+        return self._record('get_market_index', index_code, start_date, k_type)
+
+    def list_market_current(self, code_list):
+        return self._record('list_market_current', list(code_list))
+
+    def get_market_min(self, stock_code):
+        return self._record('get_market_min', stock_code)
+
+    def all_concept_code(self, source='ths'):
+        return self._record('all_concept_code', source)
+
+    def concept_constituent(self, concept_code, source='ths'):
+        return self._record('concept_constituent', concept_code, source)
+
+    def get_concept(self, stock_code, source='ths'):
+        return self._record('get_concept', stock_code, source)
+
+    def list_fundamentals(self, code_list):
+        return self._record('list_fundamentals', list(code_list))
+
+    def trade_calendar(self, start_year=1990):
+        return self._record('trade_calendar', start_year)
+
+    def get_corporate_actions(self, stock_code):
+        return self._record('get_corporate_actions', stock_code)
+
+
+class ReplayBackend(DataBackend):
+    """回放后端
+
+    从录制目录读取响应，可注入固定延迟和随机抖动模拟上游耗时。
+    同一文件只解压一次，之后直接返回副本。K线和最新行情在精确请求
+    未录制时，会从已录制的更大区间/更多代码中截取。
+    """
+
+    name = 'replay'
+
+    def __init__(self, directory, latency: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        self.directory = Path(directory)
+        if not self.directory.is_dir():
+            raise FileNotFoundError(f'回放目录不存在: {self.directory}')
+        self.latency = latency
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._frames: Dict[str, pd.DataFrame] = {}
+
+    def _sleep(self):
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter > 0 else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _load(self, key: str) -> pd.DataFrame:
+        if key not in self._frames:
+            self._frames[key] = pd.read_pickle(self.directory / key, compression='gzip')
+        return self._frames[key]
+
+    def _replay(self, method, *args):
+        key = record_key(method, *args)
+        if (self.directory / key).exists():
+            df = self._load(key)
+        else:
+            df = self._fallback(method, *args)
+        self._sleep()
+        return df.copy()
+
+    def _fallback(self, method, *args) -> pd.DataFrame:
+        """精确请求未录制时，从同一代码的其他录制中按日期区间/代码子集截取"""
+        if method in ('get_market', 'get_market_index'):
+            prefix = record_key(method, args[0])[:-len('.pkl.gz')]
+            frames = [self._load(path.name) for path in sorted(self.directory.glob(f'{prefix}__*.pkl.gz'))]
+            if frames:
+                df = pd.concat(frames).drop_duplicates('trade_date').sort_values('trade_date')
+                start_date, end_date = args[1], args[2] if method == 'get_market' else None
+                mask = df['trade_date'] >= str(start_date)
+                if end_date:
+                    mask &= df['trade_date'] <= str(end_date)
+                return df[mask].reset_index(drop=True)
+        elif method in ('list_market_current', 'list_fundamentals'):
+            frames = [self._load(path.name) for path in self.directory.glob(f'{method}__*.pkl.gz')]
+            if frames:
+                df = pd.concat(frames).drop_duplicates('stock_code', keep='last')
+                return df[df['stock_code'].isin(args[0])].reset_index(drop=True)
+        raise ReplayMissError(f'未录制的请求: {record_key(method, *args)}')
+
+    def all_code(self):
+        return self._replay('all_code')
+
+    def get_market(self, stock_code, start_date='1990-01-01', end_date=None, k_type=1):
+        return self._replay('get_market', stock_code, start_date, end_date, k_type)
+
+    def get_market_index(self, index_code, start_date='2020-01-01', k_type=1):
+        return self._replay('get_market_index', index_code, start_date, k_type)
+
+    def list_market_current(self, code_list):
+        return self._replay('list_market_current', list(code_list))
+
+    def get_market_min(self, stock_code):
+        return self._replay('get_market_min', stock_code)
+
+    def all_concept_code(self, source='ths'):
+        return self._replay('all_concept_code', source)
+
+    def concept_constituent(self, concept_code, source='ths'):
+        return self._replay('concept_constituent', concept_code, source)
+
+    def get_concept(self, stock_code, source='ths'):
+        return self._replay('get_concept', stock_code, source)
+
+    def list_fundamentals(self, code_list):
+        return self._replay('list_fundamentals', list(code_list))
+
+    def trade_calendar(self, start_year=1990):
+        return self._replay('trade_calendar', start_year)
+
+    def get_corporate_actions(self, stock_code):
+        return self._replay('get_corporate_actions', stock_code)
+
+
+class InstrumentedBackend(DataBackend):
+    """计时后端
+
+    转发到内部后端，把每次请求的耗时和失败记入上游延迟直方图，
+    按方法名和内部后端名称打标签，由 /metrics 导出。
+    """
+
+    def __init__(self, inner: DataBackend):
+        self.inner = inner
+        self.name = inner.name
+
+    def _call(self, method, *args):
+        start = time.perf_counter()
+        failed = False
+        try:
+            return getattr(self.inner, method)(*args)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            observe_upstream(method, self.name, time.perf_counter() - start, failed)
+
+    def all_code(self):
+        return self._call('all_code')
+
+    def get_market(self, stock_code, start_date='1990-01-01', end_date=None, k_type=1):
+        return self._call('get_market', stock_code, start_date, end_date, k_type)
+
+    def get_market_index(self, index_code, start_date='2020-01-01', k_type=1):
+        return self._call('get_market_index', index_code, start_date, k_type)
+
+    def list_market_current(self, code_list):
+        return self._call('list_market_current', code_list)
+
+    def get_market_min(self, stock_code):
+        return self._call('get_market_min', stock_code)
+
+    def all_concept_code(self, source='ths'):
+        return self._call('all_concept_code', source)
+
+    def concept_constituent(self, concept_code, source='ths'):
+        return self._call('concept_constituent', concept_code, source)
+
+    def get_concept(self, stock_code, source='ths'):
+        return self._call('get_concept', stock_code, source)
+
+    def list_fundamentals(self, code_list):
+        return self._call('list_fundamentals', code_list)
+
+    def trade_calendar(self, start_year=1990):
+        return self._call('trade_calendar', start_year)
+
+    def get_corporate_actions(self, stock_code):
+        return self._call('get_corporate_actions', stock_code)
+
+    def submit(self, method, *args):
+        start = time.perf_counter()
+        future = self.inner.submit(method, *args)
+        if future is not None:
+            future.add_done_callback(lambda done: observe_upstream(
+                method, self.name, time.perf_counter() - start, done.cancelled() or done.exception() is not None))
+        return future
+
+
+def create_backend(kind: Optional[str] = None) -> DataBackend:
+    """根据环境变量创建数据后端
+
+    ADATA_UI_BACKEND: mock(默认) / adata / http / record / replay
+    ADATA_UI_DATA_DIR: 录制/回放目录，默认 ./recordings
+    ADATA_UI_REPLAY_LATENCY: 回放注入延迟（秒）
+    ADATA_UI_REPLAY_JITTER: 回放随机抖动上限（秒）
+    ADATA_UI_MOCK_LATENCY: 模拟数据延迟（秒）
+    """
+    kind = (kind or os.environ.get('ADATA_UI_BACKEND', 'mock')).lower()
+    directory = os.environ.get('ADATA_UI_DATA_DIR', 'recordings')
+
+    if kind == 'adata':
+        return AdataBackend()
+    if kind == 'http':
+        return HttpBackend()
+    if kind == 'record':
+        return RecordingBackend(AdataBackend(), directory)
+    if kind == 'replay':
+        return ReplayBackend(
+            directory,
+            latency=float(os.environ.get('ADATA_UI_REPLAY_LATENCY', 0)),
+            jitter=float(os.environ.get('ADATA_UI_REPLAY_JITTER', 0))
+        )
+    if kind == 'mock':
+        return MockBackend(latency=float(os.environ.get('ADATA_UI_MOCK_LATENCY', 0.5)))
+    raise ValueError(f'未知的数据后端: {kind}')
+
+
+_backend: Optional[DataBackend] = None
+
+
+def get_backend() -> DataBackend:
+    """获取进程内共享的数据后端（带上游耗时统计）"""
+    global _backend
+    if _backend is None:
+        _backend = InstrumentedBackend(create_backend())
+    return _backend
+
+
+def set_backend(backend: Optional[DataBackend]) -> None:
+    """替换进程内共享的数据后端（传None则下次按环境变量重建）"""
+    global _backend
+    if backend is not None and not isinstance(backend, InstrumentedBackend):
+        backend = InstrumentedBackend(backend)
+    _backend = backend
+
+
+def record_fixture(backend: RecordingBackend, stock_codes: List[str], start_date: str,
+                   end_date: Optional[str] = None, concept_limit: int = 20,
+                   sources=('ths', 'east')) -> None:
+    """录制一套离线基准数据
+
+    包括全部股票代码、交易日历、指定股票的日K线、除权除息事件和分时行情、每个数据源前concept_limit个
+    概念的成分股，以及上述所有股票的最新行情。
+    """
+    backend.all_code()
+    backend.trade_calendar()
+    for code in stock_codes:
+        backend.get_market(code, start_date, end_date, 1)
+        backend.get_corporate_actions(code)
+        backend.get_market_min(code)
+
+    quote_codes = list(stock_codes)
+    for source in sources:
+        concepts = backend.all_concept_code(source)
+        for concept_code in concepts['concept_code'].head(concept_limit):
+            members = backend.concept_constituent(concept_code, source)
+            quote_codes.extend(members['stock_code'])
+    backend.list_market_current(sorted(set(quote_codes)))
+
+
+def main(argv=None):
+    """命令行入口：录制真实adata响应"""
+    parser = argparse.ArgumentParser(description='录制adata响应用于离线回放')
+    parser.add_argument('--dir', default=os.environ.get('ADATA_UI_DATA_DIR', 'recordings'), help='录制目录')
+    parser.add_argument('--codes', default='600000,000001,300750', help='逗号分隔的股票代码')
+    parser.add_argument('--start-date', default=(datetime.date.today() - datetime.timedelta(days=365)).isoformat())
+    parser.add_argument('--end-date', default=None)
+    parser.add_argument('--concepts', type=int, default=20, help='每个数据源录制的概念数量')
+    parser.add_argument('--mock', action='store_true', help='录制模拟数据（无网络环境）')
+    args = parser.parse_args(argv)
+
+    inner = MockBackend(latency=0) if args.mock else AdataBackend()
+    backend = RecordingBackend(inner, args.dir)
+    codes = [code.strip() for code in args.codes.split(',') if code.strip()]
+    record_fixture(backend, codes, args.start_date, args.end_date, args.concepts)
+    print(f'录制完成: {len(list(backend.directory.glob("*.pkl.gz")))} 个文件 -> {backend.directory}')
+
+
+if __name__ == '__main__':
+    main()
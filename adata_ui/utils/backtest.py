@@ -0,0 +1,338 @@
+# 向量化回测模块
+# 策略在对齐后的收盘价矩阵（交易日 x 标的）上一次性生成持仓权重矩阵，
+# 收益、换手、净值都是整矩阵运算，没有逐日循环。
+# 参数扫描把参数组合分块分发到计算进程池，价格矩阵经共享内存传递，只写入一次
+import math
+import itertools
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+TRADING_DAYS = 252
+# 默认交易成本（单边，按换手计）
+DEFAULT_COST = 0.001
+# 参数组合少于该数量时在当前进程内扫描，不值得分发
+SWEEP_MIN_PARALLEL = 200
+
+
+def ffill(values: np.ndarray) -> np.ndarray:
+    """沿交易日方向前向填充NaN（停牌日沿用前一日价格），开头的NaN保留"""
+    mask = np.isnan(values)
+    index = np.where(~mask, np.arange(len(values))[:, None], 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    return values[index, np.arange(values.shape[1])]
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """沿交易日方向的滚动均值，窗口内有NaN或不足window日时为NaN"""
+    valid = ~np.isnan(values)
+    total = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    count = np.cumsum(valid, axis=0)
+    result = np.full(values.shape, np.nan)
+    if window > len(values):
+        return result
+    total_window = total[window - 1:].copy()
+    total_window[1:] -= total[:-window]
+    count_window = count[window - 1:].copy()
+    count_window[1:] -= count[:-window]
+    result[window - 1:] = np.where(count_window == window, total_window / window, np.nan)
+    return result
+
+
+def rolling_extreme(values: np.ndarray, window: int, func=np.max) -> np.ndarray:
+    """沿交易日方向的滚动最大/最小值（含当日），不足window日时为NaN"""
+    result = np.full(values.shape, np.nan)
+    if window > len(values):
+        return result
+    windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=0)
+    result[window - 1:] = func(windows, axis=-1)
+    return result
+
+
+def shift(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    """沿交易日方向后移periods日，空出的位置为NaN"""
+    result = np.full(values.shape, np.nan)
+    result[periods:] = values[:-periods]
+    return result
+
+
+class PriceMatrix:
+    """回测用的价格矩阵：前向填充后的价格、日收益率，以及按窗口缓存的滚动指标
+
+    参数扫描时同一窗口的均线、通道会被大量参数组合复用，每个窗口只计算一次
+
+    Args:
+        close: 收盘价矩阵[交易日 x 标的]，未上市或停牌为NaN
+    """
+
+    def __init__(self, close: np.ndarray):
+        self.close = np.asarray(close, dtype='float64')
+        self.prices = ffill(self.close)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = self.prices[1:] / self.prices[:-1] - 1
+        self.returns = np.where(np.isnan(returns), 0.0, returns)
+        self._cache: Dict[tuple, np.ndarray] = {}
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.close.shape
+
+    def _cached(self, key: tuple, compute: Callable) -> np.ndarray:
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def mean(self, window: int) -> np.ndarray:
+        """window日均线"""
+        return self._cached(('mean', window), lambda: rolling_mean(self.prices, window))
+
+    def upper(self, window: int) -> np.ndarray:
+        """前window日（不含当日）最高价"""
+        return self._cached(('upper', window), lambda: shift(rolling_extreme(self.prices, window, np.max)))
+
+    def lower(self, window: int) -> np.ndarray:
+        """前window日（不含当日）最低价"""
+        return self._cached(('lower', window), lambda: shift(rolling_extreme(self.prices, window, np.min)))
+
+
+def as_price_matrix(close) -> PriceMatrix:
+    return close if isinstance(close, PriceMatrix) else PriceMatrix(close)
+
+
+def ma_cross(matrix: PriceMatrix, fast: int = 5, slow: int = 20) -> np.ndarray:
+    """均线策略：快线在慢线之上时持有，各标的等权分仓"""
+    if fast >= slow:
+        raise ValueError(f'快线周期必须小于慢线周期: {fast}, {slow}')
+    signal = matrix.mean(fast) > matrix.mean(slow)
+    return signal / matrix.shape[1]
+
+
+def breakout(matrix: PriceMatrix, entry: int = 20, exit: int = 10) -> np.ndarray:
+    """通道突破策略：收盘价突破前entry日最高价时买入，跌破前exit日最低价时卖出，各标的等权分仓"""
+    prices = matrix.prices
+    # 买入日为1、卖出日为0、其余沿用前一状态（前向填充），初始为空仓
+    state = np.full(prices.shape, np.nan)
+    state[0] = 0
+    state[prices < matrix.lower(exit)] = 0
+    state[prices > matrix.upper(entry)] = 1
+    return ffill(state) / matrix.shape[1]
+
+
+def momentum(matrix: PriceMatrix, lookback: int = 20, top: int = 3, rebalance: int = 5) -> np.ndarray:
+    """动量轮动策略：每rebalance日按lookback日涨幅持有排名前top的标的（等权），用于概念指数轮动"""
+    prices = matrix.prices
+    top = min(top, prices.shape[1])
+    weights = np.full(prices.shape, np.nan)
+    weights[0] = 0
+    days = np.arange(lookback, len(prices), rebalance)
+    if len(days) and top > 0:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            score = prices[days] / prices[days - lookback] - 1
+        score = np.where(np.isnan(score), -np.inf, score)
+        chosen = np.argpartition(-score, top - 1, axis=1)[:, :top]
+        rows = np.zeros((len(days), prices.shape[1]))
+        np.put_along_axis(rows, chosen, 1.0 / top, axis=1)
+        # 没有有效涨幅的标的不入选
+        rows[np.isinf(score)] = 0
+        weights[days] = rows
+    return ffill(weights)
+
+
+# 策略：(名称, 生成持仓的函数, 默认参数)
+STRATEGIES: Dict[str, Tuple[str, Callable, Dict[str, int]]] = {
+    'ma_cross': ('均线交叉', ma_cross, {'fast': 5, 'slow': 20}),
+    'breakout': ('通道突破', breakout, {'entry': 20, 'exit': 10}),
+    'momentum': ('动量轮动', momentum, {'lookback': 20, 'top': 3, 'rebalance': 5}),
+}
+
+
+def portfolio_returns(matrix: PriceMatrix, weights: np.ndarray, cost: float = DEFAULT_COST) -> Tuple[np.ndarray, np.ndarray]:
+    """按持仓权重计算组合日收益率
+
+    第t日收盘生成的权重在第t+1日生效，扣除按换手计算的交易成本
+
+    Returns:
+        tuple: (组合日收益率[T-1], 换手率[T-1])
+    """
+    weights = np.where(np.isnan(weights), 0.0, weights)
+    turnover = np.abs(np.diff(weights[:-1], axis=0, prepend=0.0)).sum(axis=1)
+    return np.einsum('ij,ij->i', weights[:-1], matrix.returns) - cost * turnover, turnover
+
+
+def performance(returns: np.ndarray, turnover: Optional[np.ndarray] = None) -> Dict[str, float]:
+    """收益率序列的统计指标"""
+    if not len(returns):
+        return {'total_return': 0.0, 'annual_return': 0.0, 'volatility': 0.0, 'sharpe': 0.0,
+                'max_drawdown': 0.0, 'win_rate': 0.0, 'turnover': 0.0}
+    equity = np.cumprod(1 + returns)
+    years = len(returns) / TRADING_DAYS
+    volatility = float(returns.std() * math.sqrt(TRADING_DAYS))
+    drawdown = equity / np.maximum.accumulate(np.maximum(equity, 1.0)) - 1
+    active = returns != 0
+    return {
+        'total_return': float(equity[-1] - 1),
+        'annual_return': float(equity[-1] ** (1 / years) - 1) if equity[-1] > 0 else -1.0,
+        'volatility': volatility,
+        'sharpe': float(returns.mean() * TRADING_DAYS / volatility) if volatility > 0 else 0.0,
+        'max_drawdown': float(drawdown.min()),
+        'win_rate': float((returns[active] > 0).mean()) if active.any() else 0.0,
+        'turnover': float(turnover.sum()) if turnover is not None else 0.0,
+    }
+
+
+def evaluate(strategy: str, close, params: Dict[str, int], cost: float = DEFAULT_COST) -> Dict[str, float]:
+    """运行一次回测，只返回统计指标（参数扫描用）"""
+    matrix = as_price_matrix(close)
+    weights = STRATEGIES[strategy][1](matrix, **params)
+    returns, turnover = portfolio_returns(matrix, weights, cost)
+    return performance(returns, turnover)
+
+
+def run_backtest(strategy: str, close, params: Optional[Dict[str, int]] = None,
+                 cost: float = DEFAULT_COST) -> Dict:
+    """运行一次回测
+
+    Args:
+        strategy: 策略名称，见STRATEGIES
+        close: 收盘价矩阵[交易日 x 标的]或PriceMatrix
+        params: 策略参数，默认使用策略的默认参数
+        cost: 单边交易成本
+
+    Returns:
+        Dict: equity（策略净值）、benchmark（等权组合净值）、stats、benchmark_stats
+    """
+    matrix = as_price_matrix(close)
+    params = {**STRATEGIES[strategy][2], **(params or {})}
+    weights = STRATEGIES[strategy][1](matrix, **params)
+    returns, turnover = portfolio_returns(matrix, weights, cost)
+    # 基准：每日等权持有已上市的标的，不计交易成本
+    listed = ~np.isnan(matrix.prices)
+    benchmark_weights = listed / np.maximum(listed.sum(axis=1, keepdims=True), 1)
+    benchmark, _ = portfolio_returns(matrix, benchmark_weights, 0.0)
+    return {
+        'params': params,
+        'equity': np.concatenate([[1.0], np.cumprod(1 + returns)]),
+        'benchmark': np.concatenate([[1.0], np.cumprod(1 + benchmark)]),
+        'stats': performance(returns, turnover),
+        'benchmark_stats': performance(benchmark),
+    }
+
+
+def parse_values(text: str) -> List[int]:
+    """解析参数扫描的取值，支持逗号分隔的列表（5,10,20）和区间（5:60:5，含终点）
+
+    Raises:
+        ValueError: 格式错误或取值不是正整数
+    """
+    values = []
+    for part in str(text).replace('，', ',').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if ':' in part:
+                start, stop, *step = [int(x) for x in part.split(':')]
+                values.extend(range(start, stop + 1, step[0] if step else 1))
+            else:
+                values.append(int(part))
+        except (TypeError, ValueError):
+            raise ValueError(f'参数取值格式错误: {part}')
+    if not values or min(values) <= 0:
+        raise ValueError(f'参数取值必须是正整数: {text}')
+    return sorted(set(values))
+
+
+def parameter_grid(grid: Dict[str, List[int]]) -> List[Dict[str, int]]:
+    """参数网格的全部组合"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def valid_params(strategy: str, params: Dict[str, int]) -> bool:
+    """参数组合是否有效（如均线快线周期必须小于慢线）"""
+    if strategy == 'ma_cross':
+        return params['fast'] < params['slow']
+    return all(value > 0 for value in params.values())
+
+
+# 工作进程中最近一次使用的价格矩阵：同一次扫描的各块共享同一块共享内存，滚动指标跨块复用
+_worker_matrix: Optional[PriceMatrix] = None
+
+
+def _evaluate_chunk(chunk: List[Dict[str, int]], strategy: str, close: np.ndarray, cost: float) -> List[Dict]:
+    global _worker_matrix
+    if _worker_matrix is None or _worker_matrix.close is not close:
+        # 换了价格矩阵（新的一次扫描）：先丢弃旧矩阵，使旧的共享内存块不再被引用、可以关闭
+        _worker_matrix = None
+        _worker_matrix = PriceMatrix(close)
+    return [{**params, **evaluate(strategy, _worker_matrix, params, cost)} for params in chunk]
+
+
+def sweep(strategy: str, close: np.ndarray, grid: Dict[str, List[int]], cost: float = DEFAULT_COST,
+          pool=None, sort_by: str = 'sharpe') -> List[Dict]:
+    """参数网格扫描，参数组合分块分发到计算进程池
+
+    价格矩阵经共享内存传给工作进程（只写入一次），同一进程处理的各块复用已计算的均线和通道。
+    在线程中调用（会阻塞等待结果）
+
+    Args:
+        strategy: 策略名称
+        close: 收盘价矩阵
+        grid: 参数名到候选值列表的映射
+        cost: 单边交易成本
+        pool: 计算进程池，默认 adata_ui.utils.compute.compute_pool
+        sort_by: 结果排序指标（降序）
+
+    Returns:
+        List[Dict]: 每个参数组合的参数和统计指标
+    """
+    from adata_ui.utils.compute import compute_pool
+
+    pool = pool or compute_pool
+    combos = [params for params in parameter_grid(grid) if valid_params(strategy, params)]
+    if not combos:
+        return []
+    close = np.asarray(close, dtype='float64')
+    if pool.processes <= 1 or len(combos) < SWEEP_MIN_PARALLEL:
+        matrix = PriceMatrix(close)
+        results = [{**params, **evaluate(strategy, matrix, params, cost)} for params in combos]
+    else:
+        # 每个进程约4块，兼顾负载均衡和调度开销；product顺序使同一块内的参数多共享窗口
+        size = max(1, math.ceil(len(combos) / (pool.processes * 4)))
+        chunks = [combos[i:i + size] for i in range(0, len(combos), size)]
+        results = [row for rows in pool.map_sync(_evaluate_chunk, chunks, strategy, close, cost) for row in rows]
+    results.sort(key=lambda row: row[sort_by], reverse=True)
+    return results
+
+
+def concept_index_prices(close: np.ndarray, codes: List[str], memberships) -> Tuple[List[str], List[str], np.ndarray]:
+    """由成分股收盘价矩阵合成各概念的等权指数（起点为1）
+
+    Args:
+        close: 成分股收盘价矩阵[交易日 x 股票]
+        codes: close各列的股票代码
+        memberships: concept_code, concept_name, stock_code 三列的成员关系
+
+    Returns:
+        tuple: (概念代码, 概念名称, 概念指数矩阵[交易日 x 概念])
+    """
+    prices = ffill(close)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = prices[1:] / prices[:-1] - 1
+    valid = ~np.isnan(returns)
+    returns = np.where(valid, returns, 0.0)
+
+    column = {code: j for j, code in enumerate(codes)}
+    concept_codes = memberships['concept_code'].astype(str).to_numpy()
+    stock_codes = memberships['stock_code'].astype(str).to_numpy()
+    keep = np.array([code in column for code in stock_codes], dtype=bool)
+    concepts, concept_index = np.unique(concept_codes[keep], return_inverse=True)
+    names = dict(zip(concept_codes, memberships['concept_name'].astype(str)))
+    # 成员关系矩阵[股票 x 概念]，一次矩阵乘法得到各概念当日的收益合计和有效成员数
+    membership = np.zeros((len(codes), len(concepts)))
+    membership[[column[code] for code in stock_codes[keep]], concept_index] = 1.0
+    total = returns @ membership
+    count = valid.astype('float64') @ membership
+    with np.errstate(invalid='ignore', divide='ignore'):
+        concept_returns = np.where(count > 0, total / count, 0.0)
+    index = np.vstack([np.ones((1, len(concepts))), np.cumprod(1 + concept_returns, axis=0)])
+    return list(concepts), [names[code] for code in concepts], index
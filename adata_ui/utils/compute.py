@@ -0,0 +1,382 @@
+# 计算进程池模块
+# 指标、相关性、回测等CPU密集的分析在常驻的工作进程中执行，不占用服务websocket的事件循环（和GIL）。
+# 大数组和DataFrame的数值列通过共享内存传递：调用方写入一次，工作进程零拷贝映射，
+# 参数本身只pickle一个很小的描述（共享内存名称、形状、类型）；大的结果同样经共享内存返回
+import os
+import time
+import asyncio
+import threading
+import functools
+import itertools
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional
+
+from adata_ui.utils import metrics
+
+# 计算进程数，0 表示不启用进程池（在调用线程中直接计算）
+COMPUTE_PROCESSES = int(os.environ.get('ADATA_UI_COMPUTE_PROCESSES', os.cpu_count() or 1))
+# 小于该字节数的数组直接pickle传递，共享内存的创建和映射开销反而更大
+SHARE_MIN_BYTES = int(os.environ.get('ADATA_UI_SHARE_MIN_BYTES', 64 * 1024))
+
+
+def _shareable(value) -> bool:
+    """是否为值得放入共享内存的数值数组"""
+    return isinstance(value, np.ndarray) and value.dtype.kind in 'biufcmM' and value.nbytes >= SHARE_MIN_BYTES
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """映射已有的共享内存块，不登记到资源跟踪器（生命周期由创建方负责）"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python 3.13 之前映射时也会登记；spawn的工作进程与主进程共用同一个资源跟踪器，
+        # 重复登记不产生新记录，由创建方unlink时统一注销
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedArray:
+    """共享内存中的numpy数组的可pickle描述
+
+    Args:
+        name: 共享内存块名称
+        shape: 数组形状
+        dtype: 数组类型
+    """
+
+    def __init__(self, name: str, shape: tuple, dtype: str):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+    @property
+    def nbytes(self) -> int:
+        return int(np.prod(self.shape)) * np.dtype(self.dtype).itemsize
+
+    @classmethod
+    def create(cls, array: np.ndarray):
+        """把数组复制到新的共享内存块
+
+        Returns:
+            tuple: (描述, 共享内存块)，调用方负责在用完后close()和unlink()
+        """
+        array = np.ascontiguousarray(array)
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+        return cls(shm.name, array.shape, array.dtype.str), shm
+
+    def view(self, shm: shared_memory.SharedMemory) -> np.ndarray:
+        array = np.ndarray(self.shape, np.dtype(self.dtype), buffer=shm.buf)
+        array.flags.writeable = False
+        return array
+
+    def open(self) -> np.ndarray:
+        """在工作进程中零拷贝映射（只读）"""
+        return _worker_attach(self)
+
+    def take(self) -> np.ndarray:
+        """复制出数组并释放共享内存块（接收工作进程返回的结果时使用）"""
+        shm = _attach(self.name)
+        try:
+            return np.array(self.view(shm))
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+class SharedFrame:
+    """DataFrame的可pickle描述：数值和日期列放在共享内存中，其余列按原样pickle
+
+    Args:
+        columns: 列名
+        arrays: 每列的SharedArray，或非数值列的原始值
+        index: 索引（RangeIndex原样保存，其余按列的方式处理）
+    """
+
+    def __init__(self, columns: list, arrays: list, index):
+        self.columns = columns
+        self.arrays = arrays
+        self.index = index
+
+    @classmethod
+    def create(cls, df: pd.DataFrame):
+        """把DataFrame的大数值列复制到共享内存
+
+        Returns:
+            tuple: (描述, 共享内存块列表)
+        """
+        blocks = []
+
+        def pack(values):
+            # numpy类型的大列放入共享内存，其余（字符串、扩展类型）保留原数组按原样pickle
+            if isinstance(values.dtype, np.dtype) and _shareable(values.to_numpy()):
+                handle, shm = SharedArray.create(values.to_numpy())
+                blocks.append(shm)
+                return handle
+            return values.array
+
+        index = df.index if isinstance(df.index, pd.RangeIndex) else (df.index.name, pack(df.index))
+        return cls(list(df.columns), [pack(df[column]) for column in df.columns], index), blocks
+
+    def _build(self, resolve: Callable) -> pd.DataFrame:
+        data = {column: resolve(values) for column, values in zip(self.columns, self.arrays)}
+        if isinstance(self.index, pd.RangeIndex):
+            index = self.index
+        else:
+            index = pd.Index(resolve(self.index[1]), name=self.index[0])
+        return pd.DataFrame(data, index=index, copy=False)
+
+    def open(self) -> pd.DataFrame:
+        """在工作进程中重建DataFrame（共享列零拷贝）"""
+        return self._build(lambda values: values.open() if isinstance(values, SharedArray) else values)
+
+    def take(self) -> pd.DataFrame:
+        """复制出DataFrame并释放共享内存块"""
+        return self._build(lambda values: values.take() if isinstance(values, SharedArray) else values)
+
+
+# ---- 工作进程 ----
+
+# 共享内存名称 -> (共享内存块, 所属的map_sync批次)；批次内的各任务复用映射，其余在任务结束时关闭
+_attached: Dict[str, tuple] = {}
+_arrays: Dict[str, np.ndarray] = {}
+# 当前任务所属的map_sync批次，run/run_sync的任务为None
+_scope: Optional[str] = None
+
+
+def _worker_attach(handle: SharedArray) -> np.ndarray:
+    """工作进程中映射共享内存，同一任务（或同一map_sync批次）内重复引用时复用"""
+    if handle.name in _arrays:
+        return _arrays[handle.name]
+    shm = _attach(handle.name)
+    array = _arrays[handle.name] = handle.view(shm)
+    _attached[handle.name] = (shm, _scope)
+    return array
+
+
+def _release_attached(keep: Optional[str] = None) -> None:
+    """关闭不属于批次keep的映射
+
+    仍被引用的块（如任务返回了参数的视图、模块级缓存还持有旧数组）关闭时会抛出BufferError，
+    保留到之后的任务结束时再关闭
+    """
+    for name, (shm, scope) in list(_attached.items()):
+        if keep is not None and scope == keep:
+            continue
+        _arrays.pop(name, None)
+        try:
+            shm.close()
+        except BufferError:
+            _attached[name] = (shm, None)
+            continue
+        del _attached[name]
+
+
+def _open(value):
+    if isinstance(value, (SharedArray, SharedFrame)):
+        return value.open()
+    if isinstance(value, tuple):
+        return tuple(_open(item) for item in value)
+    if isinstance(value, list):
+        return [_open(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _open(item) for key, item in value.items()}
+    return value
+
+
+def _pack_result(value):
+    """工作进程中把大的结果放入共享内存（由调用方take()后释放）"""
+    if _shareable(value):
+        handle, shm = SharedArray.create(value)
+        shm.close()
+        return handle
+    if isinstance(value, pd.DataFrame):
+        handle, blocks = SharedFrame.create(value)
+        for shm in blocks:
+            shm.close()
+        return handle
+    if isinstance(value, tuple):
+        return tuple(_pack_result(item) for item in value)
+    if isinstance(value, list):
+        return [_pack_result(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _pack_result(item) for key, item in value.items()}
+    return value
+
+
+def _call(func: Callable, args: tuple, kwargs: dict, scope: Optional[str] = None):
+    """工作进程入口：映射共享参数，执行计算，打包结果
+
+    任务结束时关闭本任务和之前批次的映射；scope为map_sync批次时保留本批次的映射供后续各块复用
+    （批次结束后由该进程的下一个任务关闭）
+    """
+    global _scope
+    _scope = scope
+    try:
+        return _pack_result(func(*_open(args), **_open(kwargs)))
+    finally:
+        _scope = None
+        _release_attached(keep=scope)
+
+
+def _take(value):
+    """调用方接收结果：复制共享内存中的结果并释放"""
+    if isinstance(value, (SharedArray, SharedFrame)):
+        return value.take()
+    if isinstance(value, tuple):
+        return tuple(_take(item) for item in value)
+    if isinstance(value, list):
+        return [_take(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _take(item) for key, item in value.items()}
+    return value
+
+
+# ---- 调用方 ----
+
+class SharedArgs:
+    """把参数中的大数组和DataFrame放入共享内存，退出时释放
+
+    用法：
+        with SharedArgs() as shared:
+            handle = shared.share(close)
+            ... 多次提交引用handle的任务 ...
+    """
+
+    def __init__(self):
+        self._blocks: List[shared_memory.SharedMemory] = []
+
+    def share(self, value):
+        """递归替换参数中的大数组/DataFrame为共享内存描述"""
+        if _shareable(value):
+            handle, shm = SharedArray.create(value)
+            self._blocks.append(shm)
+            return handle
+        if isinstance(value, pd.DataFrame):
+            handle, blocks = SharedFrame.create(value)
+            self._blocks.extend(blocks)
+            return handle
+        if isinstance(value, tuple):
+            return tuple(self.share(item) for item in value)
+        if isinstance(value, list):
+            return [self.share(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self.share(item) for key, item in value.items()}
+        return value
+
+    def release(self):
+        for shm in self._blocks:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+# map_sync批次编号
+_map_ids = itertools.count()
+
+
+class ComputePool:
+    """常驻的计算进程池
+
+    首次使用时以spawn方式启动（应用进程中有事件循环和线程，fork不安全），
+    工作进程崩溃后下次提交时自动重建
+
+    Args:
+        processes: 工作进程数，0 表示在调用线程中直接计算
+    """
+
+    def __init__(self, processes: int = COMPUTE_PROCESSES):
+        self.processes = processes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.processes > 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                context = multiprocessing.get_context('spawn')
+                self._executor = ProcessPoolExecutor(self.processes, mp_context=context)
+            return self._executor
+
+    def _submit(self, func: Callable, args: tuple, kwargs: dict, scope: Optional[str] = None) -> Future:
+        try:
+            return self._get_executor().submit(_call, func, args, kwargs, scope)
+        except BrokenProcessPool:
+            self.reset()
+            return self._get_executor().submit(_call, func, args, kwargs, scope)
+
+    def run_sync(self, func: Callable, *args, **kwargs):
+        """在工作进程中执行func并等待结果（在线程中调用）"""
+        if not self.enabled:
+            return func(*args, **kwargs)
+        with SharedArgs() as shared:
+            return _take(self._submit(func, shared.share(args), shared.share(kwargs)).result())
+
+    def map_sync(self, func: Callable, items: list, *common) -> list:
+        """对items中的每一项执行func(item, *common)，common中的大数组只放入共享内存一次
+
+        Returns:
+            list: 按items顺序的结果
+        """
+        if not self.enabled:
+            return [func(item, *common) for item in items]
+        with SharedArgs() as shared:
+            common = shared.share(common)
+            scope = f'{os.getpid()}-{next(_map_ids)}'
+            futures = [self._submit(func, (item, *common), {}, scope) for item in items]
+            return [_take(future.result()) for future in futures]
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """在工作进程中执行func，不阻塞事件循环
+
+        Args:
+            func: 模块级函数（需可被工作进程导入）
+            *args, **kwargs: 参数，其中的大数组和DataFrame经共享内存传递
+
+        Returns:
+            func的返回值
+        """
+        name = getattr(func, '__name__', 'task')
+        started = time.perf_counter()
+        metrics.COMPUTE_INFLIGHT.inc()
+        try:
+            if not self.enabled:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+            with SharedArgs() as shared:
+                future = self._submit(func, shared.share(args), shared.share(kwargs))
+                return _take(await asyncio.wrap_future(future))
+        finally:
+            metrics.COMPUTE_INFLIGHT.dec()
+            metrics.COMPUTE_SECONDS.observe(time.perf_counter() - started, task=name)
+
+    def reset(self) -> None:
+        """关闭当前进程池（下次提交时重建）"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        """应用停止时关闭进程池"""
+        self.reset()
+
+
+# 进程内共享的计算进程池
+compute_pool = ComputePool()
@@ -0,0 +1,292 @@
+# 概念对照索引模块
+# 同花顺（ths）和东方财富（east）的概念板块各自编码，同一题材在两边的名称和成分股略有差异。
+# 索引按规范化后的名称和成分股集合的重合度（Jaccard系数）把两边的概念一一对应，
+# 用于合并视图，以及让一个数据源已加载的成分股回答另一个数据源的查询。
+# 成员关系按概念记录签名，任一数据源更新时只重算成分股变化的概念与另一侧各概念的交集
+import os
+import re
+import threading
+import unicodedata
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+SOURCES = ('ths', 'east')
+# 合并视图的数据源名
+MERGED_SOURCE = 'merged'
+# 名称不同的概念，成分股重合度不低于该值时视为同一概念
+MATCH_OVERLAP = float(os.environ.get('ADATA_UI_CONCEPT_MATCH_OVERLAP', 0.6))
+# 成分股重合度不低于该值时，两个概念的成分股和派生结果可以互相代替
+SHARE_OVERLAP = float(os.environ.get('ADATA_UI_CONCEPT_SHARE_OVERLAP', 0.9))
+
+# 名称中不区分概念的后缀和标点
+_SUFFIX = re.compile(r'(概念股?|板块|题材|指数)$')
+_PUNCT = re.compile(r'[\s\-_·•.,，、/()（）\[\]【】"“”\'‘’]+')
+
+
+def normalize_concept_name(name: str) -> str:
+    """规范化概念名称：全角转半角、英文转小写、去掉空白标点和“概念/板块”等后缀
+
+    如 '5G概念'、'5ｇ' 都规范化为 '5g'
+    """
+    text = _PUNCT.sub('', unicodedata.normalize('NFKC', str(name)).lower())
+    stripped = _SUFFIX.sub('', text)
+    return stripped or text
+
+
+def other_source(source: str) -> str:
+    """另一个概念数据源：'ths' <-> 'east'"""
+    if source not in SOURCES:
+        raise ValueError(f'不支持的概念数据源: {source}')
+    return SOURCES[1 - SOURCES.index(source)]
+
+
+class ConceptIndex:
+    """同花顺/东方财富概念对照索引
+
+    概念名称来自概念列表（set_concepts），成分股来自全部成员关系（set_memberships）；
+    只有名称时按规范化名称对应，两边成分股都已加载后再按重合度对应
+    """
+
+    def __init__(self):
+        # 全局编号 -> 股票代码
+        self._stocks: List[str] = []
+        self._stock_index = pd.Index([], dtype=object)
+        # 数据源 -> 概念代码 -> 名称 / 成分股编号（已排序） / 签名
+        self._names: Dict[str, Dict[str, str]] = {source: {} for source in SOURCES}
+        self._members: Dict[str, Dict[str, np.ndarray]] = {source: {} for source in SOURCES}
+        self._signatures: Dict[str, Dict[str, int]] = {source: {} for source in SOURCES}
+        # 最近一次写入的成员关系表，同一对象再次写入时跳过
+        self._frames: Dict[str, pd.DataFrame] = {}
+        # 成分股交集数：行为ths概念，列为east概念
+        self._inter = pd.DataFrame(np.zeros((0, 0), dtype='int64'))
+        self._matches: Optional[pd.DataFrame] = None
+        self._lock = threading.Lock()
+        # 概念或成分股变化时递增
+        self.version = 0
+
+    def clear(self) -> None:
+        """清空全部概念和成员关系（版本号继续递增）"""
+        with self._lock:
+            self._stocks = []
+            self._stock_index = pd.Index([], dtype=object)
+            for source in SOURCES:
+                self._names[source], self._members[source], self._signatures[source] = {}, {}, {}
+            self._frames = {}
+            self._inter = pd.DataFrame(np.zeros((0, 0), dtype='int64'))
+            self._matches = None
+            self.version += 1
+
+    def has_members(self, source: str) -> bool:
+        """该数据源的成员关系是否已加载"""
+        return bool(self._members[source])
+
+    def _ids(self, codes: np.ndarray) -> np.ndarray:
+        """股票代码对应的全局编号，新代码追加到末尾"""
+        ids = self._stock_index.get_indexer(codes)
+        new = pd.unique(codes[ids < 0])
+        if len(new):
+            self._stocks.extend(new)
+            self._stock_index = pd.Index(self._stocks, dtype=object)
+            ids = self._stock_index.get_indexer(codes)
+        return ids
+
+    def set_concepts(self, source: str, concepts: pd.DataFrame) -> None:
+        """写入概念列表（concept_code, concept_name），成员关系未加载时用于按名称对应"""
+        other_source(source)
+        names = dict(zip(concepts['concept_code'].astype(str), concepts['concept_name'].astype(str)))
+        with self._lock:
+            if self.has_members(source) or names == self._names[source]:
+                return
+            self._names[source] = names
+            self._matches = None
+            self.version += 1
+
+    def set_memberships(self, source: str, memberships: pd.DataFrame) -> List[str]:
+        """写入一个数据源的全部成员关系（concept_code, concept_name, stock_code 三列的长表）
+
+        与上次相比成分股没有变化的概念不重算交集
+
+        Returns:
+            list: 新增、删除或成分股变化的概念代码
+        """
+        other = other_source(source)
+        with self._lock:
+            if self._frames.get(source) is memberships:
+                return []
+            df = memberships.astype({'concept_code': str, 'stock_code': str})
+            concept_codes, concept_index = np.unique(df['concept_code'].to_numpy(dtype=object), return_inverse=True)
+            ids = self._ids(df['stock_code'].to_numpy(dtype=object))
+            # 按 (概念, 股票编号) 排序去重后，每个概念的成分股是连续的一段
+            order = np.lexsort((ids, concept_index))
+            concept_index, ids = concept_index[order], ids[order]
+            keep = np.ones(len(ids), dtype=bool)
+            keep[1:] = (concept_index[1:] != concept_index[:-1]) | (ids[1:] != ids[:-1])
+            concept_index, ids = concept_index[keep], ids[keep]
+            groups = np.split(ids, np.searchsorted(concept_index, np.arange(1, len(concept_codes))))
+            members = dict(zip(concept_codes, groups))
+            signatures = {code: hash(group.tobytes()) for code, group in members.items()}
+            names = df.drop_duplicates('concept_code').set_index('concept_code')['concept_name'].astype(str)
+
+            old = self._signatures[source]
+            changed = [code for code in concept_codes if old.get(code) != signatures[code]]
+            removed = [code for code in old if code not in signatures]
+            self._frames[source] = memberships
+            self._names[source] = names.reindex(concept_codes).to_dict()
+            self._members[source], self._signatures[source] = members, signatures
+            if changed or removed:
+                self._update_intersections(source, other, list(concept_codes), changed)
+                self._matches = None
+                self.version += 1
+            return changed + removed
+
+    def _update_intersections(self, source: str, other: str, codes: List[str], changed: List[str]) -> None:
+        """重算变化概念与另一侧全部概念的成分股交集数，其余概念沿用原值"""
+        other_codes = list(self._members[other])
+        counts = np.zeros((len(changed), len(other_codes)), dtype='int64')
+        if changed and other_codes:
+            # 另一侧的概念 x 股票 关联矩阵，变化概念的交集数为其成分股列之和
+            incidence = np.zeros((len(other_codes), len(self._stocks)), dtype=bool)
+            for i, code in enumerate(other_codes):
+                incidence[i, self._members[other][code]] = True
+            for i, code in enumerate(changed):
+                counts[i] = incidence[:, self._members[source][code]].sum(axis=1)
+        inter = self._inter if source == SOURCES[0] else self._inter.T
+        inter = inter.reindex(index=codes, columns=other_codes, fill_value=0)
+        if changed:
+            inter.loc[changed] = counts
+        self._inter = inter if source == SOURCES[0] else inter.T
+
+    def matches(self) -> pd.DataFrame:
+        """两个数据源间一一对应的概念
+
+        候选为规范化名称相同、或成分股重合度不低于MATCH_OVERLAP的概念对，
+        按得分从高到低贪心选取，每个概念最多对应一个
+
+        Returns:
+            pd.DataFrame: ths_code, ths_name, east_code, east_name, same_name, overlap
+            （重合度为成分股交集/并集，任一侧成分股未加载时为NaN）
+        """
+        with self._lock:
+            if self._matches is None:
+                self._matches = self._build_matches()
+            return self._matches
+
+    def _build_matches(self) -> pd.DataFrame:
+        left, right = (list(self._names[source]) for source in SOURCES)
+        left_names = np.array([normalize_concept_name(self._names[SOURCES[0]][code]) for code in left], dtype=object)
+        right_names = np.array([normalize_concept_name(self._names[SOURCES[1]][code]) for code in right], dtype=object)
+        same_name = left_names[:, None] == right_names[None, :] if len(left) and len(right) \
+            else np.zeros((len(left), len(right)), dtype=bool)
+        overlap = np.full((len(left), len(right)), np.nan)
+        if self.has_members(SOURCES[0]) and self.has_members(SOURCES[1]):
+            inter = self._inter.reindex(index=left, columns=right, fill_value=0).to_numpy(dtype='float64')
+            sizes = [np.array([len(self._members[source].get(code, ())) for code in codes], dtype='float64')
+                     for source, codes in zip(SOURCES, (left, right))]
+            union = sizes[0][:, None] + sizes[1][None, :] - inter
+            with np.errstate(invalid='ignore', divide='ignore'):
+                overlap = np.where(union > 0, inter / np.maximum(union, 1), 0.0)
+        rows, cols = np.nonzero(same_name | (overlap >= MATCH_OVERLAP))
+        # 名称相同计为MATCH_OVERLAP的重合度：成分股几乎相同的概念对优先于仅名称相同的
+        score = same_name[rows, cols] * MATCH_OVERLAP + np.nan_to_num(overlap[rows, cols])
+        used_rows, used_cols, pairs = set(), set(), []
+        for k in np.argsort(-score, kind='stable'):
+            i, j = rows[k], cols[k]
+            if i not in used_rows and j not in used_cols:
+                used_rows.add(i)
+                used_cols.add(j)
+                pairs.append((i, j))
+        i, j = (np.array([p[n] for p in pairs], dtype='int64') for n in (0, 1))
+        return pd.DataFrame({
+            'ths_code': np.array(left, dtype=object)[i] if len(i) else np.array([], dtype=object),
+            'ths_name': [self._names[SOURCES[0]][left[k]] for k in i],
+            'east_code': np.array(right, dtype=object)[j] if len(j) else np.array([], dtype=object),
+            'east_name': [self._names[SOURCES[1]][right[k]] for k in j],
+            'same_name': same_name[i, j] if len(i) else np.array([], dtype=bool),
+            'overlap': overlap[i, j] if len(i) else np.array([], dtype='float64'),
+        })
+
+    def counterpart(self, source: str, concept_code: str) -> Optional[Tuple[str, float]]:
+        """另一个数据源中对应的概念
+
+        Returns:
+            tuple: (概念代码, 重合度)，没有对应概念时为None
+        """
+        other = other_source(source)
+        matches = self.matches()
+        found = matches[matches[f'{source}_code'] == str(concept_code)]
+        if found.empty:
+            return None
+        return found[f'{other}_code'].iloc[0], float(found['overlap'].iloc[0])
+
+    def canonical(self, source: str, concept_code: str) -> Tuple[str, str]:
+        """成分股可互相代替的一对概念共用的键（以ths一侧为准），用于共享派生结果的缓存"""
+        if source == SOURCES[1]:
+            pair = self.counterpart(source, concept_code)
+            if pair is not None and pair[1] >= SHARE_OVERLAP:
+                return SOURCES[0], pair[0]
+        return source, str(concept_code)
+
+    def members(self, source: str, concept_code: str) -> Optional[List[str]]:
+        """已加载的概念成分股代码
+
+        Args:
+            source: 'ths'、'east' 或合并视图 MERGED_SOURCE（两侧对应概念成分股的并集）
+            concept_code: 概念代码，合并视图中为 merged() 的 concept_code
+
+        Returns:
+            list: 股票代码；成员关系未加载、且另一侧没有可代替的概念时为None
+        """
+        code = str(concept_code)
+        if source == MERGED_SOURCE:
+            ids = [self._members[side][code] for side in SOURCES if code in self._members[side]]
+            matches = self.matches()
+            for side in SOURCES:
+                found = matches[matches[f'{side}_code'] == code]
+                if not found.empty:
+                    other = other_source(side)
+                    ids.append(self._members[other].get(found[f'{other}_code'].iloc[0], np.array([], dtype='int64')))
+                    break
+            if not ids:
+                return None
+        elif code in self._members[source]:
+            ids = [self._members[source][code]]
+        else:
+            pair = self.counterpart(source, code)
+            other = other_source(source)
+            if pair is None or not (pair[1] >= SHARE_OVERLAP) or pair[0] not in self._members[other]:
+                return None
+            ids = [self._members[other][pair[0]]]
+        return [self._stocks[i] for i in np.unique(np.concatenate(ids))]
+
+    def merged(self) -> pd.DataFrame:
+        """合并视图：对应的概念合为一行，未对应的概念各占一行
+
+        Returns:
+            pd.DataFrame: concept_code（有ths概念时为ths代码）, concept_name, ths_code, east_code,
+            overlap, stock_count（两侧成分股并集的数量）
+        """
+        matches = self.matches()
+        ths, east = (list(self._names[source]) for source in SOURCES)
+        matched_ths, matched_east = set(matches['ths_code']), set(matches['east_code'])
+        ths_only = [code for code in ths if code not in matched_ths]
+        east_only = [code for code in east if code not in matched_east]
+        df = pd.DataFrame({
+            'concept_code': list(matches['ths_code']) + ths_only + east_only,
+            'concept_name': list(matches['ths_name']) + [self._names['ths'][c] for c in ths_only]
+                            + [self._names['east'][c] for c in east_only],
+            'ths_code': list(matches['ths_code']) + ths_only + [None] * len(east_only),
+            'east_code': list(matches['east_code']) + [None] * len(ths_only) + east_only,
+            'overlap': list(matches['overlap']) + [np.nan] * (len(ths_only) + len(east_only)),
+        })
+        ths_members, east_members = self._members['ths'], self._members['east']
+        empty = np.array([], dtype='int64')
+        df['stock_count'] = [
+            len(np.union1d(ths_members.get(t, empty), east_members.get(e, empty)))
+            for t, e in zip(df['ths_code'], df['east_code'])
+        ]
+        return df
+
+
+# 进程内共享的概念对照索引
+concept_index = ConceptIndex()
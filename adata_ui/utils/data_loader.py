@@ -1,471 +1,933 @@
 # 数据加载模块
 import os
-import asyncio
 import time
-import random
+import asyncio
+import datetime
+import threading
 import pandas as pd
-from typing import Dict, List, Optional
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from adata_ui.utils import metrics
+from adata_ui.utils.adjust import ADJUST_MODES, AdjustmentFactors, factor_store
+from adata_ui.utils.analytics import aligned_prices, co_movement_matrix
+from adata_ui.utils.backend import DataBackend, get_backend
+from adata_ui.utils.compute import compute_pool
+from adata_ui.utils.concept_index import MERGED_SOURCE, SHARE_OVERLAP, SOURCES, concept_index, other_source
+from adata_ui.utils import formatting
+from adata_ui.utils.fundamentals import (FundamentalsSnapshot, build_fundamentals_snapshot, cached_fundamentals_snapshot,
+                                         get_fundamentals_snapshot, latest_fundamentals_snapshot)
+from adata_ui.utils.history_store import HistoryStore, get_history_store
+from adata_ui.utils.intraday import intraday_feed
+from adata_ui.utils.materialize import (MARKET_TZ, SESSION_CLOSE, current_materialized, in_session,
+                                        latest_bar_date, settled_date)
+from adata_ui.utils.metrics import note_cache, timed_loader
+from adata_ui.utils.quote_store import QUOTE_TTL, quote_store
+from adata_ui.utils.schema import BAR_COLUMNS, compact_bars, compact_codes
+from adata_ui.utils.screener import MarketSnapshot, cached_market_snapshot, get_market_snapshot
+from adata_ui.utils.trading_calendar import get_trading_calendar, resample_bars
+from adata_ui.utils.wire import downsample_minmax
+
+# 后端调用使用独立线程池，便于统计排队/执行中的任务数（线程池饱和度）
+LOADER_THREADS = int(os.environ.get('ADATA_UI_LOADER_THREADS', 8))
+_executor = ThreadPoolExecutor(max_workers=LOADER_THREADS, thread_name_prefix='adata_loader')
+metrics.POOL_SIZE.set(LOADER_THREADS)
+# 指数K线缓存的刷新间隔（秒），超过后再次请求时向后端补齐最新的K线
+INDEX_TTL = float(os.environ.get('ADATA_UI_INDEX_TTL', 60))
+# K线缓存（不复权/复权各一份）保留的条目数，按最近使用淘汰
+STOCK_CACHE_SIZE = int(os.environ.get('ADATA_UI_STOCK_CACHE_SIZE', 256))
+# 分析结果缓存保留的条目数（键中含数据版本，旧版本的结果随使用淘汰）
+ANALYTICS_CACHE_SIZE = int(os.environ.get('ADATA_UI_ANALYTICS_CACHE_SIZE', 64))
+
+
+class LRUCache(OrderedDict):
+    """定长缓存：超过maxsize时淘汰最久未使用的条目，读写加锁（后端调用在线程池中执行）
+
+    Args:
+        maxsize: 最多保留的条目数
+    """
+
+    def __init__(self, maxsize: int):
+        super().__init__()
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self:
+                return default
+            self.move_to_end(key)
+            return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            super().__setitem__(key, value)
+            self.move_to_end(key)
+            while len(self) > self.maxsize:
+                self.popitem(last=False)
 
-class DataTransformer:
-    """数据转换器类，负责数据格式化和转换"""
-    
-    def __init__(self):
-        pass
-    
-    def format_stock_price(self, price):
-        """格式化股票价格"""
-        return round(float(price), 2)
-    
-    def format_volume(self, volume):
-        """格式化成交量"""
-        return f"{int(volume):,}"
-    
-    def format_change_pct(self, change):
-        """格式化涨跌幅"""
-        return f"{float(change):+.2f}%"
 
 class DataLoader:
-    """数据加载器类，负责获取各类股票数据"""
-    
-    def __init__(self):
+    """
+    数据加载器类，负责从数据后端加载数据
+    数据后端由环境变量ADATA_UI_BACKEND选择（mock/adata/record/replay），
+    详见 adata_ui.utils.backend
+    """
+
+    def __init__(self, backend: Optional[DataBackend] = None, history: Optional[HistoryStore] = None):
+        """初始化数据加载器
+
+        Args:
+            backend: 数据后端，默认使用进程内共享的后端
+            history: 全市场历史行情库，默认按环境变量ADATA_UI_HISTORY_DIR打开
+        """
         # 初始化数据源配置
         self.sources = {
             'ths': '同花顺',
             'eastmoney': '东方财富',
         }
-        # 模拟数据缓存
-        self._stock_cache: Dict[str, pd.DataFrame] = {}
+        self._backend = backend
+        self._history = history
+        # 数据缓存
+        self._stock_cache: Dict[str, pd.DataFrame] = LRUCache(STOCK_CACHE_SIZE)
         self._concept_cache: Dict[str, pd.DataFrame] = {}
-    
+        # 指数K线：每个指数一份从最早请求日期到最新交易日的K线，增量补齐
+        self._index_cache: Dict[str, Dict] = {}
+        # 复权K线：(股票, 区间, 复权方式) -> ((因子版本, 数据版本), K线)
+        self._adjusted_cache: Dict[tuple, Tuple[tuple, pd.DataFrame]] = LRUCache(STOCK_CACHE_SIZE)
+        # 由K线派生的分析结果，键中包含数据版本
+        self._analytics_cache: Dict[tuple, Dict] = LRUCache(ANALYTICS_CACHE_SIZE)
+        # 缓存代数，clear_cache() 后递增，使派生结果失效
+        self._generation = 0
+
+    @property
+    def backend(self) -> DataBackend:
+        """当前使用的数据后端"""
+        if self._backend is None:
+            self._backend = get_backend()
+        return self._backend
+
+    @property
+    def history(self) -> Optional[HistoryStore]:
+        """全市场历史行情库，未配置时为None"""
+        return self._history if self._history is not None else get_history_store()
+
+    @property
+    def data_version(self) -> str:
+        """K线数据版本：历史行情库版本、缓存代数和当前日期，任一变化时派生结果失效"""
+        history = self.history
+        return f"{history.version if history is not None else 'live'}:{self._generation}:{datetime.date.today()}"
+
+    async def _run(self, func, *args, **kwargs):
+        """在线程池中执行同步的后端调用，避免阻塞事件循环"""
+        def task():
+            metrics.POOL_RUNNING.inc()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.POOL_RUNNING.dec()
+
+        loop = asyncio.get_running_loop()
+        metrics.POOL_INFLIGHT.inc()
+        try:
+            return await loop.run_in_executor(_executor, task)
+        finally:
+            metrics.POOL_INFLIGHT.dec()
+
+    async def run_in_thread(self, func, *args, **kwargs):
+        """在数据加载线程池中执行同步函数（如收盘物化、历史同步等批量任务），不阻塞事件循环"""
+        return await self._run(func, *args, **kwargs)
+
+    async def _fetch(self, method: str, *args):
+        """请求数据后端：支持非阻塞请求的后端（如http）直接等待，不占用线程池；其余在线程池中调用"""
+        future = self.backend.submit(method, *args)
+        if future is not None:
+            return await asyncio.wrap_future(future)
+        return await self._run(getattr(self.backend, method), *args)
+
+    @timed_loader
+    async def get_quotes(self, codes: List[str], max_age: Optional[float] = None) -> pd.DataFrame:
+        """获取最新行情：从共享的行情存储中按代码取出，只为缺失或过期的代码请求一次行情接口
+
+        交易时段内写入超过max_age秒的行情视为过期；非交易时段在最近一次收盘后写入的行情不再变化
+
+        Args:
+            codes: 股票代码列表
+            max_age: 交易时段内行情的有效期（秒），默认 QUOTE_TTL
+
+        Returns:
+            pd.DataFrame: 有行情的股票的 stock_code, short_name, price, change, change_pct, volume, amount ...
+        """
+        codes = [str(code) for code in codes]
+        if in_session():
+            since = time.time() - (QUOTE_TTL if max_age is None else max_age)
+        else:
+            since = datetime.datetime.combine(settled_date(), SESSION_CLOSE, MARKET_TZ).timestamp()
+        stale = quote_store.stale(codes, since)
+        note_cache(not stale)
+        if stale:
+            quote_store.update(await self._run(self.backend.list_market_current, stale))
+        return quote_store.frame(codes)
+
+    @timed_loader
     async def get_stock_list(self, market='all', limit=100, offset=0):
         """获取股票列表
-        
+
         Args:
             market: 市场类型 ('sh', 'sz', 'all')
             limit: 返回数量限制
             offset: 偏移量
-            
+
         Returns:
             pandas DataFrame: 股票列表数据
         """
         try:
-            # 模拟异步加载
-            await asyncio.sleep(0.5)
-            
-            # 由于是演示，返回模拟数据
-            stocks = []
-            for i in range(limit):
-                code = f"{random.choice(['600', '601', '000', '002'])}{random.randint(100, 999)}"
-                name = f"股票{i + offset + 1}"
-                market_type = 'sh' if code.startswith('6') else 'sz'
-                
-                if market == 'all' or market == market_type:
-                    stocks.append({
-                        'code': code,
-                        'name': name,
-                        'market': market_type,
-                        'price': round(random.uniform(5, 100), 2),
-                        'change_rate': round(random.uniform(-10, 10), 2)
-                    })
-            
-            return pd.DataFrame(stocks)
+            df = await self._run(self.backend.all_code)
+            if market != 'all':
+                df = df[df['exchange'].str.lower() == market]
+            df = df.iloc[offset:offset + limit]
+
+            # 附加最新行情
+            quotes = await self.get_quotes(df['stock_code'].tolist())
+            df = df.merge(quotes[['stock_code', 'price', 'change_pct']], on='stock_code', how='left')
+
+            return pd.DataFrame({
+                'code': df['stock_code'],
+                'name': df['short_name'],
+                'market': df['exchange'].str.lower(),
+                'price': df['price'],
+                'change_rate': df['change_pct']
+            })
         except Exception as e:
             print(f"获取股票列表失败: {str(e)}")
             return pd.DataFrame()
-    
-    async def get_stock_market_data(self, code, days=30):
+
+    @timed_loader
+    async def get_stock_market_data(self, code, days=30, period: str = 'D', adjust: str = 'qfq'):
         """获取股票行情数据
-        
+
         Args:
             code: 股票代码
             days: 获取天数
-            
+            period: K线周期，'D'（日K）、'W'（周K）或 'M'（月K），周K/月K由日K按交易日历重采样
+            adjust: 复权方式，见 get_stock_data
+
         Returns:
             pandas DataFrame: 行情数据
         """
         try:
-            # 模拟异步加载
-            await asyncio.sleep(0.8)
-            
-            # 生成模拟的K线数据
-            dates = pd.date_range(end=pd.Timestamp.now(), periods=days)
-            
-            # 生成随机价格数据，保持一定的连续性
-            base_price = random.uniform(10, 50)
-            prices = []
-            current_price = base_price
-            
-            for date in dates:
-                # 跳过非交易日（周末）
-                if date.weekday() >= 5:
-                    continue
-                    
-                change = random.uniform(-2, 2)
-                current_price = max(1, current_price + change)
-                prices.append({
-                    'date': date.strftime('%Y-%m-%d'),
-                    'open': round(current_price, 2),
-                    'high': round(current_price + random.uniform(0, 1), 2),
-                    'low': round(current_price - random.uniform(0, 1), 2),
-                    'close': round(current_price + random.uniform(-0.5, 0.5), 2),
-                    'volume': random.randint(100000, 10000000)
-                })
-            
-            return pd.DataFrame(prices)
+            end = pd.Timestamp.now()
+            start = end - pd.Timedelta(days=days - 1)
+            bars = await self._run(
+                self.get_stock_data, code, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'), adjust
+            )
+            return bars if period == 'D' else resample_bars(bars, period)
         except Exception as e:
             print(f"获取股票行情数据失败: {str(e)}")
             return pd.DataFrame()
-    
+
+    @timed_loader
+    async def get_intraday_bars(self, code, freq: int = 1) -> Tuple[int, pd.DataFrame]:
+        """获取最近一个交易日的分钟K线
+
+        订阅该股票的盘中行情（由页面启动的后台任务 intraday_feed 逐笔写入分钟K线缓冲区）；每个交易日首次读取时用分时数据
+        回补开盘以来的K线，收盘后再回补一次补齐最后几分钟，其余读取只读缓冲区、不请求后端
+
+        Args:
+            code: 股票代码
+            freq: 分钟周期，1/5/15/30/60
+
+        Returns:
+            tuple: (缓冲区版本, K线)，版本不变时K线不变，页面据此跳过重绘
+        """
+        try:
+            intraday_feed.subscribe(code)
+            buffer = intraday_feed.aggregator.buffer(code)
+            loaded = (latest_bar_date(), not in_session())
+            note_cache(buffer.backfilled == loaded)
+            if buffer.backfilled != loaded:
+                minutes = await self._run(self.backend.get_market_min, code)
+                intraday_feed.aggregator.backfill(code, minutes)
+                buffer.backfilled = loaded
+            return buffer.version, buffer.bars(freq)
+        except Exception as e:
+            print(f"获取分钟K线失败: {str(e)}")
+            return -1, pd.DataFrame()
+
+    @timed_loader
     async def get_stock_info(self, code):
         """获取股票信息
-        
+
         Args:
             code: 股票代码
-            
+
+        Returns:
+            dict: 股票信息，代码不存在或获取失败时为None
+        """
+        infos = await self.get_stock_infos([code])
+        return infos[0] if infos else None
+
+    @timed_loader
+    async def get_stock_infos(self, codes: List[str]) -> List[Dict]:
+        """批量获取股票信息：基本面来自全市场快照的按代码查找，最新价只请求一次行情接口
+
+        Args:
+            codes: 股票代码列表
+
         Returns:
-            dict: 股票信息
+            List[dict]: 股票信息（按传入顺序，跳过不存在的代码）
         """
         try:
-            await asyncio.sleep(0.5)
-            return {
-                'code': code,
-                'name': f'股票{code}',
-                'industry': '科技',
-                'area': '深圳',
-                'pe': 25.5,
-                'pb': 2.1,
-                'total_share': 1000000000,
-                'float_share': 800000000,
-                'market_cap': 10000000000,
-                'eps': 0.45,
-                'bvps': 5.2
-            }
+            snapshot = latest_fundamentals_snapshot()
+            note_cache(snapshot is not None)
+            if snapshot is None:
+                # 全市场快照尚未构建（由后台任务构建），本次只拉取这几只股票
+                snapshot = await self._run(build_fundamentals_snapshot, self.backend, 0, list(codes))
+            records = snapshot.records(codes)
+            if not records:
+                return []
+            quotes = await self.get_quotes([info['stock_code'] for info in records])
+            quotes = quotes.set_index('stock_code')
+            return [self._stock_info(info, quotes) for info in records]
         except Exception as e:
             print(f"获取股票信息失败: {str(e)}")
-            return None
-    
-    async def get_concept_list(self, concept_name=None):
-        """获取概念板块列表
-        
+            return []
+
+    @staticmethod
+    def _stock_info(info: Dict, quotes: pd.DataFrame) -> Dict:
+        """基本面快照的一行 + 最新行情，转换为页面展示的字段（股本、金额以亿为单位）"""
+        code = info['stock_code']
+        quote = quotes.loc[code] if code in quotes.index else {}
+
+        def value(name, scale=1.0, decimals=2):
+            raw = info.get(name)
+            return '-' if raw is None else round(raw / scale, decimals)
+
+        return {
+            'code': code,
+            'name': info.get('short_name') or '-',
+            'status': 'online' if len(quote) else 'unknown',
+            'current_price': quote.get('price', 0),
+            'change_percent': quote.get('change_pct', 0),
+            'industry': info.get('industry') or '-',
+            'list_date': info.get('list_date') or '-',
+            'report_date': info.get('report_date') or '-',
+            'total_share': value('total_shares', 1e8),
+            'circulating_share': value('float_shares', 1e8),
+            'pe_ttm': value('pe_ttm'),
+            'pb': value('pb'),
+            'revenue': value('revenue', 1e8),
+            'net_profit': value('net_profit', 1e8),
+            'gross_margin': value('gross_margin'),
+            'net_margin': value('net_margin'),
+            'roe': value('roe'),
+            'debt_ratio': value('debt_ratio'),
+            'eps': value('eps', decimals=3),
+            'bps': value('bps', decimals=3),
+        }
+
+    @timed_loader
+    def get_stock_data(self, stock_code: str, start_date: str, end_date: str, adjust: str = 'qfq') -> pd.DataFrame:
+        """
+        获取指定股票在指定日期范围内的数据
+
+        缓存和历史行情库中只保存不复权K线，复权K线由复权因子在本地计算，按复权方式缓存
+
         Args:
-            concept_name: 概念名称（可选）
-            
+            stock_code: 股票代码
+            start_date: 开始日期，格式为'YYYY-MM-DD'
+            end_date: 结束日期，格式为'YYYY-MM-DD'
+            adjust: 复权方式，'qfq'（前复权）、'hfq'（后复权）或 'none'（不复权），见 adata_ui.utils.adjust
+
         Returns:
-            pandas DataFrame: 概念板块列表
+            pd.DataFrame: 包含股票数据的DataFrame
+        """
+        if adjust not in ADJUST_MODES:
+            raise ValueError(f'未知的复权方式: {adjust}')
+        bars = self._raw_stock_data(stock_code, start_date, end_date)
+        if adjust == 'none':
+            return bars
+        factors = self.get_adjust_factors(stock_code)
+        # 因子有新事件或K线数据版本变化时重新计算
+        version = (factors.version, self.data_version)
+        cache_key = (stock_code, start_date, end_date, adjust)
+        cached = self._adjusted_cache.get(cache_key)
+        if cached is None or cached[0] != version:
+            cached = self._adjusted_cache[cache_key] = (version, factors.apply(bars, adjust))
+        return cached[1]
+
+    def get_adjust_factors(self, stock_code: str) -> AdjustmentFactors:
+        """股票的复权因子（进程内共享）
+
+        每ACTIONS_TTL秒向后端检查一次除权除息事件，只为新出现的事件取K线计算因子
         """
+        factors, fresh = factor_store.get(stock_code)
+        if fresh:
+            return factors
+        factors = factors or AdjustmentFactors()
         try:
-            await asyncio.sleep(0.6)
-            
-            # 模拟概念板块数据
-            data = [
-                {'code': '880123', 'name': 'AI芯片', 'change': random.uniform(-5, 8), 'volume': random.randint(10000000, 100000000), 'market_value': random.uniform(500, 2000)},
-                {'code': '880234', 'name': '新能源汽车', 'change': random.uniform(-5, 8), 'volume': random.randint(10000000, 100000000), 'market_value': random.uniform(500, 2000)},
-                {'code': '880345', 'name': '光伏概念', 'change': random.uniform(-5, 8), 'volume': random.randint(10000000, 100000000), 'market_value': random.uniform(500, 2000)},
-                {'code': '880456', 'name': '半导体', 'change': random.uniform(-5, 8), 'volume': random.randint(10000000, 100000000), 'market_value': random.uniform(500, 2000)},
-                {'code': '880567', 'name': '5G通信', 'change': random.uniform(-5, 8), 'volume': random.randint(10000000, 100000000), 'market_value': random.uniform(500, 2000)},
-                {'code': '880678', 'name': '医药生物', 'change': random.uniform(-5, 8), 'volume': random.randint(10000000, 100000000), 'market_value': random.uniform(500, 2000)},
-                {'code': '880789', 'name': '云计算', 'change': random.uniform(-5, 8), 'volume': random.randint(10000000, 100000000), 'market_value': random.uniform(500, 2000)},
-                {'code': '880890', 'name': '军工', 'change': random.uniform(-5, 8), 'volume': random.randint(10000000, 100000000), 'market_value': random.uniform(500, 2000)}
-            ]
-            
-            df = pd.DataFrame(data)
-            
-            # 如果提供了概念名称，进行过滤
-            if concept_name:
-                df = df[df['name'].str.contains(concept_name, case=False)]
-            
-            return df
+            new = factors.missing(self.backend.get_corporate_actions(stock_code))
+            if not new.empty:
+                # 除权日前一交易日到最新的不复权K线（停牌可能跨越多日，向前多取30天）
+                start = pd.to_datetime(new['ex_date']).min() - pd.Timedelta(days=30)
+                bars = self._raw_stock_data(stock_code, start.strftime('%Y-%m-%d'), str(latest_bar_date()))
+                factors = factors.extend(new, bars)
         except Exception as e:
-            print(f"获取概念板块列表失败: {str(e)}")
-            return pd.DataFrame()
-    
-    def get_stock_data(self, stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
-        """获取指定股票在指定日期范围内的数据"""
+            print(f"获取 {stock_code} 除权除息信息失败: {str(e)}")
+        factor_store.put(stock_code, factors)
+        return factors
+
+    def _raw_stock_data(self, stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """不复权K线：优先历史行情库，其余向后端请求并缓存"""
         # 检查缓存
         cache_key = f"{stock_code}_{start_date}_{end_date}"
-        if cache_key in self._stock_cache:
-            return self._stock_cache[cache_key]
-        
-        # 模拟API调用延迟
-        time.sleep(0.5)
-        
-        # 生成模拟数据
-        # 计算日期范围
-        start = pd.to_datetime(start_date)
-        end = pd.to_datetime(end_date)
-        date_range = pd.date_range(start=start, end=end)
-        
-        # 生成基础价格
-        base_price = random.uniform(10, 100)
-        
-        # 生成模拟数据
-        data = []
-        for date in date_range:
-            # 跳过非交易日（周末）
-            if date.weekday() >= 5:
-                continue
-                
-            # 生成当天价格
-            change = random.uniform(-2, 2)
-            base_price = max(1, base_price + change)
-            
-            # 生成开盘价、最高价、最低价、收盘价
-            open_price = round(base_price * random.uniform(0.98, 1.02), 2)
-            close_price = round(open_price * random.uniform(0.95, 1.05), 2)
-            high_price = round(max(open_price, close_price) * random.uniform(1.01, 1.03), 2)
-            low_price = round(min(open_price, close_price) * random.uniform(0.97, 0.99), 2)
-            
-            # 生成成交量
-            volume = round(random.uniform(10000, 10000000), 0)
-            
-            # 生成成交额
-            amount = round(volume * close_price, 2)
-            
-            data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'open': open_price,
-                'close': close_price,
-                'high': high_price,
-                'low': low_price,
-                'volume': volume,
-                'amount': amount
-            })
-        
-        # 创建DataFrame
-        df = pd.DataFrame(data)
-        
+        cached = self._stock_cache.get(cache_key)
+        if cached is not None:
+            note_cache(True)
+            return cached
+
+        # 历史行情库覆盖整个区间时直接返回内存映射切片，不占用缓存
+        history = self.history
+        if history is not None and stock_code in history:
+            df, complete = self._read_history(history, stock_code, start_date, end_date)
+            note_cache(complete)
+            if complete:
+                return df
+        else:
+            note_cache(False)
+            df = self._normalize_bars(self.backend.get_market(stock_code, start_date, end_date, 1))
+
         # 缓存结果
         self._stock_cache[cache_key] = df
-        
+
         return df
-    
-    async def get_concept_list(self, source: str = 'ths') -> pd.DataFrame:
-        """获取概念板块列表"""
-        # 检查缓存
-        cache_key = f"concepts_{source}"
-        if cache_key in self._concept_cache:
-            return self._concept_cache[cache_key]
-        
-        # 模拟异步加载
-        await asyncio.sleep(0.5)
-        
-        # 模拟概念板块数据
-        concept_names = [
-            '人工智能', '新能源汽车', '半导体', '光伏', '锂电池', 
-            '5G通信', '生物医药', '芯片概念', '航天军工', '云计算',
-            '区块链', '大数据', '元宇宙', '氢能源', '绿色电力',
-            '机器人', '储能', '物联网', '国产软件', '智能驾驶'
-        ]
-        
-        data = []
-        for i, name in enumerate(concept_names):
-            # 生成概念代码
-            code = f"{source.upper()}_CONCEPT_{i:03d}"
-            
-            # 生成随机涨跌幅
-            change = round(random.uniform(-8, 8), 2)
-            
-            # 生成包含股票数
-            stock_count = random.randint(10, 100)
-            
-            # 生成平均价格
-            avg_price = round(random.uniform(15, 80), 2)
-            
-            data.append({
-                'concept_code': code,
-                'concept_name': name,
-                'change': change,
-                'stock_count': stock_count,
-                'avg_price': avg_price
-            })
-        
-        # 创建DataFrame
-        df = pd.DataFrame(data)
-        
-        # 缓存结果
-        self._concept_cache[cache_key] = df
-        
+
+    def _read_history(self, history: HistoryStore, stock_code: str, start_date: str, end_date: str):
+        """从历史行情库读取K线，库最新日期之后的部分向后端补齐
+
+        Returns:
+            tuple: (K线, 是否无需请求后端)
+        """
+        bars = history.get_bars(stock_code, start_date, end_date)
+        last = pd.Timestamp(history.end_date)
+        tail_start = max(last + pd.Timedelta(days=1), pd.Timestamp(start_date))
+        tail_end = pd.Timestamp(latest_bar_date())
+        if end_date:
+            tail_end = min(tail_end, pd.Timestamp(end_date))
+        # 库最新日期之后到区间结束没有交易日（周末、节假日或尚未开盘）时无需请求后端
+        if not get_trading_calendar().count(tail_start, tail_end):
+            return bars, True
+        tail = self._normalize_bars(
+            self.backend.get_market(stock_code, tail_start.strftime('%Y-%m-%d'), end_date, 1)
+        )
+        if tail.empty:
+            # 仍是内存映射切片，缓存它只为避免重复向后端请求
+            return bars, False
+        return pd.concat([bars, tail], ignore_index=True), False
+
+    @staticmethod
+    def _normalize_bars(df: pd.DataFrame) -> pd.DataFrame:
+        """将后端返回的K线统一为 date/open/close/high/low/volume/amount 列，并转换为紧凑类型
+
+        缓存中的日期为datetime64、价格为float32，显示用的字符串格式由
+        DataTransformer.to_display_frame 在UI层生成
+        """
+        if df is None or df.empty:
+            return compact_bars(None)
+        df = df.rename(columns={'trade_date': 'date'})
+        return compact_bars(df[BAR_COLUMNS])
+
+    @timed_loader
+    async def get_concept_list(self, source: str = 'ths', concept_name: Optional[str] = None) -> pd.DataFrame:
+        """
+        获取概念板块列表
+
+        Args:
+            source: 数据源，如'ths'（同花顺）或'east'（东方财富），'merged'为两者按对照索引合并的视图
+            concept_name: 概念名称或代码过滤（可选）
+
+        Returns:
+            pd.DataFrame: 包含概念板块数据的DataFrame
+        """
+        if source == MERGED_SOURCE:
+            df = await self.get_concept_index_view()
+        else:
+            # 检查缓存
+            cache_key = f"concepts_{source}"
+            note_cache(cache_key in self._concept_cache)
+            if cache_key not in self._concept_cache:
+                df = await self._fetch('all_concept_code', source)
+                self._concept_cache[cache_key] = compact_codes(df.rename(columns={'name': 'concept_name'}))
+                concept_index.set_concepts(source, self._concept_cache[cache_key])
+
+            df = self._concept_cache[cache_key]
+
+        # 如果提供了概念名称，进行过滤
+        if concept_name:
+            mask = (df['concept_name'].str.contains(concept_name, case=False, regex=False)
+                    | df['concept_code'].astype(str).str.contains(concept_name, regex=False))
+            df = df[mask]
+
         return df
-    
-    async def get_concept_stocks(self, concept_code):
-        """获取概念板块成分股
-        
+
+    @timed_loader
+    async def get_concept_stocks(self, concept_code, source: str = 'ths'):
+        """获取概念板块成分股及其最新行情
+
         Args:
             concept_code: 概念板块代码
-            
+            source: 数据源
+
         Returns:
             pandas DataFrame: 成分股列表
         """
         try:
-            # 模拟异步加载
-            await asyncio.sleep(0.5)
-            
-            # 模拟成分股数据
-            stocks = []
-            stock_count = random.randint(10, 30)
-            
-            for i in range(stock_count):
-                code = f"{random.choice(['600', '601', '000', '002'])}{random.randint(100, 999)}"
-                stocks.append({
-                    'code': code,
-                    'name': f"个股{i + 1}",
-                    'price': round(random.uniform(5, 100), 2),
-                    'change_rate': round(random.uniform(-10, 10), 2),
-                    'volume_ratio': round(random.uniform(0.1, 3), 2)
-                })
-            
-            return pd.DataFrame(stocks)
+            members = await self._concept_members(concept_code, source)
+            if members.empty:
+                return pd.DataFrame()
+
+            quotes = await self.get_quotes(members['stock_code'].tolist())
+            df = members.merge(quotes.drop(columns=['short_name'], errors='ignore'), on='stock_code', how='left')
+
+            return pd.DataFrame({
+                'code': df['stock_code'],
+                'name': df['short_name'],
+                'current_price': df['price'],
+                'change': df['change_pct'],
+                'volume': df['volume'] / 1000000,
+                'amount': df['amount']
+            })
         except Exception as e:
             print(f"获取概念板块成分股失败: {str(e)}")
             return pd.DataFrame()
-    
+
+    @timed_loader
+    async def get_concept_memberships(self, source: str = 'ths') -> pd.DataFrame:
+        """获取全部概念的成分股关系
+
+        各概念的成分股请求在数据加载线程池中并发执行
+
+        Args:
+            source: 数据源
+
+        Returns:
+            pd.DataFrame: concept_code, concept_name, stock_code 三列的长表
+        """
+        cache_key = f"memberships_{source}"
+        tables = current_materialized()
+        if cache_key not in self._concept_cache and tables is not None and cache_key in tables:
+            # 非交易时段直接使用收盘后物化的成员关系
+            self._concept_cache[cache_key] = compact_codes(tables.table(cache_key))
+        note_cache(cache_key in self._concept_cache)
+        if cache_key not in self._concept_cache:
+            concepts = await self.get_concept_list(source)
+
+            async def members(concept_code, concept_name):
+                try:
+                    df = await self._fetch('concept_constituent', concept_code, source)
+                    return pd.DataFrame({'concept_code': concept_code, 'concept_name': concept_name,
+                                         'stock_code': df['stock_code'].astype(str)})
+                except Exception as e:
+                    print(f"获取概念 {concept_code} 成分股失败: {str(e)}")
+                    return None
+
+            frames = await asyncio.gather(*[
+                members(str(code), str(name))
+                for code, name in zip(concepts['concept_code'], concepts['concept_name'])
+            ])
+            frames = [df for df in frames if df is not None]
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+                columns=['concept_code', 'concept_name', 'stock_code'])
+            self._concept_cache[cache_key] = compact_codes(df)
+        # 同一份成员关系再次写入时直接跳过，重新获取后只重算成分股变化的概念
+        concept_index.set_memberships(source, self._concept_cache[cache_key])
+        return self._concept_cache[cache_key]
+
+    async def get_concept_index_view(self) -> pd.DataFrame:
+        """同花顺与东方财富概念的合并视图（两个数据源的成员关系都会加载）
+
+        Returns:
+            pd.DataFrame: concept_code, concept_name, ths_code, east_code, overlap, stock_count，
+            见 adata_ui.utils.concept_index.ConceptIndex.merged
+        """
+        await asyncio.gather(self.get_concept_memberships('ths'), self.get_concept_memberships('east'))
+        return await self._run(concept_index.merged)
+
+    async def _concept_members(self, concept_code: str, source: str = 'ths') -> pd.DataFrame:
+        """概念成分股（stock_code, short_name）
+
+        优先使用对照索引中已加载的成员关系（本数据源，或成分股可代替的另一数据源的对应概念），
+        都没有时向后端请求；合并视图为两侧对应概念成分股的并集
+
+        Args:
+            concept_code: 概念代码
+            source: 数据源
+
+        Returns:
+            pd.DataFrame: stock_code, short_name
+        """
+        if source == MERGED_SOURCE and not (concept_index.has_members('ths') and concept_index.has_members('east')):
+            await self.get_concept_index_view()
+        codes = concept_index.members(source, concept_code)
+        note_cache(codes is not None)
+        if codes is None:
+            if source == MERGED_SOURCE:
+                return pd.DataFrame(columns=['stock_code', 'short_name'])
+            return await self._run(self.get_concept_constituents, concept_code, source)
+        quotes = await self.get_quotes(codes)
+        names = dict(zip(quotes['stock_code'], quotes['short_name'])) if not quotes.empty else {}
+        return pd.DataFrame({'stock_code': codes, 'short_name': [names.get(code, code) for code in codes]})
+
+    @timed_loader
+    async def get_concept_aggregates(self, source: str = 'ths') -> Optional[pd.DataFrame]:
+        """获取收盘后物化的概念聚合行情（成分股数量、平均涨跌幅、上涨/下跌家数、成交量和成交额合计）
+
+        盘中逐个概念聚合需要全部成分股关系，只在非交易时段读取预先算好的结果。
+        本数据源没有物化时，用另一数据源物化结果中成分股可代替的对应概念（见 ConceptIndex.counterpart）
+
+        Args:
+            source: 数据源
+
+        Returns:
+            pd.DataFrame: concept_code, concept_name, stock_count, change, up, down, volume, amount；
+            交易时段或尚未物化时为None
+        """
+        tables = current_materialized()
+        name = f"concepts_{source}"
+        if tables is not None and name not in tables and source in SOURCES:
+            other = other_source(source)
+            note_cache(f"concepts_{other}" in tables)
+            if f"concepts_{other}" not in tables:
+                return None
+            matches = concept_index.matches()
+            matches = matches[matches['overlap'] >= SHARE_OVERLAP]
+            codes = dict(zip(matches[f'{other}_code'], matches[f'{source}_code']))
+            df = tables.table(f"concepts_{other}").astype({'concept_code': str})
+            df = df[df['concept_code'].isin(codes)]
+            return df.assign(concept_code=df['concept_code'].map(codes)).reset_index(drop=True)
+        note_cache(tables is not None and name in tables)
+        if tables is None or name not in tables:
+            return None
+        return tables.table(name)
+
+    @timed_loader
+    async def get_concept_co_movement(self, concept_code: str, source: str = 'ths', window: int = 60) -> Dict:
+        """概念成分股的联动分析：日收益率相关系数矩阵、聚类和相对概念等权组合的beta
+
+        成分股K线通过get_close_matrix并发获取并对齐，矩阵计算在计算进程池中执行，
+        结果按 (概念, 数据源, 窗口, 数据版本) 缓存，成分股可互相代替的ths/east概念共用一份（见 ConceptIndex.canonical）
+
+        Args:
+            concept_code: 概念代码
+            source: 数据源
+            window: 收益率窗口（交易日）
+
+        Returns:
+            Dict: codes, names, corr, labels, beta, days，见 adata_ui.utils.analytics.co_movement
+        """
+        canonical = concept_index.canonical(source, concept_code) if source != MERGED_SOURCE else (source, concept_code)
+        cache_key = (*canonical, window, self.data_version)
+        result = self._analytics_cache.get(cache_key)
+        note_cache(result is not None)
+        if result is None:
+            members = await self._concept_members(concept_code, source)
+            codes = members['stock_code'].astype(str).tolist()
+            names = dict(zip(codes, members['short_name'].astype(str)))
+            # 按交易日历取恰好覆盖window个收益率（window+1个交易日）的区间
+            end = pd.Timestamp(latest_bar_date())
+            start = pd.Timestamp(get_trading_calendar().offset(end, -window))
+            _, codes, close = await self.get_close_matrix(codes, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+            result = await compute_pool.run(co_movement_matrix, codes, close, window)
+            result['names'] = [names.get(code, code) for code in result['codes']]
+            self._analytics_cache[cache_key] = result
+        return result
+
+    @timed_loader
+    async def get_close_matrix(self, codes, start_date: str, end_date: str) -> Tuple[np.ndarray, List[str], np.ndarray]:
+        """获取一组股票按交易日对齐的收盘价矩阵，供回测使用
+
+        各股票K线通过get_stock_data并发获取（命中其缓存），结果按 (股票, 区间, 数据版本) 缓存
+
+        Args:
+            codes: 股票代码列表
+            start_date: 开始日期
+            end_date: 结束日期
+
+        Returns:
+            tuple: (交易日, 股票代码, 收盘价矩阵[交易日 x 股票])，见 adata_ui.utils.analytics.aligned_prices
+        """
+        codes = [str(code) for code in codes]
+        cache_key = ('close', tuple(codes), start_date, end_date, self.data_version)
+        result = self._analytics_cache.get(cache_key)
+        note_cache(result is not None)
+        if result is None:
+            async def bars(code):
+                try:
+                    return await self._run(self.get_stock_data, code, start_date, end_date)
+                except Exception as e:
+                    print(f"获取 {code} 行情失败: {str(e)}")
+                    return None
+
+            frames = await asyncio.gather(*[bars(code) for code in codes])
+            result = self._analytics_cache[cache_key] = await self._run(aligned_prices, dict(zip(codes, frames)))
+        return result
+
+    @timed_loader
     def get_concept_constituents(self, concept_code: str, source: str = 'ths') -> pd.DataFrame:
-        """获取概念板块包含的股票列表"""
-        # 模拟API调用延迟
-        time.sleep(0.5)
-        
-        # 模拟股票数据
-        stock_prefixes = ['600', '601', '603', '000', '002', '300']
-        industries = ['科技', '金融', '医药', '制造', '消费', '能源']
-        
-        data = []
-        # 生成5-15只股票
-        count = random.randint(5, 15)
-        
-        for i in range(count):
-            # 生成股票代码
-            prefix = random.choice(stock_prefixes)
-            code = f"{prefix}{random.randint(100, 999)}"
-            
-            # 生成股票名称
-            industry = random.choice(industries)
-            name = f"{industry}{random.randint(100, 999)}"
-            
-            data.append({
-                'stock_code': code,
-                'stock_name': name
-            })
-        
-        # 创建DataFrame
-        df = pd.DataFrame(data)
-        
-        return df
-    
+        """
+        获取概念板块包含的股票列表
+
+        Args:
+            concept_code: 概念代码
+            source: 数据源
+
+        Returns:
+            pd.DataFrame: 包含概念成分股数据的DataFrame（stock_code, short_name）
+        """
+        return self.backend.concept_constituent(concept_code, source)
+
+    @timed_loader
     def get_stock_basic_info(self, stock_code: str) -> Dict:
-        """获取股票基本信息"""
-        # 模拟股票基本信息
-        industries = ['科技', '金融', '医药', '制造', '消费', '能源']
-        markets = ['上证', '深证', '创业板', '科创板']
-        
-        info = {
-            'stock_code': stock_code,
-            'stock_name': f"{random.choice(industries)}{random.randint(100, 999)}",
-            'industry': random.choice(industries),
-            'market': random.choice(markets),
-            'list_date': f"20{random.randint(00, 22)}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
-            'total_share': round(random.uniform(1, 100), 2),
-            'float_share': round(random.uniform(0.5, 90), 2),
-            'pe': round(random.uniform(10, 100), 2),
-            'pb': round(random.uniform(1, 10), 2),
-            'eps': round(random.uniform(0.1, 5), 2)
-        }
-        
-        return info
-    
+        """
+        获取股票基本信息（名称、行业、上市日期、股本、财务指标和估值）
+        从全市场基本面快照中按代码查找，快照过期时仍读取旧快照（由后台任务重建），不请求上游
+
+        Args:
+            stock_code: 股票代码
+
+        Returns:
+            Dict: 包含股票基本信息的字典，代码不存在时为空字典
+        """
+        snapshot = latest_fundamentals_snapshot()
+        note_cache(snapshot is not None)
+        if snapshot is None:
+            # 全市场快照尚未构建（由后台任务构建），只拉取这一只股票
+            snapshot = build_fundamentals_snapshot(self.backend, codes=[stock_code])
+        return snapshot.record(stock_code) or {}
+
+    @timed_loader
     def get_index_data(self, index_code: str, start_date: str, end_date: str) -> pd.DataFrame:
-        """获取指数数据"""
-        # 模拟指数数据
-        # 计算日期范围
-        start = pd.to_datetime(start_date)
-        end = pd.to_datetime(end_date)
-        date_range = pd.date_range(start=start, end=end)
-        
-        # 生成基础点数
-        base_point = random.uniform(2000, 5000)
-        
-        # 生成模拟数据
-        data = []
-        for date in date_range:
-            # 跳过非交易日（周末）
-            if date.weekday() >= 5:
-                continue
-                
-            # 生成当天点数变化
-            change = random.uniform(-50, 50)
-            base_point = max(1000, base_point + change)
-            
-            # 生成开盘点、最高点、最低点、收盘点
-            open_point = round(base_point * random.uniform(0.995, 1.005), 2)
-            close_point = round(open_point * random.uniform(0.99, 1.01), 2)
-            high_point = round(max(open_point, close_point) * random.uniform(1.001, 1.003), 2)
-            low_point = round(min(open_point, close_point) * random.uniform(0.997, 0.999), 2)
-            
-            # 生成成交量
-            volume = round(random.uniform(5000000, 50000000), 0)
-            
-            # 生成成交额
-            amount = round(random.uniform(5000000000, 50000000000), 2)
-            
-            data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'open': open_point,
-                'close': close_point,
-                'high': high_point,
-                'low': low_point,
-                'volume': volume,
-                'amount': amount
+        """
+        获取指数数据
+
+        每个指数缓存一份从最早请求日期到最新交易日的K线。缓存超过ADATA_UI_INDEX_TTL秒、
+        且按交易日历可能有新K线时（见_index_stale），只向后端请求缓存最后一个交易日及之后的K线
+        （最后一日盘中仍在变化），拼接到缓存上；请求更早的日期时重新获取整段
+
+        Args:
+            index_code: 指数代码
+            start_date: 开始日期
+            end_date: 结束日期
+
+        Returns:
+            pd.DataFrame: 包含指数数据的DataFrame
+        """
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        cached = self._index_cache.get(index_code)
+        if cached is None or start < cached['start']:
+            note_cache(False)
+            bars = self._normalize_bars(self.backend.get_market_index(index_code, start_date, 1))
+            cached = self._index_cache[index_code] = {'start': start, 'bars': bars, 'fetched': time.monotonic(),
+                                                      'settled': not in_session()}
+        elif time.monotonic() - cached['fetched'] > INDEX_TTL and self._index_stale(cached, end):
+            note_cache(False)
+            bars = cached['bars']
+            last = bars['date'].iloc[-1] if len(bars) else cached['start']
+            tail = self._normalize_bars(self.backend.get_market_index(index_code, last.strftime('%Y-%m-%d'), 1))
+            # 后端出错时返回空表：保留缓存（包括最后一根K线），也不更新获取时间，下次请求时重试
+            if not tail.empty:
+                cached['bars'] = pd.concat([bars[bars['date'] < last], tail], ignore_index=True)
+                cached['fetched'] = time.monotonic()
+                cached['settled'] = not in_session()
+        else:
+            note_cache(True)
+        bars = cached['bars']
+        dates = bars['date']
+        return bars[(dates >= start) & (dates <= end)].reset_index(drop=True)
+
+    @staticmethod
+    def _index_stale(cached: Dict, end: pd.Timestamp) -> bool:
+        """指数K线缓存之后是否可能有新数据
+
+        按交易日历：区间内最近一个交易日还没有K线，或最后一根K线是在盘中取得的（收盘后还会变化）。
+        周末、节假日没有K线，不算缺口
+        """
+        bars = cached['bars']
+        if bars.empty:
+            return True
+        latest = get_trading_calendar().rollback(min(end, pd.Timestamp(latest_bar_date())))
+        last = bars['date'].iloc[-1].to_datetime64().astype('datetime64[D]')
+        return last < latest or not cached['settled']
+
+    @timed_loader
+    async def get_index_overview(self, index_codes: List[str], days: int = 120, points: int = 60) -> List[Dict]:
+        """获取多个指数的概览：最新点位、涨跌幅和降采样后的走势
+
+        各指数的K线在数据加载线程池中并发获取（经get_index_data缓存），
+        总耗时约为一次后端请求，而不是逐个请求之和
+
+        Args:
+            index_codes: 指数代码列表
+            days: 走势的自然日数
+            points: 走势降采样后的分桶数（每桶保留最高和最低点）
+
+        Returns:
+            list: 每个指数一个字典：code, close, change_pct, bars（date/close列，无数据时为空）
+        """
+        end = pd.Timestamp.now()
+        start = (end - pd.Timedelta(days=days - 1)).strftime('%Y-%m-%d')
+        frames = await asyncio.gather(*[
+            self._run(self.get_index_data, code, start, end.strftime('%Y-%m-%d')) for code in index_codes
+        ], return_exceptions=True)
+
+        overview = []
+        for code, df in zip(index_codes, frames):
+            if isinstance(df, Exception):
+                print(f"获取指数 {code} 数据失败: {str(df)}")
+                df = compact_bars(None)
+            close = df['close'].to_numpy(dtype='float64')
+            overview.append({
+                'code': code,
+                'close': float(close[-1]) if len(close) else None,
+                'change_pct': float((close[-1] / close[-2] - 1) * 100) if len(close) > 1 else None,
+                'bars': downsample_minmax(df[['date', 'close']], 'close', points),
             })
-        
-        # 创建DataFrame
-        df = pd.DataFrame(data)
-        
-        return df
-    
+        return overview
+
+    @timed_loader
+    async def get_market_snapshot(self, max_age: Optional[float] = None) -> MarketSnapshot:
+        """获取全市场列式快照（最新行情 + 历史行情库最近的收盘价/成交量矩阵），供选股使用
+
+        快照在进程内共享，有效期内的调用直接返回同一份；非交易时段返回收盘后物化的快照
+
+        Args:
+            max_age: 快照有效期（秒），默认ADATA_UI_SCREENER_TTL
+
+        Returns:
+            MarketSnapshot: 全市场快照
+        """
+        tables = current_materialized()
+        if tables is not None:
+            # 非交易时段直接使用收盘后物化的快照（含预先计算的指标列）
+            note_cache(True)
+            return tables.market_snapshot()
+        history = self.history
+        snapshot = cached_market_snapshot(history, max_age)
+        note_cache(snapshot is not None)
+        if snapshot is None:
+            snapshot = await self._run(get_market_snapshot, self.backend, history, max_age)
+        return snapshot
+
+    @timed_loader
+    async def get_fundamentals(self, max_age: Optional[float] = None) -> FundamentalsSnapshot:
+        """获取全市场基本面快照（代码表 + 最新一期财务指标 + 估值），由后台任务定期批量重建
+
+        不指定max_age时直接使用最近一次的快照（即使已过期），尚未构建过时构建；
+        页面查询不调用该方法，快照尚未构建时只拉取所查询的股票（见 get_stock_infos）
+
+        Args:
+            max_age: 快照有效期（秒），给出时快照超过该时间即重建（后台任务使用）
+
+        Returns:
+            FundamentalsSnapshot: 全市场基本面快照
+        """
+        snapshot = latest_fundamentals_snapshot() if max_age is None else cached_fundamentals_snapshot(max_age)
+        note_cache(snapshot is not None)
+        if snapshot is None:
+            snapshot = await self._run(get_fundamentals_snapshot, self.backend, max_age)
+        return snapshot
+
     def clear_cache(self):
         """清除缓存"""
         self._stock_cache.clear()
+        self._adjusted_cache.clear()
         self._concept_cache.clear()
+        self._index_cache.clear()
+        self._analytics_cache.clear()
+        self._generation += 1
 
 
 class DataTransformer:
     """数据转换工具类"""
-    
+
     @staticmethod
     def df_to_dict_list(df):
         """将DataFrame转换为字典列表
-        
+
         Args:
             df: pandas DataFrame
-            
+
         Returns:
             list: 字典列表
         """
         if df.empty:
             return []
         return df.to_dict('records')
-    
+
+    @staticmethod
+    def to_display_frame(df, date_format='%Y-%m-%d', decimals=4):
+        """将缓存中的紧凑类型转换为显示用的类型
+
+        日期转为字符串，category转为字符串，float32转为float64并四舍五入
+        （避免10.12显示为10.119999885559082），只在UI层调用。
+
+        Args:
+            df: pandas DataFrame
+            date_format: 日期格式
+            decimals: 浮点数保留的小数位数
+
+        Returns:
+            pandas DataFrame: 新的DataFrame
+        """
+        if df.empty:
+            return df
+        columns = {}
+        for column in df.columns:
+            series = df[column]
+            if pd.api.types.is_datetime64_any_dtype(series):
+                columns[column] = series.dt.strftime(date_format)
+            elif isinstance(series.dtype, pd.CategoricalDtype):
+                columns[column] = series.astype(str)
+            elif series.dtype == 'float32':
+                columns[column] = series.astype('float64').round(decimals)
+            else:
+                columns[column] = series
+        return pd.DataFrame(columns, index=df.index)
+
+    @staticmethod
+    def format_stock_price(price):
+        """格式化股票价格"""
+        return round(float(price), 2)
+
+    @staticmethod
+    def format_change_pct(change):
+        """格式化涨跌幅"""
+        return f"{float(change):+.2f}%"
+
     @staticmethod
     def format_number(value, decimals=2):
         """格式化数字
-        
+
         Args:
             value: 数字值
             decimals: 小数位数
-            
+
         Returns:
             str: 格式化后的字符串
         """
         if pd.isna(value):
             return '-'
         return f"{value:.{decimals}f}"
-    
+
     @staticmethod
     def format_volume(volume):
         """格式化成交量
-        
+
         Args:
             volume: 成交量
-            
+
         Returns:
             str: 格式化后的字符串
         """
@@ -477,293 +939,58 @@ class DataTransformer:
             return f"{volume/10000:.2f}万"
         return str(volume)
 
+    @staticmethod
+    def format_volume_column(values):
+        """整列格式化成交量（万/亿），见 format_volume；缺失为'-'
 
-# 创建全局数据加载器实例
-data_loader = DataLoader()
-
-
-class DataLoader:
-    """
-    数据加载器类，负责从各种来源加载数据
-    实际使用时，这里应该替换为真实的数据API调用
-    """
-    
-    def __init__(self):
-        """初始化数据加载器"""
-        # 初始化数据源配置
-        self.sources = {
-            'ths': '同花顺',
-            'eastmoney': '东方财富',
-        }
-        # 模拟数据缓存
-        self._stock_cache: Dict[str, pd.DataFrame] = {}
-        self._concept_cache: Dict[str, pd.DataFrame] = {}
-    
-    def get_stock_data(self, stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
-        """
-        获取指定股票在指定日期范围内的数据
-        实际使用时，这里应该调用真实的股票数据API
-        
         Args:
-            stock_code: 股票代码
-            start_date: 开始日期，格式为'YYYY-MM-DD'
-            end_date: 结束日期，格式为'YYYY-MM-DD'
-            
-        Returns:
-            pd.DataFrame: 包含股票数据的DataFrame
-        """
-        # 检查缓存
-        cache_key = f"{stock_code}_{start_date}_{end_date}"
-        if cache_key in self._stock_cache:
-            return self._stock_cache[cache_key]
-        
-        # 模拟API调用延迟
-        time.sleep(0.5)
-        
-        # 生成模拟数据
-        # 计算日期范围
-        start = pd.to_datetime(start_date)
-        end = pd.to_datetime(end_date)
-        date_range = pd.date_range(start=start, end=end)
-        
-        # 生成基础价格
-        base_price = random.uniform(10, 100)
-        
-        # 生成模拟数据
-        data = []
-        for date in date_range:
-            # 跳过非交易日（周末）
-            if date.weekday() >= 5:
-                continue
-                
-            # 生成当天价格
-            change = random.uniform(-2, 2)
-            base_price = max(1, base_price + change)
-            
-            # 生成开盘价、最高价、最低价、收盘价
-            open_price = round(base_price * random.uniform(0.98, 1.02), 2)
-            close_price = round(open_price * random.uniform(0.95, 1.05), 2)
-            high_price = round(max(open_price, close_price) * random.uniform(1.01, 1.03), 2)
-            low_price = round(min(open_price, close_price) * random.uniform(0.97, 0.99), 2)
-            
-            # 生成成交量
-            volume = round(random.uniform(10000, 10000000), 0)
-            
-            # 生成成交额
-            amount = round(volume * close_price, 2)
-            
-            data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'open': open_price,
-                'close': close_price,
-                'high': high_price,
-                'low': low_price,
-                'volume': volume,
-                'amount': amount
-            })
-        
-        # 创建DataFrame
-        df = pd.DataFrame(data)
-        
-        # 缓存结果
-        self._stock_cache[cache_key] = df
-        
-        return df
-    
-    def get_concept_list(self, source: str = 'ths') -> pd.DataFrame:
-        """
-        获取概念板块列表
-        实际使用时，这里应该调用真实的概念板块API
-        
-        Args:
-            source: 数据源，如'ths'（同花顺）或'eastmoney'（东方财富）
-            
+            values: 数值序列
+
         Returns:
-            pd.DataFrame: 包含概念板块数据的DataFrame
+            np.ndarray: 字符串数组
         """
-        # 检查缓存
-        cache_key = f"concepts_{source}"
-        if cache_key in self._concept_cache:
-            return self._concept_cache[cache_key]
-        
-        # 模拟API调用延迟
-        time.sleep(0.3)
-        
-        # 模拟概念板块数据
-        concept_names = [
-            '人工智能', '新能源汽车', '半导体', '光伏', '锂电池', 
-            '5G通信', '生物医药', '芯片概念', '航天军工', '云计算',
-            '区块链', '大数据', '元宇宙', '氢能源', '绿色电力',
-            '机器人', '储能', '物联网', '国产软件', '智能驾驶'
-        ]
-        
-        data = []
-        for i, name in enumerate(concept_names):
-            # 生成概念代码
-            code = f"{source.upper()}_CONCEPT_{i:03d}"
-            
-            # 生成随机涨跌幅
-            change = round(random.uniform(-8, 8), 2)
-            
-            # 生成包含股票数
-            stock_count = random.randint(10, 100)
-            
-            # 生成平均价格
-            avg_price = round(random.uniform(15, 80), 2)
-            
-            data.append({
-                'concept_code': code,
-                'concept_name': name,
-                'change': change,
-                'stock_count': stock_count,
-                'avg_price': avg_price
-            })
-        
-        # 创建DataFrame
-        df = pd.DataFrame(data)
-        
-        # 缓存结果
-        self._concept_cache[cache_key] = df
-        
-        return df
-    
-    def get_concept_constituents(self, concept_code: str, source: str = 'ths') -> pd.DataFrame:
-        """
-        获取概念板块包含的股票列表
-        实际使用时，这里应该调用真实的概念成分股API
-        
+        return formatting.format_volume_column(values)
+
+    @staticmethod
+    def format_number_column(values, decimals=2, thousands=False):
+        """整列格式化数字，可加千分位；缺失为'-'
+
         Args:
-            concept_code: 概念代码
-            source: 数据源
-            
+            values: 数值序列
+            decimals: 小数位数
+            thousands: 是否加千分位逗号
+
         Returns:
-            pd.DataFrame: 包含概念成分股数据的DataFrame
-        """
-        # 模拟API调用延迟
-        time.sleep(0.5)
-        
-        # 模拟股票数据
-        stock_prefixes = ['600', '601', '603', '000', '002', '300']
-        industries = ['科技', '金融', '医药', '制造', '消费', '能源']
-        
-        data = []
-        # 生成5-15只股票
-        count = random.randint(5, 15)
-        
-        for i in range(count):
-            # 生成股票代码
-            prefix = random.choice(stock_prefixes)
-            code = f"{prefix}{random.randint(100, 999)}"
-            
-            # 生成股票名称
-            industry = random.choice(industries)
-            name = f"{industry}{random.randint(100, 999)}"
-            
-            data.append({
-                'stock_code': code,
-                'stock_name': name
-            })
-        
-        # 创建DataFrame
-        df = pd.DataFrame(data)
-        
-        return df
-    
-    def get_stock_basic_info(self, stock_code: str) -> Dict:
+            np.ndarray: 字符串数组
         """
-        获取股票基本信息
-        实际使用时，这里应该调用真实的股票信息API
-        
+        return formatting.format_number_column(values, decimals, thousands)
+
+    @staticmethod
+    def format_change_pct_column(values):
+        """整列格式化涨跌幅（带符号的百分比）；缺失为'-'
+
         Args:
-            stock_code: 股票代码
-            
+            values: 数值序列
+
         Returns:
-            Dict: 包含股票基本信息的字典
-        """
-        # 模拟股票基本信息
-        industries = ['科技', '金融', '医药', '制造', '消费', '能源']
-        markets = ['上证', '深证', '创业板', '科创板']
-        
-        info = {
-            'stock_code': stock_code,
-            'stock_name': f"{random.choice(industries)}{random.randint(100, 999)}",
-            'industry': random.choice(industries),
-            'market': random.choice(markets),
-            'list_date': f"20{random.randint(00, 22)}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
-            'total_share': round(random.uniform(1, 100), 2),
-            'float_share': round(random.uniform(0.5, 90), 2),
-            'pe': round(random.uniform(10, 100), 2),
-            'pb': round(random.uniform(1, 10), 2),
-            'eps': round(random.uniform(0.1, 5), 2)
-        }
-        
-        return info
-    
-    def get_index_data(self, index_code: str, start_date: str, end_date: str) -> pd.DataFrame:
+            np.ndarray: 字符串数组
         """
-        获取指数数据
-        实际使用时，这里应该调用真实的指数数据API
-        
+        return formatting.format_change_pct_column(values)
+
+    @staticmethod
+    def format_columns(df, formats, version=None):
+        """按具名格式（'volume'、'percent'、'fixed2'、'thousands'）整列格式化，结果按数据版本缓存
+
         Args:
-            index_code: 指数代码
-            start_date: 开始日期
-            end_date: 结束日期
-            
+            df: pandas DataFrame
+            formats: 列名 -> 具名格式
+            version: 数据版本，给出时同一版本直接复用格式化结果
+
         Returns:
-            pd.DataFrame: 包含指数数据的DataFrame
+            dict: 列名 -> 字符串数组
         """
-        # 模拟指数数据
-        # 计算日期范围
-        start = pd.to_datetime(start_date)
-        end = pd.to_datetime(end_date)
-        date_range = pd.date_range(start=start, end=end)
-        
-        # 生成基础点数
-        base_point = random.uniform(2000, 5000)
-        
-        # 生成模拟数据
-        data = []
-        for date in date_range:
-            # 跳过非交易日（周末）
-            if date.weekday() >= 5:
-                continue
-                
-            # 生成当天点数变化
-            change = random.uniform(-50, 50)
-            base_point = max(1000, base_point + change)
-            
-            # 生成开盘点、最高点、最低点、收盘点
-            open_point = round(base_point * random.uniform(0.995, 1.005), 2)
-            close_point = round(open_point * random.uniform(0.99, 1.01), 2)
-            high_point = round(max(open_point, close_point) * random.uniform(1.001, 1.003), 2)
-            low_point = round(min(open_point, close_point) * random.uniform(0.997, 0.999), 2)
-            
-            # 生成成交量
-            volume = round(random.uniform(5000000, 50000000), 0)
-            
-            # 生成成交额
-            amount = round(random.uniform(5000000000, 50000000000), 2)
-            
-            data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'open': open_point,
-                'close': close_point,
-                'high': high_point,
-                'low': low_point,
-                'volume': volume,
-                'amount': amount
-            })
-        
-        # 创建DataFrame
-        df = pd.DataFrame(data)
-        
-        return df
-    
-    def clear_cache(self):
-        """清除缓存"""
-        self._stock_cache.clear()
-        self._concept_cache.clear()
+        return formatting.format_columns(df, formats, version)
 
 
 # 创建全局数据加载器实例
-data_loader = DataLoader()
\ No newline at end of file
+data_loader = DataLoader()
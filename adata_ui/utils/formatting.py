@@ -0,0 +1,172 @@
+# 显示格式化模块
+# 表格的成交量（万/亿）、带符号的涨跌幅、千分位和定点小数按整列向量化格式化：
+# 数值先放大取整，整数部分、小数部分、千分位分组和单位后缀都用 numpy.char 在整列上拼接，
+# 不再逐个单元格调用 f-string；取整与 f-string 一致（按十进制值四舍六入五成双），缺失值（NaN）显示为'-'。
+# 格式化结果按 (数据版本, 列, 格式) 缓存，数据版本不变时重绘直接复用
+import os
+import threading
+import functools
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+# 缓存的格式化列数
+FORMAT_CACHE_SIZE = int(os.environ.get('ADATA_UI_FORMAT_CACHE_SIZE', 256))
+MISSING = '-'
+
+# 千分位分组的最大宽度：int64最多19位，6个逗号分组共24个字符
+_GROUPS = 'U24'
+# 放大后的小数部分与0.5相差不超过该值时，改用Python格式化确定进位方向
+_TIE = 1e-6
+
+
+def _values(values) -> np.ndarray:
+    return pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _distinct(formatter: Callable[[np.ndarray], np.ndarray]) -> Callable[..., np.ndarray]:
+    """重复值多的列（价格、成交量在行情表中常有大量相同取值）只格式化去重后的取值，再按下标取回整列"""
+    @functools.wraps(formatter)
+    def wrapper(values, *args, **kwargs):
+        values = _values(values)
+        uniques, inverse = np.unique(values, return_inverse=True)
+        if len(uniques) * 2 <= len(values):
+            return formatter(uniques, *args, **kwargs)[inverse]
+        return formatter(values, *args, **kwargs)
+    return wrapper
+
+
+def _scaled(values: np.ndarray, decimals: int) -> np.ndarray:
+    """绝对值放大 10**decimals 倍后取整（int64），结果与 f'{abs(v):.{decimals}f}' 的数字一致
+
+    放大时的二进制误差只会影响小数部分接近0.5的值，这些值（通常很少）逐个用f-string取整
+    """
+    scaled = np.abs(values) * 10 ** decimals
+    result = np.rint(scaled)
+    ties = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) <= _TIE)
+    if len(ties):
+        result[ties] = [int(f'{abs(v):.{decimals}f}'.replace('.', '')) for v in values[ties]]
+    return result.astype('int64')
+
+
+def _fractions(fractions: np.ndarray, decimals: int, suffix: str = '') -> np.ndarray:
+    """小数点和补零后的小数部分（加后缀），位数较少时直接查表"""
+    if decimals <= 4:
+        return np.array([f'.{k:0{decimals}d}{suffix}' for k in range(10 ** decimals)])[fractions]
+    return np.char.add(np.char.add('.', np.char.zfill(fractions.astype(str), decimals)), suffix)
+
+
+def _group_thousands(integers: np.ndarray) -> np.ndarray:
+    """非负整数加千分位逗号"""
+    top = integers.copy()
+    low = np.full(len(integers), '', dtype=_GROUPS)
+    # 从低位起每次取3位，高位剩余部分不补零；每轮只处理仍不少于4位的行
+    while True:
+        rows = np.flatnonzero(top >= 1000)
+        if not len(rows):
+            break
+        group = np.char.zfill((top[rows] % 1000).astype(str), 3)
+        low[rows] = np.char.add(np.char.add(',', group), low[rows])
+        top[rows] //= 1000
+    return np.char.add(top.astype(str), low)
+
+
+def _fixed(values: np.ndarray, decimals: int, thousands: bool = False, sign: bool = False, suffix: str = '') -> np.ndarray:
+    """定点小数文本（numpy字符串数组），NaN也会得到文本，由调用方替换"""
+    scaled = _scaled(np.where(np.isfinite(values), values, 0), decimals)
+    integers, fractions = np.divmod(scaled, 10 ** decimals)
+    # 四舍五入后为0的负数不带负号（与 f'{-0.001:.2f}' 的 '-0.00' 不同，显示更自然）
+    negative = (values < 0) & (scaled > 0)
+    # 符号和整数部分的组合远少于行数，只对去重后的组合生成文本
+    keys, inverse = np.unique(integers * 2 + negative, return_inverse=True)
+    head = _group_thousands(keys // 2) if thousands else (keys // 2).astype(str)
+    head = np.char.add(np.where(keys % 2 == 1, '-', '+' if sign else ''), head)[inverse]
+    if decimals:
+        return np.char.add(head, _fractions(fractions, decimals, suffix))
+    return np.char.add(head, suffix) if suffix else head
+
+
+def _finish(text: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """缺失值替换为'-'，转为object数组（与DataFrame的字符串列一致）"""
+    text = text.astype(object)
+    text[~np.isfinite(values)] = MISSING
+    return text
+
+
+@_distinct
+def format_number_column(values, decimals: int = 2, thousands: bool = False) -> np.ndarray:
+    """数值列格式化为定点小数，可加千分位
+
+    Args:
+        values: 数值序列
+        decimals: 小数位数
+        thousands: 是否加千分位逗号
+
+    Returns:
+        np.ndarray: 字符串数组（object），缺失为'-'
+    """
+    return _finish(_fixed(values, decimals, thousands), values)
+
+
+@_distinct
+def format_change_pct_column(values, decimals: int = 2) -> np.ndarray:
+    """涨跌幅列格式化为带符号的百分比，如 '+1.23%'、'-0.50%'"""
+    return _finish(_fixed(values, decimals, sign=True, suffix='%'), values)
+
+
+@_distinct
+def format_volume_column(values) -> np.ndarray:
+    """成交量列格式化：1亿及以上为'x.xx亿'，1万及以上为'x.xx万'，其余为原数（整数不带小数）"""
+    yi = values >= 1e8
+    wan = (values >= 1e4) & ~yi
+    scaled = np.where(yi, values / 1e8, np.where(wan, values / 1e4, values))
+    plain = ~(yi | wan) & (scaled == np.rint(scaled))
+    text = _fixed(scaled, 2)
+    if plain.any():
+        text[plain] = _fixed(scaled[plain], 0)
+    text = np.char.add(text, np.where(yi, '亿', np.where(wan, '万', '')))
+    return _finish(text, values)
+
+
+# 具名格式（表格列定义中的 format: 'volume' 等）
+COLUMN_FORMATTERS: Dict[str, Callable[..., np.ndarray]] = {
+    'volume': format_volume_column,
+    'percent': format_change_pct_column,
+    'fixed2': format_number_column,
+    'thousands': functools.partial(format_number_column, decimals=0, thousands=True),
+}
+
+_cache: 'OrderedDict[tuple, np.ndarray]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def format_columns(df: pd.DataFrame, formats: Dict[str, str], version: Optional[Hashable] = None) -> Dict[str, np.ndarray]:
+    """按具名格式格式化DataFrame的若干列
+
+    Args:
+        df: 数据
+        formats: 列名 -> 具名格式（见 COLUMN_FORMATTERS），df中没有的列跳过
+        version: 数据版本（如 (代码, 区间, 数据版本)），给出时按 (version, 列, 格式) 缓存结果；
+            同一version必须对应同样的数据
+
+    Returns:
+        dict: 列名 -> 格式化后的字符串数组
+    """
+    result = {}
+    for column, name in formats.items():
+        if column not in df.columns:
+            continue
+        if name not in COLUMN_FORMATTERS:
+            raise ValueError(f'未知的显示格式: {name}')
+        key = (version, column, name)
+        text = _cache.get(key) if version is not None else None
+        if text is None or len(text) != len(df):
+            text = COLUMN_FORMATTERS[name](df[column])
+            if version is not None:
+                with _cache_lock:
+                    _cache[key] = text
+                    while len(_cache) > FORMAT_CACHE_SIZE:
+                        _cache.popitem(last=False)
+        result[column] = text
+    return result
@@ -0,0 +1,238 @@
+# 全市场基本面快照模块
+# 由一个批量任务定期拉取全市场的代码表、最新一期财务指标和最新行情（估值），
+# 按股票代码排序后每个字段存为一个numpy数组；单只查询、批量查询和选股都在快照上
+# 用 searchsorted 按代码定位行号，不再逐只请求上游
+import os
+import time
+import asyncio
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+# 快照有效期（秒），后台任务按此间隔重建；财务数据按季度更新，默认6小时
+FUNDAMENTALS_TTL = float(os.environ.get('ADATA_UI_FUNDAMENTALS_TTL', 6 * 3600))
+
+# 数值字段及显示名称（股本为股、金额为元、比率为%）
+FUNDAMENTAL_LABELS = {
+    'total_shares': '总股本',
+    'float_shares': '流通股本',
+    'revenue': '营业收入',
+    'net_profit': '净利润',
+    'gross_margin': '毛利率(%)',
+    'net_margin': '净利率(%)',
+    'roe': 'ROE(%)',
+    'debt_ratio': '资产负债率(%)',
+    'eps': '每股收益',
+    'bps': '每股净资产',
+    'pe_ttm': '市盈率(TTM)',
+    'pb': '市净率',
+}
+
+
+class FundamentalsSnapshot:
+    """全市场基本面列式快照
+
+    Args:
+        codes: 股票代码（升序）
+        columns: 字段名到数组的映射，与codes一一对应；数值字段为float64（缺失为NaN），文本字段为object
+        version: 快照版本号，每次重建递增
+    """
+
+    def __init__(self, codes: np.ndarray, columns: Dict[str, np.ndarray], version: int = 0):
+        self.codes = codes
+        self.version = version
+        self.created = time.time()
+        self._columns = dict(columns)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def field(self, name: str) -> np.ndarray:
+        """取整列数据"""
+        if name not in self._columns:
+            raise ValueError(f'未知的基本面字段: {name}')
+        return self._columns[name]
+
+    def rows(self, codes) -> np.ndarray:
+        """按股票代码查行号（二分查找），不在快照中的代码为-1"""
+        codes = np.asarray([str(code) for code in codes], dtype=object)
+        if not len(self.codes):
+            return np.full(len(codes), -1)
+        pos = np.clip(np.searchsorted(self.codes, codes), 0, len(self.codes) - 1)
+        return np.where(self.codes[pos] == codes, pos, -1)
+
+    def record(self, code: str) -> Optional[Dict]:
+        """单只股票的全部字段，不在快照中时返回None"""
+        records = self.records([code])
+        return records[0] if records else None
+
+    def records(self, codes) -> List[Dict]:
+        """多只股票的全部字段（按传入顺序，跳过不在快照中的代码），NaN转为None"""
+        rows = self.rows(codes)
+        records = []
+        for row in rows[rows >= 0]:
+            record = {'stock_code': self.codes[row]}
+            for name, values in self._columns.items():
+                value = values[row]
+                # NaN（缺失）转为None
+                record[name] = None if value is None or value != value else (
+                    float(value) if values.dtype.kind == 'f' else value)
+            records.append(record)
+        return records
+
+    def to_frame(self, rows: np.ndarray, fields: Optional[List[str]] = None) -> pd.DataFrame:
+        """按行号取出指定字段（默认全部），返回DataFrame"""
+        data = {'stock_code': self.codes[rows]}
+        for name in fields or self._columns:
+            data[name] = self.field(name)[rows]
+        return pd.DataFrame(data)
+
+    def reindex(self, codes: np.ndarray, fields: List[str]) -> Dict[str, np.ndarray]:
+        """把数值字段按另一组代码重排（如选股快照），缺失为NaN"""
+        rows = self.rows(codes)
+        found = rows >= 0
+        columns = {}
+        for name in fields:
+            values = np.full(len(codes), np.nan)
+            values[found] = self.field(name)[rows[found]]
+            columns[name] = values
+        return columns
+
+
+def build_fundamentals_snapshot(backend, version: int = 0, codes: Optional[List[str]] = None) -> FundamentalsSnapshot:
+    """批量拉取全市场代码表、基本面和最新行情，构建快照
+
+    市盈率、市净率优先取行情接口的 pe/pb，没有时按 现价/每股收益、现价/每股净资产 计算
+
+    Args:
+        backend: 数据后端
+        version: 快照版本号
+        codes: 只拉取这些股票（全市场快照尚未构建时的单只查询），默认全市场
+
+    Returns:
+        FundamentalsSnapshot: 全市场基本面快照
+    """
+    all_code = backend.all_code().drop_duplicates('stock_code')
+    all_code['stock_code'] = all_code['stock_code'].astype(str)
+    if codes is not None:
+        all_code = all_code[all_code['stock_code'].isin([str(code) for code in codes])]
+    all_code = all_code.sort_values('stock_code').set_index('stock_code')
+    codes = all_code.index.to_numpy(dtype=object)
+
+    def by_code(df: pd.DataFrame) -> pd.DataFrame:
+        df = df.assign(stock_code=df['stock_code'].astype(str)).drop_duplicates('stock_code', keep='last')
+        return df.set_index('stock_code').reindex(codes)
+
+    fundamentals = by_code(backend.list_fundamentals(codes.tolist()))
+    quotes = by_code(backend.list_market_current(codes.tolist()))
+
+    def numeric(df: pd.DataFrame, name: str) -> np.ndarray:
+        if name not in df.columns:
+            return np.full(len(codes), np.nan)
+        return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype='float64')
+
+    columns = {
+        'short_name': all_code['short_name'].astype(str).to_numpy(dtype=object),
+        'industry': fundamentals['industry'].to_numpy(dtype=object),
+        'list_date': all_code['list_date'].astype(str).to_numpy(dtype=object) if 'list_date' in all_code else
+        np.full(len(codes), None, dtype=object),
+        'report_date': fundamentals['report_date'].to_numpy(dtype=object),
+    }
+    for name in FUNDAMENTAL_LABELS:
+        if name not in ('pe_ttm', 'pb'):
+            columns[name] = numeric(fundamentals, name)
+
+    price = numeric(quotes, 'price')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pe = numeric(quotes, 'pe')
+        columns['pe_ttm'] = np.where(np.isnan(pe), price / np.where(columns['eps'] > 0, columns['eps'], np.nan), pe)
+        pb = numeric(quotes, 'pb')
+        columns['pb'] = np.where(np.isnan(pb), price / np.where(columns['bps'] > 0, columns['bps'], np.nan), pb)
+    return FundamentalsSnapshot(codes, columns, version=version)
+
+
+_snapshot: Optional[FundamentalsSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def latest_fundamentals_snapshot() -> Optional[FundamentalsSnapshot]:
+    """最近一次构建的快照（可能已过期），尚未构建时返回None；不触发构建"""
+    return _snapshot
+
+
+def cached_fundamentals_snapshot(max_age: Optional[float] = None) -> Optional[FundamentalsSnapshot]:
+    """返回未过期的共享快照，没有时返回None"""
+    snapshot = _snapshot
+    max_age = FUNDAMENTALS_TTL if max_age is None else max_age
+    if snapshot is None or time.time() - snapshot.created > max_age:
+        return None
+    return snapshot
+
+
+def set_fundamentals_snapshot(snapshot: Optional[FundamentalsSnapshot]) -> None:
+    """替换进程内共享的基本面快照（传None则丢弃，由后台任务重新构建）"""
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = snapshot
+
+
+def get_fundamentals_snapshot(backend, max_age: Optional[float] = None) -> FundamentalsSnapshot:
+    """获取进程内共享的基本面快照，过期后重建
+
+    同一时间只有一个线程重建，其他线程等待后直接复用结果。
+    """
+    global _snapshot
+    snapshot = cached_fundamentals_snapshot(max_age)
+    if snapshot is not None:
+        return snapshot
+    with _snapshot_lock:
+        snapshot = cached_fundamentals_snapshot(max_age)
+        if snapshot is None:
+            version = _snapshot.version + 1 if _snapshot is not None else 1
+            snapshot = _snapshot = build_fundamentals_snapshot(backend, version=version)
+        return snapshot
+
+
+class FundamentalsRefresher:
+    """后台批量任务：按FUNDAMENTALS_TTL定期重建基本面快照，页面查询只读快照（过期时读旧快照）"""
+
+    def __init__(self):
+        self._task = None
+        # 上一次重建的耗时（秒），下一次提前这么久开始，使新快照在旧快照到期前就绪
+        self.build_seconds = 0.0
+
+    async def run(self, interval: float = FUNDAMENTALS_TTL, retry: float = 60):
+        """后台循环：在快照到期前（提前上一次的重建耗时）于数据加载线程池中重建
+
+        Args:
+            interval: 快照有效期（秒）
+            retry: 重建失败后的重试间隔（秒）
+        """
+        from adata_ui.utils.data_loader import DataLoader
+
+        loader = DataLoader()
+        while True:
+            try:
+                lead = min(self.build_seconds, interval / 2)
+                previous = _snapshot
+                started = time.monotonic()
+                snapshot = await loader.get_fundamentals(max_age=interval - lead)
+                if snapshot is not previous:
+                    self.build_seconds = time.monotonic() - started
+                    lead = min(self.build_seconds, interval / 2)
+                delay = snapshot.created + interval - lead - time.time()
+            except Exception as e:
+                print(f"更新基本面快照失败: {str(e)}")
+                delay = retry
+            await asyncio.sleep(max(delay, 1))
+
+    def ensure_started(self) -> None:
+        """首次访问时启动后台更新任务"""
+        if self._task is None or self._task.done():
+            from nicegui import background_tasks
+            self._task = background_tasks.create(self.run(), name='fundamentals')
+
+
+# 进程内共享的基本面更新任务
+fundamentals_refresher = FundamentalsRefresher()
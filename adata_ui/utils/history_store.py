@@ -0,0 +1,300 @@
+# 全市场历史行情库
+# 每个字段一个连续的列式文件（按代码、日期排序），配合按代码的偏移索引，
+# 通过内存映射读取：按代码取数是零拷贝切片，多个进程经由页缓存共享同一份数据
+import os
+import json
+import time
+import shutil
+import argparse
+import datetime
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from adata_ui.utils.schema import BAR_SCHEMA, compact_bars
+
+# 文件中各字段的存储类型；日期存为datetime64[s]的整数秒，读取时直接视为datetime64[s]
+FIELD_DTYPES: Dict[str, str] = {
+    'date': 'int64',
+    'open': 'float32',
+    'close': 'float32',
+    'high': 'float32',
+    'low': 'float32',
+    'volume': 'int64',
+    'amount': 'float64',
+}
+FORMAT_VERSION = 1
+CURRENT_FILE = 'CURRENT'
+# 每次全量构建和增量同步都写入新版本，只保留最近的几个版本
+KEEP_VERSIONS = int(os.environ.get('ADATA_UI_HISTORY_KEEP', 2))
+
+
+class HistoryStoreWriter:
+    """历史行情库写入器
+
+    按代码升序逐个追加K线，字段数据直接追加写入各自的文件，内存中只保留偏移索引。
+    写入到新的版本目录，commit() 时原子更新 CURRENT 指向该版本，读者不会看到写了一半的文件。
+    """
+
+    def __init__(self, directory):
+        self.root = Path(directory)
+        self.version = time.strftime('v%Y%m%d-%H%M%S')
+        self.path = self.root / self.version
+        suffix = 1
+        while self.path.exists():
+            self.path = self.root / f'{self.version}-{suffix}'
+            suffix += 1
+        self.path.mkdir(parents=True)
+        self._files = {field: open(self.path / f'{field}.bin', 'wb') for field in FIELD_DTYPES}
+        self._codes: List[str] = []
+        self._offsets: List[int] = [0]
+        self._min_date: Optional[int] = None
+        self._max_date: Optional[int] = None
+
+    def append(self, code: str, bars: pd.DataFrame) -> None:
+        """追加一只股票的K线
+
+        Args:
+            code: 股票代码，必须大于之前追加的代码
+            bars: date/open/close/high/low/volume/amount 列的K线
+        """
+        if self._codes and code <= self._codes[-1]:
+            raise ValueError(f'股票代码必须按升序追加: {code}')
+        bars = compact_bars(bars).sort_values('date')
+        dates = bars['date'].to_numpy().astype('datetime64[s]').astype('int64')
+        for field, dtype in FIELD_DTYPES.items():
+            values = dates if field == 'date' else bars[field].to_numpy()
+            self._files[field].write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        self._codes.append(code)
+        self._offsets.append(self._offsets[-1] + len(bars))
+        if len(dates):
+            self._min_date = int(dates[0]) if self._min_date is None else min(self._min_date, int(dates[0]))
+            self._max_date = int(dates[-1]) if self._max_date is None else max(self._max_date, int(dates[-1]))
+
+    def commit(self) -> Path:
+        """写入索引和元数据，并把 CURRENT 指向新版本"""
+        for f in self._files.values():
+            f.close()
+        np.save(self.path / 'offsets.npy', np.asarray(self._offsets, dtype='int64'))
+        meta = {
+            'format_version': FORMAT_VERSION,
+            'version': self.path.name,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'rows': self._offsets[-1],
+            'codes': self._codes,
+            'fields': FIELD_DTYPES,
+            'start_date': _day_str(self._min_date),
+            'end_date': _day_str(self._max_date),
+        }
+        (self.path / 'meta.json').write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+        tmp = self.root / f'{CURRENT_FILE}.tmp'
+        tmp.write_text(self.path.name, encoding='utf-8')
+        os.replace(tmp, self.root / CURRENT_FILE)
+        return self.path
+
+    def abort(self) -> None:
+        """放弃写入并删除版本目录"""
+        for f in self._files.values():
+            f.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def prune_versions(directory, current: str, keep: int = KEEP_VERSIONS) -> None:
+    """删除较旧的版本目录（版本名按时间排序），保留包括current在内的最近keep个"""
+    versions = sorted(p.name for p in Path(directory).iterdir() if p.is_dir() and p.name.startswith('v'))
+    for name in versions[:max(0, len(versions) - keep)]:
+        if name != current:
+            shutil.rmtree(Path(directory) / name, ignore_errors=True)
+
+
+def _day_str(seconds: Optional[int]) -> Optional[str]:
+    if seconds is None:
+        return None
+    return str(np.datetime64(seconds, 's').astype('datetime64[D]'))
+
+
+def _to_seconds(date) -> int:
+    return int(pd.Timestamp(date).to_datetime64().astype('datetime64[s]').astype('int64'))
+
+
+class HistoryStore:
+    """只读的历史行情库
+
+    Args:
+        directory: 库根目录（包含 CURRENT 文件）或某个版本目录
+    """
+
+    def __init__(self, directory):
+        root = Path(directory)
+        current = root / CURRENT_FILE
+        self.path = root / current.read_text(encoding='utf-8').strip() if current.exists() else root
+        meta_path = self.path / 'meta.json'
+        if not meta_path.exists():
+            raise FileNotFoundError(f'历史行情库不存在: {self.path}')
+        self.meta = json.loads(meta_path.read_text(encoding='utf-8'))
+        if self.meta['format_version'] != FORMAT_VERSION:
+            raise Exception(f"不支持的历史行情库版本: {self.meta['format_version']}")
+        self.codes: List[str] = self.meta['codes']
+        self.offsets = np.load(self.path / 'offsets.npy', mmap_mode='r')
+        self._index: Dict[str, int] = {code: i for i, code in enumerate(self.codes)}
+        self._columns: Dict[str, np.ndarray] = {}
+
+    @property
+    def version(self) -> str:
+        return self.meta['version']
+
+    @property
+    def end_date(self) -> Optional[str]:
+        """库中最新的交易日"""
+        return self.meta['end_date']
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._index
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def column(self, field: str) -> np.ndarray:
+        """整列的内存映射（全部股票，按代码、日期排序），用于全市场批量计算"""
+        if field not in self._columns:
+            dtype = FIELD_DTYPES[field]
+            path = self.path / f'{field}.bin'
+            if path.stat().st_size == 0:
+                array = np.empty(0, dtype=dtype)
+            else:
+                array = np.memmap(path, dtype=dtype, mode='r')
+            self._columns[field] = array.view('datetime64[s]') if field == 'date' else array
+        return self._columns[field]
+
+    def bounds(self, code: str, start_date=None, end_date=None) -> Tuple[int, int]:
+        """股票在列文件中的行区间 [start, end)，可按日期裁剪"""
+        i = self._index.get(code)
+        if i is None:
+            return 0, 0
+        base, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        start = base
+        if start_date is not None or end_date is not None:
+            # 同一代码内按日期升序，二分查找裁剪
+            dates = self.column('date')[base:end].view('int64')
+            if start_date is not None:
+                start = base + int(np.searchsorted(dates, _to_seconds(start_date), side='left'))
+            if end_date is not None:
+                end = base + int(np.searchsorted(dates, _to_seconds(end_date), side='right'))
+        return start, max(start, end)
+
+    def slice(self, code: str, start_date=None, end_date=None) -> Dict[str, np.ndarray]:
+        """按代码和日期区间取各字段的零拷贝切片"""
+        start, end = self.bounds(code, start_date, end_date)
+        return {field: self.column(field)[start:end] for field in FIELD_DTYPES}
+
+    def get_bars(self, code: str, start_date=None, end_date=None) -> pd.DataFrame:
+        """按代码和日期区间返回紧凑结构的K线，各列直接引用内存映射（只读）"""
+        arrays = self.slice(code, start_date, end_date)
+        return pd.DataFrame({field: arrays[field] for field in BAR_SCHEMA}, copy=False)
+
+    def iter_bars(self, codes: Optional[Iterable[str]] = None, start_date=None, end_date=None):
+        """批量读取，逐个返回 (代码, K线)"""
+        for code in (self.codes if codes is None else codes):
+            if code in self:
+                yield code, self.get_bars(code, start_date, end_date)
+
+
+_store: Optional[HistoryStore] = None
+_store_mtime: Optional[float] = None
+
+
+def get_history_store() -> Optional[HistoryStore]:
+    """获取进程内共享的历史行情库
+
+    由环境变量 ADATA_UI_HISTORY_DIR 指定目录，未配置或不存在时返回None。
+    CURRENT 指向新版本后自动重新打开。
+    """
+    global _store, _store_mtime
+    directory = os.environ.get('ADATA_UI_HISTORY_DIR')
+    if not directory:
+        return None
+    current = Path(directory) / CURRENT_FILE
+    try:
+        mtime = current.stat().st_mtime
+    except OSError:
+        return None
+    if _store is None or mtime != _store_mtime:
+        try:
+            _store, _store_mtime = HistoryStore(directory), mtime
+        except Exception as e:
+            print(f"打开历史行情库失败: {str(e)}")
+            return None
+    return _store
+
+
+def build_history_store(backend, directory, stock_codes: Optional[List[str]] = None,
+                        start_date: str = '1990-01-01', end_date: Optional[str] = None,
+                        workers: int = 8) -> Path:
+    """从数据后端拉取K线并写入新版本的历史行情库
+
+    Args:
+        backend: 数据后端（DataBackend）
+        directory: 库根目录
+        stock_codes: 股票代码列表，默认全部A股
+        start_date: 开始日期
+        end_date: 结束日期，默认最新
+        workers: 并发拉取的线程数
+
+    Returns:
+        Path: 新版本目录
+    """
+    if stock_codes is None:
+        stock_codes = backend.all_code()['stock_code'].astype(str).tolist()
+    stock_codes = sorted(set(stock_codes))
+
+    def fetch(code):
+        try:
+            df = backend.get_market(code, start_date, end_date, 1)
+            return df.rename(columns={'trade_date': 'date'})
+        except Exception as e:
+            print(f"获取 {code} 行情失败: {str(e)}")
+            return None
+
+    writer = HistoryStoreWriter(directory)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # map按输入顺序返回，保证按代码升序写入
+            for code, df in zip(stock_codes, executor.map(fetch, stock_codes)):
+                if df is not None and not df.empty:
+                    writer.append(code, df)
+        path = writer.commit()
+    except BaseException:
+        writer.abort()
+        raise
+    prune_versions(directory, path.name)
+    return path
+
+
+def main(argv=None):
+    """命令行入口：构建历史行情库"""
+    from adata_ui.utils.backend import MockBackend, create_backend
+
+    parser = argparse.ArgumentParser(description='构建全市场历史行情库')
+    parser.add_argument('--dir', default=os.environ.get('ADATA_UI_HISTORY_DIR', 'history'), help='库目录')
+    parser.add_argument('--codes', default=None, help='逗号分隔的股票代码，默认全部A股')
+    parser.add_argument('--start-date', default='1990-01-01')
+    parser.add_argument('--end-date', default=datetime.date.today().isoformat())
+    parser.add_argument('--workers', type=int, default=8, help='并发拉取的线程数')
+    parser.add_argument('--backend', default=None, help='数据后端，默认按ADATA_UI_BACKEND')
+    parser.add_argument('--mock', action='store_true', help='使用模拟数据（无网络环境）')
+    args = parser.parse_args(argv)
+
+    backend = MockBackend(latency=0) if args.mock else create_backend(args.backend)
+    codes = [code.strip() for code in args.codes.split(',') if code.strip()] if args.codes else None
+    start = time.perf_counter()
+    path = build_history_store(backend, args.dir, codes, args.start_date, args.end_date, args.workers)
+    store = HistoryStore(path)
+    size_mb = sum(p.stat().st_size for p in path.iterdir()) / 1024 / 1024
+    print(f'构建完成: {len(store)} 只股票, {store.meta["rows"]} 行, {size_mb:.1f} MB, '
+          f'耗时 {time.perf_counter() - start:.1f}s -> {path}')
+
+
+if __name__ == '__main__':
+    main()
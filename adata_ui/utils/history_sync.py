@@ -0,0 +1,235 @@
+# 历史行情增量同步模块
+# 按 (数据源, 股票代码) 记录已同步到的交易日（高水位），每次只拉取高水位之后的新K线；
+# 分批并发拉取，每批完成后把新K线和进度写入检查点，中断后重跑时跳过已完成的批次；
+# 全部批次完成后与现有历史行情库合并写入新版本，再推进高水位
+import os
+import json
+import time
+import shutil
+import argparse
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from adata_ui.utils.history_store import HistoryStore, HistoryStoreWriter, CURRENT_FILE, _day_str, prune_versions
+from adata_ui.utils.materialize import settled_date
+from adata_ui.utils.schema import compact_bars
+from adata_ui.utils.trading_calendar import get_trading_calendar
+
+# 每批拉取的股票数，每批完成后写一次检查点
+SYNC_BATCH_SIZE = int(os.environ.get('ADATA_UI_SYNC_BATCH_SIZE', 200))
+# 并发拉取的线程数
+SYNC_WORKERS = int(os.environ.get('ADATA_UI_SYNC_WORKERS', 8))
+SYNC_DIR = 'sync'
+WATERMARKS_FILE = 'watermarks.json'
+CHECKPOINT_FILE = 'checkpoint.json'
+
+
+def _write_json(path: Path, data) -> None:
+    """先写临时文件再原子替换，中断时不会留下写了一半的文件"""
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+class SyncState:
+    """某个数据源的同步状态：各股票的高水位和进行中的同步任务（检查点）
+
+    目录结构: <库目录>/sync/<数据源>/watermarks.json 记录高水位，
+    run/ 下为进行中的任务：checkpoint.json 记录任务参数和已完成的批次，batch-N.pkl 为该批拉取到的新K线
+
+    Args:
+        directory: 历史行情库根目录
+        source: 数据源名称（数据后端的name）
+    """
+
+    def __init__(self, directory, source: str):
+        self.path = Path(directory) / SYNC_DIR / source
+        self.run_path = self.path / 'run'
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def watermarks(self) -> Dict[str, str]:
+        """股票代码 -> 已同步到的交易日（YYYY-MM-DD）"""
+        path = self.path / WATERMARKS_FILE
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text(encoding='utf-8'))
+
+    def save_watermarks(self, watermarks: Dict[str, str]) -> None:
+        _write_json(self.path / WATERMARKS_FILE, watermarks)
+
+    def resume(self, plan: Dict) -> List[int]:
+        """与上次中断的任务参数一致时返回其已完成的批次号，否则清理旧任务重新开始"""
+        checkpoint = self.run_path / CHECKPOINT_FILE
+        if checkpoint.exists():
+            state = json.loads(checkpoint.read_text(encoding='utf-8'))
+            if state['plan'] == plan:
+                return state['done']
+        shutil.rmtree(self.run_path, ignore_errors=True)
+        self.run_path.mkdir(parents=True)
+        _write_json(checkpoint, {'plan': plan, 'done': []})
+        return []
+
+    def save_batch(self, plan: Dict, done: List[int], batch: int, bars: Dict[str, pd.DataFrame]) -> None:
+        """写入一批的新K线，再把该批记入检查点"""
+        path = self.run_path / f'batch-{batch}.pkl'
+        tmp = path.with_name(path.name + '.tmp')
+        pd.to_pickle(bars, tmp)
+        os.replace(tmp, path)
+        _write_json(self.run_path / CHECKPOINT_FILE, {'plan': plan, 'done': done})
+
+    def load_batch(self, batch: int) -> Dict[str, pd.DataFrame]:
+        return pd.read_pickle(self.run_path / f'batch-{batch}.pkl')
+
+    def finish(self) -> None:
+        """任务完成后删除检查点"""
+        shutil.rmtree(self.run_path, ignore_errors=True)
+
+
+def _open_store(directory) -> Optional[HistoryStore]:
+    if not (Path(directory) / CURRENT_FILE).exists():
+        return None
+    return HistoryStore(directory)
+
+
+def _initial_watermarks(store: Optional[HistoryStore]) -> Dict[str, str]:
+    """数据源还没有高水位时，以库中各股票的最后一个交易日为起点"""
+    if store is None or not len(store):
+        return {}
+    dates = store.column('date').view('int64')
+    ends = store.offsets[1:]
+    starts = store.offsets[:-1]
+    return {code: _day_str(int(dates[end - 1])) for code, start, end in zip(store.codes, starts, ends) if end > start}
+
+
+def sync_history(backend, directory, stock_codes: Optional[List[str]] = None,
+                 start_date: str = '1990-01-01', end_date: Optional[str] = None,
+                 batch_size: int = SYNC_BATCH_SIZE, workers: int = SYNC_WORKERS) -> Dict:
+    """增量同步历史行情库：只拉取各股票高水位之后到end_date的K线
+
+    高水位之后到end_date按交易日历没有交易日的股票不发请求；没有高水位的股票从start_date开始拉取。
+    中断（异常或进程退出）后以相同参数重跑，会从检查点继续，已完成的批次不再请求。
+
+    Args:
+        backend: 数据后端（DataBackend），其name作为数据源区分高水位
+        directory: 历史行情库根目录，不存在时新建
+        stock_codes: 股票代码列表，默认全部A股
+        start_date: 新股票的开始日期
+        end_date: 同步到的交易日，默认最近一个已收盘的交易日（盘中不同步当日未完成的K线）
+        batch_size: 每批股票数
+        workers: 并发拉取的线程数
+
+    Returns:
+        dict: fetched（请求的股票数）、skipped（已是最新的股票数）、failed（失败的代码）、
+            rows（新增K线行数）、path（新版本目录，没有新数据时为None）
+    """
+    end_date = str(pd.Timestamp(end_date).date()) if end_date else str(settled_date())
+    store = _open_store(directory)
+    state = SyncState(directory, backend.name)
+    watermarks = state.watermarks() or _initial_watermarks(store)
+
+    if stock_codes is None:
+        stock_codes = backend.all_code()['stock_code'].astype(str).tolist()
+    stock_codes = sorted(set(stock_codes))
+    # 高水位之后到end_date没有交易日（已是最新，或其间全是节假日）的股票不发请求
+    marked = [code for code in stock_codes if code in watermarks]
+    after = pd.to_datetime([watermarks[code] for code in marked]) + pd.Timedelta(days=1)
+    behind = set(code for code, n in zip(marked, get_trading_calendar().count(after, end_date)) if n > 0)
+    pending = [code for code in stock_codes if code not in watermarks or code in behind]
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+    def fetch(code):
+        since = watermarks.get(code)
+        start = str((pd.Timestamp(since) + pd.Timedelta(days=1)).date()) if since else start_date
+        try:
+            df = backend.get_market(code, start, end_date, 1)
+            return compact_bars(None if df is None or df.empty else df.rename(columns={'trade_date': 'date'}))
+        except Exception as e:
+            print(f"同步 {code} 行情失败: {str(e)}")
+            return None
+
+    # 任务参数（待同步代码、各自起点、截止日）一致时才能从检查点继续
+    plan = {'end_date': end_date, 'start_date': start_date, 'batch_size': batch_size,
+            'codes': {code: watermarks.get(code) for code in pending}}
+    done = state.resume(plan)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for batch, codes in enumerate(batches):
+            if batch in done:
+                continue
+            bars = {code: df for code, df in zip(codes, executor.map(fetch, codes)) if df is not None}
+            done.append(batch)
+            state.save_batch(plan, done, batch, bars)
+
+    # 合并：现有库 + 各批新K线，写入新版本
+    new_bars: Dict[str, pd.DataFrame] = {}
+    for batch in range(len(batches)):
+        new_bars.update(state.load_batch(batch))
+    failed = [code for code in pending if code not in new_bars]
+    rows = sum(len(df) for df in new_bars.values())
+    path = None
+    if rows:
+        path = _merge(store, directory, new_bars)
+
+    # 高水位只推进到实际收到的最后一根K线：没有返回或截止日前的K线上游晚发布时，下次仍会补拉
+    for code, df in new_bars.items():
+        if not df.empty:
+            last = str(pd.Timestamp(df['date'].max()).date())
+            watermarks[code] = max(last, watermarks.get(code) or last)
+    state.save_watermarks(watermarks)
+    state.finish()
+    return {'fetched': len(pending), 'skipped': len(stock_codes) - len(pending), 'failed': failed,
+            'rows': rows, 'path': path}
+
+
+def _merge(store: Optional[HistoryStore], directory, new_bars: Dict[str, pd.DataFrame]) -> Path:
+    """按代码升序写入现有K线和新K线（日期重叠时以新K线为准）"""
+    codes = sorted(set(store.codes if store is not None else []) | set(new_bars))
+    writer = HistoryStoreWriter(directory)
+    try:
+        for code in codes:
+            old = store.get_bars(code) if store is not None and code in store else None
+            new = new_bars.get(code)
+            if new is None or new.empty:
+                bars = old
+            elif old is None or old.empty:
+                bars = new
+            else:
+                first = new['date'].min()
+                bars = pd.concat([old[old['date'] < first], new], ignore_index=True)
+            if bars is not None and not bars.empty:
+                writer.append(code, bars)
+        path = writer.commit()
+    except BaseException:
+        writer.abort()
+        raise
+    prune_versions(directory, path.name)
+    return path
+
+
+def main(argv=None):
+    """命令行入口：增量同步历史行情库"""
+    from adata_ui.utils.backend import MockBackend, create_backend
+
+    parser = argparse.ArgumentParser(description='增量同步全市场历史行情库')
+    parser.add_argument('--dir', default=os.environ.get('ADATA_UI_HISTORY_DIR', 'history'), help='库目录')
+    parser.add_argument('--codes', default=None, help='逗号分隔的股票代码，默认全部A股')
+    parser.add_argument('--start-date', default='1990-01-01', help='新股票的开始日期')
+    parser.add_argument('--end-date', default=None, help='同步到的交易日，默认最近一个已收盘的交易日')
+    parser.add_argument('--batch-size', type=int, default=SYNC_BATCH_SIZE, help='每批股票数（检查点粒度）')
+    parser.add_argument('--workers', type=int, default=SYNC_WORKERS, help='并发拉取的线程数')
+    parser.add_argument('--backend', default=None, help='数据后端，默认按ADATA_UI_BACKEND')
+    parser.add_argument('--mock', action='store_true', help='使用模拟数据（无网络环境）')
+    args = parser.parse_args(argv)
+
+    backend = MockBackend(latency=0) if args.mock else create_backend(args.backend)
+    codes = [code.strip() for code in args.codes.split(',') if code.strip()] if args.codes else None
+    start = time.perf_counter()
+    result = sync_history(backend, args.dir, codes, args.start_date, args.end_date, args.batch_size, args.workers)
+    print(f"同步完成: 请求 {result['fetched']} 只, 已是最新 {result['skipped']} 只, "
+          f"失败 {len(result['failed'])} 只, 新增 {result['rows']} 行, "
+          f"耗时 {time.perf_counter() - start:.1f}s -> {result['path'] or '无新数据'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+# 上游行情接口的异步HTTP客户端
+# adata 每次请求新建连接并同步等待，批量获取（如几百个概念的成分股）时反复建立TCP/TLS连接，
+# 并受线程数限制串行排队。这里在独立的事件循环线程中维护一个长连接池（httpx，支持时启用HTTP/2），
+# 按域名限制并发，直接请求概念列表、概念成分股和日K线接口，解析结果与adata保持一致
+import os
+import re
+import json
+import time
+import asyncio
+import threading
+import concurrent.futures
+import pandas as pd
+from typing import Dict, List, Optional
+
+# 所有上游域名改为该地址（本地替身服务器，用于测试和压测），例如 http://127.0.0.1:8765
+UPSTREAM_URL = os.environ.get('ADATA_UI_UPSTREAM_URL', '')
+# 每个域名的最大并发请求数
+HTTP_CONCURRENCY = int(os.environ.get('ADATA_UI_HTTP_CONCURRENCY', 16))
+# 连接池的最大连接数 / 保持的空闲长连接数
+HTTP_CONNECTIONS = int(os.environ.get('ADATA_UI_HTTP_CONNECTIONS', 64))
+HTTP_KEEPALIVE = int(os.environ.get('ADATA_UI_HTTP_KEEPALIVE', 32))
+HTTP_TIMEOUT = float(os.environ.get('ADATA_UI_HTTP_TIMEOUT', 10))
+HTTP_RETRIES = int(os.environ.get('ADATA_UI_HTTP_RETRIES', 2))
+
+THS_HOST = 'http://q.10jqka.com.cn'
+THS_SEARCH_HOST = 'http://search.10jqka.com.cn'
+EAST_HOST = 'https://push2.eastmoney.com'
+EAST_HISTORY_HOST = 'http://push2his.eastmoney.com'
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:105.0) Gecko/20100101 Firefox/105.0'
+THS_HEADERS = {'User-Agent': USER_AGENT, 'Referer': 'http://q.10jqka.com.cn/'}
+THS_IP_LIMIT = '<h1>Nginx forbidden.</h1>'
+# 同花顺概念指数列表（问财查询“所有概念”）的固定查询参数，与adata相同
+THS_CONCEPT_INDEX_PARAMS = {
+    'perpage': 100,
+    'query': '所有概念',
+    'condition': json.dumps([{
+        'indexName': '指数@同花顺概念指数', 'indexProperties': [], 'source': 'new_parser', 'type': 'index',
+        'indexPropertiesMap': {}, 'reportType': 'null', 'chunkedResult': '所有概念', 'valueType': '_指数类型',
+        'domain': 'abs_a指领域', 'uiText': '同花顺概念指数', 'sonSize': 0, 'queryText': '同花顺概念指数',
+        'relatedSize': 0,
+    }], ensure_ascii=False, separators=(',', ':')),
+    'urp_sort_index': '指数代码', 'source': 'Ths_iwencai_Xuangu', 'urp_sort_way': 'desc', 'ret': 'json_all',
+    'query_type': 'zhishu', 'comp_id': 6367801, 'business_cat': 'soniu', 'uuid': 23119,
+}
+THS_CONCEPT_INDEX_PAGES = 9
+# 同花顺概念成分股网页最多只能翻5页
+THS_CONSTITUENT_PAGES = 5
+EAST_PAGE_SIZE = 200
+
+
+class UpstreamError(RuntimeError):
+    """上游接口返回错误或被限流"""
+
+
+class UpstreamClient:
+    """上游接口的异步HTTP客户端
+
+    httpx.AsyncClient 运行在客户端自己的事件循环线程中：
+    同步调用方（数据加载线程）通过 run() 阻塞等待，
+    异步调用方（NiceGUI事件循环）通过 submit() 得到 concurrent Future 后 await asyncio.wrap_future()。
+    所有调用共享同一个连接池，按域名用信号量限制并发
+
+    Args:
+        base_url: 非空时所有域名都改为该地址（本地替身服务器）
+        concurrency: 每个域名的最大并发请求数
+        timeout: 单次请求超时（秒）
+    """
+
+    def __init__(self, base_url: str = UPSTREAM_URL, concurrency: int = HTTP_CONCURRENCY,
+                 timeout: float = HTTP_TIMEOUT, retries: int = HTTP_RETRIES):
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+        # 统计：请求数 / 新建连接数（长连接复用时远小于请求数）
+        self.requests = 0
+        self.connections = 0
+
+    @property
+    def http2(self) -> bool:
+        """是否可以启用HTTP/2（需要安装h2）"""
+        try:
+            import h2  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='adata_upstream', daemon=True)
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    def _get_client(self):
+        """在客户端事件循环中创建连接池"""
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=HTTP_CONNECTIONS, max_keepalive_connections=HTTP_KEEPALIVE,
+                                    keepalive_expiry=30),
+                follow_redirects=True,
+                headers={'User-Agent': USER_AGENT},
+                trust_env=False,
+            )
+            self._client.event_hooks['request'] = [self._trace_request]
+        return self._client
+
+    async def _trace_request(self, request):
+        request.extensions['trace'] = self._trace
+
+    async def _trace(self, event_name, info):
+        # 传输层事件：只有新建连接时才会建立TCP连接
+        if event_name == 'connection.connect_tcp.complete':
+            self.connections += 1
+
+    def url(self, host: str, path: str) -> str:
+        return (self.base_url or host) + path
+
+    async def _request(self, host: str, path: str, params=None, headers=None):
+        """在客户端事件循环中发出请求，按域名限制并发，连接错误和5xx时重试"""
+        import httpx
+
+        client = self._get_client()
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.concurrency))
+        async with semaphore:
+            for attempt in range(self.retries + 1):
+                try:
+                    self.requests += 1
+                    response = await client.get(self.url(host, path), params=params, headers=headers)
+                    if response.status_code >= 500 and attempt < self.retries:
+                        await asyncio.sleep(0.2 * (attempt + 1))
+                        continue
+                    return response
+                except httpx.TransportError:
+                    if attempt >= self.retries:
+                        raise
+                    await asyncio.sleep(0.2 * (attempt + 1))
+
+    async def get_json(self, host: str, path: str, params=None, headers=None):
+        response = await self._request(host, path, params, headers)
+        response.raise_for_status()
+        return response.json()
+
+    async def get_text(self, host: str, path: str, params=None, headers=None) -> str:
+        response = await self._request(host, path, params, headers)
+        response.raise_for_status()
+        return response.text
+
+    def submit(self, coro_func, *args) -> concurrent.futures.Future:
+        """在客户端事件循环中执行 coro_func(self, *args)，返回 concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coro_func(self, *args), self._start())
+
+    def run(self, coro_func, *args):
+        """同步执行 coro_func(self, *args) 并等待结果（在线程中调用）"""
+        return self.submit(coro_func, *args).result()
+
+    def close(self) -> None:
+        """关闭连接池和事件循环线程"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result(timeout=5)
+            self._client = None
+        self._semaphores.clear()
+        loop.call_soon_threadsafe(loop.stop)
+
+
+# ---- 接口 ----
+
+def _ths_cookie() -> str:
+    """同花顺成分股网页需要的cookie，由adata生成（未安装时不带cookie）"""
+    try:
+        from adata.common.utils import cookie
+        return cookie.ths_cookie()
+    except Exception:
+        return ''
+
+
+_cookie_cache = {'value': None, 'time': 0.0}
+
+
+async def _ths_headers() -> Dict[str, str]:
+    # cookie由JS计算，生成较慢，短时间内复用
+    if _cookie_cache['value'] is None or time.time() - _cookie_cache['time'] > 60:
+        _cookie_cache['value'] = await asyncio.to_thread(_ths_cookie)
+        _cookie_cache['time'] = time.time()
+    return {**THS_HEADERS, 'Cookie': _cookie_cache['value']} if _cookie_cache['value'] else THS_HEADERS
+
+
+async def all_concept_code_ths(client: UpstreamClient) -> pd.DataFrame:
+    """同花顺概念列表：concept_code, index_code, name, source
+
+    概念指数列表的各页和概念代码网页并发请求
+    """
+    async def index_page(page):
+        data = await client.get_json(THS_SEARCH_HOST, '/gateway/urp/v7/landing/getDataList',
+                                     {**THS_CONCEPT_INDEX_PARAMS, 'page': page})
+        if data.get('status_msg') != 'ok':
+            return []
+        return [[row['code'], row['指数简称']] for row in data['answer']['components'][0]['data']['datas']]
+
+    pages, html = await asyncio.gather(
+        asyncio.gather(*[index_page(page) for page in range(1, THS_CONCEPT_INDEX_PAGES + 1)]),
+        client.get_text(THS_HOST, '/gn/', headers=THS_HEADERS),
+    )
+    rows = []
+    for page in pages:
+        # 与adata一致：遇到空页即停止
+        if not page:
+            break
+        rows.extend(page)
+    index_df = pd.DataFrame(rows, columns=['index_code', 'name']).drop_duplicates(ignore_index=True)
+    code_df = pd.DataFrame(
+        [[code, name] for code, name in re.findall(r'href="[^"]*/gn/detail/code/(\d+)/?"[^>]*>([^<]*)</a>', html)],
+        columns=['concept_code', 'name'])
+    left = pd.merge(index_df, code_df, how='left', on='name')
+    right = pd.merge(index_df, code_df, how='right', on='name')
+    df = pd.concat([left, right]).drop_duplicates(keep='first', ignore_index=True)
+    df['source'] = '同花顺'
+    return df[['concept_code', 'index_code', 'name', 'source']]
+
+
+def _parse_ths_constituents(html: str) -> List[Dict[str, str]]:
+    rows = []
+    for tr in re.findall(r'<tr[^>]*>(.*?)</tr>', html, re.S)[1:]:
+        cells = [re.sub(r'<[^>]+>', '', cell).strip() for cell in re.findall(r'<td[^>]*>(.*?)</td>', tr, re.S)]
+        if len(cells) > 2:
+            rows.append({'stock_code': cells[1], 'short_name': cells[2]})
+    return rows
+
+
+async def concept_constituent_ths(client: UpstreamClient, concept_code: str) -> pd.DataFrame:
+    """同花顺概念成分股：stock_code, short_name
+
+    先请求第一页得到总页数，其余页并发请求
+    """
+    headers = await _ths_headers()
+
+    async def page(number):
+        text = await client.get_text(
+            THS_HOST, f'/gn/detail/field/199112/order/desc/page/{number}/ajax/1/code/{concept_code}', headers=headers)
+        if THS_IP_LIMIT in text:
+            raise UpstreamError('同花顺限流：当前IP被限制，请降低请求频率')
+        return text
+
+    first = await page(1)
+    if '暂无成份股数据' in first or '概念板块' in first or '概念时间表' in first:
+        return pd.DataFrame(columns=['stock_code', 'short_name'])
+    match = re.search(r'class="page_info"[^>]*>\s*\d+/(\d+)', first)
+    total = min(int(match.group(1)), THS_CONSTITUENT_PAGES) if match else 1
+    pages = [first] + list(await asyncio.gather(*[page(number) for number in range(2, total + 1)]))
+    rows = [row for text in pages for row in _parse_ths_constituents(text)]
+    return pd.DataFrame(rows, columns=['stock_code', 'short_name'])
+
+
+async def concept_constituent_east(client: UpstreamClient, concept_code: str) -> pd.DataFrame:
+    """东方财富概念成分股：stock_code, short_name
+
+    第一页返回总数后，其余页并发请求
+    """
+    async def page(number):
+        data = await client.get_json(EAST_HOST, '/api/qt/clist/get', {
+            'fid': 'f62', 'po': 1, 'pz': EAST_PAGE_SIZE, 'pn': number, 'np': 1, 'fltt': 2, 'invt': 2,
+            'fs': f'b:{concept_code}', 'fields': 'f12,f14'})
+        return data.get('data') or {}
+
+    first = await page(1)
+    pages = [first]
+    total = int(first.get('total') or 0)
+    if total > EAST_PAGE_SIZE:
+        pages += await asyncio.gather(*[page(number) for number in range(2, (total - 1) // EAST_PAGE_SIZE + 2)])
+    rows = [{'stock_code': row['f12'], 'short_name': row['f14']} for data in pages for row in data.get('diff') or []]
+    return pd.DataFrame(rows, columns=['stock_code', 'short_name'])
+
+
+KLINE_COLUMNS = ['trade_date', 'open', 'close', 'high', 'low', 'volume', 'amount', '', 'change_pct', 'change',
+                 'turnover_ratio']
+KLINE_NUMERIC = ['open', 'close', 'volume', 'high', 'low', 'amount', 'change', 'change_pct', 'turnover_ratio',
+                 'pre_close']
+
+
+async def get_market(client: UpstreamClient, stock_code: str, start_date: str = '1990-01-01',
+                     end_date: Optional[str] = None, k_type: int = 1, adjust_type: int = 0) -> pd.DataFrame:
+    """个股K线（东方财富），返回列与adata的get_market相同；默认不复权，复权在本地计算（见 adata_ui.utils.adjust）"""
+    params = {
+        'fields1': 'f1,f2,f3,f4,f5,f6',
+        'fields2': 'f51,f52,f53,f54,f55,f56,f57,f58,f59,f60,f61,f116',
+        'ut': '7eea3edcaed734bea9cbfc24409ed989',
+        'klt': f'10{k_type}' if int(k_type) < 5 else k_type,
+        'fqt': adjust_type,
+        'secid': f"{1 if stock_code.startswith('6') else 0}.{stock_code}",
+        'beg': start_date.replace('-', '') if start_date else '19900101',
+        'end': end_date.replace('-', '') if end_date else time.strftime('%Y%m%d'),
+    }
+    data = await client.get_json(EAST_HISTORY_HOST, '/api/qt/stock/kline/get', params)
+    lines = (data.get('data') or {}).get('klines') or []
+    if not lines:
+        return pd.DataFrame()
+    df = pd.DataFrame([line.split(',')[:len(KLINE_COLUMNS)] for line in lines], columns=KLINE_COLUMNS)
+    df['pre_close'] = (df['close'].astype(float) - df['change'].astype(float)).round(2)
+    df['volume'] = df['volume'].astype(int) * 100
+    dates = pd.to_datetime(df['trade_date'])
+    df['trade_time'] = dates.dt.strftime('%Y-%m-%d %H:%M:%S')
+    df['trade_date'] = dates.dt.strftime('%Y-%m-%d')
+    df['stock_code'] = stock_code
+    df[KLINE_NUMERIC] = df[KLINE_NUMERIC].apply(pd.to_numeric)
+    return df[['stock_code', 'trade_time', 'trade_date', 'open', 'close', 'high', 'low', 'volume', 'amount',
+               'change_pct', 'change', 'turnover_ratio', 'pre_close']]
+
+
+_client: Optional[UpstreamClient] = None
+
+
+def get_client() -> UpstreamClient:
+    """进程内共享的上游客户端"""
+    global _client
+    if _client is None:
+        _client = UpstreamClient()
+    return _client
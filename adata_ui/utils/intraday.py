@@ -0,0 +1,290 @@
+# 分时K线模块
+# 后台任务在交易时段定时批量拉取订阅股票的最新行情（逐笔快照），按分钟聚合成1分钟K线，
+# 写入每只股票一个的定长环形缓冲区（numpy数组），整个交易时段内存占用不变；
+# 5/15/30/60分钟K线由1分钟K线按时段对齐分组聚合，页面刷新只读缓冲区，不再重新请求整天的分时数据
+import os
+import time
+import asyncio
+import datetime
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+# 每个交易日的分钟数：上午 9:30-11:30、下午 13:00-15:00 各120分钟
+MINUTES_PER_DAY = 240
+MORNING_OPEN = datetime.time(9, 30)
+AFTERNOON_OPEN = datetime.time(13, 0)
+# 支持的分钟周期，均能整除上午/下午的120分钟，分组不会跨越午休
+MINUTE_FREQS = (1, 5, 15, 30, 60)
+# 每只股票保留的1分钟K线数（默认两个交易日），超过后覆盖最早的
+INTRADAY_CAPACITY = int(os.environ.get('ADATA_UI_INTRADAY_CAPACITY', 2 * MINUTES_PER_DAY))
+# 盘中拉取最新行情的间隔（秒）
+TICK_INTERVAL = float(os.environ.get('ADATA_UI_TICK_INTERVAL', 3))
+# 订阅的股票超过该时间（秒）没有页面读取时停止拉取
+SUBSCRIPTION_IDLE = float(os.environ.get('ADATA_UI_INTRADAY_IDLE', 600))
+
+
+def minute_slot(moment: datetime.time) -> int:
+    """时刻所在的1分钟K线序号（0-239），开盘前为-1
+
+    K线以结束时刻标记（9:31为第一根），午休和收盘后的行情计入上午/下午的最后一根
+    """
+    minutes = moment.hour * 60 + moment.minute
+    if minutes < 9 * 60 + 30:
+        return -1
+    if minutes < 13 * 60:
+        return min(minutes - (9 * 60 + 30), 119)
+    return min(120 + minutes - 13 * 60, MINUTES_PER_DAY - 1)
+
+
+def slot_times(day: datetime.date, slots: np.ndarray) -> np.ndarray:
+    """K线序号转为结束时刻（datetime64[s]）：0 -> 9:31，119 -> 11:30，120 -> 13:01，239 -> 15:00"""
+    slots = np.asarray(slots, dtype='int64')
+    minutes = np.where(slots < 120, 9 * 60 + 31 + slots, 13 * 60 + 1 + slots - 120)
+    return np.datetime64(day, 's') + minutes * 60
+
+
+class MinuteBarBuffer:
+    """一只股票的1分钟K线环形缓冲区
+
+    K线按 序列号 = 交易日序号 × 240 + 分钟序号 存放在 序列号 % capacity 的位置，
+    同一分钟内的行情更新最高/最低/收盘价并累加成交量
+
+    Args:
+        capacity: 保留的K线数
+    """
+
+    FIELDS = ('open', 'high', 'low', 'close', 'volume', 'amount')
+
+    def __init__(self, capacity: int = INTRADAY_CAPACITY):
+        self.capacity = capacity
+        self.seq = np.full(capacity, -1, dtype='int64')
+        self.values = {field: np.zeros(capacity) for field in self.FIELDS}
+        self.last_seq = -1
+        # 上一笔行情的当日累计成交量/额，用于计算本笔增量
+        self.day = -1
+        self.cum_volume = 0.0
+        self.cum_amount = 0.0
+        # 有更新时递增，页面据此判断是否需要重绘
+        self.version = 0
+        # 最近一次用分时数据回补时的 (交易日, 是否已收盘)，由 DataLoader.get_intraday_bars 判断是否需要再次回补
+        self.backfilled = None
+
+    def update(self, day: int, slot: int, price: float, cum_volume: float, cum_amount: float) -> None:
+        """写入一笔行情
+
+        Args:
+            day: 交易日序号（date.toordinal()）
+            slot: 分钟序号，见 minute_slot
+            price: 最新价
+            cum_volume: 当日累计成交量
+            cum_amount: 当日累计成交额
+        """
+        if day != self.day:
+            self.day, self.cum_volume, self.cum_amount = day, 0.0, 0.0
+        volume = max(cum_volume - self.cum_volume, 0.0)
+        amount = max(cum_amount - self.cum_amount, 0.0)
+        self.cum_volume, self.cum_amount = max(cum_volume, self.cum_volume), max(cum_amount, self.cum_amount)
+        seq = day * MINUTES_PER_DAY + slot
+        if seq < self.last_seq:
+            return
+        pos = seq % self.capacity
+        values = self.values
+        if seq != self.last_seq:
+            self.seq[pos] = seq
+            for field in ('open', 'high', 'low', 'close'):
+                values[field][pos] = price
+            values['volume'][pos] = volume
+            values['amount'][pos] = amount
+            self.last_seq = seq
+        else:
+            values['high'][pos] = max(values['high'][pos], price)
+            values['low'][pos] = min(values['low'][pos], price)
+            values['close'][pos] = price
+            values['volume'][pos] += volume
+            values['amount'][pos] += amount
+        self.version += 1
+
+    def load(self, day: int, slots: np.ndarray, price: np.ndarray, volume: np.ndarray, amount: np.ndarray) -> None:
+        """批量写入一个交易日已有的分时数据（每分钟一个价格），并以其合计作为累计成交量的起点"""
+        slots = np.asarray(slots, dtype='int64')
+        seq = day * MINUTES_PER_DAY + slots
+        pos = seq % self.capacity
+        self.seq[pos] = seq
+        for field in ('open', 'high', 'low', 'close'):
+            self.values[field][pos] = price
+        self.values['volume'][pos] = volume
+        self.values['amount'][pos] = amount
+        self.day = day
+        self.cum_volume, self.cum_amount = float(np.sum(volume)), float(np.sum(amount))
+        self.last_seq = max(self.last_seq, int(seq.max())) if len(seq) else self.last_seq
+        self.version += 1
+
+    def has_day(self, day: int) -> bool:
+        """缓冲区中是否已有该交易日的K线"""
+        return bool(((self.seq >= day * MINUTES_PER_DAY) & (self.seq < (day + 1) * MINUTES_PER_DAY)).any())
+
+    def bars(self, freq: int = 1, day: Optional[int] = None) -> pd.DataFrame:
+        """某个交易日（默认最新）的分钟K线: date（结束时刻）, open, high, low, close, volume, amount
+
+        Args:
+            freq: 分钟周期，见 MINUTE_FREQS
+            day: 交易日序号
+        """
+        if freq not in MINUTE_FREQS:
+            raise ValueError(f'不支持的分钟周期: {freq}')
+        if day is None:
+            day = self.last_seq // MINUTES_PER_DAY
+        mask = (self.seq >= day * MINUTES_PER_DAY) & (self.seq < (day + 1) * MINUTES_PER_DAY)
+        pos = np.flatnonzero(mask)
+        pos = pos[np.argsort(self.seq[pos], kind='stable')]
+        slots = self.seq[pos] - day * MINUTES_PER_DAY
+        values = {field: self.values[field][pos] for field in self.FIELDS}
+        if freq > 1 and len(pos):
+            # 按周期分组：组内开盘取首根、收盘取末根、最高/最低取极值、成交量/额求和
+            groups = slots // freq
+            starts = np.flatnonzero(np.append(True, groups[1:] != groups[:-1]))
+            ends = np.append(starts[1:], len(pos)) - 1
+            values = {
+                'open': values['open'][starts],
+                'high': np.maximum.reduceat(values['high'], starts),
+                'low': np.minimum.reduceat(values['low'], starts),
+                'close': values['close'][ends],
+                'volume': np.add.reduceat(values['volume'], starts),
+                'amount': np.add.reduceat(values['amount'], starts),
+            }
+            # 以周期的结束时刻标记
+            slots = (groups[starts] + 1) * freq - 1
+        date = datetime.date.fromordinal(day) if day > 0 else datetime.date.today()
+        return pd.DataFrame({
+            'date': slot_times(date, slots),
+            'open': values['open'].astype('float32'),
+            'high': values['high'].astype('float32'),
+            'low': values['low'].astype('float32'),
+            'close': values['close'].astype('float32'),
+            'volume': np.rint(values['volume']).astype('int64'),
+            'amount': values['amount'],
+        })
+
+
+class IntradayAggregator:
+    """各股票的1分钟K线缓冲区，行情快照逐笔写入"""
+
+    def __init__(self, capacity: int = INTRADAY_CAPACITY):
+        self.capacity = capacity
+        self._buffers: Dict[str, MinuteBarBuffer] = {}
+        self._lock = threading.Lock()
+
+    def buffer(self, code: str) -> MinuteBarBuffer:
+        """股票的缓冲区，没有时创建（不能在持有self._lock时调用）"""
+        if code not in self._buffers:
+            with self._lock:
+                self._buffers.setdefault(code, MinuteBarBuffer(self.capacity))
+        return self._buffers[code]
+
+    def on_quotes(self, quotes: pd.DataFrame, now: datetime.datetime) -> int:
+        """写入一批最新行情（stock_code, price, volume, amount，成交量/额为当日累计）
+
+        Returns:
+            int: 写入的行情数（开盘前的行情不计入）
+        """
+        slot = minute_slot(now.time())
+        if slot < 0 or quotes.empty:
+            return 0
+        day = now.date().toordinal()
+        codes = quotes['stock_code'].astype(str).to_numpy()
+        price = pd.to_numeric(quotes['price'], errors='coerce').to_numpy(dtype='float64')
+        volume = pd.to_numeric(quotes['volume'], errors='coerce').fillna(0).to_numpy(dtype='float64')
+        amount = pd.to_numeric(quotes['amount'], errors='coerce').fillna(0).to_numpy(dtype='float64')
+        written = 0
+        with self._lock:
+            for i in np.flatnonzero(np.isfinite(price) & (price > 0)):
+                buffer = self._buffers.get(codes[i])
+                if buffer is not None:
+                    buffer.update(day, slot, price[i], volume[i], amount[i])
+                    written += 1
+        return written
+
+    def remove(self, code: str) -> None:
+        """释放不再订阅的股票的缓冲区"""
+        with self._lock:
+            self._buffers.pop(code, None)
+
+    def clear(self) -> None:
+        """释放全部缓冲区"""
+        with self._lock:
+            self._buffers.clear()
+
+    def backfill(self, code: str, minutes: pd.DataFrame) -> None:
+        """用当日已有的分时数据（trade_time, price, volume, amount，每分钟一行）填充缓冲区"""
+        if minutes is None or minutes.empty:
+            return
+        times = pd.to_datetime(minutes['trade_time'])
+        day = times.iloc[-1].date().toordinal()
+        # 分时数据以分钟结束时刻标记，减去1秒后落在该分钟内
+        slots = np.array([minute_slot((t - pd.Timedelta(seconds=1)).time()) for t in times])
+        keep = slots >= 0
+        buffer = self.buffer(code)
+        with self._lock:
+            buffer.load(
+                day, slots[keep],
+                pd.to_numeric(minutes['price'], errors='coerce').to_numpy(dtype='float64')[keep],
+                pd.to_numeric(minutes['volume'], errors='coerce').fillna(0).to_numpy(dtype='float64')[keep],
+                pd.to_numeric(minutes['amount'], errors='coerce').fillna(0).to_numpy(dtype='float64')[keep],
+            )
+
+
+class IntradayFeed:
+    """后台行情任务：交易时段内定时批量拉取已订阅股票的最新行情，写入分钟K线缓冲区"""
+
+    def __init__(self, aggregator: Optional[IntradayAggregator] = None):
+        self.aggregator = aggregator or IntradayAggregator()
+        # 股票代码 -> 最近一次页面读取的时间
+        self._subscriptions: Dict[str, float] = {}
+        self._task = None
+
+    def subscribe(self, code: str) -> None:
+        """订阅（或续订）一只股票的行情"""
+        self._subscriptions[code] = time.monotonic()
+        self.aggregator.buffer(code)
+
+    def clear(self) -> None:
+        """取消全部订阅并释放缓冲区"""
+        self._subscriptions.clear()
+        self.aggregator.clear()
+
+    def symbols(self) -> List[str]:
+        """仍在订阅期内的股票，超过SUBSCRIPTION_IDLE没有读取的自动取消并释放其缓冲区"""
+        now = time.monotonic()
+        for code, last in list(self._subscriptions.items()):
+            if now - last > SUBSCRIPTION_IDLE:
+                self._subscriptions.pop(code, None)
+                self.aggregator.remove(code)
+        return sorted(self._subscriptions)
+
+    async def run(self, interval: float = TICK_INTERVAL):
+        """后台循环：交易时段内拉取订阅股票的最新行情（一次批量请求）"""
+        from adata_ui.utils.data_loader import DataLoader
+        from adata_ui.utils.materialize import in_session, market_now
+
+        loader = DataLoader()
+        while True:
+            try:
+                symbols = self.symbols()
+                if symbols and in_session():
+                    quotes = await loader.get_quotes(symbols, max_age=0)
+                    self.aggregator.on_quotes(quotes, market_now())
+            except Exception as e:
+                print(f"更新分时行情失败: {str(e)}")
+            await asyncio.sleep(interval)
+
+    def ensure_started(self) -> None:
+        """首次订阅时启动后台任务"""
+        if self._task is None or self._task.done():
+            from nicegui import background_tasks
+            self._task = background_tasks.create(self.run(), name='intraday_feed')
+
+
+# 进程内共享的分时行情任务
+intraday_feed = IntradayFeed()
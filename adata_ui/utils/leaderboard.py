@@ -0,0 +1,316 @@
+# 行情排行榜模块
+# 服务端统一维护涨幅、跌幅、换手率、量比和概念强度排行，页面只读取结果。
+# 每次全市场快照更新时，先向量化比较新旧两列找出变化的股票，排行只在
+# “原前K名 ∪ 变化的股票”中用堆取前K，不对全市场重新排序；
+# 概念强度按成员关系的反向索引只更新包含变化股票的概念
+import os
+import time
+import heapq
+import asyncio
+import numpy as np
+from typing import Dict, List, Optional
+
+# 快照检查间隔（秒）
+LEADERBOARD_INTERVAL = float(os.environ.get('ADATA_UI_LEADERBOARD_INTERVAL', 15))
+# 概念成员关系刷新间隔（秒）
+MEMBERSHIP_TTL = float(os.environ.get('ADATA_UI_MEMBERSHIP_TTL', 3600))
+
+
+class Leaderboard:
+    """增量维护的前K名
+
+    Args:
+        name: 排行榜标识
+        label: 显示名称
+        size: 保留的名次数
+        ascending: True时取最小的K个（如跌幅榜）
+    """
+
+    def __init__(self, name: str, label: str, size: int = 10, ascending: bool = False):
+        self.name = name
+        self.label = label
+        self.size = size
+        self.ascending = ascending
+        self.top = np.empty(0, dtype='int64')
+        # 第K名的排序键，未入榜的元素排序键都不小于它
+        self._threshold = np.inf
+        # 统计：增量更新次数 / 退化为全量选择的次数
+        self.incremental_updates = 0
+        self.full_updates = 0
+
+    def _keys(self, values: np.ndarray) -> np.ndarray:
+        """排序键：越小越靠前，NaN排在最后"""
+        keys = values.astype('float64') if self.ascending else -values.astype('float64')
+        keys[np.isnan(keys)] = np.inf
+        return keys
+
+    def _select(self, ids: np.ndarray, keys: np.ndarray) -> None:
+        best = heapq.nsmallest(self.size, zip(keys.tolist(), ids.tolist()))
+        self.top = np.array([i for _, i in best], dtype='int64')
+        self._threshold = best[-1][0] if len(best) == self.size else np.inf
+
+    def reset(self, values: np.ndarray) -> None:
+        """全量选择前K名（初始化或股票列表变化时）"""
+        keys = self._keys(values)
+        ids = np.arange(len(values))
+        if len(ids) > self.size:
+            ids = np.argpartition(keys, self.size - 1)[:self.size]
+        self._select(ids, keys[ids])
+        self.full_updates += 1
+
+    def update(self, values: np.ndarray, changed: np.ndarray) -> bool:
+        """按变化的元素更新前K名
+
+        Args:
+            values: 更新后的全部取值
+            changed: 取值发生变化的下标
+
+        Returns:
+            bool: 前K名（成员、顺序或取值）是否可能变化
+        """
+        if not len(changed):
+            return False
+        candidates = np.union1d(self.top, changed)
+        keys = self._keys(values[candidates])
+        best = heapq.nsmallest(self.size, zip(keys.tolist(), candidates.tolist()))
+        # 未变化的非榜内元素排序键都不小于旧门槛；候选中的第K名不超过旧门槛时结果精确，
+        # 否则（榜内元素变差后被挤出）退化为全量选择
+        if len(values) > len(candidates) and (len(best) < self.size or best[-1][0] > self._threshold):
+            self.reset(values)
+            return True
+        self.top = np.array([i for _, i in best], dtype='int64')
+        self._threshold = best[-1][0] if len(best) == self.size else np.inf
+        self.incremental_updates += 1
+        return True
+
+
+def changed_ids(old: Optional[np.ndarray], new: np.ndarray) -> np.ndarray:
+    """新旧两列中取值不同的下标（NaN与NaN视为相同）"""
+    if old is None or len(old) != len(new):
+        return np.arange(len(new))
+    same = (old == new) | (np.isnan(old) & np.isnan(new))
+    return np.flatnonzero(~same)
+
+
+class ConceptStrength:
+    """概念强度：成分股涨跌幅的平均值，按股票变化增量维护各概念的合计和有效成员数
+
+    Args:
+        concept_codes: 概念代码
+        concept_names: 概念名称
+        concept_index: 每条成员关系所属的概念下标
+        stock_rows: 每条成员关系对应的股票行号
+        stocks: 股票总数
+    """
+
+    def __init__(self, concept_codes: np.ndarray, concept_names: np.ndarray,
+                 concept_index: np.ndarray, stock_rows: np.ndarray, stocks: int):
+        self.codes = concept_codes
+        self.names = concept_names
+        # 按股票行号排序的反向索引（CSR）：row_indptr[r]:row_indptr[r+1] 为股票r所属的成员关系
+        order = np.argsort(stock_rows, kind='stable')
+        self._entry_concept = concept_index[order]
+        self._row_indptr = np.searchsorted(stock_rows[order], np.arange(stocks + 1))
+        self.members = np.bincount(concept_index, minlength=len(concept_codes))
+        self._sum = np.zeros(len(concept_codes))
+        self._count = np.zeros(len(concept_codes))
+
+    @property
+    def values(self) -> np.ndarray:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self._count > 0, self._sum / np.maximum(self._count, 1), np.nan)
+
+    def _entries(self, rows: np.ndarray):
+        """股票行号对应的所有成员关系：(成员关系所属概念, 成员关系对应的股票在rows中的位置)"""
+        starts = self._row_indptr[rows]
+        lengths = self._row_indptr[rows + 1] - starts
+        total = int(lengths.sum())
+        owner = np.repeat(np.arange(len(rows)), lengths)
+        offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return self._entry_concept[starts[owner] + offsets], owner
+
+    def update(self, rows: np.ndarray, old: Optional[np.ndarray], new: np.ndarray) -> np.ndarray:
+        """股票rows的涨跌幅从old变为new，返回受影响的概念下标"""
+        concepts, owner = self._entries(rows)
+        if not len(concepts):
+            return concepts
+        new_values = new[rows][owner]
+        valid_new = ~np.isnan(new_values)
+        np.add.at(self._sum, concepts[valid_new], new_values[valid_new])
+        np.add.at(self._count, concepts[valid_new], 1)
+        if old is not None:
+            old_values = old[rows][owner]
+            valid_old = ~np.isnan(old_values)
+            np.add.at(self._sum, concepts[valid_old], -old_values[valid_old])
+            np.add.at(self._count, concepts[valid_old], -1)
+        return np.unique(concepts)
+
+
+STOCK_BOARDS = (
+    # (标识, 显示名称, 快照字段, 是否升序)
+    ('gainers', '涨幅榜', 'change_pct', False),
+    ('losers', '跌幅榜', 'change_pct', True),
+    ('turnover', '换手率榜', 'turnover_ratio', False),
+    ('volume_ratio', '量比榜', 'volume_ratio', False),
+)
+
+
+class LeaderboardService:
+    """排行榜服务：后台跟随全市场快照更新，所有客户端共享同一份排行"""
+
+    def __init__(self, size: int = 10):
+        self.size = size
+        self.boards: Dict[str, Leaderboard] = {
+            name: Leaderboard(name, label, size, ascending) for name, label, _, ascending in STOCK_BOARDS
+        }
+        self.boards['concepts'] = Leaderboard('concepts', '概念强度榜', size)
+        self._fields = {name: field for name, _, field, _ in STOCK_BOARDS}
+        self.version = 0
+        self.snapshot_version: Optional[int] = None
+        self.updated: Optional[float] = None
+        self._codes: Optional[np.ndarray] = None
+        self._names: Optional[np.ndarray] = None
+        self._columns: Dict[str, np.ndarray] = {}
+        self._memberships = None
+        self._strength: Optional[ConceptStrength] = None
+        # 非交易时段使用的收盘物化排行（board -> 行），盘中为None
+        self._materialized: Optional[Dict[str, List[Dict]]] = None
+        self.materialized_version: Optional[str] = None
+        self._task = None
+
+    def set_memberships(self, memberships) -> None:
+        """设置概念成员关系（concept_code, concept_name, stock_code 三列的长表），下次更新时重建概念强度"""
+        self._memberships = memberships
+        self._strength = None
+
+    def _build_strength(self) -> Optional[ConceptStrength]:
+        df = self._memberships
+        if df is None or df.empty or self._codes is None:
+            return None
+        codes = df['stock_code'].astype(str).to_numpy(dtype=object)
+        rows = np.searchsorted(self._codes, codes)
+        rows = np.minimum(rows, len(self._codes) - 1)
+        found = self._codes[rows] == codes
+        concept_codes, concept_index = np.unique(df['concept_code'].astype(str).to_numpy(dtype=object), return_inverse=True)
+        names = df.astype({'concept_code': str}).drop_duplicates('concept_code').set_index('concept_code')['concept_name']
+        return ConceptStrength(concept_codes, names.reindex(concept_codes).astype(str).to_numpy(dtype=object),
+                               concept_index[found], rows[found], len(self._codes))
+
+    def load_materialized(self, tables) -> None:
+        """使用收盘后物化的排行（MaterializedTables），之后的盘中快照会全量重建排行"""
+        self._materialized = tables.leaderboards()
+        self.materialized_version = tables.version
+        self._codes = None
+        self._columns = {}
+        self._strength = None
+        self.snapshot_version = None
+        self.updated = tables.created
+        self.version += 1
+
+    def apply(self, snapshot) -> bool:
+        """用新的全市场快照更新排行
+
+        Args:
+            snapshot: MarketSnapshot
+
+        Returns:
+            bool: 是否有排行发生变化
+        """
+        self._materialized = None
+        self.materialized_version = None
+        codes_changed = self._codes is None or len(self._codes) != len(snapshot.codes) \
+            or not np.array_equal(self._codes, snapshot.codes)
+        if codes_changed:
+            self._codes, self._names = snapshot.codes, snapshot.names
+            self._columns = {}
+            self._strength = None
+
+        changed_any = False
+        fields = {field for field in self._fields.values()}
+        new_columns = {field: snapshot.field(field) if snapshot.has_field(field) else np.full(len(snapshot), np.nan)
+                       for field in fields}
+        changed = {field: changed_ids(self._columns.get(field), new_columns[field]) for field in fields}
+
+        for name, field in self._fields.items():
+            board = self.boards[name]
+            if codes_changed:
+                board.reset(new_columns[field])
+                changed_any = True
+            else:
+                changed_any |= board.update(new_columns[field], changed[field])
+
+        concept_board = self.boards['concepts']
+        if self._strength is None:
+            self._strength = self._build_strength()
+            if self._strength is not None:
+                rows = np.arange(len(self._codes))
+                self._strength.update(rows, None, new_columns['change_pct'])
+                concept_board.reset(self._strength.values)
+                changed_any = True
+        elif len(changed['change_pct']):
+            concepts = self._strength.update(changed['change_pct'], self._columns['change_pct'], new_columns['change_pct'])
+            changed_any |= concept_board.update(self._strength.values, concepts)
+
+        self._columns = new_columns
+        self.snapshot_version = snapshot.version
+        self.updated = snapshot.created
+        if changed_any:
+            self.version += 1
+        return changed_any
+
+    def rows(self, name: str) -> List[Dict]:
+        """排行榜的行：name, code, value（概念榜另有成分股数量）"""
+        if self._materialized is not None:
+            return self._materialized.get(name, [])
+        board = self.boards[name]
+        if name == 'concepts':
+            if self._strength is None:
+                return []
+            values = self._strength.values
+            return [{'code': self._strength.codes[i], 'name': self._strength.names[i],
+                     'value': _round(values[i]), 'members': int(self._strength.members[i])} for i in board.top]
+        if self._codes is None:
+            return []
+        values = self._columns[self._fields[name]]
+        return [{'code': self._codes[i], 'name': self._names[i], 'value': _round(values[i])}
+                for i in board.top if not np.isnan(values[i])]
+
+    async def run(self, interval: float = LEADERBOARD_INTERVAL, source: str = 'ths'):
+        """后台循环：定期获取全市场快照，快照版本变化时更新排行"""
+        from adata_ui.utils.data_loader import DataLoader
+        from adata_ui.utils.materialize import current_materialized
+
+        loader = DataLoader()
+        memberships_loaded = 0.0
+        while True:
+            try:
+                tables = current_materialized()
+                if tables is not None and 'leaderboards' in tables:
+                    # 非交易时段直接读取收盘后物化的排行
+                    if tables.version != self.materialized_version:
+                        self.load_materialized(tables)
+                else:
+                    if time.time() - memberships_loaded > MEMBERSHIP_TTL:
+                        loader.clear_cache()
+                        self.set_memberships(await loader.get_concept_memberships(source))
+                        memberships_loaded = time.time()
+                    snapshot = await loader.get_market_snapshot(max_age=interval)
+                    if snapshot.version != self.snapshot_version or self._strength is None:
+                        self.apply(snapshot)
+            except Exception as e:
+                print(f"更新排行榜失败: {str(e)}")
+            await asyncio.sleep(interval)
+
+    def ensure_started(self) -> None:
+        """首次访问时启动后台更新任务"""
+        if self._task is None or self._task.done():
+            from nicegui import background_tasks
+            self._task = background_tasks.create(self.run(), name='leaderboards')
+
+
+def _round(value, decimals: int = 2):
+    return None if np.isnan(value) else round(float(value), decimals)
+
+
+# 进程内共享的排行榜服务
+leaderboards = LeaderboardService()
@@ -0,0 +1,478 @@
+# 收盘后物化模块
+# 交易日15:00收盘后，到下一个交易时段开始前，行情、概念成分、指标和排行都不再变化。
+# 调度器在收盘后运行一次物化任务，把全市场行情快照、概念成员关系、概念聚合、指标列和排行榜
+# 写成带版本的列式表（每列一个 .npy 文件），CURRENT 原子指向最新版本；
+# 非交易时段的页面请求直接读取这些表，不再请求上游或重新计算
+import os
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import datetime
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from adata_ui.utils.trading_calendar import get_trading_calendar
+
+# 交易所时间（北京时间，无夏令时）
+MARKET_TZ = datetime.timezone(datetime.timedelta(hours=8), 'CST')
+# 交易时段：集合竞价开始到收盘
+SESSION_OPEN = datetime.time(9, 15)
+SESSION_CLOSE = datetime.time(15, 0)
+# 收盘后开始物化的时间，留出上游数据落地的时间
+EOD_TIME = datetime.time.fromisoformat(os.environ.get('ADATA_UI_EOD_TIME', '15:10'))
+# 调度器检查间隔（秒）
+CHECK_INTERVAL = float(os.environ.get('ADATA_UI_EOD_CHECK_INTERVAL', 60))
+# 保留的物化版本数
+KEEP_VERSIONS = int(os.environ.get('ADATA_UI_MATERIALIZED_KEEP', 5))
+CURRENT_FILE = 'CURRENT'
+FORMAT_VERSION = 1
+
+# 物化的指标列：N日均线、N日涨幅和量比（需要历史行情库）
+INDICATOR_FIELDS = ('ma_5', 'ma_10', 'ma_20', 'ma_60', 'return_5', 'return_20', 'return_60', 'volume_ratio')
+
+
+def market_now() -> datetime.datetime:
+    """当前的北京时间"""
+    return datetime.datetime.now(MARKET_TZ)
+
+
+def is_trading_day(date) -> bool:
+    """是否交易日（按沪深交易日历，节假日休市）"""
+    return bool(get_trading_calendar().is_trading_day(date))
+
+
+def previous_trading_day(date) -> datetime.date:
+    """date之前（不含）最近的交易日"""
+    return get_trading_calendar().previous(date).item()
+
+
+def in_session(now: Optional[datetime.datetime] = None) -> bool:
+    """是否处于交易时段（交易日的 9:15-15:00）"""
+    now = now or market_now()
+    return is_trading_day(now.date()) and SESSION_OPEN <= now.time() < SESSION_CLOSE
+
+
+def settled_date(now: Optional[datetime.datetime] = None) -> datetime.date:
+    """最近一个已收盘的交易日"""
+    now = now or market_now()
+    if is_trading_day(now.date()) and now.time() >= SESSION_CLOSE:
+        return now.date()
+    return previous_trading_day(now.date())
+
+
+def latest_bar_date(now: Optional[datetime.datetime] = None) -> datetime.date:
+    """最近一个已开盘的交易日，即最新一根日K线的日期（盘中为当日，开盘前为上一交易日）"""
+    now = now or market_now()
+    if is_trading_day(now.date()) and now.time() >= SESSION_OPEN:
+        return now.date()
+    return previous_trading_day(now.date())
+
+
+def _column_array(series: pd.Series) -> np.ndarray:
+    """DataFrame列转为可直接 np.save 的数组：数值原样，其余转为定长字符串（缺失为空串）"""
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        values = series.to_numpy()
+        if values.dtype == object:
+            values = series.to_numpy(dtype='float64', na_value=np.nan)
+        return values
+    return series.astype(object).where(series.notna(), '').astype(str).to_numpy(dtype=str)
+
+
+class MaterializationWriter:
+    """物化结果写入器
+
+    写入到新的版本目录（交易日-时间），commit() 时原子更新 CURRENT 指向该版本，
+    读者不会看到写了一半的结果；只保留最近KEEP_VERSIONS个版本
+    """
+
+    def __init__(self, directory, trade_date: str):
+        self.root = Path(directory)
+        self.trade_date = str(trade_date)
+        self.version = f"{self.trade_date}-{time.strftime('%H%M%S')}"
+        self.path = self.root / self.version
+        suffix = 1
+        while self.path.exists():
+            self.path = self.root / f'{self.version}-{suffix}'
+            suffix += 1
+        self.path.mkdir(parents=True)
+        self._tables: Dict[str, Dict] = {}
+        self._arrays: List[str] = []
+
+    def write_table(self, name: str, df: pd.DataFrame) -> None:
+        """写入一张表，每列一个 .npy 文件（按列序号命名）"""
+        table = self.path / name
+        table.mkdir()
+        text = []
+        for i, column in enumerate(df.columns):
+            values = _column_array(df[column])
+            if values.dtype.kind == 'U':
+                text.append(str(column))
+            np.save(table / f'{i}.npy', values, allow_pickle=False)
+        self._tables[name] = {'columns': [str(column) for column in df.columns], 'text': text, 'rows': len(df)}
+
+    def write_array(self, name: str, values: np.ndarray) -> None:
+        """写入一个数值数组（如收盘价矩阵）"""
+        np.save(self.path / f'{name}.npy', np.asarray(values), allow_pickle=False)
+        self._arrays.append(name)
+
+    def commit(self, **extra) -> Path:
+        """写入元数据，把 CURRENT 指向新版本，并清理旧版本"""
+        meta = {
+            'format_version': FORMAT_VERSION,
+            'version': self.path.name,
+            'trade_date': self.trade_date,
+            'created': time.time(),
+            'tables': self._tables,
+            'arrays': self._arrays,
+            **extra,
+        }
+        (self.path / 'meta.json').write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+        tmp = self.root / f'{CURRENT_FILE}.tmp'
+        tmp.write_text(self.path.name, encoding='utf-8')
+        os.replace(tmp, self.root / CURRENT_FILE)
+        versions = sorted(path for path in self.root.iterdir() if (path / 'meta.json').exists())
+        for path in versions[:-KEEP_VERSIONS]:
+            if path != self.path:
+                shutil.rmtree(path, ignore_errors=True)
+        return self.path
+
+    def abort(self) -> None:
+        """放弃写入并删除版本目录"""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class MaterializedTables:
+    """只读的物化结果
+
+    Args:
+        directory: 物化根目录（包含 CURRENT 文件）或某个版本目录
+    """
+
+    def __init__(self, directory):
+        root = Path(directory)
+        current = root / CURRENT_FILE
+        self.path = root / current.read_text(encoding='utf-8').strip() if current.exists() else root
+        meta_path = self.path / 'meta.json'
+        if not meta_path.exists():
+            raise FileNotFoundError(f'物化结果不存在: {self.path}')
+        self.meta = json.loads(meta_path.read_text(encoding='utf-8'))
+        if self.meta['format_version'] != FORMAT_VERSION:
+            raise Exception(f"不支持的物化结果版本: {self.meta['format_version']}")
+        self._tables: Dict[str, pd.DataFrame] = {}
+        self._snapshot = None
+        self._leaderboards: Optional[Dict[str, List[Dict]]] = None
+
+    @property
+    def version(self) -> str:
+        return self.meta['version']
+
+    @property
+    def trade_date(self) -> str:
+        return self.meta['trade_date']
+
+    @property
+    def created(self) -> float:
+        return self.meta['created']
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.meta['tables']
+
+    def table(self, name: str) -> pd.DataFrame:
+        """读取一张表（数值列为内存映射，只读）"""
+        if name not in self._tables:
+            info = self.meta['tables'][name]
+            data = {}
+            for i, column in enumerate(info['columns']):
+                path = self.path / name / f'{i}.npy'
+                if column in info['text']:
+                    data[column] = np.load(path).astype(object)
+                else:
+                    data[column] = np.load(path, mmap_mode='r')
+            self._tables[name] = pd.DataFrame(data, copy=False)
+        return self._tables[name]
+
+    def array(self, name: str) -> Optional[np.ndarray]:
+        """读取数值数组，不存在时返回None"""
+        if name not in self.meta['arrays']:
+            return None
+        return np.load(self.path / f'{name}.npy', mmap_mode='r')
+
+    def market_snapshot(self):
+        """还原收盘时的全市场快照，指标列已预先算好，选股时不再计算"""
+        if self._snapshot is None:
+            from adata_ui.utils.screener import MarketSnapshot
+
+            quotes = self.table('quotes')
+            columns = {column: quotes[column].to_numpy() for column in quotes.columns
+                       if column not in ('stock_code', 'short_name')}
+            indicators = self.table('indicators')
+            columns.update({column: indicators[column].to_numpy() for column in indicators.columns
+                            if column != 'stock_code'})
+            snapshot = MarketSnapshot(
+                quotes['stock_code'].to_numpy(dtype=object), quotes['short_name'].to_numpy(dtype=object), columns,
+                self.array('close'), self.array('volume'),
+                version=self.meta['snapshot_version'], history_version=self.meta['history_version']
+            )
+            snapshot.created = self.created
+            self._snapshot = snapshot
+        return self._snapshot
+
+    def leaderboards(self) -> Dict[str, List[Dict]]:
+        """各排行榜的行（与 LeaderboardService.rows 的格式相同）"""
+        if self._leaderboards is None:
+            df = self.table('leaderboards')
+            boards: Dict[str, List[Dict]] = {}
+            for board, code, name, value, members in zip(df['board'], df['code'], df['name'], df['value'], df['members']):
+                row = {'code': code, 'name': name, 'value': None if np.isnan(value) else float(value)}
+                if members >= 0:
+                    row['members'] = int(members)
+                boards.setdefault(board, []).append(row)
+            self._leaderboards = boards
+        return self._leaderboards
+
+
+def quote_table(snapshot) -> pd.DataFrame:
+    """行情快照的最新行情和基本面字段"""
+    from adata_ui.utils.screener import FUNDAMENTAL_FIELDS, QUOTE_FIELDS
+
+    fields = [name for name in (*QUOTE_FIELDS, *FUNDAMENTAL_FIELDS) if name != 'volume_ratio' and snapshot.has_field(name)]
+    return snapshot.to_frame(np.arange(len(snapshot)), fields)
+
+
+def indicator_table(snapshot) -> pd.DataFrame:
+    """预先计算的指标列，没有历史行情库时只有量比（行情接口提供时）"""
+    data = {'stock_code': snapshot.codes}
+    for name in INDICATOR_FIELDS:
+        if snapshot.has_field(name):
+            data[name] = snapshot.field(name)
+    return pd.DataFrame(data)
+
+
+def concept_aggregates(snapshot, memberships: pd.DataFrame) -> pd.DataFrame:
+    """按概念聚合成分股行情：成分股数量、平均涨跌幅、上涨/下跌家数、成交量和成交额合计
+
+    Args:
+        snapshot: 全市场快照（MarketSnapshot）
+        memberships: concept_code, concept_name, stock_code 三列的长表
+
+    Returns:
+        pd.DataFrame: concept_code, concept_name, stock_count, change, up, down, volume, amount
+    """
+    codes = memberships['stock_code'].astype(str).to_numpy(dtype=object)
+    rows = np.minimum(np.searchsorted(snapshot.codes, codes), max(len(snapshot) - 1, 0))
+    found = snapshot.codes[rows] == codes if len(snapshot) else np.zeros(len(codes), dtype=bool)
+
+    def column(name):
+        values = np.full(len(codes), np.nan)
+        values[found] = snapshot.field(name)[rows[found]]
+        return values
+
+    change = column('change_pct')
+    df = pd.DataFrame({
+        'concept_code': memberships['concept_code'].astype(str).to_numpy(),
+        'concept_name': memberships['concept_name'].astype(str).to_numpy(),
+        'change': change,
+        'up': change > 0,
+        'down': change < 0,
+        'volume': column('volume'),
+        'amount': column('amount'),
+    })
+    grouped = df.groupby('concept_code', sort=True)
+    return pd.DataFrame({
+        'concept_name': grouped['concept_name'].first(),
+        'stock_count': grouped.size(),
+        'change': grouped['change'].mean(),
+        'up': grouped['up'].sum(),
+        'down': grouped['down'].sum(),
+        'volume': grouped['volume'].sum(),
+        'amount': grouped['amount'].sum(),
+    }).reset_index()
+
+
+def leaderboard_table(snapshot, memberships: pd.DataFrame) -> pd.DataFrame:
+    """用收盘快照计算各排行榜，展开为 board, rank, code, name, value, members 的长表（非概念榜members为-1）"""
+    from adata_ui.utils.leaderboard import LeaderboardService
+
+    service = LeaderboardService()
+    service.set_memberships(memberships)
+    service.apply(snapshot)
+    records = []
+    for board in service.boards:
+        for rank, row in enumerate(service.rows(board), 1):
+            value = row['value']
+            records.append({'board': board, 'rank': rank, 'code': str(row['code']), 'name': str(row['name']),
+                            'value': np.nan if value is None else value, 'members': row.get('members', -1)})
+    return pd.DataFrame(records, columns=['board', 'rank', 'code', 'name', 'value', 'members'])
+
+
+def write_materialization(directory, trade_date: str, snapshot, memberships: pd.DataFrame,
+                          source: str = 'ths') -> Path:
+    """把收盘快照和概念成员关系物化为新版本
+
+    Args:
+        directory: 物化根目录
+        trade_date: 交易日
+        snapshot: 全市场快照（MarketSnapshot）
+        memberships: 概念成员关系
+        source: 概念数据源
+
+    Returns:
+        Path: 新版本目录
+    """
+    writer = MaterializationWriter(directory, trade_date)
+    try:
+        writer.write_table('quotes', quote_table(snapshot))
+        writer.write_table('indicators', indicator_table(snapshot))
+        if snapshot.close is not None:
+            writer.write_array('close', snapshot.close)
+            writer.write_array('volume', snapshot.volume)
+        writer.write_table(f'memberships_{source}', memberships)
+        writer.write_table(f'concepts_{source}', concept_aggregates(snapshot, memberships))
+        writer.write_table('leaderboards', leaderboard_table(snapshot, memberships))
+        return writer.commit(snapshot_version=snapshot.version, history_version=snapshot.history_version,
+                             source=source)
+    except BaseException:
+        writer.abort()
+        raise
+
+
+async def materialize(loader, directory, trade_date=None, source: str = 'ths') -> Path:
+    """收盘物化任务：重新拉取全市场行情和概念成员关系，计算并写入全部物化表
+
+    Args:
+        loader: DataLoader（使用新实例，避免读到盘中缓存）
+        directory: 物化根目录
+        trade_date: 交易日，默认最近一个已收盘的交易日
+        source: 概念数据源
+
+    Returns:
+        Path: 新版本目录
+    """
+    from adata_ui.utils.fundamentals import latest_fundamentals_snapshot
+    from adata_ui.utils.screener import build_market_snapshot
+
+    trade_date = str(trade_date or settled_date())
+    memberships = await loader.get_concept_memberships(source)
+    history = loader.history
+    snapshot = await loader.run_in_thread(build_market_snapshot, loader.backend, history,
+                                          fundamentals=latest_fundamentals_snapshot())
+    return await loader.run_in_thread(write_materialization, directory, trade_date, snapshot, memberships, source)
+
+
+_tables: Optional[MaterializedTables] = None
+_tables_mtime: Optional[float] = None
+
+
+def get_materialized() -> Optional[MaterializedTables]:
+    """获取最新的物化结果
+
+    由环境变量 ADATA_UI_MATERIALIZED_DIR 指定目录，未配置或尚未物化时返回None。
+    CURRENT 指向新版本后自动重新打开。
+    """
+    global _tables, _tables_mtime
+    directory = os.environ.get('ADATA_UI_MATERIALIZED_DIR')
+    if not directory:
+        return None
+    try:
+        mtime = (Path(directory) / CURRENT_FILE).stat().st_mtime
+    except OSError:
+        return None
+    if _tables is None or mtime != _tables_mtime:
+        try:
+            _tables, _tables_mtime = MaterializedTables(directory), mtime
+        except Exception as e:
+            print(f"打开物化结果失败: {str(e)}")
+            return None
+    return _tables
+
+
+def current_materialized(now: Optional[datetime.datetime] = None) -> Optional[MaterializedTables]:
+    """非交易时段且已物化最近一个收盘交易日时返回物化结果，否则返回None（需要实时数据）"""
+    tables = get_materialized()
+    if tables is None or in_session(now) or tables.trade_date != str(settled_date(now)):
+        return None
+    return tables
+
+
+class EodScheduler:
+    """收盘物化调度器：定期检查，最近一个收盘交易日尚未物化且已过EOD_TIME时运行一次物化任务
+
+    配置了历史行情库（ADATA_UI_HISTORY_DIR）时，物化前先增量同步当日K线
+    """
+
+    def __init__(self, directory, source: str = 'ths'):
+        self.directory = directory
+        self.source = source
+        self.last_run: Optional[str] = None
+        self._task = None
+
+    def due(self, now: Optional[datetime.datetime] = None) -> Optional[str]:
+        """需要物化的交易日，不需要时返回None"""
+        now = now or market_now()
+        if in_session(now):
+            return None
+        target = settled_date(now)
+        if target == now.date() and now.time() < EOD_TIME:
+            return None
+        tables = get_materialized()
+        if tables is not None and tables.trade_date >= str(target):
+            return None
+        return str(target)
+
+    async def run(self, interval: float = CHECK_INTERVAL):
+        """后台循环：到期时物化，失败时在下次检查时重试"""
+        from adata_ui.utils.data_loader import DataLoader
+
+        while True:
+            trade_date = self.due()
+            if trade_date is not None:
+                start = time.perf_counter()
+                try:
+                    loader = DataLoader()
+                    history_dir = os.environ.get('ADATA_UI_HISTORY_DIR')
+                    if history_dir:
+                        # 先把历史行情库增量同步到该交易日，指标列才包含当日K线
+                        from adata_ui.utils.history_sync import sync_history
+                        result = await loader.run_in_thread(sync_history, loader.backend, history_dir, end_date=trade_date)
+                        print(f"历史行情同步: 请求 {result['fetched']} 只, 新增 {result['rows']} 行")
+                    path = await materialize(loader, self.directory, trade_date, self.source)
+                    self.last_run = trade_date
+                    print(f"收盘物化完成: {path}，耗时 {time.perf_counter() - start:.1f}s")
+                except Exception as e:
+                    print(f"收盘物化失败: {str(e)}")
+            await asyncio.sleep(interval)
+
+    def start(self) -> None:
+        """启动后台调度任务"""
+        if self._task is None or self._task.done():
+            from nicegui import background_tasks
+            self._task = background_tasks.create(self.run(), name='eod_materialize')
+
+
+def main(argv=None):
+    """命令行入口：立即物化一次"""
+    from adata_ui.utils.backend import MockBackend, create_backend
+    from adata_ui.utils.data_loader import DataLoader
+
+    parser = argparse.ArgumentParser(description='物化收盘后的行情快照、概念聚合、指标和排行')
+    parser.add_argument('--dir', default=os.environ.get('ADATA_UI_MATERIALIZED_DIR', 'materialized'), help='物化目录')
+    parser.add_argument('--date', default=None, help='交易日，默认最近一个已收盘的交易日')
+    parser.add_argument('--source', default='ths', help='概念数据源')
+    parser.add_argument('--backend', default=None, help='数据后端，默认按ADATA_UI_BACKEND')
+    parser.add_argument('--mock', action='store_true', help='使用模拟数据（无网络环境）')
+    args = parser.parse_args(argv)
+
+    backend = MockBackend(latency=0) if args.mock else create_backend(args.backend)
+    start = time.perf_counter()
+    path = asyncio.run(materialize(DataLoader(backend), args.dir, args.date, args.source))
+    tables = MaterializedTables(path)
+    rows = ', '.join(f"{name} {info['rows']}行" for name, info in tables.meta['tables'].items())
+    print(f'物化完成: {rows}, 耗时 {time.perf_counter() - start:.1f}s -> {path}')
+
+
+if __name__ == '__main__':
+    main()
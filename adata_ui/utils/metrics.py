@@ -0,0 +1,292 @@
+# 运行时指标模块
+# 轻量的Prometheus文本格式指标：计数器、仪表、直方图，以及事件循环延迟采样
+import time
+import asyncio
+import inspect
+import threading
+import functools
+import contextvars
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from adata_ui.utils.profiling import profiler
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """指标基类，按标签值分组保存数据"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        """返回 (样本名, 标签名, 标签值, 数值) 列表"""
+        raise NotImplementedError
+
+    def expose(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for sample_name, names, values, value in self.samples():
+            lines.append(f'{sample_name}{_format_labels(names, values)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """单调递增计数器"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self.labelnames, key, value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(Metric):
+    """可增可减的仪表，也可以在采集时通过回调取值"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self._callback is not None:
+            return [(self.name, (), (), self._callback())]
+        with self._lock:
+            return [(self.name, self.labelnames, key, value) for key, value in sorted(self._values.items())]
+
+
+class Histogram(Metric):
+    """累积分桶直方图"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def samples(self):
+        result = []
+        with self._lock:
+            for key in sorted(self._counts):
+                cumulative = 0
+                for bound, count in zip(self.buckets, self._counts[key]):
+                    cumulative += count
+                    result.append((f'{self.name}_bucket', self.labelnames + ('le',),
+                                   key + (_format_value(bound),), cumulative))
+                result.append((f'{self.name}_count', self.labelnames, key, cumulative))
+                result.append((f'{self.name}_sum', self.labelnames, key, self._sums[key]))
+        return result
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def expose(self) -> str:
+        return '\n'.join(metric.expose() for metric in self._metrics.values()) + '\n'
+
+
+def _active_clients() -> float:
+    """当前保持websocket连接的客户端数"""
+    from nicegui import Client
+    return sum(1 for client in Client.instances.values() if client.has_socket_connection)
+
+
+registry = Registry()
+
+LOOP_LAG = registry.register(Histogram(
+    'adata_ui_event_loop_lag_seconds', '事件循环调度延迟',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)))
+PAGE_SECONDS = registry.register(Histogram(
+    'adata_ui_page_handler_seconds', '页面处理函数耗时', ('page',)))
+PAGE_ERRORS = registry.register(Counter(
+    'adata_ui_page_handler_errors_total', '页面处理函数异常次数', ('page',)))
+LOADER_SECONDS = registry.register(Histogram(
+    'adata_ui_loader_call_seconds', 'DataLoader方法耗时', ('method', 'source', 'cache')))
+UPSTREAM_SECONDS = registry.register(Histogram(
+    'adata_ui_upstream_request_seconds', '数据后端（上游）请求耗时', ('method', 'backend')))
+UPSTREAM_ERRORS = registry.register(Counter(
+    'adata_ui_upstream_errors_total', '数据后端（上游）请求失败次数', ('method', 'backend')))
+ACTIVE_CLIENTS = registry.register(Gauge(
+    'adata_ui_active_clients', '当前连接的客户端数', callback=_active_clients))
+POOL_SIZE = registry.register(Gauge(
+    'adata_ui_loader_pool_size', 'DataLoader线程池最大线程数'))
+POOL_INFLIGHT = registry.register(Gauge(
+    'adata_ui_loader_pool_inflight', 'DataLoader线程池中已提交未完成的任务数'))
+POOL_RUNNING = registry.register(Gauge(
+    'adata_ui_loader_pool_running', 'DataLoader线程池中正在执行的任务数'))
+COMPUTE_SECONDS = registry.register(Histogram(
+    'adata_ui_compute_task_seconds', '计算进程池任务耗时（含共享内存传递）', ('task',)))
+COMPUTE_INFLIGHT = registry.register(Gauge(
+    'adata_ui_compute_inflight', '计算进程池中已提交未完成的任务数'))
+
+
+# 当前DataLoader调用的缓存命中情况，由被计时的方法内部标记
+_cache_state: contextvars.ContextVar = contextvars.ContextVar('adata_ui_cache_state', default='none')
+
+
+def note_cache(hit: bool) -> None:
+    """在DataLoader方法中标记本次调用是否命中缓存"""
+    _cache_state.set('hit' if hit else 'miss')
+
+
+def timed_loader(method: Callable) -> Callable:
+    """DataLoader方法计时装饰器，按方法名、数据源（source参数）和缓存命中打标签
+
+    方法被启用剖析（loader:<方法名>）时同时采集剖析数据。
+    """
+    name = method.__name__
+    signature = inspect.signature(method)
+    source_default = signature.parameters['source'].default if 'source' in signature.parameters else '-'
+
+    def observe(args, kwargs, start, token):
+        source = source_default
+        if source_default != '-':
+            bound = signature.bind_partial(*args, **kwargs)
+            source = bound.arguments.get('source', source_default)
+        LOADER_SECONDS.observe(time.perf_counter() - start, method=name, source=source, cache=_cache_state.get())
+        _cache_state.reset(token)
+
+    if asyncio.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(*args, **kwargs):
+            token = _cache_state.set('none')
+            start = time.perf_counter()
+            try:
+                with profiler.capture('loader', name):
+                    return await method(*args, **kwargs)
+            finally:
+                observe(args, kwargs, start, token)
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        token = _cache_state.set('none')
+        start = time.perf_counter()
+        try:
+            with profiler.capture('loader', name):
+                return method(*args, **kwargs)
+        finally:
+            observe(args, kwargs, start, token)
+    return wrapper
+
+
+def timed_page(page: str) -> Callable:
+    """页面处理函数计时装饰器，需放在 @ui.page 之下
+
+    页面被启用剖析（page:<路径>）时同时采集剖析数据。
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    with profiler.capture('page', page):
+                        return await func(*args, **kwargs)
+                except Exception:
+                    PAGE_ERRORS.inc(page=page)
+                    raise
+                finally:
+                    PAGE_SECONDS.observe(time.perf_counter() - start, page=page)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                with profiler.capture('page', page):
+                    return func(*args, **kwargs)
+            except Exception:
+                PAGE_ERRORS.inc(page=page)
+                raise
+            finally:
+                PAGE_SECONDS.observe(time.perf_counter() - start, page=page)
+        return wrapper
+    return decorator
+
+
+def observe_upstream(method: str, backend: str, seconds: float, failed: bool = False) -> None:
+    """记录一次数据后端请求"""
+    UPSTREAM_SECONDS.observe(seconds, method=method, backend=backend)
+    if failed:
+        UPSTREAM_ERRORS.inc(method=method, backend=backend)
+
+
+async def sample_loop_lag(interval: float = 0.5) -> None:
+    """周期性睡眠，把实际唤醒时间超出预期的部分记为事件循环延迟"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
+
+
+def render_metrics() -> str:
+    """导出Prometheus文本格式"""
+    return registry.expose()
@@ -0,0 +1,259 @@
+# 按需性能剖析模块
+# 为指定页面的后续N次交互或DataLoader方法的后续N次调用采集cProfile/采样剖析，
+# 结果写入磁盘（pstats / speedscope JSON），在管理页面中列出
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import cProfile
+import functools
+import threading
+import contextlib
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROFILE_MODES = ('cprofile', 'sample')
+
+
+class ProfileTarget:
+    """一个待剖析的目标，kind为page或loader"""
+
+    def __init__(self, kind: str, name: str, count: int, mode: str = 'cprofile'):
+        if kind not in ('page', 'loader'):
+            raise ValueError(f'未知的剖析目标类型: {kind}')
+        if mode not in PROFILE_MODES:
+            raise ValueError(f'未知的剖析方式: {mode}')
+        self.kind = kind
+        self.name = name
+        self.remaining = count
+        self.mode = mode
+
+    @property
+    def key(self) -> str:
+        return f'{self.kind}:{self.name}'
+
+
+class StackSampler(threading.Thread):
+    """采样剖析器：定期读取目标线程的调用栈"""
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        super().__init__(daemon=True, name='adata_profile_sampler')
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: List[tuple] = []
+        self.weights: List[float] = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        last = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)  # pylint: disable=protected-access
+            now = time.perf_counter()
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            # speedscope要求从根到叶的顺序
+            self.samples.append(tuple(reversed(stack)))
+            self.weights.append(now - last)
+            last = now
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def to_speedscope(self, name: str) -> dict:
+        """转换为speedscope的sampled格式"""
+        frames: List[dict] = []
+        frame_index: Dict[tuple, int] = {}
+        samples = []
+        for stack in self.samples:
+            indexes = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+                indexes.append(frame_index[frame])
+            samples.append(indexes)
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'adata_ui',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(self.weights),
+                'samples': samples,
+                'weights': self.weights
+            }]
+        }
+
+
+class Profiler:
+    """剖析开关与采集
+
+    通过 arm() 或环境变量 ADATA_UI_PROFILE（如 "loader:get_concept_stocks=5,page:/concept=3"）
+    启用。未启用任何目标时 capture() 只做一次字典查询。
+    同一线程上同时只进行一次采集；事件循环线程上的异步采集会包含期间交错执行的其他任务。
+    """
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory or os.environ.get('ADATA_UI_PROFILE_DIR', 'profiles'))
+        self._targets: Dict[str, ProfileTarget] = {}
+        self._lock = threading.Lock()
+        self._active = threading.local()
+
+    def arm(self, kind: str, name: str, count: int = 1, mode: str = 'cprofile') -> ProfileTarget:
+        """启用剖析：目标的后续count次调用将被采集
+
+        Args:
+            kind: 目标类型，page（页面及其交互）或 loader（DataLoader方法）
+            name: 页面路径（如 /concept）或DataLoader方法名
+            count: 采集次数
+            mode: cprofile 或 sample（采样，输出speedscope格式）
+
+        Returns:
+            ProfileTarget: 启用的目标
+        """
+        target = ProfileTarget(kind, name, int(count), mode)
+        with self._lock:
+            self._targets[target.key] = target
+        return target
+
+    def disarm(self, key: str) -> None:
+        """取消剖析目标"""
+        with self._lock:
+            self._targets.pop(key, None)
+
+    def armed(self) -> List[ProfileTarget]:
+        """当前启用的目标"""
+        with self._lock:
+            return list(self._targets.values())
+
+    def arm_from_env(self, spec: Optional[str] = None) -> None:
+        """按 "kind:name=count[@mode],..." 格式启用目标"""
+        spec = spec if spec is not None else os.environ.get('ADATA_UI_PROFILE', '')
+        for item in filter(None, (part.strip() for part in spec.split(','))):
+            match = re.fullmatch(r'(page|loader):([^=@]+)(?:=(\d+))?(?:@(\w+))?', item)
+            if not match:
+                print(f"忽略无效的剖析配置: {item}")
+                continue
+            kind, name, count, mode = match.groups()
+            self.arm(kind, name, int(count or 1), mode or 'cprofile')
+
+    def _claim(self, key: str) -> Optional[ProfileTarget]:
+        """占用一次采集次数，用完后自动取消目标"""
+        with self._lock:
+            target = self._targets.get(key)
+            if target is None:
+                return None
+            target.remaining -= 1
+            if target.remaining <= 0:
+                del self._targets[key]
+            return target
+
+    def _unclaim(self, target: ProfileTarget) -> None:
+        """归还一次未能采集的次数（目标已用完被取消、且没有重新启用时恢复）"""
+        with self._lock:
+            target.remaining += 1
+            self._targets.setdefault(target.key, target)
+
+    @contextlib.contextmanager
+    def capture(self, kind: str, name: str):
+        """如果目标已启用，剖析with块中的代码并写入文件"""
+        key = f'{kind}:{name}'
+        if key not in self._targets or getattr(self._active, 'on', False):
+            yield
+            return
+        target = self._claim(key)
+        if target is None:
+            yield
+            return
+
+        start = time.perf_counter()
+        if target.mode == 'sample':
+            sampler = StackSampler(threading.get_ident())
+            sampler.start()
+        else:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError as e:
+                # 其他线程上的cProfile仍在运行（Python 3.12起剖析器全局唯一）
+                print(f"启动剖析失败: {str(e)}")
+                self._unclaim(target)
+                yield
+                return
+        self._active.on = True
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._active.on = False
+            if target.mode == 'sample':
+                sampler.stop()
+                self._write(key, elapsed, 'speedscope.json',
+                            lambda path: path.write_text(json.dumps(sampler.to_speedscope(key)), encoding='utf-8'))
+            else:
+                profile.disable()
+                self._write(key, elapsed, 'pstats', lambda path: profile.dump_stats(str(path)))
+
+    def _write(self, key: str, elapsed: float, suffix: str, dump) -> None:
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            slug = re.sub(r'[^\w.-]', '_', key).strip('_')
+            path = self.directory / f"{time.strftime('%Y%m%d-%H%M%S')}_{slug}_{int(elapsed * 1000)}ms.{suffix}"
+            dump(path)
+        except Exception as e:
+            print(f"写入剖析文件失败: {str(e)}")
+
+    def list_profiles(self) -> List[dict]:
+        """已写入的剖析文件，按时间倒序"""
+        if not self.directory.is_dir():
+            return []
+        files = [p for p in self.directory.iterdir() if p.suffix in ('.pstats', '.json')]
+        files.sort(key=lambda p: p.stat().st_mtime, reverse=True)
+        return [{
+            'name': p.name,
+            'size_kb': round(p.stat().st_size / 1024, 1),
+            'created': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(p.stat().st_mtime)),
+            'format': 'speedscope' if p.name.endswith('.speedscope.json') else 'pstats'
+        } for p in files]
+
+    def profile_path(self, name: str) -> Optional[Path]:
+        """按文件名取剖析文件路径，拒绝目录之外的路径"""
+        path = (self.directory / name).resolve()
+        if path.parent != self.directory.resolve() or not path.is_file():
+            return None
+        return path
+
+
+# 全局剖析器实例
+profiler = Profiler()
+profiler.arm_from_env()
+
+
+def profile_interaction(page: str):
+    """页面交互处理函数的剖析装饰器，页面目标启用时生效"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with profiler.capture('page', page):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profiler.capture('page', page):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,178 @@
+# 实时行情存储模块
+# 全市场最新行情按字段存成预分配的numpy列，每只股票分配一个整数编号作为行号；
+# 每次拉取到的行情按编号向量化原地写入，各页面（概念成分股、选股、个股信息等）按编号花式索引取出自己的行。
+# 写入前后各递增一次版本号（写入中为奇数），读取时版本号前后一致且为偶数即为一致的快照，读取不加锁
+import os
+import time
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 行情字段，行情接口不提供的字段（如adata没有买一/卖一价）为NaN
+QUOTE_COLUMNS = ('price', 'change', 'change_pct', 'volume', 'amount', 'bid', 'ask', 'pe', 'pb', 'turnover_ratio')
+# 预分配的股票数，超过后按倍数扩容
+QUOTE_CAPACITY = int(os.environ.get('ADATA_UI_QUOTE_CAPACITY', 8192))
+# 交易时段内行情的有效期（秒），超过后再次读取时重新拉取
+QUOTE_TTL = float(os.environ.get('ADATA_UI_QUOTE_TTL', 10))
+# 读取时遇到并发写入的重试次数，超过后加锁读取
+READ_RETRIES = 3
+
+
+class _QuoteArrays:
+    """某一容量下的全部列，扩容时整体替换，读取方持有的旧引用仍然完整"""
+
+    def __init__(self, capacity: int, previous: Optional['_QuoteArrays'] = None):
+        self.codes = np.empty(capacity, dtype=object)
+        self.names = np.empty(capacity, dtype=object)
+        self.columns = {name: np.full(capacity, np.nan) for name in QUOTE_COLUMNS}
+        # 各行最后一次写入的时间（time.time()）和版本号
+        self.updated_at = np.zeros(capacity)
+        self.updated_version = np.zeros(capacity, dtype='int64')
+        self.size = 0
+        self.index = pd.Index([], dtype=object)
+        if previous is not None:
+            n = previous.size
+            self.codes[:n], self.names[:n] = previous.codes[:n], previous.names[:n]
+            for name, values in previous.columns.items():
+                self.columns[name][:n] = values[:n]
+            self.updated_at[:n] = previous.updated_at[:n]
+            self.updated_version[:n] = previous.updated_version[:n]
+            self.size, self.index = n, previous.index
+
+
+class QuoteStore:
+    """进程内共享的最新行情
+
+    Args:
+        capacity: 预分配的股票数
+    """
+
+    def __init__(self, capacity: int = QUOTE_CAPACITY):
+        self._arrays = _QuoteArrays(capacity)
+        self._lock = threading.Lock()
+        # 写入中为奇数
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self._arrays.size
+
+    def ids(self, codes: Sequence[str]) -> np.ndarray:
+        """股票代码对应的编号，没有行情的代码为-1"""
+        return self._arrays.index.get_indexer(pd.Index(codes, dtype=object).astype(str))
+
+    def _assign(self, codes: np.ndarray) -> np.ndarray:
+        """为新代码分配编号（需持有写锁、版本号为奇数时调用），必要时扩容"""
+        arrays = self._arrays
+        ids = arrays.index.get_indexer(codes)
+        new = pd.unique(codes[ids < 0])
+        if len(new):
+            if arrays.size + len(new) > len(arrays.codes):
+                capacity = len(arrays.codes)
+                while capacity < arrays.size + len(new):
+                    capacity *= 2
+                arrays = _QuoteArrays(capacity, arrays)
+            arrays.codes[arrays.size:arrays.size + len(new)] = new
+            arrays.size += len(new)
+            arrays.index = pd.Index(arrays.codes[:arrays.size])
+            self._arrays = arrays
+            ids = arrays.index.get_indexer(codes)
+        return ids
+
+    def update(self, quotes: pd.DataFrame, now: Optional[float] = None) -> int:
+        """写入一批行情（list_market_current 的返回），同一代码出现多次时以最后一行为准
+
+        Returns:
+            int: 写入后的版本号
+        """
+        if quotes is None or quotes.empty:
+            return self.version
+        quotes = quotes.drop_duplicates('stock_code', keep='last')
+        codes = quotes['stock_code'].astype(str).to_numpy(dtype=object)
+        now = time.time() if now is None else now
+        with self._lock:
+            self.version += 1
+            try:
+                ids = self._assign(codes)
+                arrays = self._arrays
+                for name in QUOTE_COLUMNS:
+                    if name in quotes.columns:
+                        arrays.columns[name][ids] = pd.to_numeric(quotes[name], errors='coerce').to_numpy(dtype='float64')
+                if 'short_name' in quotes.columns:
+                    arrays.names[ids] = quotes['short_name'].to_numpy(dtype=object)
+                arrays.updated_at[ids] = now
+                arrays.updated_version[ids] = self.version + 1
+            finally:
+                self.version += 1
+        return self.version
+
+    def clear(self) -> None:
+        """清空全部行情（版本号继续递增）"""
+        with self._lock:
+            self.version += 1
+            try:
+                self._arrays = _QuoteArrays(len(self._arrays.codes))
+            finally:
+                self.version += 1
+
+    def _take(self, codes, fields) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        arrays = self._arrays
+        ids = arrays.index.get_indexer(pd.Index(codes, dtype=object).astype(str))
+        rows = np.where(ids < 0, 0, ids)
+        missing = ids < 0
+        values = {}
+        for name in fields:
+            column = arrays.columns[name][rows]
+            column[missing] = np.nan
+            values[name] = column
+        names = arrays.names[rows]
+        names[missing] = None
+        values['short_name'] = names
+        return ids, values
+
+    def snapshot(self, codes: Sequence[str], fields: Optional[Sequence[str]] = None) -> Tuple[int, np.ndarray, Dict[str, np.ndarray]]:
+        """一致地取出一组股票的行情（不加锁，遇到并发写入时重试）
+
+        Args:
+            codes: 股票代码
+            fields: 字段，默认全部 QUOTE_COLUMNS
+
+        Returns:
+            tuple: (版本号, 编号（没有行情为-1）, 字段名 -> 与codes对应的数组（含short_name）)
+        """
+        fields = list(fields or QUOTE_COLUMNS)
+        for _ in range(READ_RETRIES):
+            version = self.version
+            if version % 2 == 0:
+                ids, values = self._take(codes, fields)
+                if self.version == version:
+                    return version, ids, values
+            time.sleep(0)
+        with self._lock:
+            ids, values = self._take(codes, fields)
+            return self.version, ids, values
+
+    def frame(self, codes: Sequence[str], fields: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """有行情的股票的 stock_code, short_name 和各字段（按传入顺序）"""
+        _, ids, values = self.snapshot(codes, fields)
+        known = ids >= 0
+        columns = {'stock_code': np.asarray(codes, dtype=object)[known]}
+        columns.update((name, column[known]) for name, column in values.items())
+        return pd.DataFrame(columns)
+
+    def stale(self, codes: Sequence[str], since: float) -> List[str]:
+        """没有行情或最后一次写入早于since（time.time()）的代码"""
+        arrays = self._arrays
+        ids = arrays.index.get_indexer(pd.Index(codes, dtype=object).astype(str))
+        updated = np.where(ids < 0, -np.inf, arrays.updated_at[np.where(ids < 0, 0, ids)])
+        return [code for code, old in zip(codes, updated < since) if old]
+
+    def changed_since(self, version: int) -> np.ndarray:
+        """版本号version之后写入过的股票代码"""
+        arrays = self._arrays
+        n = arrays.size
+        return arrays.codes[:n][arrays.updated_version[:n] > version]
+
+
+# 进程内共享的行情存储
+quote_store = QuoteStore()
@@ -0,0 +1,77 @@
+# 数据结构模块
+# 缓存数据的紧凑列类型：日期用datetime64，价格用float32，成交量用int64，代码/名称用category。
+# 只在数据加载器边界转换为该结构，显示格式（字符串日期等）只在UI层生成
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable
+
+BAR_COLUMNS = ['date', 'open', 'close', 'high', 'low', 'volume', 'amount']
+
+# K线列类型；日期为秒精度，与历史库文件一致，可以零拷贝映射；
+# 成交额数值可达1e10以上，float32精度不足，保留float64
+BAR_SCHEMA: Dict[str, str] = {
+    'date': 'datetime64[s]',
+    'open': 'float32',
+    'close': 'float32',
+    'high': 'float32',
+    'low': 'float32',
+    'volume': 'int64',
+    'amount': 'float64',
+}
+
+# 代码表、概念列表中按category存储的列
+CATEGORY_COLUMNS = ('stock_code', 'short_name', 'exchange', 'list_date',
+                    'concept_code', 'index_code', 'concept_name', 'name', 'source')
+
+
+def empty_bars() -> pd.DataFrame:
+    """符合K线结构的空DataFrame"""
+    return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in BAR_SCHEMA.items()})
+
+
+def compact_bars(df: pd.DataFrame) -> pd.DataFrame:
+    """将K线转换为紧凑结构
+
+    Args:
+        df: 包含 date/open/close/high/low/volume/amount 列的DataFrame，date可以是字符串
+
+    Returns:
+        pd.DataFrame: 按BAR_SCHEMA转换类型后的新DataFrame
+    """
+    if df is None or df.empty:
+        return empty_bars()
+    columns = {'date': pd.to_datetime(df['date']).astype(BAR_SCHEMA['date']).to_numpy()}
+    for column in ('open', 'close', 'high', 'low'):
+        columns[column] = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype='float32')
+    volume = pd.to_numeric(df['volume'], errors='coerce').fillna(0)
+    columns['volume'] = np.rint(volume.to_numpy(dtype='float64')).astype('int64')
+    columns['amount'] = pd.to_numeric(df['amount'], errors='coerce').to_numpy(dtype='float64')
+    return pd.DataFrame(columns)
+
+
+def compact_codes(df: pd.DataFrame, columns: Iterable[str] = CATEGORY_COLUMNS,
+                  max_unique_ratio: float = 0.5) -> pd.DataFrame:
+    """将代码、名称等重复度高的字符串列转换为category
+
+    取值基本唯一的列（如代码表中的stock_code）转为category反而更占内存，保持原样。
+
+    Args:
+        df: pandas DataFrame
+        columns: 候选列
+        max_unique_ratio: 不同取值数/行数 不超过该比例时才转换
+
+    Returns:
+        pd.DataFrame: 新的DataFrame
+    """
+    df = df.copy()
+    for column in columns:
+        if column not in df.columns or isinstance(df[column].dtype, pd.CategoricalDtype):
+            continue
+        if df[column].nunique() <= max(1, len(df) * max_unique_ratio):
+            df[column] = df[column].astype('category')
+    return df
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """DataFrame实际占用的内存（包含字符串对象）"""
+    return int(df.memory_usage(index=True, deep=True).sum())
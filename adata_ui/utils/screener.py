@@ -0,0 +1,385 @@
+# 全市场选股模块
+# 把全市场最新行情和历史行情库中最近若干交易日的收盘价/成交量组织成列式快照：
+# 每个字段一个按股票代码排列的numpy数组，历史部分为 股票数 x 交易日数 的矩阵。
+# 选股条件在整列上做向量化比较，多个条件按位与组合，Top N 用 argpartition 做部分排序
+import os
+import re
+import time
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+from adata_ui.utils.fundamentals import latest_fundamentals_snapshot
+from adata_ui.utils.materialize import latest_bar_date
+from adata_ui.utils.quote_store import quote_store
+
+# 历史矩阵保留的交易日数，决定可用的最大N日涨幅和均线周期
+LOOKBACK = int(os.environ.get('ADATA_UI_SCREENER_LOOKBACK', 130))
+# 快照有效期（秒），期间的查询都直接复用同一份快照
+SNAPSHOT_TTL = float(os.environ.get('ADATA_UI_SCREENER_TTL', 60))
+
+# 从最新行情中取的字段，行情接口不提供的字段为NaN
+QUOTE_FIELDS = ('price', 'change_pct', 'volume', 'amount', 'pe', 'pb', 'turnover_ratio', 'volume_ratio')
+
+# 可用于筛选和排序的字段；return_N（N日涨幅%）和 ma_N（N日均线）按需计算
+FIELD_LABELS = {
+    'price': '现价',
+    'change_pct': '涨跌幅(%)',
+    'pe': '市盈率',
+    'pb': '市净率',
+    'volume_ratio': '量比',
+    'turnover_ratio': '换手率(%)',
+    'amount': '成交额',
+    'volume': '成交量',
+    'roe': 'ROE(%)',
+    'gross_margin': '毛利率(%)',
+    'debt_ratio': '资产负债率(%)',
+}
+# 来自基本面快照（adata_ui.utils.fundamentals）的字段，快照尚未构建时为NaN
+FUNDAMENTAL_FIELDS = ('roe', 'gross_margin', 'debt_ratio')
+
+_DERIVED = re.compile(r'^(return|ma)_(\d+)$')
+
+
+class MarketSnapshot:
+    """全市场列式快照
+
+    Args:
+        codes: 股票代码（升序）
+        names: 股票名称
+        columns: 字段名到数组的映射，与codes一一对应
+        close: 收盘价矩阵（股票数 x 交易日数，最后一列为最新），无历史行情库时为None
+        volume: 成交量矩阵，形状同close
+        version: 快照版本号，每次重建递增
+    """
+
+    def __init__(self, codes: np.ndarray, names: np.ndarray, columns: Dict[str, np.ndarray],
+                 close: Optional[np.ndarray] = None, volume: Optional[np.ndarray] = None,
+                 version: int = 0, history_version: Optional[str] = None):
+        self.codes = codes
+        self.names = names
+        self.close = close
+        self.volume = volume
+        self.version = version
+        self.history_version = history_version
+        self.created = time.time()
+        self._columns = dict(columns)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def lookback(self) -> int:
+        """历史矩阵的交易日数"""
+        return 0 if self.close is None else self.close.shape[1]
+
+    def _require_history(self, days: int):
+        if self.close is None:
+            raise ValueError('该条件需要历史行情库，请设置 ADATA_UI_HISTORY_DIR')
+        if days < 1 or days >= self.lookback:
+            raise ValueError(f'周期必须在 1 到 {self.lookback - 1} 之间: {days}')
+
+    def field(self, name: str) -> np.ndarray:
+        """取整列数据，派生字段计算一次后缓存在快照上"""
+        if name in self._columns:
+            return self._columns[name]
+        match = _DERIVED.match(name)
+        if match:
+            kind, days = match.group(1), int(match.group(2))
+            self._require_history(days)
+            if kind == 'return':
+                values = (self.close[:, -1] / self.close[:, -1 - days] - 1) * 100
+            else:
+                values = self.moving_average(days)
+        elif name == 'volume_ratio':
+            # 行情接口不提供量比时，用最新成交量 / 前5日平均成交量
+            self._require_history(5)
+            values = self.volume[:, -1] / self.volume[:, -6:-1].mean(axis=1)
+        else:
+            raise ValueError(f'未知的选股字段: {name}')
+        self._columns[name] = values
+        return values
+
+    def has_field(self, name: str) -> bool:
+        """字段是否可用（派生字段需要历史行情库）"""
+        try:
+            self.field(name)
+            return True
+        except ValueError:
+            return False
+
+    def moving_average(self, days: int, shift: int = 0) -> np.ndarray:
+        """最近第shift个交易日的N日均线（数据不足N日时为NaN）"""
+        self._require_history(days + shift)
+        end = self.close.shape[1] - shift
+        return self.close[:, end - days:end].mean(axis=1)
+
+    def cross(self, fast: int, slow: int) -> np.ndarray:
+        """最新交易日的均线交叉：1为金叉（快线上穿慢线），-1为死叉，0为无交叉
+
+        fast为1时快线即收盘价，可用于判断股价上穿/跌破均线
+        """
+        key = f'cross_{fast}_{slow}'
+        if key not in self._columns:
+            diff_now = self.moving_average(fast) - self.moving_average(slow)
+            diff_prev = self.moving_average(fast, 1) - self.moving_average(slow, 1)
+            signal = np.zeros(len(self), dtype='int8')
+            signal[(diff_prev <= 0) & (diff_now > 0)] = 1
+            signal[(diff_prev >= 0) & (diff_now < 0)] = -1
+            self._columns[key] = signal
+        return self._columns[key]
+
+    def to_frame(self, rows: np.ndarray, fields: List[str]) -> pd.DataFrame:
+        """按行号取出指定字段，返回DataFrame"""
+        data = {'stock_code': self.codes[rows], 'short_name': self.names[rows]}
+        for name in fields:
+            if name not in data:
+                data[name] = self.field(name)[rows]
+        return pd.DataFrame(data)
+
+
+class Condition:
+    """选股条件，mask() 返回与快照等长的布尔数组"""
+
+    def mask(self, snapshot: MarketSnapshot) -> np.ndarray:
+        raise NotImplementedError
+
+    @property
+    def fields(self) -> List[str]:
+        """结果中需要展示的字段"""
+        return []
+
+
+class RangeCondition(Condition):
+    """字段取值区间 [low, high]，任一端为None表示不限；NaN不满足任何区间"""
+
+    def __init__(self, field: str, low: Optional[float] = None, high: Optional[float] = None):
+        if field not in FIELD_LABELS and not _DERIVED.match(field):
+            raise ValueError(f'未知的选股字段: {field}')
+        self.field = field
+        self.low = low
+        self.high = high
+
+    def mask(self, snapshot):
+        values = snapshot.field(self.field)
+        result = ~np.isnan(values)
+        if self.low is not None:
+            result &= values >= self.low
+        if self.high is not None:
+            result &= values <= self.high
+        return result
+
+    @property
+    def fields(self):
+        return [self.field]
+
+
+class CrossCondition(Condition):
+    """均线交叉：direction为up（金叉）或down（死叉）"""
+
+    def __init__(self, fast: int, slow: int, direction: str = 'up'):
+        if fast >= slow:
+            raise ValueError(f'快线周期必须小于慢线周期: {fast}, {slow}')
+        if direction not in ('up', 'down'):
+            raise ValueError(f'未知的交叉方向: {direction}')
+        self.fast = fast
+        self.slow = slow
+        self.direction = direction
+
+    def mask(self, snapshot):
+        return snapshot.cross(self.fast, self.slow) == (1 if self.direction == 'up' else -1)
+
+    @property
+    def fields(self):
+        return [f'ma_{self.slow}'] if self.fast == 1 else [f'ma_{self.fast}', f'ma_{self.slow}']
+
+
+def parse_conditions(params: Dict[str, str]) -> List[Condition]:
+    """从查询参数解析选股条件
+
+    区间写作 field=low,high（任一端可省略，如 change_pct=2, 或 pe=,30），
+    均线交叉写作 cross=fast,slow[,up|down]
+
+    Args:
+        params: 查询参数
+
+    Returns:
+        List[Condition]: 选股条件
+    """
+    conditions: List[Condition] = []
+    for name, value in params.items():
+        parts = [part.strip() for part in str(value).split(',')]
+        try:
+            if name == 'cross':
+                direction = parts[2] if len(parts) > 2 and parts[2] else 'up'
+                conditions.append(CrossCondition(int(parts[0]), int(parts[1]), direction))
+            else:
+                low = float(parts[0]) if parts[0] else None
+                high = float(parts[1]) if len(parts) > 1 and parts[1] else None
+                conditions.append(RangeCondition(name, low, high))
+        except (IndexError, TypeError, ValueError) as e:
+            raise ValueError(f'无法解析选股条件 {name}={value}: {str(e)}')
+    return conditions
+
+
+def top_n(values: np.ndarray, rows: np.ndarray, limit: int, ascending: bool = False) -> np.ndarray:
+    """在候选行中按values取前limit行（NaN排在最后），只对前limit行做完整排序"""
+    if limit <= 0 or not len(rows):
+        return rows[:0]
+    key = values[rows].astype('float64')
+    key = key if ascending else -key
+    key[np.isnan(key)] = np.inf
+    if limit < len(rows):
+        part = np.argpartition(key, limit - 1)[:limit]
+    else:
+        part = np.arange(len(rows))
+    return rows[part[np.argsort(key[part], kind='stable')]]
+
+
+def screen(snapshot: MarketSnapshot, conditions: List[Condition], sort_by: str = 'change_pct',
+           ascending: bool = False, limit: Optional[int] = 50) -> Tuple[pd.DataFrame, int]:
+    """执行选股
+
+    Args:
+        snapshot: 全市场快照
+        conditions: 选股条件，全部满足才入选
+        sort_by: 排序字段
+        ascending: 是否升序
+        limit: 返回前N只，None表示全部
+
+    Returns:
+        tuple: (入选股票的DataFrame, 入选总数)
+    """
+    mask = np.ones(len(snapshot), dtype=bool)
+    for condition in conditions:
+        mask &= condition.mask(snapshot)
+    rows = np.flatnonzero(mask)
+    total = len(rows)
+    rows = top_n(snapshot.field(sort_by), rows, total if limit is None else limit, ascending)
+
+    fields = ['price', 'change_pct', 'pe', 'pb', 'turnover_ratio']
+    if snapshot.has_field('volume_ratio'):
+        fields.append('volume_ratio')
+    for name in [sort_by] + [f for condition in conditions for f in condition.fields]:
+        if name not in fields:
+            fields.append(name)
+    return snapshot.to_frame(rows, fields), total
+
+
+def history_matrices(history, codes: np.ndarray, lookback: int) -> Tuple[np.ndarray, np.ndarray]:
+    """从历史行情库取每只股票最近lookback个交易日的收盘价和成交量矩阵
+
+    一次性按偏移索引生成行号矩阵，对内存映射的整列做花式索引；
+    上市不足lookback日或不在库中的股票，缺失部分为NaN（靠左）。
+    """
+    store_codes = np.asarray(history.codes)
+    offsets = np.asarray(history.offsets)
+    pos = np.clip(np.searchsorted(store_codes, codes), 0, max(len(store_codes) - 1, 0))
+    found = (store_codes[pos] == codes) if len(store_codes) else np.zeros(len(codes), dtype=bool)
+    start = np.where(found, offsets[pos], 0)
+    end = np.where(found, offsets[np.minimum(pos + 1, len(offsets) - 1)], 0)
+
+    index = end[:, None] - lookback + np.arange(lookback)
+    valid = index >= start[:, None]
+    index = np.where(valid, index, 0)
+    close = np.asarray(history.column('close'))[index].astype('float64')
+    volume = np.asarray(history.column('volume'))[index].astype('float64')
+    close[~valid] = np.nan
+    volume[~valid] = np.nan
+    return close, volume
+
+
+def build_market_snapshot(backend, history=None, lookback: int = LOOKBACK, version: int = 0,
+                          fundamentals=None) -> MarketSnapshot:
+    """拉取全市场代码和最新行情，结合历史行情库和基本面快照构建快照
+
+    Args:
+        backend: 数据后端
+        history: 历史行情库（HistoryStore），None时只能按行情字段筛选
+        lookback: 历史矩阵的交易日数
+        version: 快照版本号
+        fundamentals: 基本面快照（FundamentalsSnapshot），None时基本面字段为NaN
+
+    Returns:
+        MarketSnapshot: 全市场快照
+    """
+    all_code = backend.all_code().drop_duplicates('stock_code')
+    all_code['stock_code'] = all_code['stock_code'].astype(str)
+    all_code = all_code.sort_values('stock_code')
+    codes = all_code['stock_code'].to_numpy(dtype=object)
+
+    quotes = backend.list_market_current(codes.tolist())
+    # 全市场行情同时写入共享的行情存储，其他页面按代码读取时不再重复请求
+    quote_store.update(quotes)
+    quotes = quotes.assign(stock_code=quotes['stock_code'].astype(str)).drop_duplicates('stock_code', keep='last')
+    quotes = quotes.set_index('stock_code').reindex(codes)
+    columns = {}
+    for name in QUOTE_FIELDS:
+        if name in quotes.columns:
+            columns[name] = pd.to_numeric(quotes[name], errors='coerce').to_numpy(dtype='float64')
+        elif name != 'volume_ratio':
+            # 量比缺失时由历史成交量派生，其余缺失字段为NaN
+            columns[name] = np.full(len(codes), np.nan)
+    if fundamentals is not None:
+        # 按代码从基本面快照取列；行情接口不提供估值（如adata）时用快照中的市盈率/市净率
+        extra = fundamentals.reindex(codes, list(FUNDAMENTAL_FIELDS) + ['pe_ttm', 'pb'])
+        columns['pe'] = np.where(np.isnan(columns['pe']), extra.pop('pe_ttm'), columns['pe'])
+        columns['pb'] = np.where(np.isnan(columns['pb']), extra.pop('pb'), columns['pb'])
+        columns.update(extra)
+    else:
+        columns.update({name: np.full(len(codes), np.nan) for name in FUNDAMENTAL_FIELDS})
+
+    close = volume = None
+    if history is not None:
+        close, volume = history_matrices(history, codes, lookback)
+        # 历史库截止日早于最近一个已开盘的交易日时，最新行情即该交易日的K线，拼到矩阵末尾；
+        # 周末、节假日和开盘前最新行情就是库中最后一日，不再重复拼接
+        if pd.Timestamp(history.end_date).date() < latest_bar_date():
+            close = np.column_stack([close[:, 1:], columns['price']])
+            volume = np.column_stack([volume[:, 1:], columns['volume']])
+
+    return MarketSnapshot(
+        codes, all_code['short_name'].astype(str).to_numpy(dtype=object), columns, close, volume,
+        version=version, history_version=None if history is None else history.version
+    )
+
+
+_snapshot: Optional[MarketSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def cached_market_snapshot(history=None, max_age: Optional[float] = None) -> Optional[MarketSnapshot]:
+    """返回未过期的共享快照，没有时返回None"""
+    snapshot = _snapshot
+    max_age = SNAPSHOT_TTL if max_age is None else max_age
+    if snapshot is None or time.time() - snapshot.created > max_age:
+        return None
+    if snapshot.history_version != (None if history is None else history.version):
+        return None
+    return snapshot
+
+
+def get_market_snapshot(backend, history=None, max_age: Optional[float] = None) -> MarketSnapshot:
+    """获取进程内共享的全市场快照，过期或历史库更新后重建
+
+    同一时间只有一个线程重建，其他线程等待后直接复用结果。基本面字段取最近一次构建的
+    基本面快照，不在这里触发全市场基本面的批量拉取。
+    """
+    global _snapshot
+    snapshot = cached_market_snapshot(history, max_age)
+    if snapshot is not None:
+        return snapshot
+    with _snapshot_lock:
+        snapshot = cached_market_snapshot(history, max_age)
+        if snapshot is None:
+            version = _snapshot.version + 1 if _snapshot is not None else 1
+            snapshot = _snapshot = build_market_snapshot(backend, history, version=version,
+                                                         fundamentals=latest_fundamentals_snapshot())
+        return snapshot
+
+
+def to_records(df: pd.DataFrame, decimals: int = 4) -> List[Dict]:
+    """转换为可JSON序列化的记录，NaN转为None"""
+    df = df.round(decimals)
+    return df.astype(object).where(df.notna(), None).to_dict('records')
@@ -0,0 +1,283 @@
+# 交易日历模块
+# 沪深交易所的交易日预先取出存为一个升序的 datetime64[D] 数组，
+# 判断交易日、区间内交易日计数、前后第N个交易日、周/月末交易日等都用 searchsorted 向量化完成；
+# 缓存缺口检测据此区分"缺少K线"和"节假日本就没有K线"，不再反复请求补不上的缺口
+import os
+import time
+import asyncio
+import datetime
+import functools
+import threading
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+# 日历覆盖的起始年份（沪市1990年12月开市）
+CALENDAR_START_YEAR = 1990
+# 重采样周期：周K、月K
+PERIOD_FREQS = ('W', 'M')
+# 后端不可用、暂按周一至周五推算时，重新获取交易日历的间隔（秒）
+CALENDAR_RETRY = float(os.environ.get('ADATA_UI_CALENDAR_RETRY', 300))
+
+
+def _days(dates) -> np.ndarray:
+    """日期（字符串、Timestamp、date或其数组）转为 datetime64[D] 数组"""
+    return np.asarray(pd.to_datetime(np.atleast_1d(np.asarray(dates, dtype=object))), dtype='datetime64[D]')
+
+
+def _weekdays(start: str, end: str) -> np.ndarray:
+    """start至end（含）之间的周一至周五"""
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    return days[np.is_busday(days)]
+
+
+def _result(values: np.ndarray, dates):
+    """标量输入返回标量，数组输入返回数组"""
+    return values[0] if np.ndim(dates) == 0 else values
+
+
+class TradingCalendar:
+    """沪深交易日历
+
+    各方法的日期参数可以是单个日期或日期数组，标量输入返回标量，数组输入返回数组
+
+    Args:
+        days: 交易日（任意可转为日期的序列），内部去重排序为 datetime64[D]
+        end: 日历覆盖的最后一天，之后的日期按周一至周五推算
+    """
+
+    def __init__(self, days, end=None):
+        days = np.unique(_days(days)) if len(days) else np.empty(0, dtype='datetime64[D]')
+        self.end = _days(end)[0] if end is not None else (days[-1] if len(days) else None)
+        if self.end is not None:
+            # 覆盖范围之后补一年的周一至周五，年末附近的偏移、前后交易日查询不会越界
+            extra = np.arange(self.end + 1, self.end + 367, dtype='datetime64[D]')
+            days = np.concatenate([days[days <= self.end], extra[np.is_busday(extra)]])
+        self.days = days
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def is_trading_day(self, dates):
+        """是否交易日"""
+        days = _days(dates)
+        pos = np.clip(np.searchsorted(self.days, days), 0, max(len(self.days) - 1, 0))
+        found = (self.days[pos] == days) if len(self.days) else np.zeros(len(days), dtype=bool)
+        # 日历覆盖范围之后的日期（未公布的年份）按周一至周五推算
+        beyond = days > self.end if self.end is not None else np.ones(len(days), dtype=bool)
+        found = np.where(beyond, np.is_busday(days), found)
+        return _result(found, dates)
+
+    def count(self, start, end):
+        """[start, end] 闭区间内的交易日数"""
+        left = np.searchsorted(self.days, _days(start), side='left')
+        right = np.searchsorted(self.days, _days(end), side='right')
+        counts = np.maximum(right - left, 0)
+        return counts if np.ndim(start) or np.ndim(end) else counts[0]
+
+    def range(self, start, end) -> np.ndarray:
+        """[start, end] 闭区间内的全部交易日"""
+        left = np.searchsorted(self.days, _days(start)[0], side='left')
+        right = np.searchsorted(self.days, _days(end)[0], side='right')
+        return self.days[left:right]
+
+    def rollback(self, dates):
+        """不晚于date的最近一个交易日（date是交易日时为其本身）"""
+        days = _days(dates)
+        pos = np.searchsorted(self.days, days, side='right') - 1
+        if (pos < 0).any():
+            raise ValueError(f'日期早于交易日历起点: {self.days[0] if len(self.days) else "空日历"}')
+        return _result(self.days[pos], dates)
+
+    def rollforward(self, dates):
+        """不早于date的最近一个交易日（date是交易日时为其本身）"""
+        days = _days(dates)
+        pos = np.searchsorted(self.days, days, side='left')
+        if (pos >= len(self.days)).any():
+            raise ValueError(f'日期晚于交易日历终点: {self.days[-1] if len(self.days) else "空日历"}')
+        return _result(self.days[pos], dates)
+
+    def offset(self, dates, n: int):
+        """date之后第n个交易日（n为负数时为之前第-n个），date本身不计入
+
+        Args:
+            dates: 日期或日期数组
+            n: 偏移的交易日数
+        """
+        days = _days(dates)
+        # 先定位到date之前(含)/之后(含)的交易日，再按位置偏移
+        if n >= 0:
+            pos = np.searchsorted(self.days, days, side='right') - 1 + n
+        else:
+            pos = np.searchsorted(self.days, days, side='left') + n
+        if (pos < 0).any() or (pos >= len(self.days)).any():
+            raise ValueError(f'偏移超出交易日历范围: {n}')
+        return _result(self.days[pos], dates)
+
+    def previous(self, dates):
+        """date之前（不含）最近的交易日"""
+        return self.offset(dates, -1)
+
+    def next(self, dates):
+        """date之后（不含）最近的交易日"""
+        return self.offset(dates, 1)
+
+    def period_ends(self, freq: str, start=None, end=None) -> np.ndarray:
+        """区间内每周/每月的最后一个交易日
+
+        Args:
+            freq: 'W'（周）或 'M'（月）
+            start: 开始日期，默认日历起点
+            end: 结束日期，默认日历终点
+        """
+        days = self.days
+        if start is not None or end is not None:
+            days = self.range(start if start is not None else days[0], end if end is not None else days[-1])
+        periods = self.periods(days, freq)
+        # 下一个交易日属于不同周期的即为周期内最后一个交易日
+        last = np.append(periods[1:] != periods[:-1], True) if len(periods) else np.empty(0, dtype=bool)
+        return days[last]
+
+    @staticmethod
+    def periods(dates, freq: str) -> np.ndarray:
+        """日期所属的周期编号：周为周一起算的周序号，月为 datetime64[M]"""
+        if freq not in PERIOD_FREQS:
+            raise ValueError(f'不支持的周期: {freq}')
+        days = _days(dates)
+        if freq == 'M':
+            return days.astype('datetime64[M]')
+        # 1970-01-01是周四，偏移3天后按7天整除即为周一起算的周序号
+        return (days.astype('int64') + 3) // 7
+
+
+def resample_bars(bars: pd.DataFrame, freq: str) -> pd.DataFrame:
+    """把日K线重采样为周K或月K
+
+    按交易日所属周期分组：开盘取首日、收盘取末日、最高/最低取极值、成交量/额求和，
+    日期为该周期内最后一个有K线的交易日（节假日所在的周、停牌期间不会多出空K线）
+
+    Args:
+        bars: 按日期升序的 date/open/close/high/low/volume/amount 紧凑K线
+        freq: 'W'（周）或 'M'（月）
+
+    Returns:
+        pd.DataFrame: 同样列结构的周期K线
+    """
+    if bars.empty:
+        return bars
+    periods = TradingCalendar.periods(bars['date'].to_numpy(), freq)
+    starts = np.flatnonzero(np.append(True, periods[1:] != periods[:-1]))
+    ends = np.append(starts[1:], len(bars)) - 1
+    return pd.DataFrame({
+        'date': bars['date'].to_numpy()[ends],
+        'open': bars['open'].to_numpy()[starts],
+        'close': bars['close'].to_numpy()[ends],
+        'high': np.maximum.reduceat(bars['high'].to_numpy(), starts),
+        'low': np.minimum.reduceat(bars['low'].to_numpy(), starts),
+        'volume': np.add.reduceat(bars['volume'].to_numpy(), starts),
+        'amount': np.add.reduceat(bars['amount'].to_numpy(), starts),
+    })
+
+
+def build_trading_calendar(backend, end_year: Optional[int] = None) -> TradingCalendar:
+    """从数据后端取交易日历
+
+    后端没有返回的年份（如尚未公布的下一年）按周一至周五推算
+
+    Args:
+        backend: 数据后端
+        end_year: 日历覆盖到的年份，默认今年
+
+    Returns:
+        TradingCalendar: 交易日历
+    """
+    end_year = end_year or datetime.date.today().year
+    df = backend.trade_calendar(CALENDAR_START_YEAR)
+    days = pd.to_datetime(df.loc[df['trade_status'].astype(int) == 1, 'trade_date'])
+    days = days[(days.dt.year >= CALENDAR_START_YEAR) & (days.dt.year <= end_year)]
+    end = f'{end_year}-12-31'
+    covered = set(days.dt.year)
+    missing = [year for year in range(CALENDAR_START_YEAR, end_year + 1) if year not in covered]
+    if missing:
+        print(f"交易日历缺少 {missing[0]}-{missing[-1]} 年中的 {len(missing)} 年，按周一至周五推算")
+        weekdays = np.concatenate([_weekdays(f'{year}-01-01', f'{year}-12-31') for year in missing])
+        days = np.concatenate([days.to_numpy(dtype='datetime64[D]'), weekdays])
+    return TradingCalendar(days, end=end)
+
+
+_calendar: Optional[TradingCalendar] = None
+_calendar_year: Optional[int] = None
+# 当前日历是后端不可用时的推算结果时，为下次重试的时间（time.monotonic()），否则为None
+_retry_at: Optional[float] = None
+_calendar_lock = threading.Lock()
+_loader: Optional[threading.Thread] = None
+_loader_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=2)
+def _weekday_calendar(year: int) -> TradingCalendar:
+    """按周一至周五推算的日历"""
+    return TradingCalendar(_weekdays(f'{CALENDAR_START_YEAR}-01-01', f'{year}-12-31'), end=f'{year}-12-31')
+
+
+def _usable(year: int) -> bool:
+    return _calendar is not None and _calendar_year == year and (_retry_at is None or time.monotonic() < _retry_at)
+
+
+def _load(year: int) -> None:
+    """从共享数据后端取日历（阻塞，需持有_calendar_lock），失败时暂用推算的日历并在CALENDAR_RETRY秒后重试"""
+    global _calendar, _calendar_year, _retry_at
+    from adata_ui.utils.backend import get_backend
+
+    try:
+        calendar, retry_at = build_trading_calendar(get_backend(), year), None
+    except Exception as e:
+        print(f"获取交易日历失败: {str(e)}")
+        calendar, retry_at = _weekday_calendar(year), time.monotonic() + CALENDAR_RETRY
+    _calendar, _calendar_year, _retry_at = calendar, year, retry_at
+
+
+def _load_in_background(year: int) -> None:
+    """在后台线程中获取日历（同一时间只有一个）"""
+    global _loader
+
+    def run():
+        with _calendar_lock:
+            if not _usable(year):
+                _load(year)
+
+    with _loader_lock:
+        if _loader is None or not _loader.is_alive():
+            _loader = threading.Thread(target=run, name='trading_calendar', daemon=True)
+            _loader.start()
+
+
+def get_trading_calendar() -> TradingCalendar:
+    """获取进程内共享的交易日历
+
+    首次使用时从共享数据后端取出一次，跨年后重新获取；后端不可用时按周一至周五推算，
+    并每CALENDAR_RETRY秒重试。在事件循环中调用时不阻塞：日历尚未取到时先返回推算的日历，
+    在后台线程中获取（应用启动时已在线程池中预先加载，见 main.py）
+    """
+    year = datetime.date.today().year
+    if _usable(year):
+        return _calendar
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        with _calendar_lock:
+            if not _usable(year):
+                _load(year)
+            return _calendar
+    _load_in_background(year)
+    calendar = _calendar
+    return calendar if calendar is not None and _calendar_year == year else _weekday_calendar(year)
+
+
+def set_trading_calendar(calendar: Optional[TradingCalendar]) -> None:
+    """替换进程内共享的交易日历（传None则下次从数据后端重新获取）"""
+    global _calendar, _calendar_year, _retry_at
+    with _calendar_lock:
+        _calendar = calendar
+        _calendar_year = datetime.date.today().year if calendar is not None else None
+        _retry_at = None
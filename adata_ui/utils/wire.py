@@ -0,0 +1,208 @@
+# 列式传输格式模块
+# 表格和图表的数据按列发送，不再逐行重复列名、逐个数值转成文本：
+# - 数值列编码为 {dtype, bdata}（小端二进制的base64，与plotly.js的typed array格式相同）
+# - 价格等定点小数按 scale 放大为整数，日期按天数编码；相邻差值更小时按差分（delta）存储，选能容纳的最小整数类型
+# - 字符串列按字典编码（去重后的取值 + 整数下标）
+# 浏览器端由 adata_ui/components/columnar.js 解码
+import base64
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Optional
+
+# numpy类型 -> typed array类型（plotly.js支持的子集，不支持64位整数）
+TYPED_DTYPES = {
+    'float64': 'f8', 'float32': 'f4',
+    'int32': 'i4', 'int16': 'i2', 'int8': 'i1',
+    'uint32': 'u4', 'uint16': 'u2', 'uint8': 'u1',
+}
+# 整数编码依次尝试的类型
+INT_DTYPES = ('int8', 'int16', 'int32')
+# 浮点列依次尝试的小数位数（能无损表示为定点数时按整数编码）
+FIXED_DECIMALS = (0, 1, 2, 3, 4)
+
+
+def _bdata(values: np.ndarray) -> str:
+    values = np.ascontiguousarray(values)
+    return base64.b64encode(values.astype(values.dtype.newbyteorder('<'), copy=False).tobytes()).decode('ascii')
+
+
+def _smallest_int(values: np.ndarray) -> Optional[str]:
+    """能容纳所有取值的最小整数类型，超出int32时返回None"""
+    if values.size == 0:
+        return 'int8'
+    low, high = values.min(), values.max()
+    for dtype in INT_DTYPES:
+        info = np.iinfo(dtype)
+        if low >= info.min and high <= info.max:
+            return dtype
+    return None
+
+
+def typed_array(values) -> Dict:
+    """将数值数组编码为typed array（plotly.js可以直接使用）
+
+    64位整数在int32范围内时按i4编码，否则按f8编码（2^53以内精确）；布尔按u1编码
+
+    Args:
+        values: 一维数值数组或Series
+
+    Returns:
+        dict: {'dtype': 'f4', 'bdata': base64字符串}
+    """
+    values = np.asarray(values)
+    if values.dtype == bool:
+        values = values.astype('uint8')
+    elif values.dtype.kind in 'iu' and values.dtype.name not in TYPED_DTYPES:
+        values = values.astype('int32' if _smallest_int(values) else 'float64')
+    elif values.dtype.name not in TYPED_DTYPES:
+        values = values.astype('float64')
+    return {'dtype': TYPED_DTYPES[values.dtype.name], 'bdata': _bdata(values)}
+
+
+def date_array(values) -> Dict:
+    """将日期编码为毫秒时间戳的typed array（f8，缺失为NaN），plotly.js的日期坐标轴可以直接使用"""
+    values = pd.to_datetime(pd.Series(values)).to_numpy().astype('datetime64[ms]')
+    ms = values.astype('int64').astype('float64')
+    ms[np.isnat(values)] = np.nan
+    return typed_array(ms)
+
+
+def integer_array(values: np.ndarray, **extra) -> Optional[Dict]:
+    """整数数组的紧凑编码：直接存储或存储相邻差值，取占用字节更少的一种
+
+    差分存储时首个值单独放在 'start' 中，数组的第一个元素为0
+
+    Returns:
+        dict: {'dtype', 'bdata', 'start'(差分时), **extra}；超出int32范围时返回None
+    """
+    values = np.asarray(values, dtype='int64')
+    plain = _smallest_int(values)
+    if values.size > 1:
+        deltas = np.diff(values, prepend=values[0])
+        delta = _smallest_int(deltas)
+        if delta is not None and abs(int(values[0])) < 2 ** 53 and (
+                plain is None or np.dtype(delta).itemsize < np.dtype(plain).itemsize):
+            return {**typed_array(deltas.astype(delta)), 'start': int(values[0]), **extra}
+    if plain is None:
+        return None
+    return {**typed_array(values.astype(plain)), **extra}
+
+
+def fixed_array(values: np.ndarray) -> Optional[Dict]:
+    """浮点数能无损表示为定点小数（如两位小数的价格）时，按 整数/scale 编码
+
+    float32保存的 10.12 实际是 10.119999885...，按float32的精度判断是否为整数
+
+    Returns:
+        dict: integer_array的结果加 'scale'；无缺失且能表示时返回，否则None
+    """
+    values = np.asarray(values)
+    if values.size == 0 or not np.isfinite(values).all():
+        return None
+    tolerance = np.finfo(values.dtype).eps * 4
+    for decimals in FIXED_DECIMALS:
+        scale = 10 ** decimals
+        scaled = values.astype('float64') * scale
+        rounded = np.rint(scaled)
+        if np.all(np.abs(scaled - rounded) <= np.maximum(tolerance * np.abs(scaled), 1e-9)):
+            if np.abs(rounded).max() >= 2 ** 31:
+                return None
+            return integer_array(rounded.astype('int64'), scale=scale)
+    return None
+
+
+def encode_column(series: pd.Series, date_format: Optional[str] = None) -> Dict:
+    """按列的类型选择编码方式
+
+    - 日期：距1970-01-01的天数（'unit': 'day'），含时间的按秒（'unit': 's'），差分存储
+    - 整数、定点小数：integer_array / fixed_array
+    - 其余数值：float32/float64原样
+    - 字符串、category：字典编码
+
+    Args:
+        series: 列数据
+        date_format: 日期列的显示格式（'date' 或 'datetime'），默认按是否含时间决定
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.to_numpy().astype('datetime64[s]')
+        seconds = values.astype('int64')
+        if not np.isnat(values).any():
+            if date_format != 'datetime' and not (seconds % 86400).any():
+                encoded = integer_array(seconds // 86400, unit='day', format=date_format or 'date')
+            else:
+                encoded = integer_array(seconds, unit='s', format=date_format or 'datetime')
+            if encoded is not None:
+                return encoded
+        return {**date_array(values), 'unit': 'ms', 'format': date_format or 'date'}
+    if pd.api.types.is_bool_dtype(series):
+        return typed_array(series.to_numpy(dtype=bool))
+    if pd.api.types.is_numeric_dtype(series):
+        values = series.to_numpy()
+        if values.dtype == object:
+            # 可空整数等扩展类型含缺失值时
+            values = series.to_numpy(dtype='float64', na_value=np.nan)
+        if values.dtype.kind in 'iu':
+            encoded = integer_array(values)
+        elif values.dtype.kind == 'f':
+            encoded = fixed_array(values)
+        else:
+            encoded = None
+        return encoded if encoded is not None else typed_array(values)
+    return dictionary_array(series)
+
+
+def dictionary_array(values) -> Dict:
+    """将字符串列按字典编码：去重后的取值 + 每行的下标（缺失为-1）
+
+    Returns:
+        dict: {'dtype': 'i1'/'i2'/'i4', 'bdata': ..., 'values': [...]}
+    """
+    codes, uniques = pd.factorize(pd.Series(values), use_na_sentinel=True)
+    codes = codes.astype(_smallest_int(np.array([-1, len(uniques)])))
+    return {**typed_array(codes), 'values': [str(value) for value in uniques]}
+
+
+def encode_frame(df: pd.DataFrame, columns: Optional[Iterable[str]] = None,
+                 date_formats: Optional[Dict[str, str]] = None) -> Dict:
+    """将DataFrame编码为列式数据
+
+    Args:
+        df: pandas DataFrame（直接使用缓存中的紧凑类型，无需先转换为显示格式）
+        columns: 需要发送的列，默认全部
+        date_formats: 日期列的显示格式（'date' 或 'datetime'）
+
+    Returns:
+        dict: {'length': 行数, 'columns': {列名: 编码后的列}}
+    """
+    columns = list(df.columns if columns is None else columns)
+    date_formats = date_formats or {}
+    return {
+        'length': len(df),
+        'columns': {str(column): encode_column(df[column], date_formats.get(column)) for column in columns},
+    }
+
+
+def downsample_minmax(df: pd.DataFrame, column: str, points: int) -> pd.DataFrame:
+    """显示用的降采样：按行均分为points个桶，每桶保留column最高和最低的行（按原顺序）
+
+    迷你走势图只有几十个像素宽，发送整段K线没有意义；保留每桶的极值，走势的高低点不会被抹平
+
+    Args:
+        df: 按时间排序的数据
+        column: 取极值的列
+        points: 分桶数
+
+    Returns:
+        pd.DataFrame: 不超过 2 * points + 2 行的子集
+    """
+    if len(df) <= 2 * points:
+        return df.reset_index(drop=True)
+    values = df[column].to_numpy(dtype='float64')
+    bounds = np.linspace(0, len(values), points + 1).astype(int)
+    # 首尾两行总是保留（走势的起点和最新值）
+    rows = {0, len(values) - 1}
+    for low, high in zip(bounds[:-1], bounds[1:]):
+        bucket = values[low:high]
+        if not np.isnan(bucket).all():
+            rows.update((low + int(np.nanargmin(bucket)), low + int(np.nanargmax(bucket))))
+    return df.iloc[sorted(rows)].reset_index(drop=True)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+对比两次基准结果，超过阈值的退化返回非零退出码
+
+用法：
+    python benchmarks/compare.py base.json new.json
+    python benchmarks/compare.py base.json new.json --threshold 1.3 --min-delta-ms 0.5
+"""
+import sys
+import json
+import argparse
+from pathlib import Path
+
+
+def load(path):
+    return json.loads(Path(path).read_text(encoding='utf-8'))
+
+
+def compare(base: dict, new: dict, threshold: float, min_delta_ms: float, metric: str = 'median_ms'):
+    """返回 (行列表, 退化的基准名列表)
+
+    只有同时满足 比值 > threshold 且 绝对差 > min_delta_ms 才算退化，
+    避免亚毫秒级基准的抖动误报。
+    """
+    rows = []
+    regressions = []
+    base_results = base['results']
+    new_results = new['results']
+
+    for name in sorted(set(base_results) | set(new_results)):
+        if name not in base_results or name not in new_results:
+            rows.append((name, base_results.get(name, {}).get(metric), new_results.get(name, {}).get(metric), None, 'n/a'))
+            continue
+        old_value = base_results[name][metric]
+        new_value = new_results[name][metric]
+        ratio = new_value / old_value if old_value else float('inf')
+        status = 'ok'
+        if ratio > threshold and new_value - old_value > min_delta_ms:
+            status = 'REGRESSION'
+            regressions.append(name)
+        elif ratio < 1 / threshold and old_value - new_value > min_delta_ms:
+            status = 'improved'
+        rows.append((name, old_value, new_value, ratio, status))
+
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='对比两次基准结果')
+    parser.add_argument('base', help='基线结果JSON')
+    parser.add_argument('new', help='新结果JSON')
+    parser.add_argument('--threshold', type=float, default=1.25, help='允许的耗时比值上限')
+    parser.add_argument('--min-delta-ms', type=float, default=0.2, help='小于该绝对差的变化忽略')
+    parser.add_argument('--metric', default='median_ms', choices=['median_ms', 'min_ms', 'mean_ms'])
+    args = parser.parse_args(argv)
+
+    base = load(args.base)
+    new = load(args.new)
+    rows, regressions = compare(base, new, args.threshold, args.min_delta_ms, args.metric)
+
+    print(f"基线 {base['meta'].get('commit')}  ->  新 {new['meta'].get('commit')}  ({args.metric})")
+    for name, old_value, new_value, ratio, status in rows:
+        old_text = '-' if old_value is None else f'{old_value:.3f}'
+        new_text = '-' if new_value is None else f'{new_value:.3f}'
+        ratio_text = '-' if ratio is None else f'{ratio:.2f}x'
+        print(f'{name:<55} {old_text:>12} {new_text:>12} {ratio_text:>8}  {status}')
+
+    if regressions:
+        print(f'\n{len(regressions)} 项性能退化超过阈值 {args.threshold}x')
+        return 1
+    print('\n未发现性能退化')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+导入耗时报告
+
+在子进程中以 python -X importtime 导入指定模块，汇总累计/自身耗时最高的模块
+以及按顶层包分组的耗时，用于检查启动路径上是否混入了重量级依赖。
+
+用法：
+    python benchmarks/import_profile.py
+    python benchmarks/import_profile.py --module main --module adata_ui.pages.market_page --top 30 -o import.json
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """解析 -X importtime 输出，返回 [{module, self_ms, cumulative_ms, depth}]"""
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        entries.append({
+            'module': module,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+            'depth': len(indent) // 2
+        })
+    return entries
+
+
+def profile_module(module: str) -> Dict:
+    """在干净的子进程中导入模块并收集导入耗时"""
+    env = dict(os.environ)
+    # 避免导入main时改写仓库中的 .nicegui 存储
+    env.setdefault('NICEGUI_STORAGE_PATH', tempfile.mkdtemp(prefix='adata_ui_import_'))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise Exception(f'导入 {module} 失败: {result.stderr.strip().splitlines()[-1]}')
+    entries = parse_importtime(result.stderr)
+    total = next((e['cumulative_ms'] for e in reversed(entries) if e['module'] == module), 0.0)
+
+    packages: Dict[str, float] = {}
+    for entry in entries:
+        top = entry['module'].split('.')[0]
+        packages[top] = packages.get(top, 0.0) + entry['self_ms']
+
+    return {
+        'module': module,
+        'total_ms': round(total, 1),
+        'modules_imported': len(entries),
+        'entries': entries,
+        'packages': dict(sorted(packages.items(), key=lambda item: item[1], reverse=True))
+    }
+
+
+def print_report(report: Dict, top: int):
+    print(f"\n{report['module']}: {report['total_ms']} ms, 共导入 {report['modules_imported']} 个模块")
+    print(f"\n累计耗时最高的 {top} 个模块:")
+    for entry in sorted(report['entries'], key=lambda e: e['cumulative_ms'], reverse=True)[:top]:
+        print(f"  {entry['cumulative_ms']:>9.1f} ms  {'  ' * entry['depth']}{entry['module']}")
+    print("\n按顶层包汇总（自身耗时）:")
+    for package, ms in list(report['packages'].items())[:top]:
+        print(f"  {ms:>9.1f} ms  {package}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='AData UI 导入耗时报告')
+    parser.add_argument('--module', action='append', help='要分析的模块（可重复），默认 main')
+    parser.add_argument('--top', type=int, default=20, help='显示的模块数量')
+    parser.add_argument('-o', '--output', help='结果JSON文件')
+    args = parser.parse_args(argv)
+
+    reports = [profile_module(module) for module in (args.module or ['main'])]
+    for report in reports:
+        print_report(report, args.top)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(reports, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f'结果已写入 {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+AData UI 并发用户压测
+
+在进程内启动应用（离线数据后端），用NiceGUI的无头用户模拟N个并发客户端，
+依次访问 / /stock /market /concept，执行查询并打开成分股对话框。
+报告交互延迟 p50/p95/p99、websocket消息大小、事件循环延迟和每客户端内存。
+
+用法：
+    python benchmarks/load_test.py --clients 50 --iterations 3
+    ADATA_UI_DATA_DIR=recordings python benchmarks/load_test.py --backend replay --latency 0.2
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# NiceGUI的用户模拟按pytest环境设计；存储放到临时目录，避免清掉仓库里的 .nicegui
+os.environ.setdefault('PYTEST_CURRENT_TEST', 'benchmarks/load_test.py::load')
+os.environ.setdefault('NICEGUI_STORAGE_PATH', tempfile.mkdtemp(prefix='adata_ui_load_'))
+
+import httpx  # noqa: E402
+from nicegui import background_tasks, core, ui  # noqa: E402
+from nicegui.testing.user import User  # noqa: E402
+from nicegui.testing.user_interaction import UserInteraction  # noqa: E402
+from nicegui.testing.user_simulation import user_simulation  # noqa: E402
+
+from adata_ui.utils.backend import MockBackend, ReplayBackend, set_backend  # noqa: E402
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """线性插值百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+def current_rss_mb() -> float:
+    """当前进程常驻内存（MB）"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS返回字节，Linux返回KB
+    return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+
+
+class LoopLagMonitor:
+    """周期性睡眠，记录实际唤醒时间超出预期的部分作为事件循环延迟"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+
+class LoadStats:
+    """汇总各类交互的延迟和消息大小"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.message_sizes: List[int] = []
+
+    def add(self, name: str, seconds: float):
+        self.latencies.setdefault(name, []).append(seconds * 1000)
+
+    def error(self, name: str):
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+
+async def settle(tasks: set, timeout: float = 30):
+    """等待交互触发的后台任务（异步事件处理函数）完成"""
+    pending = {t for t in tasks if not t.done()}
+    if pending:
+        await asyncio.wait(pending, timeout=timeout)
+
+
+class SimulatedClient:
+    """单个模拟用户的操作脚本"""
+
+    def __init__(self, user: User, stats: LoadStats, stock_codes: List[str], rng: random.Random):
+        self.user = user
+        self.stats = stats
+        self.stock_codes = stock_codes
+        self.rng = rng
+
+    async def timed(self, name: str, action):
+        """执行一次同步触发的交互（点击/事件），计时到其异步处理完成"""
+        start = time.perf_counter()
+        try:
+            before = set(background_tasks.running_tasks)
+            action()
+            # action是同步的，期间创建的任务都由本次交互触发
+            await settle(set(background_tasks.running_tasks) - before)
+            self.stats.add(name, time.perf_counter() - start)
+        except Exception:
+            self.stats.error(name)
+
+    async def open(self, path: str):
+        start = time.perf_counter()
+        try:
+            await self.user.open(path)
+            self.stats.add(f'open {path}', time.perf_counter() - start)
+            self._measure_messages()
+        except Exception:
+            self.stats.error(f'open {path}')
+
+    def _measure_messages(self):
+        """统计发往该客户端的websocket消息序列化后的大小"""
+        outbox = self.user.client.outbox
+        emit = outbox._emit  # pylint: disable=protected-access
+
+        async def measured_emit(message):
+            _, _, data = message
+            self.stats.message_sizes.append(len(json.dumps(data, default=str, ensure_ascii=False).encode()))
+            await emit(message)
+        outbox._emit = measured_emit  # pylint: disable=protected-access
+
+    def button(self, text: str) -> UserInteraction:
+        elements = {b for b in self.user.find(ui.button).elements if b.text == text}
+        return UserInteraction(self.user, elements, text)
+
+    async def run(self, iterations: int, think_time: float):
+        for _ in range(iterations):
+            await self.open('/')
+            await asyncio.sleep(self.rng.uniform(0, think_time))
+
+            await self.open('/stock')
+            code = self.rng.choice(self.stock_codes)
+            self.user.find(ui.input).type(code)
+            await self.timed('query stock info', lambda: self._click('查询'))
+            await asyncio.sleep(self.rng.uniform(0, think_time))
+
+            await self.open('/market')
+            self.user.find(ui.input).type(code)
+            await self.timed('query market', lambda: self._click('查询'))
+            await asyncio.sleep(self.rng.uniform(0, think_time))
+
+            await self.open('/concept')
+            await self.timed('query concepts', lambda: self._click('查询'))
+            await self.timed('open constituents', self._open_constituents)
+            await asyncio.sleep(self.rng.uniform(0, think_time))
+
+    def _click(self, text: str):
+        self.button(text).click()
+
+    def _open_constituents(self):
+        table = next(iter(self.user.find(ui.table).elements))
+        row = self.rng.choice(table.rows)
+        UserInteraction(self.user, {table}, None).trigger('show_stocks', row)
+
+
+async def run_load(args) -> dict:
+    stats = LoadStats()
+    monitor = LoopLagMonitor()
+    stock_codes = [code.strip() for code in args.codes.split(',') if code.strip()]
+
+    async with user_simulation(main_file=ROOT / 'main.py'):
+        rss_before = current_rss_mb()
+        monitor.start()
+        clients = []
+        for i in range(args.clients):
+            user = User(httpx.AsyncClient(transport=httpx.ASGITransport(core.app), base_url='http://test'))
+            clients.append(SimulatedClient(user, stats, stock_codes, random.Random(i)))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client.run(args.iterations, args.think_time) for client in clients))
+        duration = time.perf_counter() - start
+        monitor.stop()
+        rss_after = current_rss_mb()
+
+    interactions = {}
+    for name, values in sorted(stats.latencies.items()):
+        interactions[name] = {
+            'count': len(values),
+            'errors': stats.errors.get(name, 0),
+            'p50_ms': round(percentile(values, 50), 2),
+            'p95_ms': round(percentile(values, 95), 2),
+            'p99_ms': round(percentile(values, 99), 2),
+            'max_ms': round(max(values), 2),
+        }
+    for name, count in stats.errors.items():
+        interactions.setdefault(name, {'count': 0, 'errors': count})
+
+    all_latencies = [v for values in stats.latencies.values() for v in values]
+    sizes = stats.message_sizes
+    lag = [s * 1000 for s in monitor.samples]
+    return {
+        'config': {
+            'clients': args.clients,
+            'iterations': args.iterations,
+            'backend': args.backend,
+            'latency': args.latency,
+            'think_time': args.think_time,
+        },
+        'duration_s': round(duration, 2),
+        'interactions_per_s': round(len(all_latencies) / duration, 2) if duration else 0,
+        'latency': {
+            'p50_ms': round(percentile(all_latencies, 50), 2),
+            'p95_ms': round(percentile(all_latencies, 95), 2),
+            'p99_ms': round(percentile(all_latencies, 99), 2),
+        },
+        'interactions': interactions,
+        'websocket': {
+            'messages': len(sizes),
+            'total_kb': round(sum(sizes) / 1024, 1),
+            'mean_bytes': round(statistics.fmean(sizes), 1) if sizes else 0,
+            'p95_bytes': round(percentile(sizes, 95), 1),
+            'max_bytes': max(sizes) if sizes else 0,
+        },
+        'loop_lag': {
+            'p50_ms': round(percentile(lag, 50), 2),
+            'p99_ms': round(percentile(lag, 99), 2),
+            'max_ms': round(max(lag), 2) if lag else 0,
+        },
+        'memory': {
+            'rss_before_mb': round(rss_before, 1),
+            'rss_after_mb': round(rss_after, 1),
+            'rss_per_client_mb': round((rss_after - rss_before) / max(args.clients, 1), 3),
+        },
+    }
+
+
+def print_report(report: dict):
+    print(f"\n{report['config']['clients']} 个客户端, 耗时 {report['duration_s']}s, "
+          f"{report['interactions_per_s']} 次交互/秒")
+    print(f"{'交互':<22}{'次数':>6}{'错误':>6}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, item in report['interactions'].items():
+        print(f"{name:<22}{item['count']:>6}{item['errors']:>6}"
+              f"{item.get('p50_ms', 0):>10.1f}{item.get('p95_ms', 0):>10.1f}{item.get('p99_ms', 0):>10.1f}")
+    ws = report['websocket']
+    print(f"websocket: {ws['messages']} 条, 共 {ws['total_kb']} KB, 平均 {ws['mean_bytes']} B, 最大 {ws['max_bytes']} B")
+    lag = report['loop_lag']
+    print(f"事件循环延迟: p50 {lag['p50_ms']} ms, p99 {lag['p99_ms']} ms, 最大 {lag['max_ms']} ms")
+    mem = report['memory']
+    print(f"内存: {mem['rss_before_mb']} -> {mem['rss_after_mb']} MB, 每客户端 {mem['rss_per_client_mb']} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='AData UI 并发用户压测')
+    parser.add_argument('--clients', type=int, default=20, help='并发客户端数')
+    parser.add_argument('--iterations', type=int, default=2, help='每个客户端重复完整流程的次数')
+    parser.add_argument('--backend', default='mock', choices=['mock', 'replay'])
+    parser.add_argument('--data-dir', default=os.environ.get('ADATA_UI_DATA_DIR', 'recordings'), help='回放目录')
+    parser.add_argument('--latency', type=float, default=0.05, help='注入的上游延迟（秒）')
+    parser.add_argument('--think-time', type=float, default=0.2, help='每步之间的最大随机停顿（秒）')
+    parser.add_argument('--codes', default='600000,000001,300750', help='查询使用的股票代码')
+    parser.add_argument('-o', '--output', help='结果JSON文件')
+    args = parser.parse_args(argv)
+
+    if args.backend == 'replay':
+        set_backend(ReplayBackend(args.data_dir, latency=args.latency))
+    else:
+        set_backend(MockBackend(latency=args.latency))
+
+    report = asyncio.run(run_load(args))
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f'结果已写入 {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,420 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+AData UI 性能基准测试
+
+覆盖数据加载（冷/热缓存）、数据转换、K线图构建、全市场选股、联动分析和页面渲染，
+结果写入JSON，配合 benchmarks/compare.py 在提交之间做回归对比。
+
+用法：
+    python benchmarks/run.py -o bench.json
+    python benchmarks/run.py --only transformer --quick
+    ADATA_UI_DATA_DIR=recordings python benchmarks/run.py --backend replay
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# 页面基准会重置NiceGUI存储，使用临时目录避免清掉仓库里的 .nicegui
+os.environ.setdefault('NICEGUI_STORAGE_PATH', tempfile.mkdtemp(prefix='adata_ui_bench_'))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from adata_ui.utils.backend import MockBackend, create_backend, set_backend  # noqa: E402
+from adata_ui.utils.data_loader import DataLoader, DataTransformer  # noqa: E402
+from adata_ui.utils.schema import compact_bars  # noqa: E402
+
+
+class BenchmarkRunner:
+    """计时并收集基准结果"""
+
+    def __init__(self, rounds: int = 5, warmup: int = 1):
+        self.rounds = rounds
+        self.warmup = warmup
+        self.results: Dict[str, Dict] = {}
+
+    def _record(self, name: str, samples: List[float], **extra):
+        samples_ms = [s * 1000 for s in samples]
+        self.results[name] = {
+            'median_ms': round(statistics.median(samples_ms), 4),
+            'min_ms': round(min(samples_ms), 4),
+            'mean_ms': round(statistics.fmean(samples_ms), 4),
+            'rounds': len(samples_ms),
+            **extra
+        }
+        print(f"{name:<55} {self.results[name]['median_ms']:>12.3f} ms")
+
+    def bench(self, name: str, func: Callable, setup: Callable = None, rounds: int = None, **extra):
+        """同步基准；setup的返回值作为func的参数，不计入耗时"""
+        samples = []
+        for i in range(self.warmup + (rounds or self.rounds)):
+            arg = setup() if setup else None
+            start = time.perf_counter()
+            func(arg) if setup else func()
+            elapsed = time.perf_counter() - start
+            if i >= self.warmup:
+                samples.append(elapsed)
+        self._record(name, samples, **extra)
+
+    async def abench(self, name: str, func: Callable, setup: Callable = None, rounds: int = None, **extra):
+        """异步基准，func返回协程"""
+        samples = []
+        for i in range(self.warmup + (rounds or self.rounds)):
+            arg = setup() if setup else None
+            start = time.perf_counter()
+            await (func(arg) if setup else func())
+            elapsed = time.perf_counter() - start
+            if i >= self.warmup:
+                samples.append(elapsed)
+        self._record(name, samples, **extra)
+
+
+def make_bars(rows: int) -> pd.DataFrame:
+    """生成指定行数的K线数据（与DataLoader.get_stock_data的列和类型一致）"""
+    rng = np.random.default_rng(0)
+    close = np.round(20 + np.cumsum(rng.uniform(-0.5, 0.5, rows)), 2)
+    return compact_bars(pd.DataFrame({
+        'date': pd.bdate_range(end='2024-12-31', periods=rows).strftime('%Y-%m-%d'),
+        'open': np.round(close * rng.uniform(0.98, 1.02, rows), 2),
+        'close': close,
+        'high': np.round(close * 1.03, 2),
+        'low': np.round(close * 0.97, 2),
+        'volume': np.round(rng.uniform(10000, 1e9, rows), 0),
+        'amount': np.round(rng.uniform(1e6, 1e10, rows), 2)
+    }))
+
+
+def bench_loader(runner: BenchmarkRunner, backend_factory: Callable):
+    """DataLoader各方法的冷/热缓存耗时"""
+    cases = {
+        'get_stock_data': lambda dl: dl.get_stock_data('600000', '2023-01-01', '2024-12-31'),
+        'get_stock_data_hfq': lambda dl: dl.get_stock_data('600000', '2023-01-01', '2024-12-31', 'hfq'),
+        'get_index_data': lambda dl: dl.get_index_data('000001', '2023-01-01', '2024-12-31'),
+        'get_stock_basic_info': lambda dl: dl.get_stock_basic_info('600000'),
+        'get_concept_constituents': lambda dl: dl.get_concept_constituents('THS_CONCEPT_001', 'ths'),
+    }
+    async_cases = {
+        'get_concept_list': lambda dl: dl.get_concept_list('ths'),
+        'get_concept_stocks': lambda dl: dl.get_concept_stocks('THS_CONCEPT_001', 'ths'),
+        'get_stock_market_data': lambda dl: dl.get_stock_market_data('600000', 365),
+        'get_stock_info': lambda dl: dl.get_stock_info('600000'),
+        'get_stock_infos': lambda dl: dl.get_stock_infos([f'600{i:03d}' for i in range(50)]),
+        'get_index_overview': lambda dl: dl.get_index_overview(['000001', '399001', '399006', '000688', '000300'], 365, 30),
+        'get_intraday_bars': lambda dl: dl.get_intraday_bars('600000', 5),
+        'get_quotes': lambda dl: dl.get_quotes([f'600{i:03d}' for i in range(300)]),
+    }
+
+    # 基本面快照、复权因子、最新行情、分钟K线缓冲区和概念对照索引是进程内共享的：
+    # 冷启动时一并清空，热缓存前先构建全市场基本面快照（正常运行时由后台任务构建）
+    from adata_ui.utils.adjust import factor_store
+    from adata_ui.utils.concept_index import concept_index
+    from adata_ui.utils.fundamentals import get_fundamentals_snapshot, set_fundamentals_snapshot
+    from adata_ui.utils.intraday import intraday_feed
+    from adata_ui.utils.quote_store import quote_store
+
+    def cold_loader():
+        set_fundamentals_snapshot(None)
+        factor_store.clear()
+        quote_store.clear()
+        intraday_feed.clear()
+        concept_index.clear()
+        return DataLoader(backend_factory())
+
+    def warm_loader():
+        loader = DataLoader(backend_factory())
+        get_fundamentals_snapshot(loader.backend)
+        for call in cases.values():
+            call(loader)
+        return loader
+
+    for name, call in cases.items():
+        runner.bench(f'loader.{name}.cold', call, setup=cold_loader)
+        warm = warm_loader()
+        runner.bench(f'loader.{name}.warm', lambda: call(warm))
+
+    async def run_async():
+        for name, call in async_cases.items():
+            await runner.abench(f'loader.{name}.cold', call, setup=cold_loader)
+            warm = DataLoader(backend_factory())
+            await warm.get_fundamentals()
+            await asyncio.gather(*(call(warm) for call in async_cases.values()))
+            await runner.abench(f'loader.{name}.warm', lambda: call(warm))
+
+    asyncio.run(run_async())
+
+
+def bench_transformer(runner: BenchmarkRunner, sizes: List[int]):
+    """DataTransformer在不同行数下的耗时（逐单元格与整列格式化）"""
+    transformer = DataTransformer()
+    # 整列格式化须与逐单元格格式化一致（含 0.005、2.675 等十进制进位的边界值；
+    # 四舍五入为0的负数整列格式化不带负号，不参与比较）
+    changes = make_bars(max(sizes))['close'].pct_change().to_numpy() * 100
+    values = pd.Series(np.concatenate([changes[np.isfinite(changes)], [0.005, -0.015, 1.005, 2.675, 0.125, 1234.5]]))
+    for column, scalar in ((transformer.format_number_column, transformer.format_number),
+                           (transformer.format_change_pct_column, transformer.format_change_pct)):
+        expected = values.map(scalar)
+        shown = ~expected.str.startswith('-0.00')
+        assert list(column(values)[shown.to_numpy()]) == list(expected[shown]), f'{column.__name__} 与逐单元格格式化不一致'
+    for rows in sizes:
+        df = make_bars(rows)
+        runner.bench(f'transformer.df_to_dict_list.{rows}', lambda: transformer.df_to_dict_list(df), rows=rows)
+        runner.bench(f'transformer.to_display_frame.{rows}', lambda: transformer.to_display_frame(df), rows=rows)
+        runner.bench(f'transformer.format_volume.{rows}', lambda: df['volume'].map(transformer.format_volume), rows=rows)
+        runner.bench(f'transformer.format_number.{rows}', lambda: df['close'].map(transformer.format_number), rows=rows)
+        runner.bench(f'transformer.format_volume_column.{rows}', lambda: transformer.format_volume_column(df['volume']), rows=rows)
+        runner.bench(f'transformer.format_number_column.{rows}', lambda: transformer.format_number_column(df['close']), rows=rows)
+        runner.bench(f'transformer.format_change_pct_column.{rows}', lambda: transformer.format_change_pct_column(df['close'].pct_change() * 100), rows=rows)
+
+
+def bench_chart(runner: BenchmarkRunner, sizes: List[int]):
+    """K线图构建与序列化（ColumnarChart发送的trace、布局和列式数据）"""
+    from nicegui import json as nicegui_json
+    from adata_ui.pages.market_page import create_kline_chart
+    from adata_ui.utils.wire import encode_frame
+
+    for rows in sizes:
+        df = make_bars(rows)
+
+        def payload():
+            traces, layout = create_kline_chart('600000')
+            return {'options': {'data': traces, 'layout': layout},
+                    'data': encode_frame(df, ['date', 'open', 'high', 'low', 'close'])}
+
+        runner.bench(f'chart.kline_figure.{rows}', payload, rows=rows)
+        runner.bench(f'chart.kline_json.{rows}', lambda: nicegui_json.dumps(payload()), rows=rows,
+                     bytes=len(nicegui_json.dumps(payload())))
+
+
+def bench_wire(runner: BenchmarkRunner, sizes: List[int]):
+    """行情表格的发送数据：逐行字典（ui.table） vs 列式编码（ColumnarTable），含序列化，记录字节数"""
+    from nicegui import json as nicegui_json
+    from adata_ui.utils.wire import encode_frame
+
+    transformer = DataTransformer()
+    fields = ['date', 'open', 'high', 'low', 'close', 'volume']
+    for rows in sizes:
+        df = make_bars(rows)
+
+        def row_payload():
+            return nicegui_json.dumps(transformer.df_to_dict_list(transformer.to_display_frame(df[fields])))
+
+        def columnar_payload():
+            return nicegui_json.dumps(encode_frame(df, fields))
+
+        runner.bench(f'wire.table_rows.{rows}', row_payload, rows=rows, bytes=len(row_payload()))
+        runner.bench(f'wire.table_columnar.{rows}', columnar_payload, rows=rows, bytes=len(columnar_payload()))
+
+
+def bench_screener(runner: BenchmarkRunner, stocks: int = 5000, lookback: int = 130):
+    """全市场选股：组合条件筛选 + Top N（随机生成的快照，不含构建耗时）"""
+    from adata_ui.utils.screener import MarketSnapshot, parse_conditions, screen
+
+    rng = np.random.default_rng(0)
+    close = np.cumprod(1 + rng.normal(0, 0.02, (stocks, lookback)), axis=1) * rng.uniform(5, 100, (stocks, 1))
+    volume = rng.uniform(1e5, 1e7, (stocks, lookback))
+    columns = {
+        'price': close[:, -1],
+        'change_pct': (close[:, -1] / close[:, -2] - 1) * 100,
+        'volume': volume[:, -1],
+        'amount': volume[:, -1] * close[:, -1],
+        'pe': rng.uniform(-20, 120, stocks),
+        'pb': rng.uniform(0.5, 12, stocks),
+        'turnover_ratio': rng.uniform(0.1, 15, stocks),
+    }
+    codes = np.array([f'{i:06d}' for i in range(stocks)], dtype=object)
+
+    def make_snapshot():
+        return MarketSnapshot(codes, codes, columns, close, volume)
+
+    conditions = parse_conditions({'change_pct': '0,', 'pe': '0,60', 'return_20': '5,', 'cross': '5,20,up'})
+    runner.bench(f'screener.composite.{stocks}', lambda snapshot: screen(snapshot, conditions, 'return_20'),
+                 setup=make_snapshot, stocks=stocks)
+    runner.bench(f'screener.top50.{stocks}', lambda snapshot: screen(snapshot, [], 'change_pct', limit=50),
+                 setup=make_snapshot, stocks=stocks)
+
+    # 排行榜：每次快照有约5%的股票变化时的增量更新
+    from adata_ui.utils.leaderboard import Leaderboard, changed_ids
+
+    board = Leaderboard('gainers', '涨幅榜', 10)
+    values = columns['change_pct'].copy()
+    board.reset(values)
+
+    def next_values():
+        old = values.copy()
+        rows = rng.integers(0, stocks, stocks // 20)
+        values[rows] = rng.normal(0, 3, len(rows))
+        return old
+
+    runner.bench(f'leaderboard.update.{stocks}', lambda old: board.update(values, changed_ids(old, values)),
+                 setup=next_values, stocks=stocks)
+
+
+def bench_analytics(runner: BenchmarkRunner, days: int = 250):
+    """联动分析：概念规模（30只）的完整分析和全市场规模的分块相关性"""
+    from adata_ui.utils.analytics import cluster, correlation_matrix, most_correlated
+
+    rng = np.random.default_rng(0)
+    for stocks in (30, 500):
+        returns = rng.normal(0, 0.02, (days, stocks))
+        returns[rng.random(returns.shape) < 0.05] = np.nan
+        runner.bench(f'analytics.correlation.{stocks}', lambda: correlation_matrix(returns), stocks=stocks)
+        corr = correlation_matrix(returns)
+        runner.bench(f'analytics.cluster.{stocks}', lambda: cluster(corr), stocks=stocks)
+    runner.bench('analytics.most_correlated.2000', lambda: most_correlated(rng.normal(0, 0.02, (days, 2000))),
+                 rounds=3, stocks=2000)
+
+    # 概念对照索引：约400个ths概念、500个east概念，其中300对成分股大部分相同
+    from adata_ui.utils.concept_index import ConceptIndex
+
+    stocks = np.array([f'{i:06d}' for i in range(5500)], dtype=object)
+    members = [rng.choice(stocks, rng.integers(10, 200), replace=False) for _ in range(500)]
+
+    def memberships(prefix, groups):
+        return pd.DataFrame({
+            'concept_code': np.repeat([f'{prefix}{i:04d}' for i in range(len(groups))], [len(g) for g in groups]),
+            'concept_name': np.repeat([f'{prefix}{i}' for i in range(len(groups))], [len(g) for g in groups]),
+            'stock_code': np.concatenate(groups),
+        })
+
+    ths = memberships('T', members[:400])
+    east = memberships('BK', [g[:int(len(g) * 0.95)] for g in members[:300]] + members[400:] + members[:100])
+    # 一个ths概念剔除一半成分股
+    changed = ths[~((ths['concept_code'] == 'T0001') & (ths.index % 2 == 0))]
+
+    def build():
+        index = ConceptIndex()
+        index.set_memberships('ths', ths)
+        index.set_memberships('east', east)
+        return index
+
+    def incremental(index):
+        index.set_memberships('ths', changed if index._frames['ths'] is ths else ths)
+        return index.matches()
+
+    runner.bench('analytics.concept_index.build', lambda: build().matches(), concepts=900)
+    warm = build()
+    runner.bench('analytics.concept_index.incremental', lambda: incremental(warm), concepts=900)
+
+
+def bench_backtest(runner: BenchmarkRunner, days: int = 750, symbols: int = 500):
+    """策略回测：单次回测和进程池参数扫描（随机生成的价格矩阵）"""
+    from adata_ui.utils.backtest import run_backtest, sweep
+
+    rng = np.random.default_rng(0)
+    close = np.cumprod(1 + rng.normal(0, 0.02, (days, symbols)), axis=0) * rng.uniform(5, 100, symbols)
+    close[rng.random(close.shape) < 0.02] = np.nan
+    for strategy in ('ma_cross', 'breakout', 'momentum'):
+        runner.bench(f'backtest.{strategy}.{symbols}', lambda: run_backtest(strategy, close), symbols=symbols)
+    grid = {'fast': list(range(2, 42)), 'slow': list(range(45, 70))}
+    runner.bench(f'backtest.sweep.1000x{symbols}', lambda: sweep('ma_cross', close, grid), rounds=1,
+                 symbols=symbols, combos=1000)
+
+
+def bench_compute(runner: BenchmarkRunner, rows: int = 1_000_000):
+    """计算进程池：大DataFrame经共享内存往返一次（不含进程启动）"""
+    from adata_ui.utils.compute import ComputePool
+
+    pool = ComputePool(1)
+    df = pd.DataFrame(np.random.default_rng(0).normal(size=(rows, 8)), columns=[f'c{i}' for i in range(8)])
+    pool.run_sync(len, df)
+    runner.bench(f'compute.frame_sum.{rows}', lambda: pool.run_sync(pd.DataFrame.sum, df), rows=rows)
+    runner.bench(f'compute.frame_roundtrip.{rows}', lambda: pool.run_sync(pd.DataFrame.abs, df), rows=rows)
+    pool.shutdown()
+
+
+def bench_pages(runner: BenchmarkRunner):
+    """通过NiceGUI的无头用户模拟渲染页面"""
+    from nicegui.testing.user_simulation import user_simulation
+
+    # NiceGUI的用户模拟按pytest环境设计（重置全局状态时依赖该变量）
+    os.environ.setdefault('PYTEST_CURRENT_TEST', 'benchmarks/run.py::pages')
+
+    async def run_pages():
+        async with user_simulation(main_file=ROOT / 'main.py') as user:
+            for path in ['/concept', '/market']:
+                await runner.abench(f'page.render{path}', lambda: user.open(path))
+
+    asyncio.run(run_pages())
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except Exception:
+        return 'unknown'
+
+
+GROUPS = ['loader', 'transformer', 'chart', 'wire', 'screener', 'analytics', 'backtest', 'compute', 'pages']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='AData UI 性能基准测试')
+    parser.add_argument('-o', '--output', default='bench_results.json', help='结果JSON文件')
+    parser.add_argument('--only', action='append', choices=GROUPS, help='只运行指定分组（可重复）')
+    parser.add_argument('--backend', default='mock', help='数据后端（mock/replay），mock不注入延迟')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--quick', action='store_true', help='只跑1k/10k规模，用于快速检查')
+    args = parser.parse_args(argv)
+
+    if args.backend == 'mock':
+        def backend_factory():
+            return MockBackend(latency=0)
+    else:
+        def backend_factory():
+            return create_backend(args.backend)
+    set_backend(backend_factory())
+
+    sizes = [1000, 10000] if args.quick else [1000, 10000, 100000]
+    runner = BenchmarkRunner(rounds=args.rounds)
+    groups = args.only or GROUPS
+
+    if 'loader' in groups:
+        bench_loader(runner, backend_factory)
+    if 'transformer' in groups:
+        bench_transformer(runner, sizes)
+    if 'chart' in groups:
+        bench_chart(runner, sizes)
+    if 'wire' in groups:
+        bench_wire(runner, sizes)
+    if 'screener' in groups:
+        bench_screener(runner)
+    if 'analytics' in groups:
+        bench_analytics(runner)
+    if 'backtest' in groups:
+        bench_backtest(runner)
+    if 'compute' in groups:
+        bench_compute(runner)
+    if 'pages' in groups:
+        bench_pages(runner)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': args.backend,
+            'rounds': args.rounds,
+        },
+        'results': runner.results
+    }
+    Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f'结果已写入 {args.output}')
+
+
+if __name__ == '__main__':
+    os.environ.setdefault('ADATA_UI_BACKEND', 'mock')
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+启动耗时预算检查
+
+启动 main.py（关闭热重载），测量从进程启动到 / 返回首个字节的时间，
+取多次运行的中位数，超过预算时返回非零退出码，可用于CI。
+
+用法：
+    python benchmarks/startup_budget.py
+    python benchmarks/startup_budget.py --budget 2.5 --runs 5
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_byte(timeout: float) -> float:
+    """启动一次应用，返回到 / 首个字节的秒数"""
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        'PORT': str(port),
+        'RELOAD': 'false',
+        # 存储放到临时目录，避免改写仓库中的 .nicegui
+        'NICEGUI_STORAGE_PATH': tempfile.mkdtemp(prefix='adata_ui_startup_'),
+    })
+    env.setdefault('ADATA_UI_BACKEND', 'mock')
+
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'main.py'], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise Exception(f'应用启动失败: {process.stderr.read().decode(errors="replace")[-500:]}')
+            try:
+                with httpx.stream('GET', f'http://127.0.0.1:{port}/', timeout=timeout) as response:
+                    next(response.iter_raw(), None)
+                    elapsed = time.perf_counter() - start
+                    if response.status_code != 200:
+                        raise Exception(f'/ 返回状态码 {response.status_code}')
+                    return elapsed
+            except httpx.TransportError:
+                time.sleep(0.02)
+        raise Exception(f'{timeout}s 内未能访问 /')
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='检查启动到首字节的耗时预算')
+    parser.add_argument('--budget', type=float, default=float(os.environ.get('ADATA_UI_STARTUP_BUDGET', 3.0)),
+                        help='预算（秒），默认3秒或环境变量ADATA_UI_STARTUP_BUDGET')
+    parser.add_argument('--runs', type=int, default=3, help='运行次数，取中位数')
+    parser.add_argument('--timeout', type=float, default=60, help='单次启动超时（秒）')
+    args = parser.parse_args(argv)
+
+    samples = []
+    for i in range(args.runs):
+        elapsed = measure_first_byte(args.timeout)
+        samples.append(elapsed)
+        print(f'第 {i + 1} 次: {elapsed * 1000:.0f} ms')
+
+    median = statistics.median(samples)
+    print(f'启动到首字节中位数 {median * 1000:.0f} ms，预算 {args.budget * 1000:.0f} ms')
+    if median > args.budget:
+        print('超出启动耗时预算，可用 python benchmarks/import_profile.py 查看导入耗时')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+上游行情接口的本地替身服务器
+
+按与真实接口相同的路径和返回格式，提供同花顺概念列表、概念成分股（分页网页）、
+东方财富概念成分股和日K线的确定性数据。每个请求注入 --latency 延迟，
+每个新连接额外注入 --connect-latency 延迟（模拟TCP/TLS握手），并统计连接数。
+
+用法：
+    # 只启动替身服务器，应用通过 ADATA_UI_UPSTREAM_URL 指向它
+    python benchmarks/upstream_stub.py --port 8765
+    ADATA_UI_BACKEND=http ADATA_UI_UPSTREAM_URL=http://127.0.0.1:8765 python main.py
+
+    # 对比：逐次新建连接的同步请求（8线程） vs 长连接池的异步客户端
+    python benchmarks/upstream_stub.py --compare --concepts 300
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+CONCEPTS = 400
+
+
+def concept_members(concept_code: str, count: int = None):
+    """概念成分股：按概念代码确定性生成"""
+    rng = random.Random(concept_code)
+    count = count or rng.randint(10, 150)
+    codes = sorted({f"{rng.choice(['60', '00', '30'])}{rng.randint(0, 9999):04d}" for _ in range(count)})
+    return [(code, f'股票{code[-3:]}') for code in codes]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+    connect_latency = 0.0
+    stats = {'connections': 0, 'requests': 0}
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with self.lock:
+            self.stats['connections'] += 1
+        time.sleep(self.connect_latency)
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, body: str, content_type: str = 'application/json'):
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        with self.lock:
+            self.stats['requests'] += 1
+        time.sleep(self.latency)
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        path = url.path
+
+        if path == '/gateway/urp/v7/landing/getDataList':
+            page, size = int(query.get('page', 1)), int(query.get('perpage', 100))
+            rows = [{'code': f'{885000 + i}', '指数简称': f'概念{i}'}
+                    for i in range((page - 1) * size, min(page * size, CONCEPTS))]
+            return self.send_body(json.dumps({'status_msg': 'ok', 'answer': {'components': [{'data': {'datas': rows}}]}},
+                                             ensure_ascii=False))
+        if path == '/gn/':
+            links = ''.join(f'<a href="http://q.10jqka.com.cn/gn/detail/code/{300000 + i}/">概念{i}</a>'
+                            for i in range(CONCEPTS))
+            return self.send_body(f'<html><body>{links}</body></html>', 'text/html')
+        if path.startswith('/gn/detail/field/'):
+            parts = path.strip('/').split('/')
+            page, concept_code = int(parts[parts.index('page') + 1]), parts[-1]
+            members = concept_members(concept_code)
+            pages = max(1, (len(members) + 9) // 10)
+            rows = ''.join(f'<tr><td>{i}</td><td><a>{code}</a></td><td><a>{name}</a></td></tr>'
+                           for i, (code, name) in enumerate(members[(page - 1) * 10:page * 10]))
+            return self.send_body(f'<table><tr><th>序号</th></tr>{rows}</table>'
+                                  f'<span class="page_info">{page}/{pages}</span>', 'text/html')
+        if path == '/api/qt/clist/get':
+            concept_code = query.get('fs', 'b:').split(':')[1]
+            members = concept_members(concept_code)
+            page, size = int(query.get('pn', 1)), int(query.get('pz', 200))
+            rows = [{'f12': code, 'f14': name} for code, name in members[(page - 1) * size:page * size]]
+            data = {'total': len(members), 'diff': rows} if rows else None
+            return self.send_body(json.dumps({'data': data}, ensure_ascii=False))
+        if path == '/api/qt/stock/kline/get':
+            code = query.get('secid', '0.000001').split('.')[1]
+            rng = random.Random(code)
+            price, lines = rng.uniform(5, 100), []
+            for day in range(250):
+                change = price * rng.uniform(-0.05, 0.05)
+                close = price + change
+                date = time.strftime('%Y-%m-%d', time.gmtime(1704067200 + day * 86400))
+                lines.append(f'{date},{price:.2f},{close:.2f},{max(price, close) * 1.01:.2f},'
+                             f'{min(price, close) * 0.99:.2f},{rng.randint(10000, 900000)},{rng.uniform(1e6, 1e9):.2f},'
+                             f'3.0,{change / price * 100:.2f},{change:.2f},{rng.uniform(0.1, 10):.2f}')
+                price = close
+            return self.send_body(json.dumps({'data': {'klines': lines}}))
+        self.send_error(404)
+
+
+def serve(port: int, latency: float, connect_latency: float) -> ThreadingHTTPServer:
+    """在后台线程中启动替身服务器"""
+    StubHandler.latency = latency
+    StubHandler.connect_latency = connect_latency
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def compare(base_url: str, concepts: int, threads: int):
+    """批量获取概念成分股：逐次新建连接（adata的方式） vs 长连接池的异步客户端"""
+    import asyncio
+    import httpx
+    from adata_ui.utils import http_client
+
+    codes = [str(300000 + i) for i in range(concepts)]
+
+    def fetch_one(code):
+        # 每次请求新建连接，与adata的requests调用方式相同
+        members, page = [], 1
+        while True:
+            response = httpx.get(f'{base_url}/api/qt/clist/get', params={'pn': page, 'pz': 200, 'fs': f'b:{code}'})
+            data = response.json()['data'] or {}
+            members.extend(data.get('diff') or [])
+            if len(members) >= int(data.get('total') or 0):
+                return members
+            page += 1
+
+    StubHandler.stats.update(connections=0, requests=0)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        baseline = list(executor.map(fetch_one, codes))
+    baseline_seconds = time.perf_counter() - start
+    baseline_stats = dict(StubHandler.stats)
+
+    client = http_client.UpstreamClient(base_url)
+
+    async def fetch_all():
+        futures = [client.submit(http_client.concept_constituent_east, code) for code in codes]
+        return await asyncio.gather(*[asyncio.wrap_future(future) for future in futures])
+
+    StubHandler.stats.update(connections=0, requests=0)
+    start = time.perf_counter()
+    pooled = asyncio.run(fetch_all())
+    pooled_seconds = time.perf_counter() - start
+    pooled_stats = dict(StubHandler.stats)
+    client.close()
+
+    assert [len(rows) for rows in baseline] == [len(df) for df in pooled], '两种方式返回的成分股数量不一致'
+    print(f'{concepts} 个概念的成分股')
+    print(f'  逐次新建连接（{threads}线程）: {baseline_seconds:.2f}s, '
+          f'{baseline_stats["requests"]} 个请求, {baseline_stats["connections"]} 个连接')
+    print(f'  长连接池异步客户端: {pooled_seconds:.2f}s, '
+          f'{pooled_stats["requests"]} 个请求, {pooled_stats["connections"]} 个连接（HTTP/2: {client.http2}）')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='上游行情接口的本地替身服务器')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.02, help='每个请求的延迟（秒）')
+    parser.add_argument('--connect-latency', type=float, default=0.05, help='每个新连接的额外延迟（秒）')
+    parser.add_argument('--compare', action='store_true', help='运行对比后退出')
+    parser.add_argument('--concepts', type=int, default=300)
+    parser.add_argument('--threads', type=int, default=8, help='对比时同步请求的线程数')
+    args = parser.parse_args(argv)
+
+    server = serve(args.port, args.latency, args.connect_latency)
+    base_url = f'http://127.0.0.1:{args.port}'
+    if args.compare:
+        compare(base_url, args.concepts, args.threads)
+        server.shutdown()
+        return
+    print(f'上游替身服务器: {base_url}（Ctrl+C 退出）')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
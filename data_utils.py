@@ -1,8 +1,22 @@
-import adata
+import os
 import pandas as pd
 import asyncio
 from typing import Optional, Dict, Any, List
 
+from adata_ui.utils.backend import DataBackend, InstrumentedBackend, create_backend
+
+# 该加载器默认直连adata，可通过ADATA_UI_BACKEND切换为录制/回放后端
+_backend: Optional[DataBackend] = None
+
+
+def get_backend() -> DataBackend:
+    """获取数据后端（默认adata）"""
+    global _backend
+    if _backend is None:
+        _backend = InstrumentedBackend(create_backend(os.environ.get('ADATA_UI_BACKEND', 'adata')))
+    return _backend
+
+
 class DataLoader:
     """数据加载器类，用于处理与adata库的交互"""
     
@@ -19,7 +33,7 @@ class DataLoader:
         """
         try:
             # 使用adata获取所有股票代码
-            df = adata.stock.info.all_code()
+            df = get_backend().all_code()
             
             # 如果有搜索文本，进行过滤
             if search_text:
@@ -46,7 +60,7 @@ class DataLoader:
         """
         try:
             # 使用adata获取行情数据
-            df = adata.stock.market.get_market(
+            df = get_backend().get_market(
                 stock_code=stock_code, 
                 k_type=k_type, 
                 start_date=start_date
@@ -67,10 +81,7 @@ class DataLoader:
             包含概念信息的DataFrame
         """
         try:
-            if source == 'ths':
-                df = adata.stock.info.all_concept_code_ths()
-            else:
-                df = adata.stock.info.all_concept_code_east()
+            df = get_backend().all_concept_code(source)
             return df
         except Exception as e:
             raise Exception(f'获取{"同花顺" if source == "ths" else "东方财富"}概念列表失败: {str(e)}')
@@ -88,10 +99,7 @@ class DataLoader:
             包含成分股信息的DataFrame
         """
         try:
-            if source == 'ths':
-                df = adata.stock.info.concept_constituent_ths(concept_code)
-            else:
-                df = adata.stock.info.concept_constituent_east(concept_code)
+            df = get_backend().concept_constituent(concept_code, source)
             return df
         except Exception as e:
             raise Exception(f'获取概念{concept_code}股票列表失败: {str(e)}')
@@ -109,10 +117,7 @@ class DataLoader:
             包含成分股信息的DataFrame
         """
         try:
-            if source == 'ths':
-                df = adata.stock.info.concept_constituent_ths(concept_code)
-            else:
-                df = adata.stock.info.concept_constituent_east(concept_code)
+            df = get_backend().concept_constituent(concept_code, source)
             return df
         except Exception as e:
             raise Exception(f'获取概念{concept_code}成分股失败: {str(e)}')
@@ -130,10 +135,7 @@ class DataLoader:
             包含概念信息的DataFrame
         """
         try:
-            if source == 'ths':
-                df = adata.stock.info.get_concept_ths(stock_code)
-            else:
-                df = adata.stock.info.get_concept_east(stock_code)
+            df = get_backend().get_concept(stock_code, source)
             return df
         except Exception as e:
             raise Exception(f'获取股票{stock_code}所属概念失败: {str(e)}')
@@ -150,6 +152,7 @@ class DataLoader:
             proxy_url: 获取代理IP的链接
         """
         try:
+            import adata
             adata.proxy(is_proxy=is_proxy, ip=ip, proxy_url=proxy_url)
         except Exception as e:
             raise Exception(f'设置代理失败: {str(e)}')
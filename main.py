@@ -8,18 +8,19 @@ AData UI - 股票数据分析应用
 """
 
 # 导入必要的库和模块
-from nicegui import ui, app
+from nicegui import ui, app, background_tasks
+from fastapi import Request
+from fastapi.responses import PlainTextResponse
 import sys
 import os
 from pathlib import Path
 
-# 导入已拆分的页面模块
-from adata_ui.pages.stock_page import load_stock_info_page
-from adata_ui.pages.market_page import load_stock_market_page
-from adata_ui.pages.concept_page import load_concept_page
-
 # 导入应用配置和工具函数
 from adata_ui.utils.app_config import setup_app, show_error, set_loading
+from adata_ui.utils.metrics import render_metrics, sample_loop_lag, timed_page
+
+# 页面模块（及其依赖的pandas、plotly、数据加载器）在首次访问对应路由时才导入，
+# 避免拖慢启动；导入耗时见 benchmarks/import_profile.py
 
 # 初始化应用配置
 setup_app()
@@ -54,6 +55,8 @@ def create_navbar():
             ui.button('股票信息', on_click=lambda: ui.navigate.to('/stock')).props('flat text-color=white')
             ui.button('股票行情', on_click=lambda: ui.navigate.to('/market')).props('flat text-color=white')
             ui.button('概念板块', on_click=lambda: ui.navigate.to('/concept')).props('flat text-color=white')
+            ui.button('选股', on_click=lambda: ui.navigate.to('/screener')).props('flat text-color=white')
+            ui.button('回测', on_click=lambda: ui.navigate.to('/backtest')).props('flat text-color=white')
             ui.button('数据导出', on_click=lambda: ui.navigate.to('/export')).props('flat text-color=white')
     
 # 创建主内容区域函数
@@ -66,6 +69,7 @@ def create_main_content():
 
 # 首页路由
 @ui.page('/')
+@timed_page('/')
 def index_page():
     """首页 - 应用的主入口页面"""
     # 创建导航栏
@@ -80,6 +84,10 @@ def index_page():
             
         ui.label('欢迎使用 AData UI').style('font-size: 1.5rem; font-weight: 600; margin-bottom: 2rem; color: #165DFF')
         
+        # 主要指数看板（各指数并发加载）
+        from adata_ui.components.index_dashboard import create_index_dashboard
+        create_index_dashboard()
+        
         # 功能介绍卡片
         with ui.grid(columns=2, rows=2).classes('gap-6'):
             # 股票信息卡片
@@ -106,6 +114,10 @@ def index_page():
                 ui.label('数据导出').style('font-size: 1.1rem; font-weight: 500; margin-top: 1rem;')
                 ui.label('导出分析数据为Excel或CSV格式').style('color: #666; margin-top: 0.5rem;')
         
+        # 行情排行榜（后台增量维护，首次访问时启动）
+        from adata_ui.components.leaderboard_panel import create_leaderboard_panel
+        create_leaderboard_panel()
+        
         # 系统信息卡片
         with ui.card().classes('p-6 shadow-md border-0 rounded-xl mt-6'):
             ui.label('系统信息').style('font-size: 1.1rem; font-weight: 500; margin-bottom: 1rem;')
@@ -114,6 +126,7 @@ def index_page():
 
 # 股票信息页面路由
 @ui.page('/stock')
+@timed_page('/stock')
 def stock_page():
     """股票信息页面 - 查看股票基本信息"""
     # 创建导航栏
@@ -126,11 +139,13 @@ def stock_page():
             ui.notify(app.storage.general['error_message'], color='negative')
             app.storage.general['error_message'] = ''
     
-    # 调用已拆分的页面加载函数
+    # 调用已拆分的页面加载函数（首次访问时导入页面模块）
+    from adata_ui.pages.stock_page import load_stock_info_page
     load_stock_info_page()
 
 # 股票行情页面路由
 @ui.page('/market')
+@timed_page('/market')
 def market_page():
     """股票行情页面 - 查看股票K线图和历史数据"""
     # 创建导航栏
@@ -143,11 +158,13 @@ def market_page():
             ui.notify(app.storage.general['error_message'], color='negative')
             app.storage.general['error_message'] = ''
             
-    # 调用已拆分的页面加载函数
+    # 调用已拆分的页面加载函数（首次访问时导入页面模块）
+    from adata_ui.pages.market_page import load_stock_market_page
     load_stock_market_page()
 
 # 概念板块页面路由
 @ui.page('/concept')
+@timed_page('/concept')
 def concept_page():
     """概念板块页面 - 查看市场热点和板块轮动"""
     # 创建导航栏
@@ -160,11 +177,51 @@ def concept_page():
             ui.notify(app.storage.general['error_message'], color='negative')
             app.storage.general['error_message'] = ''
             
-    # 调用已拆分的页面加载函数
+    # 调用已拆分的页面加载函数（首次访问时导入页面模块）
+    from adata_ui.pages.concept_page import load_concept_page
     load_concept_page()
 
+# 全市场选股页面路由
+@ui.page('/screener')
+@timed_page('/screener')
+def screener_page():
+    """全市场选股页面 - 按行情、估值和技术条件筛选股票"""
+    # 创建导航栏
+    create_navbar()
+    
+    # 创建主内容区域
+    with create_main_content():
+        # 全局错误提示检查
+        if 'error_message' in app.storage.general and app.storage.general['error_message']:
+            ui.notify(app.storage.general['error_message'], color='negative')
+            app.storage.general['error_message'] = ''
+            
+        # 调用已拆分的页面加载函数（首次访问时导入页面模块）
+        from adata_ui.pages.screener_page import load_screener_page
+        load_screener_page()
+
+# 策略回测页面路由
+@ui.page('/backtest')
+@timed_page('/backtest')
+def backtest_page():
+    """策略回测页面 - 均线、突破、概念轮动策略的回测和参数扫描"""
+    # 创建导航栏
+    create_navbar()
+    
+    # 创建主内容区域
+    with create_main_content():
+        # 全局错误提示检查
+        if 'error_message' in app.storage.general and app.storage.general['error_message']:
+            ui.notify(app.storage.general['error_message'], color='negative')
+            app.storage.general['error_message'] = ''
+            
+        # 调用已拆分的页面加载函数（首次访问时导入页面模块）
+        from adata_ui.pages.backtest_page import load_backtest_page
+        load_backtest_page()
+
 # 数据导出页面路由
 @ui.page('/export')
+@timed_page('/export')
 def export_page():
     """数据导出页面 - 导出分析数据"""
     # 创建导航栏
@@ -228,17 +285,70 @@ def export_data(data_type, format_type):
     finally:
         set_loading(False)
 
+# Prometheus指标接口
+def metrics_endpoint():
+    """导出事件循环延迟、页面/数据加载耗时、上游延迟和连接数等指标"""
+    return PlainTextResponse(render_metrics(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+app.add_api_route('/metrics', metrics_endpoint, methods=['GET'])
+
+# 全市场选股接口
+async def screener_endpoint(request: Request):
+    """全市场选股，参数格式见 adata_ui.pages.screener_page.screener_api"""
+    from adata_ui.pages.screener_page import screener_api
+    return await screener_api(request.query_params)
+
+app.add_api_route('/api/screener', screener_endpoint, methods=['GET'])
+
+# 性能剖析管理页面，仅在设置 ADATA_UI_ADMIN=1 时启用
+if os.environ.get('ADATA_UI_ADMIN', '').lower() in ('1', 'true'):
+    from adata_ui.pages.admin_page import load_profiles_page, register_admin_routes
+
+    register_admin_routes()
+
+    @ui.page('/admin/profiles')
+    def admin_profiles_page():
+        """性能剖析管理页面 - 启用剖析并下载剖析文件"""
+        create_navbar()
+        with create_main_content():
+            load_profiles_page()
+
+def load_trading_calendar():
+    """加载交易日历（及其依赖的pandas），在线程池中执行"""
+    from adata_ui.utils.trading_calendar import get_trading_calendar
+    return get_trading_calendar()
+
+async def preload_trading_calendar():
+    """启动后在线程池中预先加载交易日历，不阻塞事件循环"""
+    import asyncio
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, load_trading_calendar)
+    except Exception as e:
+        print(f"加载交易日历失败: {str(e)}")
+
 # 应用启动前初始化
 @app.on_startup
 def startup():
     """应用启动时执行的初始化操作"""
     initialize_storage()
+    # 启动事件循环延迟采样
+    background_tasks.create(sample_loop_lag(), name='loop_lag_sampler')
+    # 在线程池中预先加载交易日历，事件循环中判断交易时段、最新交易日时不再等待后端
+    background_tasks.create(preload_trading_calendar(), name='trading_calendar')
+    # 配置了物化目录时启动收盘物化调度器，非交易时段的页面直接读取物化结果
+    materialized_dir = os.environ.get('ADATA_UI_MATERIALIZED_DIR')
+    if materialized_dir:
+        from adata_ui.utils.materialize import EodScheduler
+        EodScheduler(materialized_dir).start()
     print('AData UI 应用启动成功')
 
 # 应用停止时清理
 @app.on_shutdown
 def shutdown():
     """应用停止时执行的清理操作"""
+    # 关闭计算进程池（未使用过时不会启动）
+    from adata_ui.utils.compute import compute_pool
+    compute_pool.shutdown()
     print('AData UI 应用已停止')
 
 # 启动应用